@@ -9,18 +9,28 @@ from enum import Enum
 from fastapi import APIRouter, Depends, HTTPException, status, Body 
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import from parent directory
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import get_db
+from database import get_db, get_async_db, run_db
 import models  
 from models import UserRole
 from config import settings
+from utils.cache import user_cache, user_cache_key, invalidate_user
+from utils.security import (
+    pwd_context,
+    verify_password,
+    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    verify_and_update_password_async
+)
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-for-jwt-tokens-make-it-long-and-random"  # Store in environment variables in production
@@ -28,9 +38,6 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Token schemes
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
@@ -46,6 +53,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
     user_id: Optional[int] = None
+    role: Optional[str] = None
 
 class UserRole(str, Enum):
     MASTER = "master"
@@ -69,12 +77,6 @@ class UserAgreement(BaseModel):
     agreement_accepted: bool
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -89,6 +91,53 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_claims(user) -> dict:
+    """Claims carried by access and refresh tokens: who the user is and their role"""
+    return {"sub": user.email, "user_id": user.id, "role": user.role.value}
+
+def decode_token(token: str) -> TokenData:
+    """Claims of a valid token; raises JWTError for anything else"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    email = payload.get("sub")
+    user_id = payload.get("user_id")
+    
+    if email is None or user_id is None:
+        raise JWTError("Missing claims")
+    
+    # Tokens issued before the role claim existed carry none
+    return TokenData(email=email, user_id=user_id, role=payload.get("role"))
+
+def snapshot_user(user):
+    """Detached copy of a user row's columns, safe to share between sessions"""
+    snapshot = models.User(**{
+        attr.key: getattr(user, attr.key) for attr in inspect(models.User).column_attrs
+    })
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+def fetch_user_snapshot(db: Session, user_id: int):
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    return snapshot_user(user) if user is not None else None
+
+async def load_user(db: Session, read_db, user_id: int, use_cache: bool = True):
+    """
+    A user row attached to db. Cache misses are read through read_db (the
+    async session on requests); either way the row is merged into db without
+    a SELECT, so the caller gets a normal session object (lazy relationships,
+    updates).
+    """
+    key = user_cache_key(user_id)
+    snapshot = user_cache.get(key) if use_cache else None
+    
+    if snapshot is None:
+        snapshot = await run_db(read_db, fetch_user_snapshot, user_id)
+        if snapshot is None:
+            return None
+        user_cache.set(key, snapshot, 1)
+    
+    # merge copies the snapshot's state, replacing any stale copy in db
+    return db.merge(snapshot, load=False)
+
 # Get user by email from database
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -97,21 +146,43 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
+def get_login_user(db: Session, login: str):
+    # Try to find user by email first, then treat it as a username
+    return get_user_by_email(db, login) or get_user_by_username(db, login)
+
 # Authenticate user
 def authenticate_user(db: Session, email: str, password: str):
-    # Try to find user by email first
-    user = get_user_by_email(db, email)
-    
-    # If not found by email, check if email is actually a username
-    if not user:
-        user = get_user_by_username(db, email)
+    user = get_login_user(db, email)
         
     if not user or not verify_password(password, user.hashed_password):
         return False
     return user
 
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """
+    authenticate_user with bcrypt on the password pool. A hash made with an
+    outdated BCRYPT_ROUNDS is replaced while the plain password is at hand.
+    """
+    user = get_login_user(db, email)
+    if not user:
+        return False
+    
+    valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not valid:
+        return False
+    
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+        invalidate_user(user.id)
+    return user
+
 # Get current user from token
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    read_db: AsyncSession = Depends(get_async_db)
+):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -119,18 +190,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        user_id = payload.get("user_id")
-        
-        if email is None or user_id is None:
-            raise credentials_exception
-        
-        token_data = TokenData(email=email, user_id=user_id)
+        token_data = decode_token(token)
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.id == token_data.user_id).first()
+    user = await load_user(db, read_db, token_data.user_id)
+    if user is not None and token_data.role and user.role.value != token_data.role:
+        # Role changed since the token was issued: confirm against the
+        # database, then refuse the token if it really is stale
+        invalidate_user(token_data.user_id)
+        user = await load_user(db, read_db, token_data.user_id, use_cache=False)
+        if user is not None and user.role.value != token_data.role:
+            user = None
+    
     if user is None:
         raise credentials_exception
     
@@ -164,7 +236,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         new_user = models.User(
             email=user_data.email,
             username=user_data.username,
@@ -195,7 +267,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login_for_access_token(user_data: UserLogin, db: Session = Depends(get_db)):
     try:
-        user = authenticate_user(db, user_data.email, user_data.password)
+        user = await authenticate_user_async(db, user_data.email, user_data.password)
         
         if not user:
             raise HTTPException(
@@ -224,12 +296,12 @@ async def login_for_access_token(user_data: UserLogin, db: Session = Depends(get
         # Create access and refresh tokens
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email, "user_id": user.id},
+            data=token_claims(user),
             expires_delta=access_token_expires
         )
         
         refresh_token = create_refresh_token(
-            data={"sub": user.email, "user_id": user.id}
+            data=token_claims(user)
         )
         
         # Return tokens and user info
@@ -266,6 +338,7 @@ async def accept_agreement(
     current_user.agreement_accepted = True
     current_user.agreement_timestamp = datetime.utcnow()
     db.commit()
+    invalidate_user(current_user.id)
     
     return {"message": "User agreement accepted successfully"}
 
@@ -295,7 +368,7 @@ async def accept_initial_agreement(
         )
     
     # Verify credentials
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
@@ -305,16 +378,17 @@ async def accept_initial_agreement(
     user.agreement_accepted = True
     user.agreement_timestamp = datetime.utcnow()
     db.commit()
+    invalidate_user(user.id)
     
     # Create tokens
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id},
+        data=token_claims(user),
         expires_delta=access_token_expires
     )
     
     refresh_token = create_refresh_token(
-        data={"sub": user.email, "user_id": user.id}
+        data=token_claims(user)
     )
     
     # Return tokens and user info
@@ -355,18 +429,10 @@ async def get_current_user_info(current_user: models.User = Depends(get_current_
 async def refresh_access_token(refresh_token_data: RefreshToken, db: Session = Depends(get_db)):
     try:
         # Decode refresh token
-        payload = jwt.decode(refresh_token_data.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        user_id = payload.get("user_id")
-        
-        if email is None or user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid refresh token",
-            )
+        token_data = decode_token(refresh_token_data.refresh_token)
         
-        # Find user
-        user = db.query(User).filter(User.id == user_id).first()
+        # Find user; a new access token always carries the current role
+        user = await load_user(db, db, token_data.user_id, use_cache=False)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -376,7 +442,7 @@ async def refresh_access_token(refresh_token_data: RefreshToken, db: Session = D
         # Create new access token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email, "user_id": user.id},
+            data=token_claims(user),
             expires_delta=access_token_expires
         )
         
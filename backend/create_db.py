@@ -1,9 +1,11 @@
 # create_db.py
-from database import engine, Base
+# Create missing tables and indexes. Run once per deploy when the app starts
+# with SCHEMA_SYNC_ON_STARTUP=off
+from database import engine, sync_schema
 import models
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    sync_schema(engine)
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
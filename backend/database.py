@@ -1,5 +1,6 @@
 # database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -24,8 +25,41 @@ else:
     
     SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+def pool_options(url: str) -> dict:
+    """
+    Connection pool settings shared by the sync and async engines. Pre-ping
+    and recycling drop connections the server (or Azure's idle timeout)
+    already closed instead of failing the request that picks them up.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+def async_database_url(url: str) -> str:
+    """The same database through an asyncio driver (asyncpg / aiosqlite)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg spells libpq's sslmode as ssl
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    
+    return url
+
 # Create engine for PostgreSQL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL))
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -40,3 +74,115 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async engine for read-heavy endpoints, created on first use so scripts and
+# workers that never touch it do not need the asyncio driver
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        
+        _async_engine = create_async_engine(
+            async_database_url(SQLALCHEMY_DATABASE_URL), **pool_options(SQLALCHEMY_DATABASE_URL)
+        )
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+        
+        from utils.metrics import instrument_engine
+        instrument_engine(_async_engine.sync_engine)
+    return _async_engine
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session_factory() as session:
+        yield session
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run fn(session, *args, **kwargs), plain sync ORM code, against db. On an
+    AsyncSession the queries go through the asyncio driver, so the event loop
+    keeps serving other requests while they wait; a sync Session (scripts,
+    tests) runs fn directly. fn should return plain data: lazy loads do not
+    work once it has returned.
+    """
+    from sqlalchemy.ext.asyncio import AsyncSession
+    
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
+
+def create_missing_indexes(bind=None):
+    """
+    create_all only builds indexes together with new tables; this adds
+    indexes declared later on tables that already exist.
+    """
+    bind = bind or engine
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+# Startup schema check: "auto" (default) compares the schema fingerprint stored
+# by the last sync with the models and only runs create_all when they differ,
+# "always" syncs on every start, "off" leaves it to `python create_db.py`
+SCHEMA_SYNC_ON_STARTUP = os.getenv("SCHEMA_SYNC_ON_STARTUP", "auto").lower()
+
+def schema_fingerprint() -> str:
+    """
+    Hash of the tables, indexes and unique constraints the models declare:
+    everything create_all and create_missing_indexes can add
+    """
+    import hashlib
+    import models  # registers the tables on Base.metadata
+    
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(sorted(f"{table.name}.{column.name}" for column in table.columns))
+        parts.extend(sorted(f"index:{index.name}" for index in table.indexes))
+        parts.extend(sorted(
+            f"constraint:{constraint.name}" for constraint in table.constraints if constraint.name
+        ))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def schema_is_current(bind=None) -> bool:
+    """One SELECT: does the stored fingerprint match the models?"""
+    from sqlalchemy import select
+    from sqlalchemy.exc import SQLAlchemyError
+    import models
+    
+    bind = bind or engine
+    try:
+        with bind.connect() as conn:
+            stored = conn.execute(
+                select(models.SchemaState.fingerprint).where(models.SchemaState.id == 1)
+            ).scalar()
+    except SQLAlchemyError:
+        return False  # no schema_state table yet
+    return stored == schema_fingerprint()
+
+def sync_schema(bind=None):
+    """Create missing tables and indexes, then record the fingerprint"""
+    from datetime import datetime
+    import models
+    
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    create_missing_indexes(bind)
+    
+    with bind.begin() as conn:
+        conn.execute(models.SchemaState.__table__.delete())
+        conn.execute(models.SchemaState.__table__.insert().values(
+            id=1, fingerprint=schema_fingerprint(), synced_at=datetime.utcnow()
+        ))
+
+def ensure_schema(bind=None, mode: str = None) -> str:
+    """Startup schema check according to SCHEMA_SYNC_ON_STARTUP; returns what it did"""
+    mode = (mode or SCHEMA_SYNC_ON_STARTUP).lower()
+    if mode == "off":
+        return "skipped"
+    if mode != "always" and schema_is_current(bind):
+        return "current"
+    sync_schema(bind)
+    return "synced"
@@ -1,13 +1,14 @@
 # main.py
 # main FastAPI application
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 import os
+from typing import Optional
 
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from mimetypes import add_type
 
@@ -18,17 +19,17 @@ from routers.relationships import router as relationships_router
 from routers.analysis import router as analysis_router  
 from routers.analysis_with_master import router as analysis_with_master_router  
 from routers.video_english import router as video_english_router
+from routers.upload_sessions import router as upload_sessions_router
 from baduanjin_analysis.router import router as baduanjin_router
 
 # Import database
-from database import engine, Base
+from database import engine, sync_schema, ensure_schema
 
-# Azure imports for testing deployment 
+# Azure settings for testing deployment (the SDK itself is imported where it is used)
 from config import settings
-from azure_services import azure_blob_service
 
 # Create directory structure
-for dir_name in ["uploads", "processed", "analysis"]:
+for dir_name in ["uploads", "processed", "analysis", "outputs_json"]:
     os.makedirs(dir_name, exist_ok=True)
 
 # Create FastAPI app
@@ -47,6 +48,12 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request metrics (latency per route, DB/storage calls), scraped from /api/metrics.
+# Added last so it wraps CORS and times the whole request
+from utils.metrics import MetricsMiddleware, instrument_engine
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+
 # Serve static files
 # app.mount("/api/static", StaticFiles(directory="uploads"), name="static_files")
 # app.mount("/api/static/outputs_json", StaticFiles(directory="outputs_json"), name="static_outputs_json")
@@ -64,6 +71,7 @@ app.include_router(analysis_with_master_router)
 app.include_router(relationships_router)
 app.include_router(baduanjin_router)
 app.include_router(video_english_router)
+app.include_router(upload_sessions_router)
 
 # Add Azure health check endpoint
 @app.get("/api/health")
@@ -104,6 +112,15 @@ async def health_check():
             "timestamp": "2024-06-08"
         }
 
+@app.get("/api/metrics")
+def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint; requires "Bearer $METRICS_TOKEN" (METRICS_PUBLIC=1 opens it)"""
+    from utils.metrics import render, scrape_authorized, CONTENT_TYPE
+    
+    if not scrape_authorized(authorization):
+        raise HTTPException(status_code=401, detail="Invalid or unconfigured metrics token")
+    return Response(content=render(), media_type=CONTENT_TYPE)
+
 # Add a debug endpoint to help diagnose path issues
 @app.get("/api/debug/paths")
 def debug_paths():
@@ -230,7 +247,9 @@ async def serve_video(path: str):
     if not filepath.lower().endswith(('.mp4', '.webm', '.ogg')):
         raise HTTPException(status_code=400, detail="Not a video file")
     
-    # Serve with proper headers for video streaming
+    # Serve with proper headers for video streaming. FileResponse answers Range
+    # requests with 206 + Content-Range and reads the file in chunks, so seeking
+    # never loads the whole video into memory
     return FileResponse(
         filepath, 
         media_type="video/mp4",
@@ -252,8 +271,8 @@ def read_root():
 async def force_create_tables():
     """Manually force table creation"""
     try:
-        # Create tables
-        Base.metadata.create_all(bind=engine)
+        # Create tables and indexes
+        sync_schema(engine)
         
         # Verify
         from sqlalchemy import inspect
@@ -277,19 +296,25 @@ async def force_create_tables():
 async def startup_event():
     try:
         print("Starting application...")
-        Base.metadata.create_all(bind=engine)
-        print("Tables created successfully!")
+        # One fingerprint query unless the models changed since the last sync
+        # (see SCHEMA_SYNC_ON_STARTUP in database.py)
+        result = ensure_schema(engine)
+        print(f"Database schema {result}")
         
-        # Quick verification
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
-        print(f"Tables found: {tables}")
+        # Analysis job workers (ANALYSIS_WORKERS=0 when they run in their own
+        # process: python -m services.job_queue)
+        from services.job_queue import start_workers
+        start_workers()
         
     except Exception as e:
         print(f"Startup error: {e}")
         # Don't fail startup, just log the error
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from services.job_queue import stop_workers
+    stop_workers()
+
 # Run with: uvicorn main:app --reload
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,129 @@
+# ml_pipeline/cpu_budget.py
+# CPU thread budget for concurrently running analyses. Every job used to set
+# OMP/MKL/torch threads to all cores, so two or three concurrent jobs
+# oversubscribed the machine. The budget splits the cores between the jobs
+# running in this process; a job's MMPose subprocess starts with its share in
+# the thread environment variables and picks up later changes (jobs starting
+# or finishing) from its control file.
+# Standard library only, so the MMPose demo script can use it too.
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Thread pools the analysis libraries size from the environment
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "TORCH_NUM_THREADS")
+
+def available_cores() -> int:
+    """Cores this process may run on (container/affinity aware), ANALYSIS_CPU_CORES overrides"""
+    configured = os.getenv("ANALYSIS_CPU_CORES")
+    if configured:
+        return max(1, int(configured))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # not available on Windows/macOS
+        return max(1, os.cpu_count() or 1)
+
+def thread_env(threads: int) -> Dict[str, str]:
+    """Environment for a subprocess limited to threads threads (CPU only)"""
+    env = {name: str(threads) for name in THREAD_ENV_VARS}
+    env["CUDA_VISIBLE_DEVICES"] = ""
+    return env
+
+def read_thread_count(path: str) -> Optional[int]:
+    """Thread count in a lease's control file, or None when it is missing or invalid"""
+    try:
+        with open(path, "r") as f:
+            return max(1, int(f.read().strip()))
+    except (OSError, ValueError):
+        return None
+
+class CpuLease:
+    """One job's share of the budget; threads changes as other jobs start and finish"""
+
+    def __init__(self, budget: "CpuBudget", key: str, control_path: Optional[str]):
+        self.budget = budget
+        self.key = key
+        self.control_path = control_path
+        self.threads = 1
+
+    def env(self) -> Dict[str, str]:
+        return thread_env(self.threads)
+
+    def release(self):
+        self.budget.release(self)
+
+class CpuBudget:
+    """
+    Fair split of cores (minus reserved ones) over the active leases: each gets
+    cores // n threads, the oldest leases take the remainder, never below one.
+    """
+
+    def __init__(self, cores: Optional[int] = None, reserved: int = 0, control_dir: Optional[str] = None):
+        self.cores = max(1, (cores or available_cores()) - reserved)
+        self.control_dir = control_dir
+        self._leases: List[CpuLease] = []
+        self._lock = threading.Lock()
+
+    def shares(self, jobs: int) -> List[int]:
+        """Threads per job, oldest first, for jobs concurrent jobs"""
+        if jobs <= 0:
+            return []
+        base, extra = divmod(self.cores, jobs)
+        return [max(1, base + (1 if index < extra else 0)) for index in range(jobs)]
+
+    def acquire(self, key: str) -> CpuLease:
+        control_path = None
+        if self.control_dir:
+            os.makedirs(self.control_dir, exist_ok=True)
+            control_path = os.path.join(self.control_dir, f"{os.getpid()}-{key}.threads")
+        lease = CpuLease(self, key, control_path)
+        with self._lock:
+            self._leases.append(lease)
+            self._rebalance()
+        return lease
+
+    def release(self, lease: CpuLease):
+        with self._lock:
+            if lease not in self._leases:
+                return
+            self._leases.remove(lease)
+            self._rebalance()
+        if lease.control_path:
+            try:
+                os.remove(lease.control_path)
+            except OSError:
+                pass
+
+    @contextmanager
+    def lease(self, key: str):
+        lease = self.acquire(key)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+    def active(self) -> Dict[str, int]:
+        with self._lock:
+            return {lease.key: lease.threads for lease in self._leases}
+
+    def _rebalance(self):
+        for lease, threads in zip(self._leases, self.shares(len(self._leases))):
+            if threads == lease.threads and lease.control_path and os.path.exists(lease.control_path):
+                continue
+            lease.threads = threads
+            if lease.control_path:
+                # Write then rename, so a reader never sees a partial file
+                temporary = lease.control_path + ".tmp"
+                with open(temporary, "w") as f:
+                    f.write(str(threads))
+                os.replace(temporary, lease.control_path)
+
+# Shared by the analysis workers of this process (services/job_queue.py)
+cpu_budget = CpuBudget(
+    reserved=int(os.getenv("ANALYSIS_RESERVED_CORES", "0")),
+    control_dir=os.path.join(tempfile.gettempdir(), "baduanjin_cpu_budget")
+)
@@ -3,6 +3,7 @@
 
 import mimetypes
 import os
+import sys
 import time
 from argparse import ArgumentParser
 
@@ -16,21 +17,50 @@ import numpy as np
 from mmpose.apis import MMPoseInferencer
 from mmpose.evaluation.functional import nms
 
+# Timing and CPU budget helpers shared with pose_analyzer (ml_pipeline/, standard library only)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stage_timing import StageTotals
+from cpu_budget import read_thread_count
+
 try:
     from mmdet.apis import inference_detector, init_detector
     has_mmdet = True
 except (ImportError, ModuleNotFoundError):
     has_mmdet = False
 
+class ThreadShare:
+    """
+    Follows the CPU budget share pose_analyzer writes to --threads-file
+    (ml_pipeline/cpu_budget.py) while other analyses start and finish
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.threads = None
+
+    def refresh(self):
+        if not self.path:
+            return
+        threads = read_thread_count(self.path)
+        if threads and threads != self.threads:
+            import torch
+            torch.set_num_threads(threads)
+            cv2.setNumThreads(threads)
+            self.threads = threads
+            print(f"CPU budget: using {threads} threads")
+
+
 def process_one_image(args,
                       img,
                       detector,
                       pose_inferencer,
-                      show_interval=0):
+                      show_interval=0,
+                      clock=None):
     """Process one image with pose estimation."""
     
     try:
         # predict bbox using mmdet
+        detection_start = time.perf_counter()
         det_result = inference_detector(detector, img)
         pred_instance = det_result.pred_instances.cpu().numpy()
         bboxes = np.concatenate(
@@ -38,6 +68,8 @@ def process_one_image(args,
         bboxes = bboxes[np.logical_and(pred_instance.labels == args.det_cat_id,
                                        pred_instance.scores > args.bbox_thr)]
         bboxes = bboxes[nms(bboxes, args.nms_thr), :4]
+        if clock:
+            clock.add("detection", time.perf_counter() - detection_start, 1)
 
         # Handle image input and fix paths for Windows
         if isinstance(img, str):
@@ -57,8 +89,11 @@ def process_one_image(args,
         # Run pose estimation with Windows-compatible path
         try:
             # Simple approach - just run MMPoseInferencer without complex output dir
+            pose_start = time.perf_counter()
             result_generator = pose_inferencer(img_path, show=False)
             results = next(result_generator)
+            if clock:
+                clock.add("pose_estimation", time.perf_counter() - pose_start, 1)
             
             # Extract predictions
             if isinstance(results, dict) and 'predictions' in results:
@@ -235,6 +270,16 @@ def main():
         '--alpha', type=float, default=0.8, help='The transparency of bboxes')
     parser.add_argument(
         '--draw-bbox', action='store_true', help='Draw bboxes of instances')
+    parser.add_argument(
+        '--timings-out',
+        type=str,
+        default='',
+        help='Write per-stage seconds and frame counts to this JSON file')
+    parser.add_argument(
+        '--threads-file',
+        type=str,
+        default='',
+        help='File holding the thread count to use, re-read while running')
 
     assert has_mmdet, 'Please install mmdet to run the demo.'
 
@@ -263,6 +308,11 @@ def main():
         args.pred_save_path = os.path.join(args.output_root, f'results_{os.path.splitext(os.path.basename(args.input))[0]}.json')
         args.pred_save_path = os.path.normpath(args.pred_save_path)
 
+    clock = StageTotals()
+    thread_share = ThreadShare(args.threads_file)
+    thread_share.refresh()
+    model_load_start = time.perf_counter()
+
     # build detector
     detector = init_detector(
         args.det_config, args.det_checkpoint, device=args.device)
@@ -274,6 +324,7 @@ def main():
     except Exception as e:
         print(f"Error initializing MMPoseInferencer: {e}")
         return
+    clock.add("model_load", time.perf_counter() - model_load_start)
 
     # Determine input type (removed webcam support as requested)
     input_type = mimetypes.guess_type(args.input)[0]
@@ -287,7 +338,7 @@ def main():
         # inference
         try:
             predictions, img_array = process_one_image(
-                args, args.input, detector, pose_inferencer)
+                args, args.input, detector, pose_inferencer, clock=clock)
 
             print(f"Detected {len(predictions)} pose instances")
             
@@ -333,8 +384,10 @@ def main():
                     "instance_info": [frame_data]
                 }
                 
+                json_start = time.perf_counter()
                 with open(args.pred_save_path, 'w') as f:
                     json.dump(final_data, f, indent='\t')
+                clock.add("json_write", time.perf_counter() - json_start, 1)
                 print(f'Predictions saved at {args.pred_save_path}')
         
         except Exception as e:
@@ -374,7 +427,9 @@ def main():
 
         # Process each frame of the uploaded video
         while cap.isOpened():
+            decode_start = time.perf_counter()
             success, frame = cap.read()
+            clock.add("decode", time.perf_counter() - decode_start, 1 if success else 0)
             frame_idx += 1
 
             if not success:
@@ -390,11 +445,12 @@ def main():
             # Show progress every 30 PROCESSED frames (not total frames)
             if processed_frames % 30 == 0 and processed_frames > 0:  # MODIFY THIS LINE
                 print(f"Processing frame {frame_idx}/{total_frames} (processed: {processed_frames})")
+                thread_share.refresh()
 
             try:
                 # Pose estimation for current frame
                 predictions, img_array = process_one_image(
-                    args, frame, detector, pose_inferencer, 0)
+                    args, frame, detector, pose_inferencer, 0, clock=clock)
 
                 if args.save_predictions and predictions:
                     # Convert predictions to format expected by results_analysis.py
@@ -408,6 +464,7 @@ def main():
                     pred_instances_list.append(frame_data)
 
                 # Create visualization with pose overlay
+                render_start = time.perf_counter()
                 frame_vis = visualize_pose(frame, predictions, args.kpt_thr)
 
                 # Save output video with pose analysis
@@ -443,6 +500,7 @@ def main():
                         # ============================================================
 
                     video_writer.write(frame_vis)
+                clock.add("render", time.perf_counter() - render_start, 1)
 
                 processed_frames += 1  # ADD THIS: Increment processed frame counter
 
@@ -493,13 +551,18 @@ def main():
                 "instance_info": pred_instances_list
             }
             
+            json_start = time.perf_counter()
             with open(args.pred_save_path, 'w') as f:
                 json.dump(final_data, f, indent='\t')
+            clock.add("json_write", time.perf_counter() - json_start, len(pred_instances_list))
             print(f'Predictions saved: {args.pred_save_path}')
             print(f'Total frames with predictions: {len(pred_instances_list)}')
         
     else:
         raise ValueError(f'file {os.path.basename(args.input)} has invalid format.')
 
+    if args.timings_out:
+        clock.save(args.timings_out)
+
 if __name__ == '__main__':
     main()
@@ -11,6 +11,52 @@ import traceback
 import sys
 import datetime
 import shutil
+import hashlib
+import json
+import functools
+
+try:
+    from ml_pipeline.stage_timing import StageTimer, add_reported_stages, timings_path
+    from ml_pipeline.cpu_budget import cpu_budget
+except ImportError:  # run from inside ml_pipeline
+    from stage_timing import StageTimer, add_reported_stages, timings_path
+    from cpu_budget import cpu_budget
+
+# Bump when a change to this module alters the analysis output, so results
+# cached under the old pipeline fingerprint are not reused
+PIPELINE_VERSION = 1
+
+# Detector checkpoint and MMPose demo options; part of the pipeline fingerprint
+DET_CHECKPOINT_URL = "https://download.openmmlab.com/mmdetection/v2.0/faster_rcnn/faster_rcnn_r50_fpn_1x_coco/faster_rcnn_r50_fpn_1x_coco_20200130-047c8118.pth"
+MMPOSE_OPTIONS = [
+    "--pose-model", "human",
+    "--device", "cpu",
+    "--bbox-thr", "0.8",
+    "--kpt-thr", "0.2",
+    "--nms-thr", "0.8",
+    "--save-predictions"
+]
+
+@functools.lru_cache(maxsize=1)
+def pipeline_fingerprint():
+    """
+    Hash of everything besides the video that determines the analysis output:
+    PIPELINE_VERSION, the demo options and checkpoint, and the demo script and
+    detector config files. Key for reusing results of identical videos.
+    """
+    demo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo")
+    digest = hashlib.sha256(json.dumps({
+        "version": PIPELINE_VERSION,
+        "checkpoint": DET_CHECKPOINT_URL,
+        "options": MMPOSE_OPTIONS
+    }, sort_keys=True).encode("utf-8"))
+    for filename in ("topdown_demo_mmdet_no_heatmap.py", "faster_rcnn_r50_fpn_coco.py"):
+        try:
+            with open(os.path.join(demo_dir, filename), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(f"missing:{filename}".encode("utf-8"))
+    return digest.hexdigest()
 
 def preprocess_video_for_cpu_preserve_duration(input_video_path, output_video_path, target_fps=30, max_resolution=720):
     """
@@ -153,7 +199,9 @@ def preprocess_video_for_cpu(input_video_path, output_video_path, target_fps=15,
 
 def setup_cpu_optimizations():
     """
-    Set environment variables for optimal CPU performance
+    Set environment variables for optimal CPU performance of a single job run
+    on its own (analyze_video gives each job its share of the CPU budget
+    through the MMPose subprocess environment instead)
     """
     import os
     
@@ -227,10 +275,39 @@ def analyze_video(video_path, user_id, video_id):
         video_id: Video ID for file naming
         
     Returns:
-        dict: Paths to the output files
+        dict: Paths to the output files, plus "timings" (the stage spans of
+        this run, also saved to outputs_json/{user_id}/{video_id}/timings.json)
+    """
+    timer = StageTimer()
+    outputs_json_dir = os.path.join(os.getcwd(), "outputs_json", str(user_id), str(video_id))
+    
+    try:
+        # Concurrent jobs split the cores instead of each using all of them
+        with cpu_budget.lease(f"video-{video_id}") as lease:
+            result = run_analysis_stages(video_path, user_id, video_id, timer, lease)
+    finally:
+        # Stages a failure returned out of are recorded as errors
+        timer.finish_open(status="error")
+        try:
+            timer.save(timings_path(outputs_json_dir))
+        except Exception as e:
+            print(f"DEBUG: Could not save stage timings: {e}")
+    
+    if result:
+        result["timings"] = timer.to_dict()
+        result["pipeline_fingerprint"] = pipeline_fingerprint()
+    return result
+
+def run_analysis_stages(video_path, user_id, video_id, timer, lease=None):
+    """
+    The steps of analyze_video, each pipeline stage timed on timer. lease is
+    the job's CPU budget share; without one the job uses every core.
     """
     # STEP 1: Setup CPU optimizations
-    setup_cpu_optimizations()
+    if lease is None:
+        setup_cpu_optimizations()
+    else:
+        print(f"CPU budget: {lease.threads} of {cpu_budget.cores} threads ({len(cpu_budget.active())} running jobs)")
     
     # STEP 2: Setup directories and logging FIRST
     print("DEBUG: Setting up directories and logging...")
@@ -263,6 +340,8 @@ def analyze_video(video_path, user_id, video_id):
     print("DEBUG: Checking if preprocessing is needed...")
 
     original_video_path = video_path
+    timer.start("preprocess")
+    preprocess_frames, preprocess_status = None, "skipped"
 
     # Check video properties first
     try:
@@ -277,6 +356,7 @@ def analyze_video(video_path, user_id, video_id):
             cap.release()
             
             print(f"DEBUG: Original video - {width}x{height}, {fps}fps, {total_frames} frames, {duration:.1f}s")
+            preprocess_frames = total_frames
             
             # Only preprocess if video is very large (to reduce processing time)
             needs_preprocessing = width > 1080 or height > 1080  # Only if larger than 1080p
@@ -289,10 +369,12 @@ def analyze_video(video_path, user_id, video_id):
                 if preprocess_video_for_cpu_preserve_duration(original_video_path, preprocessed_video_path, 
                                                             target_fps=fps, max_resolution=720):  # Keep original FPS
                     video_path = preprocessed_video_path
+                    preprocess_status = "ok"
                     print(f"DEBUG: Using resolution-reduced video: {video_path}")
                     with open(debug_log, 'a') as f:
                         f.write(f"Using resolution-reduced video: {video_path}\n")
                 else:
+                    preprocess_status = "error"
                     print("DEBUG: Resolution reduction failed, using original video")
                     with open(debug_log, 'a') as f:
                         f.write(f"Resolution reduction failed, using original video\n")
@@ -308,6 +390,7 @@ def analyze_video(video_path, user_id, video_id):
     except Exception as e:
         print(f"DEBUG: Error checking video properties: {e}")
         print("DEBUG: Using original video")
+    timer.finish("preprocess", frames=preprocess_frames, status=preprocess_status)
     
     # STEP 4: Setup remaining paths and logging
     print("DEBUG: Setting up MMPose paths...")
@@ -354,22 +437,25 @@ def analyze_video(video_path, user_id, video_id):
 
     print("DEBUG: Preparing MMPose command (simplified approach)...")
     
+    # The demo script reports its own stages (model load, decode, detection,
+    # pose estimation, render, JSON write) here
+    mmpose_timings_path = os.path.join(outputs_json_dir, "mmpose_timings.json").replace('\\', '/')
+    
     try:
         # Construct the MMPose 1.3.2 command format
         mmpose_cmd = [
             python_executable,
             mmpose_demo_path,
             det_config_path,
-            "https://download.openmmlab.com/mmdetection/v2.0/faster_rcnn/faster_rcnn_r50_fpn_1x_coco/faster_rcnn_r50_fpn_1x_coco_20200130-047c8118.pth",
-            "--pose-model", "human",  
+            DET_CHECKPOINT_URL,
             "--input", video_path,
             "--output-root", outputs_json_dir,
-            "--device", "cpu",
-            "--bbox-thr", "0.8",
-            "--kpt-thr", "0.2", 
-            "--nms-thr", "0.8",
-            "--save-predictions"
+            *MMPOSE_OPTIONS,
+            "--timings-out", mmpose_timings_path
         ]
+        if lease is not None and lease.control_path:
+            # Re-read while running, so the share follows other jobs starting and finishing
+            mmpose_cmd += ["--threads-file", lease.control_path]
         
         print("DEBUG: Command constructed successfully")
         print(f"DEBUG: Command has {len(mmpose_cmd)} arguments")
@@ -388,13 +474,14 @@ def analyze_video(video_path, user_id, video_id):
             print("DEBUG: Creating subprocess...")
             
             # Create subprocess with proper Windows environment
+            timer.start("mmpose")
             process = subprocess.Popen(
                 mmpose_cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 cwd=root_dir,
-                env=dict(os.environ, PYTHONIOENCODING='utf-8'),  # Fix encoding issues
+                env=dict(os.environ, PYTHONIOENCODING='utf-8', **(lease.env() if lease else {})),  # Fix encoding issues
                 shell=False  # Don't use shell for security
             )
             
@@ -510,6 +597,8 @@ def analyze_video(video_path, user_id, video_id):
                 
                 return None
             
+            pose_frames = add_reported_stages(timer, mmpose_timings_path, parent="mmpose")
+            timer.finish("mmpose", frames=pose_frames, threads=lease.threads if lease else os.cpu_count())
             print("DEBUG: MMPose completed successfully!")
             print("DEBUG: Checking output files...")
             
@@ -565,7 +654,10 @@ def analyze_video(video_path, user_id, video_id):
             web_video_path = os.path.join(outputs_json_dir, web_video_filename)
             
             # Enhanced FFmpeg conversion for web compatibility
-            success = convert_to_web_format(original_output, web_video_path, debug_log, log_file)
+            with timer.stage("web_conversion") as conversion_span:
+                success = convert_to_web_format(original_output, web_video_path, debug_log, log_file,
+                                                threads=lease.threads if lease else None)
+                conversion_span["status"] = "ok" if success else "error"
             
             if success:
                 with open(log_file, 'a') as f:
@@ -623,9 +715,10 @@ def analyze_video(video_path, user_id, video_id):
             f.write(f"Error: {str(e)}\n")
         return None
 
-def convert_to_web_format(input_path, output_path, debug_log, log_file):
+def convert_to_web_format(input_path, output_path, debug_log, log_file, threads=None):
     """
-    Convert video to web-compatible format using FFmpeg
+    Convert video to web-compatible format using FFmpeg (with at most threads
+    encoder threads when given)
     """
     try:
         with open(debug_log, 'a') as f:
@@ -659,6 +752,8 @@ def convert_to_web_format(input_path, output_path, debug_log, log_file):
             "-y",                       # Overwrite output file
             output_path
         ]
+        if threads:
+            ffmpeg_cmd[-2:-2] = ["-threads", str(threads)]
         
         with open(log_file, 'a') as f:
             f.write(f"Running FFmpeg conversion:\n")
@@ -0,0 +1,144 @@
+# ml_pipeline/stage_timing.py
+# Per-stage timing spans of one analysis job (preprocessing, detection, pose
+# estimation, JSON writing, web conversion, upload, ...), written next to the
+# results as timings.json and copied into analysis_stage_timings.
+# Standard library only, so the MMPose demo script can use it too.
+
+import os
+import json
+import time
+import uuid
+import datetime
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+TIMINGS_FILENAME = "timings.json"
+TIMINGS_VERSION = 1
+
+class StageTimer:
+    """
+    Collects spans for one job. Each span has a name, an optional parent (for
+    the sub-stages of the MMPose subprocess), start time, duration, status and
+    an optional frame count from which throughput (frames per second) follows.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, spans: Optional[List[Dict]] = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.spans = list(spans or [])
+        self._open = {}  # name -> (perf_counter start, started_at, parent)
+
+    def start(self, name: str, parent: Optional[str] = None):
+        """Open a span that finish() closes; for stages with several exit paths"""
+        self._open[name] = (time.perf_counter(), datetime.datetime.utcnow(), parent)
+
+    def finish(self, name: str, frames: Optional[int] = None, status: str = "ok", **details) -> Optional[Dict]:
+        if name not in self._open:
+            return None
+        start, started_at, parent = self._open.pop(name)
+        return self.add_span(name, time.perf_counter() - start, frames=frames, status=status,
+                             parent=parent, started_at=started_at, **details)
+
+    def finish_open(self, status: str = "error"):
+        """Close spans left open by an early return or exception"""
+        for name in list(self._open):
+            self.finish(name, status=status)
+
+    @contextmanager
+    def stage(self, name: str, frames: Optional[int] = None, parent: Optional[str] = None, **details):
+        """
+        Time the block as one span. The yielded dict can be updated inside the
+        block (span["frames"] = n, span["status"] = "skipped", details...).
+        An exception marks the span "error" and propagates.
+        """
+        span = {"frames": frames, "status": "ok", "details": dict(details)}
+        self.start(name, parent)
+        try:
+            yield span
+        except BaseException:
+            span["status"] = "error"
+            raise
+        finally:
+            self.finish(name, frames=span.get("frames"), status=span.get("status", "ok"),
+                        **span.get("details", {}))
+
+    def add_span(self, name: str, seconds: float, frames: Optional[int] = None, status: str = "ok",
+                 parent: Optional[str] = None, started_at: Optional[datetime.datetime] = None, **details) -> Dict:
+        """Record a span measured elsewhere (e.g. reported by a subprocess)"""
+        span = {
+            "stage": name,
+            "parent": parent,
+            "started_at": (started_at or datetime.datetime.utcnow()).isoformat(),
+            "seconds": round(seconds, 4),
+            "frames": frames,
+            "fps": round(frames / seconds, 3) if frames and seconds > 0 else None,
+            "status": status,
+            "details": details
+        }
+        self.spans.append(span)
+        return span
+
+    def total_seconds(self) -> float:
+        return round(sum(span["seconds"] for span in self.spans if not span["parent"]), 4)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": TIMINGS_VERSION,
+            "run_id": self.run_id,
+            "total_seconds": self.total_seconds(),
+            "spans": self.spans
+        }
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["StageTimer"]:
+        """The timer saved at path, or None when there is none (or it is unreadable)"""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(run_id=data.get("run_id"), spans=data.get("spans", []))
+
+class StageTotals:
+    """
+    Seconds and frames summed per stage, for a subprocess that times many
+    short steps (one per frame) and reports them once; saved in the format
+    add_reported_stages reads.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+
+    def add(self, name: str, seconds: float, frames: int = 0):
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "frames": 0})
+        stage["seconds"] += seconds
+        stage["frames"] += frames
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+
+def timings_path(outputs_dir: str) -> str:
+    return os.path.join(outputs_dir, TIMINGS_FILENAME)
+
+def add_reported_stages(timer: StageTimer, path: str, parent: str) -> Optional[int]:
+    """
+    Add the sub-stages a subprocess wrote to path ({"stages": {name:
+    {"seconds", "frames"}}}) as children of parent. Returns the frame count of
+    the pose estimation stage, if reported.
+    """
+    try:
+        with open(path, "r") as f:
+            stages = json.load(f).get("stages", {})
+    except (OSError, ValueError):
+        return None
+
+    for name, stage in stages.items():
+        timer.add_span(name, float(stage.get("seconds") or 0), frames=stage.get("frames") or None, parent=parent)
+    return (stages.get("pose_estimation") or {}).get("frames")
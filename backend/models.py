@@ -1,9 +1,9 @@
 # SQLAlchemy models (models.py) for database interactions
 # models.py 
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, BigInteger, Float, String, DateTime, Text, JSON, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import enum
 from sqlalchemy import Enum as SQLAlchemyEnum
 import json
@@ -64,6 +64,10 @@ class UserProfile(Base):
 
 class VideoUpload(Base):
     __tablename__ = "video_uploads"
+    __table_args__ = (
+        # Per-user listings: filter on owner and status, newest first
+        Index("ix_video_uploads_user_status_uploaded", "user_id", "processing_status", "upload_timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -81,7 +85,18 @@ class VideoUpload(Base):
     # Relationships
     user = relationship("User", back_populates="videos")
     analysis_results = relationship("AnalysisResult", back_populates="video", uselist=False)
+    analysis_metrics = relationship("AnalysisMetrics", back_populates="video", uselist=False, cascade="all, delete-orphan")
+    joint_ranges = relationship("AnalysisJointRange", back_populates="video", cascade="all, delete-orphan")
+    stage_timings = relationship("AnalysisStageTiming", back_populates="video", cascade="all, delete-orphan")
+    analysis_jobs = relationship("AnalysisJob", back_populates="video", cascade="all, delete-orphan")
+    result_cache_entries = relationship("AnalysisResultCache", back_populates="video", cascade="all, delete-orphan")
     keypoints = relationship("KeypointData", back_populates="video", cascade="all, delete-orphan")
+    keypoint_chunks = relationship("KeypointChunk", back_populates="video", cascade="all, delete-orphan")
+    artifact_manifest = relationship("VideoArtifactManifest", back_populates="video", uselist=False, cascade="all, delete-orphan")
+    artifact_index = relationship("VideoArtifactIndex", back_populates="video", uselist=False, cascade="all, delete-orphan")
+    file_info = relationship("VideoFileInfo", back_populates="video", uselist=False, cascade="all, delete-orphan")
+    stream_packages = relationship("VideoStreamPackage", back_populates="video", cascade="all, delete-orphan")
+    preview_media = relationship("VideoPreviewMedia", back_populates="video", cascade="all, delete-orphan")
 
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
@@ -140,6 +155,103 @@ class AnalysisResult(Base):
     def set_recommendations(self, data):
         self.recommendations = json.dumps(data)
 
+# Headline metrics of an analyzed video in typed columns, copied from the
+# extracted {performer}_*.json files, so progress trends are SQL aggregates
+class AnalysisMetrics(Base):
+    __tablename__ = "analysis_metrics"
+    __table_args__ = (
+        # Progress queries: one user's sessions, optionally one brocade, in time order
+        Index("ix_analysis_metrics_user_brocade_analyzed", "user_id", "brocade_type", "analyzed_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), unique=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    brocade_type = Column(String, nullable=True)
+    performer_type = Column(String(16), nullable=True)  # learner or master
+    analyzed_at = Column(DateTime, nullable=False)  # the session date (video upload time)
+    overall_smoothness = Column(Float, nullable=True)
+    overall_symmetry = Column(Float, nullable=True)
+    overall_stability = Column(Float, nullable=True)
+    mean_range_of_motion = Column(Float, nullable=True)  # degrees, averaged over joints
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="analysis_metrics")
+
+# Per-joint angle range of an analyzed video ({performer}_joint_angles.json rangeOfMotion)
+class AnalysisJointRange(Base):
+    __tablename__ = "analysis_joint_ranges"
+    __table_args__ = (
+        UniqueConstraint("video_id", "joint", name="uq_analysis_joint_ranges_video_joint"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), nullable=False)
+    joint = Column(String(32), nullable=False)
+    min_angle = Column(Float, nullable=True)
+    max_angle = Column(Float, nullable=True)
+    optimal_angle = Column(Float, nullable=True)
+    range_of_motion = Column(Float, nullable=True)  # max_angle - min_angle
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="joint_ranges")
+
+# Durable queue of analysis jobs (services/job_queue.py). Workers claim queued
+# jobs with SELECT ... FOR UPDATE SKIP LOCKED and heartbeat while running.
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        # At most one queued or running job per video (idempotent submission)
+        Index("uq_analysis_jobs_active_video", "video_id", unique=True,
+              postgresql_where=text("status IN ('queued', 'running')"),
+              sqlite_where=text("status IN ('queued', 'running')")),
+        # Claim order
+        Index("ix_analysis_jobs_status_priority", "status", "priority", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, completed, failed, cancelled
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=2)
+    worker_id = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="analysis_jobs")
+
+# One timed stage of an analysis job (see ml_pipeline/stage_timing.py); a job's
+# spans share a run_id. Sub-stages of the MMPose subprocess name their parent.
+class AnalysisStageTiming(Base):
+    __tablename__ = "analysis_stage_timings"
+    __table_args__ = (
+        # Regression queries: one stage across jobs over time
+        Index("ix_analysis_stage_timings_stage_started", "stage", "started_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), index=True)
+    run_id = Column(String(32), nullable=False, index=True)
+    stage = Column(String(64), nullable=False)
+    parent_stage = Column(String(64), nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    seconds = Column(Float, nullable=False)
+    frames = Column(Integer, nullable=True)
+    fps = Column(Float, nullable=True)  # frames / seconds
+    status = Column(String(16), nullable=False, default="ok")  # ok, error, skipped
+    details = Column(Text, nullable=True)  # JSON string
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="stage_timings")
+
 class MasterLearnerRelationship(Base):
     __tablename__ = "master_learner_relationships"
     
@@ -164,4 +276,197 @@ class KeypointData(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    video = relationship("VideoUpload", back_populates="keypoints")
\ No newline at end of file
+    video = relationship("VideoUpload", back_populates="keypoints")
+
+# Pose keypoints of a video in fixed-size frame chunks: one row holds a
+# zlib-compressed float32 array of shape (frame_count, keypoint_count, 3)
+# with x, y, score per keypoint (NaN where no person was detected)
+class KeypointChunk(Base):
+    __tablename__ = "keypoint_chunks"
+    __table_args__ = (
+        UniqueConstraint("video_id", "start_frame", name="uq_keypoint_chunks_video_start"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), index=True)
+    start_frame = Column(Integer, nullable=False)
+    frame_count = Column(Integer, nullable=False)
+    keypoint_count = Column(Integer, nullable=False)
+    codec = Column(String(16), default="zlib-f32", nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="keypoint_chunks")
+
+# Cached copy of the per-video artifact manifest written when analysis completes
+class VideoArtifactManifest(Base):
+    __tablename__ = "video_artifact_manifests"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), unique=True, index=True)
+    manifest = Column(Text)  # JSON string, same content as outputs_json/{user_id}/{video_id}/manifest.json
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="artifact_manifest")
+    
+    def get_manifest(self):
+        if self.manifest:
+            return json.loads(self.manifest)
+        return {}
+    
+    def set_manifest(self, data):
+        self.manifest = json.dumps(data)
+
+# What the pipeline produced for a video, derived from its manifest, so listings
+# of analyzed videos are a join instead of per-video filesystem checks
+class VideoArtifactIndex(Base):
+    __tablename__ = "video_artifact_index"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), unique=True, index=True)
+    has_results_json = Column(Boolean, default=False, nullable=False)
+    has_analysis_report = Column(Boolean, default=False, nullable=False)
+    results_json_name = Column(String, nullable=True)  # e.g. results_<name>.json
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="artifact_index")
+
+# Size and content hash of the uploaded video file, computed while it streamed in
+class VideoFileInfo(Base):
+    __tablename__ = "video_file_info"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), unique=True, index=True)
+    size_bytes = Column(BigInteger)
+    sha256 = Column(String(64), index=True)
+    storage_type = Column(String)  # azure_blob or local_fallback
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="file_info")
+
+# Finished analysis reusable for any video with the same content (sha256 of
+# the video file) analyzed by the same pipeline (services/result_cache.py).
+# video_id is the video whose outputs get linked.
+class AnalysisResultCache(Base):
+    __tablename__ = "analysis_result_cache"
+    __table_args__ = (
+        UniqueConstraint("content_sha256", "pipeline_fingerprint", name="uq_analysis_result_cache_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_sha256 = Column(String(64), nullable=False)
+    pipeline_fingerprint = Column(String(64), nullable=False)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), nullable=False, index=True)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="result_cache_entries")
+
+# Adaptive streaming (HLS) package of one variant of a video: master playlist
+# plus one playlist and segment set per rendition under base_path
+class VideoStreamPackage(Base):
+    __tablename__ = "video_stream_packages"
+    __table_args__ = (
+        UniqueConstraint("video_id", "variant", name="uq_video_stream_packages_variant"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), nullable=False, index=True)
+    variant = Column(String, nullable=False)  # original, analyzed or english
+    base_path = Column(String, nullable=False)  # outputs_json/{user_id}/{video_id}/hls/{variant}
+    renditions = Column(Text)  # JSON list of rendition names, lowest first
+    storage_type = Column(String)  # azure_blob or local
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="stream_packages")
+    
+    def get_renditions(self):
+        return json.loads(self.renditions) if self.renditions else []
+    
+    def set_renditions(self, renditions):
+        self.renditions = json.dumps(renditions)
+
+# Poster, seek-preview sprite sheet and WebVTT index of one variant of a video.
+# Files live under base_path, which ends in the content version, so they can
+# be cached forever.
+class VideoPreviewMedia(Base):
+    __tablename__ = "video_preview_media"
+    __table_args__ = (
+        UniqueConstraint("video_id", "variant", name="uq_video_preview_media_variant"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), nullable=False, index=True)
+    variant = Column(String, nullable=False)  # original or analyzed
+    version = Column(String(16), nullable=False)
+    base_path = Column(String, nullable=False)  # outputs_json/{user_id}/{video_id}/media/{variant}/{version}
+    thumbnail_count = Column(Integer)
+    thumbnail_interval = Column(Float)
+    storage_type = Column(String)  # azure_blob or local
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    video = relationship("VideoUpload", back_populates="preview_media")
+
+# Stored learner/master comparison, keyed by the content hashes of both sides' JSON files
+class ComparisonResult(Base):
+    __tablename__ = "comparison_results"
+    __table_args__ = (
+        UniqueConstraint("learner_hash", "master_hash", name="uq_comparison_results_inputs"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    learner_hash = Column(String(64), nullable=False, index=True)
+    master_hash = Column(String(64), nullable=False)
+    version = Column(Integer, nullable=False, default=1)  # Bumped when the comparison logic changes
+    user_video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), index=True)
+    master_video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="CASCADE"), index=True)
+    result = Column(Text)  # JSON string of the compare endpoint response
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def get_result(self):
+        if self.result:
+            return json.loads(self.result)
+        return {}
+    
+    def set_result(self, data):
+        self.result = json.dumps(data)
+
+# Resumable upload: chunks are staged as uncommitted Azure blocks (or local part
+# files) and only become a VideoUpload on commit
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(36), primary_key=True, index=True)  # uuid4
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    title = Column(String)
+    description = Column(String, nullable=True)
+    brocade_type = Column(String)
+    filename = Column(String)
+    content_type = Column(String)
+    total_size = Column(BigInteger)
+    chunk_size = Column(Integer)
+    total_chunks = Column(Integer)
+    storage_type = Column(String)  # azure_blob or local_fallback
+    blob_path = Column(String)  # Blob name, or local file path for local sessions
+    status = Column(String, default="open")  # open, committed, aborted
+    video_id = Column(Integer, ForeignKey("video_uploads.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+# Fingerprint of the schema the last database.sync_schema created, so app
+# startup can skip create_all when nothing changed (single row, id 1)
+class SchemaState(Base):
+    __tablename__ = "schema_state"
+    
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    synced_at = Column(DateTime, nullable=False)
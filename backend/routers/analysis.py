@@ -14,10 +14,11 @@ import models
 import database
 from auth.router import get_current_user
 import time
-
-from azure.storage.blob import BlobServiceClient
 import io
 
+from services.artifact_manifest import write_manifest, load_manifest, rebuild_manifest, artifacts_in
+from utils.cache import invalidate_master_artifacts
+
 def correct_azure_blob_path(stored_url: str, user_id: int, video_id: int) -> str:
     """
     Correct the blob path from the database to match actual Azure storage structure
@@ -205,6 +206,68 @@ async def run_analysis_script(video_id: int, user_id: int, video: models.VideoUp
         traceback.print_exc()
         return False
 
+# Declared before /{video_id} so "progress" is not parsed as a video id
+@router.get("/progress")
+async def get_progress(
+    user_id: Optional[int] = None,
+    brocade_type: Optional[str] = None,
+    joint: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Progress over time from the materialized analysis metrics: every analyzed
+    session in time order plus per-brocade aggregates (avg/min/max, first,
+    latest and change of each metric). user_id defaults to the current user; a
+    master may pass one of their accepted learners. joint (e.g. "left_knee")
+    adds that joint's angle range to each session.
+    """
+    from services.analysis_metrics import progress_sessions, progress_by_brocade, add_trend
+
+    user_id = user_id or current_user.id
+    if user_id != current_user.id:
+        relationship = None
+        if current_user.role == models.UserRole.MASTER:
+            relationship = db.query(models.MasterLearnerRelationship.id).filter(
+                models.MasterLearnerRelationship.master_id == current_user.id,
+                models.MasterLearnerRelationship.learner_id == user_id,
+                models.MasterLearnerRelationship.status == "accepted"
+            ).first()
+        if not relationship:
+            raise HTTPException(status_code=403, detail="Not authorized to view this user's progress")
+
+    sessions = progress_sessions(db, user_id, brocade_type, joint)
+    brocades = progress_by_brocade(db, user_id, brocade_type)
+    add_trend(brocades, sessions)
+
+    return {
+        "user_id": user_id,
+        "brocade_type": brocade_type,
+        "joint": joint,
+        "sessions": sessions,
+        "brocades": brocades
+    }
+
+@router.get("/timings/summary")
+async def get_stage_timing_summary(
+    stage: Optional[str] = None,
+    days: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Pipeline stage timings aggregated across all analysis jobs: per stage (and
+    parent stage) the number of runs and errors, avg/min/max seconds and average
+    throughput in frames per second. days limits it to recent jobs.
+    """
+    from services.stage_timings import stage_summary
+
+    return {
+        "stage": stage,
+        "days": days,
+        "stages": stage_summary(db, stage, days)
+    }
+
 @router.get("/{video_id}")
 async def get_analysis_results(
     video_id: int,
@@ -270,6 +333,7 @@ async def get_analysis_results(
                 if corrected_blob_path:
                     print(f"Checking Azure for analysis report with corrected path: {corrected_blob_path}")
                     
+                    from azure.storage.blob import BlobServiceClient
                     blob_service_client = BlobServiceClient.from_connection_string(connection_string)
                     blob_client = blob_service_client.get_blob_client(
                         container="results",
@@ -292,26 +356,14 @@ async def get_analysis_results(
                         print(f"Blob check failed: {str(blob_error)}")
                         print(f"Error type: {type(blob_error).__name__}")
                         
-                        # Try to list blobs with similar names for debugging
+                        # Show what the manifest says exists for this video, for debugging
                         try:
-                            container_client = blob_service_client.get_container_client("results")
-                            
-                            # Look for any blobs that start with outputs_json
-                            similar_blobs = []
-                            for blob in container_client.list_blobs(name_starts_with="outputs_json"):
-                                similar_blobs.append(blob.name)
-                            
-                            print(f"Found similar blobs: {similar_blobs}")
-                            
-                            # Look for any blobs for this user/video
-                            user_video_blobs = []
-                            for blob in container_client.list_blobs(name_starts_with=f"outputs_json/{current_user.id}/{video_id}/baduanjin_analysis"):
-                                user_video_blobs.append(blob.name)
-                            
-                            print(f"Found user/video blobs: {user_video_blobs}")
+                            manifest = load_manifest(db, current_user.id, video_id)
+                            user_video_blobs = [a["blob_path"] for a in artifacts_in(manifest, "baduanjin_analysis/")]
+                            print(f"Manifest artifacts for user/video: {user_video_blobs}")
                             
                         except Exception as list_error:
-                            print(f"Could not list similar blobs: {list_error}")
+                            print(f"Could not read artifact manifest: {list_error}")
                 else:
                     print(f"Could not correct blob path for URL: {analysis_report_url}")
             else:
@@ -643,6 +695,16 @@ async def run_analysis(
             if not success:
                 print(f"Analysis failed for video {video_id}")
                 # You might want to update the database to mark this video as analysis failed
+                return
+            
+            invalidate_master_artifacts(video_id)
+            
+            # Refresh the artifact manifest with the new baduanjin_analysis files
+            task_db = database.SessionLocal()
+            try:
+                write_manifest(task_db, current_user.id, video_id)
+            finally:
+                task_db.close()
         except Exception as e:
             print(f"Background analysis error for video {video_id}: {e}")
             import traceback
@@ -680,6 +742,7 @@ async def get_analysis_image(
         if connection_string:
             blob_path = f"outputs_json/{current_user.id}/{video_id}/baduanjin_analysis/{image_name}.png"
             
+            from azure.storage.blob import BlobServiceClient
             blob_service_client = BlobServiceClient.from_connection_string(connection_string)
             blob_client = blob_service_client.get_blob_client(
                 container="results",
@@ -776,6 +839,7 @@ async def get_analysis_file(
             raise HTTPException(status_code=400, detail="Invalid file type")
         
         # Download from Azure
+        from azure.storage.blob import BlobServiceClient
         blob_service_client = BlobServiceClient.from_connection_string(connection_string)
         blob_client = blob_service_client.get_blob_client(
             container="results",
@@ -803,6 +867,101 @@ async def get_analysis_file(
         print(f"Error accessing analysis file: {e}")
         raise HTTPException(status_code=404, detail=f"Analysis file not found: {filename}")
 
+@router.get("/{video_id}/keypoints")
+async def get_keypoint_frames(
+    video_id: int,
+    start: int = 0,
+    end: Optional[int] = None,
+    keypoints: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Pose keypoints for frames [start, end) from the chunked keypoint store.
+    keypoints is an optional comma-separated list of keypoint indices
+    (e.g. "5,6,11,12"); each frame is a list of [x, y, score] (null where no
+    person was detected). end defaults to the last frame, and one request
+    returns at most MAX_KEYPOINT_RANGE_FRAMES frames.
+    """
+    from services.keypoint_store import (
+        MAX_KEYPOINT_RANGE_FRAMES, total_frames, read_keypoints, frames_to_json
+    )
+    
+    # Verify video ownership
+    video = db.query(models.VideoUpload).filter(
+        models.VideoUpload.id == video_id,
+        models.VideoUpload.user_id == current_user.id
+    ).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    try:
+        keypoint_ids = [int(k) for k in keypoints.split(",")] if keypoints else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="keypoints must be comma-separated integers")
+    
+    frame_total = total_frames(db, video_id)
+    if frame_total == 0:
+        raise HTTPException(status_code=404, detail="No keypoints stored for this video")
+    
+    start = max(start, 0)
+    end = min(frame_total if end is None else end, frame_total, start + MAX_KEYPOINT_RANGE_FRAMES)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="Empty frame range")
+    
+    try:
+        frames = read_keypoints(db, video_id, start, end, keypoint_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "video_id": video_id,
+        "start": start,
+        "end": end,
+        "total_frames": frame_total,
+        "keypoints": keypoint_ids if keypoint_ids is not None else list(range(frames.shape[1])),
+        "frames": frames_to_json(frames)
+    }
+
+@router.get("/{video_id}/timings")
+async def get_stage_timings(
+    video_id: int,
+    run_id: Optional[str] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Stage spans of one analysis job of the video (the latest unless run_id is
+    given): stage, parent stage, start, seconds, frames, fps and status, plus
+    the list of all jobs of the video.
+    """
+    from services.stage_timings import list_runs, load_run
+    
+    # Verify video ownership
+    video = db.query(models.VideoUpload).filter(
+        models.VideoUpload.id == video_id,
+        models.VideoUpload.user_id == current_user.id
+    ).first()
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    runs = list_runs(db, video_id)
+    run = next((r for r in runs if r["run_id"] == run_id), None) if run_id else (runs[0] if runs else None)
+    if not run:
+        raise HTTPException(status_code=404, detail="No stage timings recorded for this video")
+    
+    return {
+        "video_id": video_id,
+        "run_id": run["run_id"],
+        "started_at": run["started_at"],
+        "total_seconds": run["total_seconds"],
+        "failed": run["failed"],
+        "spans": load_run(db, video_id, run["run_id"]),
+        "runs": runs
+    }
+
 @router.get("/{video_id}/analysis-summary")
 async def get_analysis_summary(
     video_id: int,
@@ -829,15 +988,18 @@ async def get_analysis_summary(
         }
     
     try:
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if not connection_string:
-            raise HTTPException(status_code=500, detail="Azure storage not configured")
-        
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client("results")
+        # The manifest lists every artifact, so storage is never enumerated
+        manifest = load_manifest(db, current_user.id, video_id)
+        if manifest is None:
+            # Analyzed before manifests existed: index its outputs once
+            manifest = rebuild_manifest(db, current_user.id, video_id)
+        if manifest is None:
+            return {
+                "status": "no_manifest",
+                "video_id": video_id,
+                "available_files": []
+            }
         
-        # List all files for this user/video in baduanjin_analysis
-        prefix = f"outputs_json/{current_user.id}/{video_id}/baduanjin_analysis/"
         available_files = {
             "images": [],
             "json": [], 
@@ -845,8 +1007,8 @@ async def get_analysis_summary(
             "urls": {}
         }
         
-        for blob in container_client.list_blobs(name_starts_with=prefix):
-            filename = blob.name.split("/")[-1]  # Get just the filename
+        for artifact in artifacts_in(manifest, "baduanjin_analysis/"):
+            filename = artifact["name"].split("/")[-1]  # Get just the filename
             
             if filename.endswith('.png'):
                 file_base = filename.replace('.png', '')
@@ -883,48 +1045,38 @@ async def get_analysis_summary(
     
 @router.get("/debug/azure-results-contents")
 async def debug_azure_results_contents(
-    current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
 ):
-    """Debug endpoint to check what's actually in the Azure results container"""
+    """Debug endpoint to check what's stored for the current user, read from the artifact manifests"""
     try:
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if not connection_string:
-            return {"error": "No Azure connection string"}
+        records = db.query(models.VideoArtifactManifest).join(models.VideoUpload).filter(
+            models.VideoUpload.user_id == current_user.id
+        ).all()
         
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client("results")
-        
-        # List all blobs in results container
-        all_blobs = []
         user_blobs = []
-        
-        for blob in container_client.list_blobs():
-            blob_info = {
-                "name": blob.name,
-                "size": blob.size,
-                "url": f"https://baduanjintesting.blob.core.windows.net/results/{blob.name}",
-                "last_modified": blob.last_modified.isoformat() if blob.last_modified else None
-            }
-            all_blobs.append(blob_info)
-            
-            # Check if this blob belongs to current user
-            if f"/{current_user.id}/" in blob.name or blob.name.startswith(f"{current_user.id}/"):
-                user_blobs.append(blob_info)
+        for record in records:
+            for artifact in record.get_manifest().get("artifacts", []):
+                user_blobs.append({
+                    "video_id": record.video_id,
+                    "name": artifact["blob_path"],
+                    "size": artifact["size"],
+                    "url": f"https://baduanjintesting.blob.core.windows.net/{artifact['container']}/{artifact['blob_path']}",
+                    "sha256": artifact["sha256"]
+                })
         
         return {
             "container": "results",
-            "total_blobs": len(all_blobs),
+            "manifests": len(records),
             "user_blobs": len(user_blobs),
             "current_user_id": current_user.id,
-            "all_blobs": all_blobs[:20],  # First 20 blobs
-            "user_specific_blobs": user_blobs,
-            "looking_for": f"outputs_json/{current_user.id}/{video_id}/baduanjin_analysis/analysis_report.txt"
+            "user_specific_blobs": user_blobs
         }
         
     except Exception as e:
         return {
             "error": str(e),
             "container": "results",
-            "details": "Failed to list blobs"
+            "details": "Failed to read artifact manifests"
         }
     
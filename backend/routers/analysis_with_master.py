@@ -2,6 +2,7 @@
 
 import os
 import json
+import hashlib
 import subprocess
 import sys
 import asyncio
@@ -15,39 +16,49 @@ import database
 from auth.router import get_current_user
 import io
 
-# Add Azure imports
-from azure.storage.blob import BlobServiceClient
+from services.artifact_manifest import write_manifest, artifact_set_hash
+from services.blob_storage import get_blob_service_client, download_blob_bytes_async
+from utils.cache import master_artifact_cache, master_cache_key, invalidate_master_artifacts
 
 router = APIRouter(
     prefix="/api/analysis-master",
     tags=["analysis-master"]
 )
 
+# Bump when generate_comparison_recommendations or the compare response changes,
+# so stored comparisons are recomputed
+COMPARISON_VERSION = 1
+
+# Reference files every learner comparison reads for a master video
+MASTER_JSON_FILES = [
+    "master_joint_angles.json",
+    "master_smoothness.json",
+    "master_symmetry.json",
+    "master_balance.json",
+    "master_recommendations.json"
+]
+
 # Helper function to read JSON from Azure or local storage
 async def read_json_file_azure_local(user_id: int, video_id: int, file_name: str) -> Dict:
     """
-    Read JSON file from Azure storage first, then fallback to local storage
+    Read JSON file from Azure storage first, then fallback to local storage.
+    Blocking I/O runs on a worker thread so several reads can be awaited together.
     """
     # Try Azure first
     try:
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if connection_string:
-            # Construct Azure blob path - matching your existing structure
-            blob_path = f"outputs_json/{user_id}/{video_id}/baduanjin_analysis/{file_name}"
-            
-            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            blob_client = blob_service_client.get_blob_client(
-                container="results",
-                blob=blob_path
-            )
-            
-            try:
-                blob_data = blob_client.download_blob().readall()
+        # Construct Azure blob path - matching your existing structure
+        blob_path = f"outputs_json/{user_id}/{video_id}/baduanjin_analysis/{file_name}"
+        
+        try:
+            blob_data = await download_blob_bytes_async("results", blob_path)
+            if blob_data is not None:
                 json_data = json.loads(blob_data.decode('utf-8'))
                 print(f"Successfully loaded {file_name} from Azure: {blob_path}")
                 return json_data
-            except Exception as azure_error:
-                print(f"Azure blob not found for {file_name}: {azure_error}")
+        except asyncio.TimeoutError:
+            print(f"Timed out reading {file_name} from Azure: {blob_path}")
+        except Exception as azure_error:
+            print(f"Azure blob not found for {file_name}: {azure_error}")
                 
     except Exception as e:
         print(f"Error accessing Azure storage for {file_name}: {e}")
@@ -63,8 +74,7 @@ async def read_json_file_azure_local(user_id: int, video_id: int, file_name: str
     
     if os.path.exists(local_path):
         try:
-            with open(local_path, 'r') as f:
-                json_data = json.load(f)
+            json_data = await asyncio.to_thread(read_local_json, local_path)
             print(f"Successfully loaded {file_name} from local storage: {local_path}")
             return json_data
         except Exception as e:
@@ -73,6 +83,73 @@ async def read_json_file_azure_local(user_id: int, video_id: int, file_name: str
     # File not found anywhere
     raise FileNotFoundError(f"JSON file {file_name} not found in Azure or local storage")
 
+def read_local_json(local_path: str) -> Dict:
+    with open(local_path, 'r') as f:
+        return json.load(f)
+
+async def read_json_files_concurrently(user_id: int, video_id: int, file_names: List[str], use_master_cache: bool = False) -> Dict[str, Any]:
+    """
+    Read several analysis JSON files at once. Returns {file_name: data} for the
+    files that loaded; a missing or failed file is logged and left out, so one
+    bad read does not fail the whole page.
+    """
+    reader = read_master_json_cached if use_master_cache else read_json_file_azure_local
+    results = await asyncio.gather(
+        *(reader(user_id, video_id, file_name) for file_name in file_names),
+        return_exceptions=True
+    )
+    
+    loaded = {}
+    for file_name, result in zip(file_names, results):
+        if isinstance(result, FileNotFoundError):
+            print(f"JSON file not found: {file_name}")
+        elif isinstance(result, Exception):
+            print(f"Error loading {file_name}: {str(result)}")
+        else:
+            loaded[file_name] = result
+    return loaded
+
+# Reads of master files already on their way to storage, so a burst of
+# comparisons against a cold master triggers one download per file
+_master_reads_in_flight: Dict[str, asyncio.Future] = {}
+
+async def read_master_json_cached(user_id: int, video_id: int, file_name: str) -> Dict:
+    """
+    Read-through cache for master reference files. Callers must not mutate
+    the returned data, it is shared by every request for the same master.
+    """
+    key = master_cache_key(video_id, file_name)
+    cached = master_artifact_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    in_flight = _master_reads_in_flight.get(key)
+    if in_flight is not None:
+        return await asyncio.shield(in_flight)
+    
+    future = asyncio.get_running_loop().create_future()
+    _master_reads_in_flight[key] = future
+    try:
+        json_data = await read_json_file_azure_local(user_id, video_id, file_name)
+        master_artifact_cache.set(key, json_data, len(json.dumps(json_data)))
+        future.set_result(json_data)
+        return json_data
+    except Exception as e:
+        future.set_exception(e)
+        # Mark retrieved so waiterless failures are not reported as unhandled
+        future.exception()
+        raise
+    finally:
+        _master_reads_in_flight.pop(key, None)
+
+async def warm_master_cache(user_id: int, video_id: int):
+    """Load a master's freshly extracted files into the cache"""
+    invalidate_master_artifacts(video_id)
+    loaded = await read_json_files_concurrently(
+        user_id, video_id, MASTER_JSON_FILES, use_master_cache=True
+    )
+    print(f"Warmed master cache for video {video_id}: {len(loaded)} files")
+
 # Helper function to check if JSON file exists in Azure or local
 async def json_file_exists(user_id: int, video_id: int, file_name: str) -> bool:
     """
@@ -80,18 +157,17 @@ async def json_file_exists(user_id: int, video_id: int, file_name: str) -> bool:
     """
     # Check Azure first
     try:
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if connection_string:
+        blob_service_client = get_blob_service_client()
+        if blob_service_client:
             blob_path = f"outputs_json/{user_id}/{video_id}/baduanjin_analysis/{file_name}"
             
-            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
             blob_client = blob_service_client.get_blob_client(
                 container="results",
                 blob=blob_path
             )
             
             try:
-                blob_client.get_blob_properties()
+                await asyncio.to_thread(blob_client.get_blob_properties)
                 return True
             except:
                 pass
@@ -115,15 +191,14 @@ async def upload_json_to_azure(json_data: Dict, user_id: int, video_id: int, fil
     Upload JSON data to Azure storage using your existing path structure
     """
     try:
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if not connection_string:
+        blob_service_client = get_blob_service_client()
+        if not blob_service_client:
             print("No Azure connection string available")
             return None
             
         # Construct Azure blob path - matching your existing structure
         blob_path = f"outputs_json/{user_id}/{video_id}/baduanjin_analysis/{file_name}"
         
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
         blob_client = blob_service_client.get_blob_client(
             container="results",
             blob=blob_path
@@ -133,7 +208,7 @@ async def upload_json_to_azure(json_data: Dict, user_id: int, video_id: int, fil
         json_bytes = json.dumps(json_data, indent=2).encode('utf-8')
         
         # Upload to Azure
-        blob_client.upload_blob(json_bytes, overwrite=True)
+        await asyncio.to_thread(blob_client.upload_blob, json_bytes, overwrite=True)
         
         azure_url = f"https://baduanjintesting.blob.core.windows.net/results/{blob_path}"
         print(f"Successfully uploaded {file_name} to Azure: {azure_url}")
@@ -392,6 +467,17 @@ async def get_master_extracted_videos(
     
     return extracted_videos
 
+def materialize_video_metrics(db: Session, video: models.VideoUpload):
+    """Copy the extracted headline metrics into analysis_metrics for progress queries"""
+    from services.analysis_metrics import materialize_metrics
+    
+    try:
+        if materialize_metrics(db, video) is None:
+            print(f"No extracted metric files to materialize for video {video.id}")
+    except Exception as e:
+        db.rollback()
+        print(f"Error materializing analysis metrics for video {video.id}: {e}")
+
 @router.post("/extract/{video_id}")
 async def extract_json_files(
     video_id: int,
@@ -481,10 +567,9 @@ async def extract_json_files(
     for file_name in expected_files:
         # Check Azure
         try:
-            connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-            if connection_string:
+            blob_service_client = get_blob_service_client()
+            if blob_service_client:
                 blob_path = f"outputs_json/{video.user_id}/{video_id}/baduanjin_analysis/{file_name}"
-                blob_service_client = BlobServiceClient.from_connection_string(connection_string)
                 blob_client = blob_service_client.get_blob_client(container="results", blob=blob_path)
                 
                 try:
@@ -504,7 +589,10 @@ async def extract_json_files(
                 existing_files.append(file_name)
     
     if len(existing_files) == len(expected_files):
-        # Files already exist, no need to extract again
+        # Files already exist, no need to extract again; videos extracted
+        # before metrics were materialized get their row here
+        if len(local_files) == len(expected_files):
+            materialize_video_metrics(db, video)
         return {
             "status": "success",
             "message": "JSON files already exist",
@@ -515,6 +603,10 @@ async def extract_json_files(
             "user_type": user_type
         }
     
+    # Re-extraction replaces the files, so cached copies are stale from here on
+    if user_type == "master":
+        invalidate_master_artifacts(video_id)
+    
     # Run the extraction with user type
     success = await run_extract_json_files(input_dir, output_dir, video.user_id, video_id, user_type)
     
@@ -525,6 +617,20 @@ async def extract_json_files(
             if os.path.exists(os.path.join(analysis_dir, f)):
                 created_files.append(f)
         
+        # Refresh the artifact manifest with the extracted JSON files
+        try:
+            write_manifest(db, video.user_id, video_id)
+        except Exception as e:
+            print(f"Error writing artifact manifest for video {video_id}: {e}")
+        
+        materialize_video_metrics(db, video)
+        
+        if user_type == "master":
+            try:
+                await warm_master_cache(video.user_id, video_id)
+            except Exception as e:
+                print(f"Error warming master cache for video {video_id}: {e}")
+        
         return {
             "status": "success",
             "message": "JSON files extracted and uploaded to Azure successfully",
@@ -621,24 +727,13 @@ async def get_master_data(
     
     # Load JSON files from Azure or local storage
     json_files = {}
-    json_file_names = [
-        "master_joint_angles.json",
-        "master_smoothness.json", 
-        "master_symmetry.json",
-        "master_balance.json",
-        "master_recommendations.json"
-    ]
     
-    for file_name in json_file_names:
-        try:
-            # Use the helper function to read from Azure or local
-            json_data = await read_json_file_azure_local(video.user_id, video_id, file_name)
-            json_files[file_name.replace(".json", "")] = json_data
-            
-        except FileNotFoundError:
-            print(f"JSON file not found: {file_name}")
-        except Exception as e:
-            print(f"Error loading {file_name}: {str(e)}")
+    # Read all files concurrently through the master cache; missing ones are left out
+    loaded = await read_json_files_concurrently(
+        video.user_id, video_id, MASTER_JSON_FILES, use_master_cache=True
+    )
+    for file_name, json_data in loaded.items():
+        json_files[file_name.replace(".json", "")] = json_data
     
     return {
         "masterData": master_data,
@@ -701,8 +796,7 @@ async def compare_analysis(
     if not master_video:
         raise HTTPException(status_code=404, detail="Master video not found")
     
-    # Load user's analysis data
-    user_data = {}
+    # Load user's and master's analysis data
     learner_json_files = [
         "learner_joint_angles.json",
         "learner_smoothness.json",
@@ -710,20 +804,6 @@ async def compare_analysis(
         "learner_balance.json"
     ]
     
-    for file_name in learner_json_files:
-        try:
-            # Use helper function to read from Azure or local
-            json_data = await read_json_file_azure_local(current_user.id, user_video_id, file_name)
-            key = file_name.replace("learner_", "").replace(".json", "")
-            user_data[key] = json_data
-            
-        except FileNotFoundError:
-            print(f"User JSON file not found: {file_name}")
-        except Exception as e:
-            print(f"Error loading user {file_name}: {str(e)}")
-    
-    # Load master's analysis data  
-    master_data = {}
     master_json_files = [
         "master_joint_angles.json",
         "master_smoothness.json",
@@ -731,17 +811,39 @@ async def compare_analysis(
         "master_balance.json"
     ]
     
-    for file_name in master_json_files:
-        try:
-            # Use helper function to read from Azure or local
-            json_data = await read_json_file_azure_local(master_video.user_id, master_video_id, file_name)
-            key = file_name.replace("master_", "").replace(".json", "")
-            master_data[key] = json_data
-            
-        except FileNotFoundError:
-            print(f"Master JSON file not found: {file_name}")
-        except Exception as e:
-            print(f"Error loading master {file_name}: {str(e)}")
+    # Serve a stored comparison if neither side's files changed since it was computed
+    learner_hash, master_hash = comparison_input_hashes(
+        db, user_video_id, learner_json_files, master_video_id, master_json_files
+    )
+    if learner_hash and master_hash:
+        stored = load_stored_comparison(db, learner_hash, master_hash)
+        if stored is not None:
+            return stored
+    
+    # Fetch learner and master files together; latency is the slowest single read
+    user_loaded, master_loaded = await asyncio.gather(
+        read_json_files_concurrently(current_user.id, user_video_id, learner_json_files),
+        read_json_files_concurrently(
+            master_video.user_id, master_video_id, master_json_files, use_master_cache=True
+        )
+    )
+    
+    user_data = {
+        file_name.replace("learner_", "").replace(".json", ""): json_data
+        for file_name, json_data in user_loaded.items()
+    }
+    master_data = {
+        file_name.replace("master_", "").replace(".json", ""): json_data
+        for file_name, json_data in master_loaded.items()
+    }
+    
+    # Videos without a manifest yet are keyed by the loaded data instead
+    if not (learner_hash and master_hash):
+        learner_hash = learner_hash or json_data_hash(user_data)
+        master_hash = master_hash or json_data_hash(master_data)
+        stored = load_stored_comparison(db, learner_hash, master_hash)
+        if stored is not None:
+            return stored
     
     # Generate comparison and recommendations
     comparison_result = {
@@ -756,8 +858,90 @@ async def compare_analysis(
         "recommendations": generate_comparison_recommendations(user_data, master_data)
     }
     
+    # Only store complete comparisons, a missing file may show up later
+    if len(user_loaded) == len(learner_json_files) and len(master_loaded) == len(master_json_files):
+        save_stored_comparison(
+            db, learner_hash, master_hash, user_video_id, master_video_id, comparison_result
+        )
+    
     return comparison_result
 
+def comparison_input_hashes(db: Session, user_video_id: int, learner_files: List[str],
+                            master_video_id: int, master_files: List[str]):
+    """
+    Version hashes of both sides' comparison inputs, taken from the cached
+    artifact manifests (one query, no storage access). None for a side whose
+    manifest does not list every file.
+    """
+    try:
+        records = db.query(models.VideoArtifactManifest).filter(
+            models.VideoArtifactManifest.video_id.in_([user_video_id, master_video_id])
+        ).all()
+        manifests = {record.video_id: record.get_manifest() for record in records}
+        
+        learner_hash = artifact_set_hash(
+            manifests.get(user_video_id),
+            [f"baduanjin_analysis/{name}" for name in learner_files]
+        )
+        master_hash = artifact_set_hash(
+            manifests.get(master_video_id),
+            [f"baduanjin_analysis/{name}" for name in master_files]
+        )
+        return learner_hash, master_hash
+    except Exception as e:
+        print(f"Could not read manifests for comparison {user_video_id}/{master_video_id}: {e}")
+        return None, None
+
+def json_data_hash(data: Dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_stored_comparison(db: Session, learner_hash: str, master_hash: str):
+    try:
+        record = db.query(models.ComparisonResult).filter(
+            models.ComparisonResult.learner_hash == learner_hash,
+            models.ComparisonResult.master_hash == master_hash
+        ).first()
+        
+        if record and record.version == COMPARISON_VERSION and isinstance(record.result, str):
+            print(f"Serving stored comparison {learner_hash[:12]}/{master_hash[:12]}")
+            return record.get_result()
+    except Exception as e:
+        print(f"Error loading stored comparison: {e}")
+    return None
+
+def save_stored_comparison(db: Session, learner_hash: str, master_hash: str,
+                           user_video_id: int, master_video_id: int, comparison_result: Dict):
+    try:
+        record = db.query(models.ComparisonResult).filter(
+            models.ComparisonResult.learner_hash == learner_hash,
+            models.ComparisonResult.master_hash == master_hash
+        ).first()
+        
+        if not record:
+            record = models.ComparisonResult(learner_hash=learner_hash, master_hash=master_hash)
+            db.add(record)
+        
+        record.version = COMPARISON_VERSION
+        record.user_video_id = user_video_id
+        record.master_video_id = master_video_id
+        record.set_result(comparison_result)
+        db.commit()
+    except Exception as e:
+        # Another request may have stored the same pair first
+        db.rollback()
+        print(f"Error storing comparison result: {e}")
+
+@router.get("/cache-stats")
+async def get_master_cache_stats(
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Hit/miss counters and size of the master reference data cache
+    """
+    return {
+        "master_artifact_cache": master_artifact_cache.stats()
+    }
+
 def generate_comparison_recommendations(user_data: Dict, master_data: Dict) -> List[str]:
     """
     Generate recommendations based on comparison between learner and master data
@@ -1,12 +1,13 @@
 # routers/relationships.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from sqlalchemy import or_, and_, select, func
 
 import os
-from pathlib import Path
+import asyncio
 from datetime import datetime
 import models, database
 from auth.router import get_current_user
@@ -14,37 +15,196 @@ from config import settings
 
 router = APIRouter(prefix="/api/relationships", tags=["relationships"])
 
+def master_directory_query(db: Session):
+    """
+    Active masters with follower and video counts in one round trip: each
+    count is a grouped subquery outer-joined on the master, and the profile
+    is joined in. Rows are (User, followers_count, videos_count).
+    """
+    followers = select(
+        models.MasterLearnerRelationship.master_id,
+        func.count(models.MasterLearnerRelationship.id).label("followers_count")
+    ).where(
+        models.MasterLearnerRelationship.status == "accepted"
+    ).group_by(models.MasterLearnerRelationship.master_id).subquery()
+    
+    videos = select(
+        models.VideoUpload.user_id,
+        func.count(models.VideoUpload.id).label("videos_count")
+    ).group_by(models.VideoUpload.user_id).subquery()
+    
+    return db.query(
+        models.User,
+        func.coalesce(followers.c.followers_count, 0),
+        func.coalesce(videos.c.videos_count, 0)
+    ).outerjoin(
+        followers, followers.c.master_id == models.User.id
+    ).outerjoin(
+        videos, videos.c.user_id == models.User.id
+    ).options(
+        joinedload(models.User.profile)
+    ).filter(
+        models.User.role == models.UserRole.MASTER,
+        models.User.is_active == True
+    )
+
+def analyzed_videos_query(db: Session, owner_id: int):
+    """
+    Completed videos of one user joined to their artifact index. Videos with
+    no index row yet (analyzed before the index existed) are kept so the
+    caller can backfill them; indexed videos without artifacts are dropped.
+    """
+    index = models.VideoArtifactIndex
+    return db.query(
+        models.VideoUpload.id,
+        models.VideoUpload.title,
+        models.VideoUpload.description,
+        models.VideoUpload.brocade_type,
+        models.VideoUpload.processing_status,
+        models.VideoUpload.upload_timestamp,
+        index.id.label("index_id"),
+        index.has_results_json,
+        index.has_analysis_report
+    ).outerjoin(
+        index, index.video_id == models.VideoUpload.id
+    ).filter(
+        models.VideoUpload.user_id == owner_id,
+        models.VideoUpload.processing_status == "completed",
+        or_(index.id.is_(None), index.has_results_json == True, index.has_analysis_report == True)
+    )
+
+def list_analyzed_videos(db: Session, owner_id: int, cursor: Optional[str] = None,
+                         limit: Optional[int] = None, unindexed: Optional[list] = None):
+    """
+    Analyzed videos of owner_id, newest first, from one indexed query.
+    With limit and/or cursor, returns one page: {"items": [...], "next_cursor": ...}
+    
+    Videos without an index row are indexed from their cached manifest when
+    they have one. The rest need storage: with unindexed given they are left
+    out and their (owner_id, video_id) appended for the caller to index off
+    the event loop (list_with_backfill); without it they are indexed here.
+    """
+    from services.artifact_manifest import backfill_artifact_index, index_from_cached_manifest
+    
+    query = analyzed_videos_query(db, owner_id)
+    paginated = cursor is not None or limit is not None
+    
+    if paginated:
+        from utils.pagination import keyset_paginate
+        rows, next_cursor = keyset_paginate(
+            query, models.VideoUpload.upload_timestamp, models.VideoUpload.id, cursor, limit
+        )
+    else:
+        rows = query.order_by(models.VideoUpload.upload_timestamp.desc()).all()
+    
+    analyzed_videos = []
+    for row in rows:
+        has_json, has_analysis = row.has_results_json, row.has_analysis_report
+        
+        if row.index_id is None:
+            # First listing since the index was added: record it once
+            try:
+                flags = index_from_cached_manifest(db, row.id)
+                if flags is None:
+                    if unindexed is not None:
+                        unindexed.append((owner_id, row.id))
+                        continue
+                    flags = backfill_artifact_index(db, owner_id, row.id)
+            except Exception as e:
+                print(f"Error indexing artifacts of video {row.id}: {str(e)}")
+                db.rollback()
+                continue
+            has_json, has_analysis = flags["has_results_json"], flags["has_analysis_report"]
+        
+        # Include video if it has either JSON results or analysis
+        if not (has_json or has_analysis):
+            continue
+        
+        analyzed_videos.append({
+            "id": row.id,
+            "title": row.title,
+            "description": row.description or "",
+            "brocade_type": row.brocade_type,
+            "processing_status": row.processing_status,
+            "upload_timestamp": row.upload_timestamp.isoformat() if row.upload_timestamp else None,
+            "has_json": bool(has_json),
+            "has_analysis": bool(has_analysis)
+        })
+    
+    if paginated:
+        return {"items": analyzed_videos, "next_cursor": next_cursor}
+    return analyzed_videos
+
+def save_backfilled_indexes(db: Session, resolved: list):
+    """Store the (video_id, flags, manifest) list_with_backfill resolved"""
+    from services.artifact_manifest import save_backfilled_index
+    
+    for video_id, flags, manifest in resolved:
+        try:
+            save_backfilled_index(db, video_id, flags, manifest)
+        except Exception as e:
+            print(f"Error indexing artifacts of video {video_id}: {str(e)}")
+            db.rollback()
+
+async def list_with_backfill(db, list_fn, *args):
+    """
+    Run list_fn (ending in list_analyzed_videos) through database.run_db. On an
+    AsyncSession run_db executes on the event loop thread, so videos that
+    still need their artifacts looked up in storage are resolved on a worker
+    thread in between, saved, and the listing runs again to include them.
+    """
+    from services.artifact_manifest import resolve_artifact_flags
+    
+    unindexed = []
+    result = await database.run_db(db, list_fn, *args, unindexed=unindexed)
+    if not unindexed:
+        return result
+    
+    def resolve_all():
+        resolved = []
+        for owner_id, video_id in unindexed:
+            try:
+                resolved.append((video_id, *resolve_artifact_flags(owner_id, video_id)))
+            except Exception as e:
+                print(f"Error indexing artifacts of video {video_id}: {str(e)}")
+        return resolved
+    
+    resolved = await asyncio.to_thread(resolve_all)
+    await database.run_db(db, save_backfilled_indexes, resolved)
+    return await database.run_db(db, list_fn, *args)
+
 # NEW ENDPOINT: Get all masters in the system
 @router.get("/masters")
 async def get_available_masters(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    """Get all available masters in the system"""
+    """
+    Get all available masters in the system.
+    With limit and/or cursor, returns one page: {"items": [...], "next_cursor": ...}
+    """
     # Verify current user is a learner
     if current_user.role != models.UserRole.LEARNER:
         raise HTTPException(status_code=403, detail="Only learners can view masters")
     
-    # Query all users with master role
-    masters = db.query(models.User).filter(
-        models.User.role == models.UserRole.MASTER,
-        models.User.is_active == True
-    ).all()
+    return await database.run_db(db, list_available_masters, cursor, limit)
+
+def list_available_masters(db: Session, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Body of get_available_masters, as sync ORM code run through database.run_db"""
+    query = master_directory_query(db)
+    paginated = cursor is not None or limit is not None
+    
+    if paginated:
+        from utils.pagination import id_paginate
+        rows, next_cursor = id_paginate(query, models.User.id, cursor, limit, row_id=lambda row: row[0].id)
+    else:
+        rows = query.order_by(models.User.id).all()
     
     # Format response
     result = []
-    for master in masters:
-        # Count followers
-        followers_count = db.query(models.MasterLearnerRelationship).filter(
-            models.MasterLearnerRelationship.master_id == master.id,
-            models.MasterLearnerRelationship.status == "accepted"
-        ).count()
-        
-        # Count videos
-        videos_count = db.query(models.VideoUpload).filter(
-            models.VideoUpload.user_id == master.id
-        ).count()
-        
+    for master, followers_count, videos_count in rows:
         # Get profile if it exists
         profile = None
         if hasattr(master, 'profile') and master.profile:
@@ -63,6 +223,8 @@ async def get_available_masters(
             "profile": profile
         })
     
+    if paginated:
+        return {"items": result, "next_cursor": next_cursor}
     return result
 
 # NEW ENDPOINT: Get details for a specific master
@@ -458,11 +620,16 @@ async def get_master_learners(
 @router.get("/master-videos/{master_id}/analyzed")
 async def get_master_analyzed_videos(
     master_id: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Get only analyzed videos from a master that have extracted JSON files"""
-    
+    return await list_with_backfill(db, list_master_analyzed_videos, master_id, cursor, limit)
+
+def list_master_analyzed_videos(db: Session, master_id: int, cursor: Optional[str] = None,
+                                limit: Optional[int] = None, unindexed: Optional[list] = None):
     # Verify the master exists
     master = db.query(models.User).filter(
         models.User.id == master_id,
@@ -473,67 +640,7 @@ async def get_master_analyzed_videos(
     if not master:
         raise HTTPException(status_code=404, detail="Master not found")
     
-    # Get videos that are completed
-    videos = db.query(models.VideoUpload).filter(
-        models.VideoUpload.user_id == master_id,
-        models.VideoUpload.processing_status == "completed"
-    ).order_by(models.VideoUpload.upload_timestamp.desc()).all()
-    
-    analyzed_videos = []
-    
-    for video in videos:
-        try:
-            # Construct paths to check for analysis results
-            video_uuid = getattr(video, 'video_uuid', None)
-            
-            # Create the base path for outputs
-            base_path = Path("outputs_json") / str(master_id) / str(video.id)
-            
-            # Check for analysis directory
-            analysis_dir = base_path / "baduanjin_analysis"
-            
-            # Check for JSON results file - handle different possible naming conventions
-            json_exists = False
-            if video_uuid:
-                json_path = base_path / f"results_{video_uuid}.json"
-                json_exists = json_path.exists()
-            
-            # Alternative: check for any results JSON file in the directory
-            if not json_exists and base_path.exists():
-                json_files = list(base_path.glob("results_*.json"))
-                json_exists = len(json_files) > 0
-            
-            # Check if analysis report exists
-            analysis_exists = False
-            if analysis_dir.exists():
-                report_path = analysis_dir / "analysis_report.txt"
-                analysis_exists = report_path.exists()
-            
-            # Include video if it has either JSON results or analysis
-            if json_exists or analysis_exists:
-                video_data = {
-                    "id": video.id,
-                    "title": video.title,
-                    "description": video.description or "",
-                    "brocade_type": getattr(video, 'brocade_type', None),
-                    "processing_status": video.processing_status,
-                    "upload_timestamp": video.upload_timestamp.isoformat() if video.upload_timestamp else None,
-                    "has_json": json_exists,
-                    "has_analysis": analysis_exists
-                }
-                
-                # Add uuid if available
-                if video_uuid:
-                    video_data["uuid"] = video_uuid
-                
-                analyzed_videos.append(video_data)
-                
-        except Exception as e:
-            print(f"Error processing video {video.id}: {str(e)}")
-            # Continue with next video instead of failing entirely
-            continue
-    
-    return analyzed_videos
+    return list_analyzed_videos(db, master_id, cursor, limit, unindexed)
 
 # Endpoints for the Master's to learner accounts
 @router.get("/learner-details/{learner_id}")
@@ -590,8 +697,10 @@ async def get_learner_details(
 @router.get("/learner-videos/{learner_id}/analyzed")
 async def get_learner_analyzed_videos(
     learner_id: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Get analyzed videos from a learner that are ready for comparison"""
     
@@ -599,9 +708,14 @@ async def get_learner_analyzed_videos(
     if current_user.role != models.UserRole.MASTER:
         raise HTTPException(status_code=403, detail="Only masters can view learner videos")
     
+    return await list_with_backfill(db, list_learner_analyzed_videos, current_user.id, learner_id, cursor, limit)
+
+def list_learner_analyzed_videos(db: Session, master_id: int, learner_id: int,
+                                 cursor: Optional[str] = None, limit: Optional[int] = None,
+                                 unindexed: Optional[list] = None):
     # Verify the learner follows this master
     relationship = db.query(models.MasterLearnerRelationship).filter(
-        models.MasterLearnerRelationship.master_id == current_user.id,
+        models.MasterLearnerRelationship.master_id == master_id,
         models.MasterLearnerRelationship.learner_id == learner_id,
         models.MasterLearnerRelationship.status == "accepted"
     ).first()
@@ -609,61 +723,7 @@ async def get_learner_analyzed_videos(
     if not relationship:
         raise HTTPException(status_code=404, detail="Learner not found or doesn't follow you")
     
-    # Get videos that are completed and have analysis results
-    videos = db.query(models.VideoUpload).filter(
-        models.VideoUpload.user_id == learner_id,
-        models.VideoUpload.processing_status == "completed"
-    ).order_by(models.VideoUpload.upload_timestamp.desc()).all()
-    
-    analyzed_videos = []
-    
-    for video in videos:
-        try:
-            # Check for analysis results
-            video_uuid = getattr(video, 'video_uuid', None)
-            base_path = Path("outputs_json") / str(learner_id) / str(video.id)
-            
-            # Check for analysis directory and JSON files
-            analysis_dir = base_path / "baduanjin_analysis"
-            json_exists = False
-            
-            if video_uuid:
-                json_path = base_path / f"results_{video_uuid}.json"
-                json_exists = json_path.exists()
-            
-            if not json_exists and base_path.exists():
-                json_files = list(base_path.glob("results_*.json"))
-                json_exists = len(json_files) > 0
-            
-            # Check if analysis report exists
-            analysis_exists = False
-            if analysis_dir.exists():
-                report_path = analysis_dir / "analysis_report.txt"
-                analysis_exists = report_path.exists()
-            
-            # Include video if it has either JSON results or analysis
-            if json_exists or analysis_exists:
-                video_data = {
-                    "id": video.id,
-                    "title": video.title,
-                    "description": video.description or "",
-                    "brocade_type": getattr(video, 'brocade_type', None),
-                    "processing_status": video.processing_status,
-                    "upload_timestamp": video.upload_timestamp.isoformat() if video.upload_timestamp else None,
-                    "has_json": json_exists,
-                    "has_analysis": analysis_exists
-                }
-                
-                if video_uuid:
-                    video_data["uuid"] = video_uuid
-                
-                analyzed_videos.append(video_data)
-                
-        except Exception as e:
-            print(f"Error processing video {video.id}: {str(e)}")
-            continue
-    
-    return analyzed_videos
+    return list_analyzed_videos(db, learner_id, cursor, limit, unindexed)
 
 @router.get("/master-followers/{master_id}")
 async def get_master_followers(
@@ -0,0 +1,380 @@
+# routers/upload_sessions.py
+# Resumable video uploads: create a session, PUT numbered chunks in any order
+# (in parallel if the client wants), check what arrived, then commit
+
+import os
+import uuid
+import shutil
+import asyncio
+import hashlib
+from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+import models
+import database
+from auth.router import get_current_user
+from services.blob_storage import get_blob_service_client, iter_blob_range
+from services.video_upload import MAX_UPLOAD_SIZE, UPLOAD_BLOCK_SIZE, make_block_id, parse_block_id
+
+router = APIRouter(
+    prefix="/api/upload-sessions",
+    tags=["upload-sessions"]
+)
+
+SESSIONS_DIR = "uploads/sessions"
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 32 * 1024 * 1024
+
+class UploadSessionCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    brocade_type: str
+    filename: str
+    content_type: str = "video/mp4"
+    total_size: int
+    chunk_size: Optional[int] = None
+
+def get_owned_session(db: Session, session_id: str, user_id: int) -> models.UploadSession:
+    upload_session = db.query(models.UploadSession).filter(
+        models.UploadSession.id == session_id,
+        models.UploadSession.user_id == user_id
+    ).first()
+
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload_session
+
+def get_session_blob_client(upload_session: models.UploadSession):
+    blob_service_client = get_blob_service_client()
+    if not blob_service_client:
+        raise HTTPException(status_code=503, detail="Azure storage not available for this session")
+    return blob_service_client.get_blob_client(container="videos", blob=upload_session.blob_path)
+
+def session_parts_dir(session_id: str) -> str:
+    return os.path.join(SESSIONS_DIR, session_id)
+
+def expected_chunk_length(upload_session: models.UploadSession, index: int) -> int:
+    if index == upload_session.total_chunks - 1:
+        return upload_session.total_size - upload_session.chunk_size * index
+    return upload_session.chunk_size
+
+async def received_chunk_indexes(upload_session: models.UploadSession) -> List[int]:
+    """What storage actually holds: uncommitted Azure blocks or local part files"""
+    if upload_session.storage_type == "azure_blob":
+        blob_client = get_session_blob_client(upload_session)
+        _committed, uncommitted = await asyncio.to_thread(blob_client.get_block_list, "uncommitted")
+        indexes = {parse_block_id(block.id) for block in uncommitted}
+    else:
+        parts_dir = session_parts_dir(upload_session.id)
+        names = os.listdir(parts_dir) if os.path.isdir(parts_dir) else []
+        indexes = {parse_block_id(name[:-len(".part")]) for name in names if name.endswith(".part")}
+
+    return sorted(i for i in indexes if i is not None and 0 <= i < upload_session.total_chunks)
+
+def chunk_indexes_to_ranges(upload_session: models.UploadSession, indexes: List[int]) -> List[List[int]]:
+    """Merge received chunk numbers into inclusive byte ranges"""
+    ranges = []
+    for index in indexes:
+        start = index * upload_session.chunk_size
+        end = start + expected_chunk_length(upload_session, index) - 1
+        if ranges and ranges[-1][1] == start - 1:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+def session_status(upload_session: models.UploadSession, indexes: List[int]) -> dict:
+    received = set(indexes)
+    return {
+        "session_id": upload_session.id,
+        "status": upload_session.status,
+        "storage_type": upload_session.storage_type,
+        "total_size": upload_session.total_size,
+        "chunk_size": upload_session.chunk_size,
+        "total_chunks": upload_session.total_chunks,
+        "received_chunks": indexes,
+        "received_ranges": chunk_indexes_to_ranges(upload_session, indexes),
+        "missing_chunks": [i for i in range(upload_session.total_chunks) if i not in received],
+        "video_id": upload_session.video_id
+    }
+
+def assemble_local_parts(upload_session: models.UploadSession) -> dict:
+    """Concatenate part files into the final video, hashing as it goes"""
+    parts_dir = session_parts_dir(upload_session.id)
+    digest = hashlib.sha256()
+    size = 0
+
+    with open(upload_session.blob_path, "wb") as output:
+        for index in range(upload_session.total_chunks):
+            with open(os.path.join(parts_dir, f"{make_block_id(index)}.part"), "rb") as part:
+                for block in iter(lambda: part.read(1024 * 1024), b""):
+                    digest.update(block)
+                    output.write(block)
+                    size += len(block)
+
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return {"size": size, "sha256": digest.hexdigest()}
+
+def record_blob_sha256(video_id: int, blob_client, size: int):
+    """
+    Background task: hash the committed blob by streaming it back, since the
+    chunks arrived out of order across separate requests
+    """
+    task_db = database.SessionLocal()
+    try:
+        digest = hashlib.sha256()
+        for chunk in iter_blob_range(blob_client, 0, size - 1):
+            digest.update(chunk)
+
+        file_info = task_db.query(models.VideoFileInfo).filter(
+            models.VideoFileInfo.video_id == video_id
+        ).first()
+        if file_info:
+            file_info.sha256 = digest.hexdigest()
+            task_db.commit()
+    except Exception as e:
+        print(f"Error hashing uploaded blob for video {video_id}: {e}")
+    finally:
+        task_db.close()
+
+@router.post("")
+async def create_upload_session(
+    session_data: UploadSessionCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Start a resumable upload. Returns the session id, chunk size and number of chunks
+    """
+    if not session_data.content_type.startswith('video/'):
+        raise HTTPException(status_code=400, detail="File must be a video")
+
+    if session_data.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+
+    if session_data.total_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024*1024)}MB"
+        )
+
+    chunk_size = session_data.chunk_size or UPLOAD_BLOCK_SIZE
+    if chunk_size < MIN_CHUNK_SIZE or chunk_size > MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes"
+        )
+
+    session_id = str(uuid.uuid4())
+    file_extension = os.path.splitext(session_data.filename)[1]
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
+
+    # Chunks go to Azure as uncommitted blocks, or to local part files
+    if get_blob_service_client():
+        storage_type = "azure_blob"
+        blob_path = f"uploads/videos/{current_user.id}/{unique_filename}"
+    else:
+        storage_type = "local_fallback"
+        user_dir = os.path.join("uploads/videos", str(current_user.id))
+        os.makedirs(user_dir, exist_ok=True)
+        os.makedirs(session_parts_dir(session_id), exist_ok=True)
+        blob_path = os.path.join(user_dir, unique_filename)
+
+    upload_session = models.UploadSession(
+        id=session_id,
+        user_id=current_user.id,
+        title=session_data.title,
+        description=session_data.description,
+        brocade_type=session_data.brocade_type,
+        filename=session_data.filename,
+        content_type=session_data.content_type,
+        total_size=session_data.total_size,
+        chunk_size=chunk_size,
+        total_chunks=(session_data.total_size + chunk_size - 1) // chunk_size,
+        storage_type=storage_type,
+        blob_path=blob_path,
+        status="open"
+    )
+
+    db.add(upload_session)
+    db.commit()
+    db.refresh(upload_session)
+
+    print(f"Upload session {session_id} created: {upload_session.total_chunks} chunks, {storage_type}")
+
+    return session_status(upload_session, [])
+
+@router.put("/{session_id}/chunks/{index}")
+async def upload_chunk(
+    session_id: str,
+    index: int,
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Store one chunk (raw request body). Chunks may arrive in any order and
+    re-sending a chunk replaces it
+    """
+    upload_session = get_owned_session(db, session_id, current_user.id)
+
+    if upload_session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {upload_session.status}")
+
+    if index < 0 or index >= upload_session.total_chunks:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+    expected_length = expected_chunk_length(upload_session, index)
+
+    # Read at most one chunk of body; anything longer is rejected straight away
+    body = bytearray()
+    async for data in request.stream():
+        body.extend(data)
+        if len(body) > expected_length:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} is larger than {expected_length} bytes")
+
+    if len(body) != expected_length:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk {index} is incomplete: got {len(body)} of {expected_length} bytes"
+        )
+
+    chunk_sha256 = request.headers.get("x-chunk-sha256")
+    if chunk_sha256 and hashlib.sha256(body).hexdigest() != chunk_sha256.lower():
+        raise HTTPException(status_code=400, detail=f"Chunk {index} checksum mismatch")
+
+    if upload_session.storage_type == "azure_blob":
+        blob_client = get_session_blob_client(upload_session)
+        await asyncio.to_thread(blob_client.stage_block, make_block_id(index), bytes(body))
+    else:
+        parts_dir = session_parts_dir(session_id)
+        os.makedirs(parts_dir, exist_ok=True)
+        part_path = os.path.join(parts_dir, f"{make_block_id(index)}.part")
+
+        # Write then rename, so an interrupted write never counts as received
+        temp_path = f"{part_path}.{uuid.uuid4().hex}.tmp"
+        def write_part():
+            with open(temp_path, "wb") as part:
+                part.write(body)
+            os.replace(temp_path, part_path)
+        await asyncio.to_thread(write_part)
+
+    return {"session_id": session_id, "index": index, "size": len(body)}
+
+@router.get("/{session_id}")
+async def get_upload_session(
+    session_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Received chunks and byte ranges, read from storage, so a client can resume
+    """
+    upload_session = get_owned_session(db, session_id, current_user.id)
+
+    if upload_session.status != "open":
+        return session_status(upload_session, list(range(upload_session.total_chunks))
+                              if upload_session.status == "committed" else [])
+
+    indexes = await received_chunk_indexes(upload_session)
+    return session_status(upload_session, indexes)
+
+@router.post("/{session_id}/commit")
+async def commit_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Assemble the chunks into the video and create the video record
+    """
+    from routers.video import create_uploaded_video
+
+    upload_session = get_owned_session(db, session_id, current_user.id)
+
+    if upload_session.status == "committed":
+        return {"session_id": session_id, "id": upload_session.video_id, "status": "committed"}
+    if upload_session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload session is {upload_session.status}")
+
+    indexes = await received_chunk_indexes(upload_session)
+    if len(indexes) != upload_session.total_chunks:
+        status = session_status(upload_session, indexes)
+        raise HTTPException(
+            status_code=409,
+            detail=f"Missing chunks: {status['missing_chunks']}"
+        )
+
+    if upload_session.storage_type == "azure_blob":
+        from azure.storage.blob import ContentSettings
+
+        blob_client = get_session_blob_client(upload_session)
+        await asyncio.to_thread(
+            blob_client.commit_block_list,
+            [make_block_id(i) for i in range(upload_session.total_chunks)],
+            content_settings=ContentSettings(content_type=upload_session.content_type),
+            metadata={
+                "original_filename": upload_session.filename,
+                "user_id": str(current_user.id),
+                "upload_type": "video",
+                "upload_session": session_id
+            }
+        )
+        file_path = blob_client.url
+        # Hash is filled in by a background task once the blob is committed
+        upload_result = {"size": upload_session.total_size, "sha256": None}
+    else:
+        upload_result = await asyncio.to_thread(assemble_local_parts, upload_session)
+        file_path = upload_session.blob_path
+
+    new_video = create_uploaded_video(
+        db, current_user.id, upload_session.title, upload_session.description,
+        upload_session.brocade_type, file_path, upload_result, upload_session.storage_type,
+        background_tasks
+    )
+
+    upload_session.status = "committed"
+    upload_session.video_id = new_video.id
+    db.commit()
+
+    if upload_session.storage_type == "azure_blob":
+        background_tasks.add_task(record_blob_sha256, new_video.id, blob_client, upload_session.total_size)
+
+    print(f"Upload session {session_id} committed as video {new_video.id}")
+
+    return {
+        "session_id": session_id,
+        "id": new_video.id,
+        "title": new_video.title,
+        "brocade_type": upload_session.brocade_type,
+        "processing_status": new_video.processing_status,
+        "upload_timestamp": new_video.upload_timestamp,
+        "storage_type": upload_session.storage_type,
+        "video_path": file_path,
+        "size": upload_result["size"],
+        "sha256": upload_result["sha256"],
+        "status": "committed"
+    }
+
+@router.delete("/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Abandon an upload. Local parts are removed; uncommitted Azure blocks are
+    discarded by the service after a week
+    """
+    upload_session = get_owned_session(db, session_id, current_user.id)
+
+    if upload_session.status == "committed":
+        raise HTTPException(status_code=409, detail="Upload session is already committed")
+
+    shutil.rmtree(session_parts_dir(session_id), ignore_errors=True)
+    upload_session.status = "aborted"
+    db.commit()
+
+    return {"session_id": session_id, "status": "aborted"}
@@ -3,20 +3,20 @@
 import os
 import uuid
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, BackgroundTasks, Query
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, BackgroundTasks, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import models
 import database
 from auth.router import get_current_user
+from utils.cache import invalidate_master_artifacts, invalidate_blob_properties
 
-# For Azure Testing Deployment 
-from azure_services import azure_blob_service
-from azure.storage.blob import BlobServiceClient
+# For Azure Testing Deployment. The Azure SDK and httpx are imported inside
+# the endpoints that use them, so importing the app stays cheap
 from config import settings
 import json
-import httpx
 from datetime import datetime
 
 
@@ -46,32 +46,465 @@ def map_brocade_type(frontend_type):
     
     return mapping.get(frontend_type, "BROCADE_1")
 
+def record_analysis_artifacts(db: Session, user_id: int, video_id: int):
+    """
+    Write the artifact manifest for a finished analysis. Failures are logged only,
+    the analysis itself already succeeded.
+    """
+    # Outputs were regenerated, cached master reference data is stale
+    invalidate_master_artifacts(video_id)
+    invalidate_blob_properties(f"outputs_json/{user_id}/{video_id}/")
+    
+    try:
+        from services.artifact_manifest import write_manifest
+        manifest = write_manifest(db, user_id, video_id)
+    except Exception as e:
+        print(f"Error writing artifact manifest for video {video_id}: {e}")
+        return
+    
+    ingest_video_keypoints(db, user_id, video_id, manifest)
+
+def ingest_video_keypoints(db: Session, user_id: int, video_id: int, manifest: dict):
+    """Load the finished analysis' MMPose results into the chunked keypoint store"""
+    from services.artifact_manifest import OUTPUTS_ROOT, artifact_flags
+    
+    results_name = artifact_flags(manifest)["results_json_name"]
+    if not results_name:
+        return
+    
+    results_path = os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id), results_name)
+    try:
+        from services.keypoint_store import ingest_results_json
+        chunks = ingest_results_json(db, video_id, results_path)
+        print(f"Stored keypoints of video {video_id} in {chunks} chunks")
+    except Exception as e:
+        db.rollback()
+        print(f"Error storing keypoints of video {video_id}: {e}")
+
+def package_video_streams(db: Session, video_id: int, variants=("original", "analyzed", "english")):
+    """
+    Package each available variant of a finished video as multi-bitrate HLS
+    and record it. Runs in the analysis background task; failures are logged
+    only, the progressive MP4 stream keeps working without a package.
+    """
+    from services.hls_packager import HLS_ENABLED, package_variant
+    
+    if not HLS_ENABLED:
+        return
+    
+    video = db.query(models.VideoUpload).filter(models.VideoUpload.id == video_id).first()
+    if not video:
+        return
+    
+    packaged_paths = set()
+    for variant in variants:
+        try:
+            video_path = resolve_stream_path(video, variant)
+        except HTTPException:
+            continue
+        # "analyzed" falls back to the original when there is no output video
+        if video_path in packaged_paths:
+            continue
+        packaged_paths.add(video_path)
+        
+        try:
+            package = package_variant(video.user_id, video_id, variant, video_path)
+        except Exception as e:
+            print(f"HLS packaging error for video {video_id} ({variant}): {e}")
+            continue
+        if not package:
+            continue
+        
+        record = db.query(models.VideoStreamPackage).filter(
+            models.VideoStreamPackage.video_id == video_id,
+            models.VideoStreamPackage.variant == variant
+        ).first()
+        if not record:
+            record = models.VideoStreamPackage(video_id=video_id, variant=variant)
+            db.add(record)
+        record.base_path = package["base_path"]
+        record.storage_type = package["storage_type"]
+        record.set_renditions(package["renditions"])
+        db.commit()
+        print(f"HLS package ready for video {video_id} ({variant}): {package['renditions']}")
+
+def generate_video_previews(db: Session, video_id: int, variants=("original", "analyzed")):
+    """
+    Poster, sprite sheet and WebVTT thumbnail index for each available variant.
+    Failures are logged only; the player works without them.
+    """
+    from services.preview_media import PREVIEW_ENABLED, create_variant_previews
+    
+    if not PREVIEW_ENABLED:
+        return
+    
+    video = db.query(models.VideoUpload).filter(models.VideoUpload.id == video_id).first()
+    if not video:
+        return
+    
+    for variant in variants:
+        try:
+            video_path = resolve_stream_path(video, variant)
+        except HTTPException:
+            continue
+        # "analyzed" falls back to the original when there is no output video
+        if variant != "original" and video_path == video.video_path:
+            continue
+        
+        try:
+            media = create_variant_previews(video.user_id, video_id, variant, video_path)
+        except Exception as e:
+            print(f"Preview media error for video {video_id} ({variant}): {e}")
+            continue
+        if not media:
+            continue
+        
+        record = db.query(models.VideoPreviewMedia).filter(
+            models.VideoPreviewMedia.video_id == video_id,
+            models.VideoPreviewMedia.variant == variant
+        ).first()
+        if not record:
+            record = models.VideoPreviewMedia(video_id=video_id, variant=variant)
+            db.add(record)
+        record.version = media["version"]
+        record.base_path = media["base_path"]
+        record.thumbnail_count = media["count"]
+        record.thumbnail_interval = media["interval"]
+        record.storage_type = media["storage_type"]
+        db.commit()
+        print(f"Preview media ready for video {video_id} ({variant}): version {media['version']}")
+
+def generate_video_previews_task(video_id: int, variants=("original",)):
+    """Background task form of generate_video_previews with its own session"""
+    import shutil
+    from services.preview_media import PREVIEW_ENABLED
+    
+    if not PREVIEW_ENABLED or not shutil.which("ffmpeg"):
+        return
+    
+    try:
+        task_db = database.SessionLocal()
+        try:
+            generate_video_previews(task_db, video_id, variants)
+        finally:
+            task_db.close()
+    except Exception as e:
+        print(f"Preview media task error for video {video_id}: {e}")
+
+def finish_analysis_job(db: Session, user_id: int, video_id: int, result: Optional[dict]):
+    """
+    Post-process a finished analysis run (artifact manifest and keypoint ingest,
+    HLS packaging, previews), timing each step onto the run's stage spans, then
+    store the spans. For a failed run (no result) only the spans are stored.
+    """
+    from ml_pipeline.stage_timing import StageTimer, timings_path
+    from services.artifact_manifest import OUTPUTS_ROOT
+    
+    path = timings_path(os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id)))
+    timings = (result or {}).get("timings")
+    if timings:
+        timer = StageTimer(run_id=timings.get("run_id"), spans=timings.get("spans"))
+    else:
+        timer = StageTimer.load(path) or StageTimer()
+    
+    try:
+        if result:
+            with timer.stage("artifacts"):
+                record_analysis_artifacts(db, user_id, video_id)
+            with timer.stage("stream_packaging"):
+                package_video_streams(db, video_id)
+            with timer.stage("previews"):
+                generate_video_previews(db, video_id, ("analyzed",))
+    finally:
+        record_stage_timings(db, video_id, timer, path)
+
+def record_stage_timings(db: Session, video_id: int, timer, path: str):
+    """Save the run's spans to timings.json and analysis_stage_timings; failures are logged only"""
+    if not timer.spans:
+        return
+    try:
+        timer.save(path)
+        from services.stage_timings import save_stage_timings
+        count = save_stage_timings(db, video_id, timer.to_dict())
+        print(f"Stage timings for video {video_id} (run {timer.run_id}): {count} spans, {timer.total_seconds()}s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error recording stage timings for video {video_id}: {e}")
+
+def run_analysis_job(db: Session, job) -> bool:
+    """
+    Run one queued analysis job (called by the worker pool in
+    services/job_queue.py): the MMPose pipeline, the video's status and paths,
+    then post-processing. Returns whether the analysis produced results.
+    """
+    from ml_pipeline.pose_analyzer import analyze_video as run_analysis, pipeline_fingerprint
+    from services.result_cache import reuse_cached_result, remember_result
+    
+    video = db.query(models.VideoUpload).filter(models.VideoUpload.id == job.video_id).first()
+    if not video:
+        print(f"WARNING: Video {job.video_id} of analysis job {job.id} no longer exists")
+        return False
+    
+    user_id, video_id = video.user_id, video.id
+    
+    # Identical content may have finished analyzing while this job waited, or
+    # the video predates upload hashes (hashed now); a video whose own results
+    # are current is not analyzed again
+    try:
+        reused = reuse_cached_result(db, video, pipeline_fingerprint(), compute_hash=True)
+        if reused:
+            if reused["source_video_id"] != video_id:
+                record_analysis_artifacts(db, user_id, video_id)
+            return True
+        
+        print(f"Starting video analysis for ID: {video_id}, path: {video.video_path}")
+        result = run_analysis(video.video_path, user_id, video_id)
+    except Exception:
+        db.rollback()
+        video.processing_status = "failed"
+        db.commit()
+        raise
+    
+    if result:
+        video.analyzed_video_path = result.get("analyzed_video_path", result.get("original_video"))
+        video.keypoints_path = result.get("keypoints_path", result.get("results_json"))
+        video.processing_status = "completed"
+    else:
+        video.processing_status = "failed"
+    db.commit()
+    print(f"Database updated for video {video_id} with status: {video.processing_status}")
+    
+    finish_analysis_job(db, user_id, video_id, result)
+    if result:
+        try:
+            remember_result(db, video, result.get("pipeline_fingerprint"))
+        except Exception as e:
+            db.rollback()
+            print(f"Error caching analysis result of video {video_id}: {e}")
+    return bool(result)
+
+def queue_video_analysis(db: Session, video, current_user: models.User) -> dict:
+    """
+    Queue the analysis of a video (or return its queued/running job) and mark
+    it processing. Master videos go first, learner comparisons depend on them.
+    A video whose content was already analyzed by the same pipeline (itself
+    included) completes at once with linked or its current results. 429 when
+    the queue does not admit more jobs.
+    """
+    from services.job_queue import QueueFullError, active_job, submit_job, job_to_dict, wake_workers
+    from services.result_cache import reuse_cached_result
+    from ml_pipeline.pose_analyzer import pipeline_fingerprint
+    
+    # Same video content already analyzed by the same pipeline: link its results
+    if not active_job(db, video.id):
+        reused = reuse_cached_result(db, video, pipeline_fingerprint())
+        if reused:
+            if reused["source_video_id"] != video.id:
+                record_analysis_artifacts(db, video.user_id, video.id)
+            return {
+                "job_id": None,
+                "video_id": video.id,
+                "status": "completed",
+                "queue_position": 0,
+                "created": False,
+                "reused_from": reused["source_video_id"]
+            }
+    
+    priority = 1 if current_user.role == models.UserRole.MASTER else 0
+    try:
+        job, created = submit_job(db, video, priority=priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "60"})
+    
+    if created:
+        video.processing_status = "processing"
+        db.commit()
+        wake_workers()
+    
+    return {**job_to_dict(db, job), "created": created}
+
+def create_uploaded_video(db: Session, user_id: int, title: str, description: Optional[str],
+                          brocade_type: str, file_path: str, upload_result: dict, storage_type: str,
+                          background_tasks: Optional[BackgroundTasks] = None):
+    """
+    Create the VideoUpload row and its file info once the bytes are stored.
+    With background_tasks, preview media for the upload is generated after
+    the response.
+    """
+    # Map the frontend brocade type to database enum value
+    mapped_brocade_type = map_brocade_type(brocade_type)
+    
+    # Create database record
+    new_video = models.VideoUpload(
+        user_id=user_id,
+        title=title,
+        description=description,
+        brocade_type=mapped_brocade_type,
+        video_path=file_path,  # Either Azure URL or local path
+        processing_status="uploaded"
+    )
+    
+    db.add(new_video)
+    db.commit()
+    db.refresh(new_video)
+    
+    db.add(models.VideoFileInfo(
+        video_id=new_video.id,
+        size_bytes=upload_result["size"],
+        sha256=upload_result["sha256"],
+        storage_type=storage_type
+    ))
+    db.commit()
+    
+    if background_tasks is not None:
+        background_tasks.add_task(generate_video_previews_task, new_video.id)
+    
+    return new_video
+
+# Columns a list view needs; paged listings load nothing else
+VIDEO_LIST_COLUMNS = (
+    models.VideoUpload.id,
+    models.VideoUpload.title,
+    models.VideoUpload.description,
+    models.VideoUpload.brocade_type,
+    models.VideoUpload.processing_status,
+    models.VideoUpload.upload_timestamp,
+)
+
+def poster_urls_for(db: Session, video_ids) -> dict:
+    """video_id -> signed poster URL (original preferred), one query for the page"""
+    from utils.signed_urls import build_media_url
+    from services.preview_media import POSTER_FILE
+    
+    if not video_ids:
+        return {}
+    
+    media = db.query(models.VideoPreviewMedia).filter(
+        models.VideoPreviewMedia.video_id.in_(video_ids)
+    ).all()
+    
+    poster_urls = {}
+    for item in sorted(media, key=lambda m: m.variant != "original"):
+        poster_urls.setdefault(
+            item.video_id,
+            build_media_url(item.video_id, item.variant, item.base_path, item.version, POSTER_FILE)
+        )
+    return poster_urls
+
 @router.get("")
 async def get_videos(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Get all videos for the current user (excluding deleted ones)
+    Get all videos for the current user (excluding deleted ones).
+    Each video carries poster_url so the list needs no video data.
+    
+    With limit and/or cursor the response is one keyset page of list columns
+    only: {"items": [...], "next_cursor": ...}; pass next_cursor back for the
+    following page until it is null.
     """
-    videos = db.query(models.VideoUpload).filter(
-        models.VideoUpload.user_id == current_user.id,
+    return await database.run_db(db, list_videos, current_user.id, cursor, limit)
+
+def list_videos(db: Session, user_id: int, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Body of get_videos, as sync ORM code run through database.run_db"""
+    from sqlalchemy.orm import selectinload
+    
+    if cursor is not None or limit is not None:
+        from utils.pagination import keyset_paginate
+        
+        query = db.query(*VIDEO_LIST_COLUMNS).filter(
+            models.VideoUpload.user_id == user_id,
+            models.VideoUpload.processing_status != "deleted"
+        )
+        rows, next_cursor = keyset_paginate(
+            query, models.VideoUpload.upload_timestamp, models.VideoUpload.id, cursor, limit
+        )
+        poster_urls = poster_urls_for(db, [row.id for row in rows])
+        
+        return {
+            "items": [dict(row._mapping, poster_url=poster_urls.get(row.id)) for row in rows],
+            "next_cursor": next_cursor
+        }
+    
+    videos = db.query(models.VideoUpload).options(
+        selectinload(models.VideoUpload.preview_media)
+    ).filter(
+        models.VideoUpload.user_id == user_id,
         models.VideoUpload.processing_status != "deleted"
     ).order_by(models.VideoUpload.upload_timestamp.desc()).all()
     
-    return videos
+    # Explicit dicts: the video columns plus poster_url, never the preview rows
+    items = []
+    for video in videos:
+        previews = build_preview_urls(video)
+        preview = previews.get("original") or next(iter(previews.values()), None)
+        item = {column.name: getattr(video, column.name) for column in models.VideoUpload.__table__.columns}
+        item["poster_url"] = preview["poster"] if preview else None
+        items.append(item)
+    
+    return items
 
 # get_video endpoint to allow learners to view master's videos
+def build_stream_urls(video) -> dict:
+    """Signed stream URL per available variant; access was checked by the caller"""
+    from utils.signed_urls import build_stream_url
+    
+    stream_urls = {}
+    for variant in ("original", "analyzed", "english"):
+        try:
+            video_path = resolve_stream_path(video, variant)
+        except HTTPException:
+            continue
+        if isinstance(video_path, str):
+            stream_urls[variant] = build_stream_url(video.id, variant, video_path)
+    return stream_urls
+
+def build_preview_urls(video) -> dict:
+    """Signed poster / sprite / thumbnail index URLs per variant with preview media"""
+    from utils.signed_urls import build_media_url
+    from services.preview_media import POSTER_FILE, SPRITE_FILE, THUMBNAILS_FILE
+    
+    media = getattr(video, "preview_media", None)
+    if not isinstance(media, list):
+        return {}
+    return {
+        item.variant: {
+            "poster": build_media_url(video.id, item.variant, item.base_path, item.version, POSTER_FILE),
+            "sprite": build_media_url(video.id, item.variant, item.base_path, item.version, SPRITE_FILE),
+            "thumbnails": build_media_url(video.id, item.variant, item.base_path, item.version, THUMBNAILS_FILE)
+        }
+        for item in media
+    }
+
+def build_hls_urls(video) -> dict:
+    """Signed master playlist URL per packaged variant"""
+    from utils.signed_urls import build_hls_url
+    
+    packages = getattr(video, "stream_packages", None)
+    if not isinstance(packages, list):
+        return {}
+    return {
+        package.variant: build_hls_url(video.id, package.variant, package.base_path)
+        for package in packages
+    }
+
 @router.get("/{video_id}")
 async def get_video(
     video_id: int,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Get details for a specific video (Enhanced with English audio info)
     Allow masters to view their learners' videos
     """
+    return await database.run_db(db, video_details, video_id, current_user)
+
+def video_details(db: Session, video_id: int, current_user: models.User) -> dict:
+    """Body of get_video, as sync ORM code run through database.run_db"""
     # Find the video
     video = db.query(models.VideoUpload).filter(
         models.VideoUpload.id == video_id
@@ -119,7 +552,10 @@ async def get_video(
         "brocade_type": getattr(video, 'brocade_type', None),
         "processing_status": video.processing_status,
         "upload_timestamp": video.upload_timestamp,
-        "keypoints_path": getattr(video, 'keypoints_path', None)
+        "keypoints_path": getattr(video, 'keypoints_path', None),
+        "stream_urls": build_stream_urls(video),
+        "hls_urls": build_hls_urls(video),
+        "preview": build_preview_urls(video)
     }
     
     return video_dict
@@ -255,6 +691,7 @@ async def upload_video(
     description: Optional[str] = Form(None),
     brocade_type: str = Form(...),
     file: UploadFile = File(...),
+    background_tasks: BackgroundTasks = None,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(database.get_db)
 ):
@@ -264,36 +701,22 @@ async def upload_video(
         if not file.content_type or not file.content_type.startswith('video/'):
             raise HTTPException(status_code=400, detail="File must be a video")
         
-        # Read file content
-        file_content = await file.read()
+        from services.video_upload import stream_upload_to_blob, stream_upload_to_file, UploadTooLargeError
+        from services.blob_storage import get_blob_service_client
         
-        # Check file size (limit to 100MB for now)
-        max_size = 100 * 1024 * 1024  # 100MB
-        if len(file_content) > max_size:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"File too large. Maximum size is {max_size // (1024*1024)}MB"
-            )
+        print(f"Uploading video: {file.filename}")
         
-        print(f"Uploading video: {file.filename}, size: {len(file_content)} bytes")
+        # Generate unique filename
+        file_extension = os.path.splitext(file.filename)[1]
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
         
-        # Upload to Azure Blob Storage
+        # Upload to Azure Blob Storage, one staged block at a time
+        body_consumed = False
         try:
-            from azure.storage.blob import BlobServiceClient
-            import os
-            import uuid
-            
-            # Get connection string
-            connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-            if not connection_string:
+            blob_service_client = get_blob_service_client()
+            if not blob_service_client:
                 raise Exception("Azure storage not configured")
             
-            # Create blob service client
-            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            
-            # Generate unique filename
-            file_extension = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
             blob_path = f"uploads/videos/{current_user.id}/{unique_filename}"
             
             # Upload to Azure
@@ -302,10 +725,10 @@ async def upload_video(
                 blob=blob_path
             )
             
-            blob_client.upload_blob(
-                file_content,
-                overwrite=True,
-                content_type="video/mp4",
+            body_consumed = True
+            upload_result = await stream_upload_to_blob(
+                file,
+                blob_client,
                 metadata={
                     "original_filename": file.filename,
                     "user_id": str(current_user.id),
@@ -314,17 +737,19 @@ async def upload_video(
             )
             
             # Get the blob URL
-            blob_url = blob_client.url
+            blob_url = upload_result["url"]
             file_path = blob_url  # Store Azure URL as path
             storage_type = "azure_blob"
             
             print(f"Successfully uploaded to Azure: {blob_url}")
             
+        except UploadTooLargeError:
+            raise
         except Exception as azure_error:
             print(f"Azure upload failed: {azure_error}")
             # Fallback to local storage (your existing logic)
-            file_extension = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
+            if body_consumed:
+                await file.seek(0)
             
             UPLOAD_DIR = "uploads/videos"
             os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -332,27 +757,16 @@ async def upload_video(
             os.makedirs(user_dir, exist_ok=True)
             file_path = os.path.join(user_dir, unique_filename)
             
-            with open(file_path, "wb") as buffer:
-                buffer.write(file_content)
+            upload_result = await stream_upload_to_file(file, file_path)
             storage_type = "local_fallback"
             print(f"Fallback: Uploaded to local storage: {file_path}")
         
-        # Map the frontend brocade type to database enum value
-        mapped_brocade_type = map_brocade_type(brocade_type)
-        
-        # Create database record
-        new_video = models.VideoUpload(
-            user_id=current_user.id,
-            title=title,
-            description=description,
-            brocade_type=mapped_brocade_type,
-            video_path=file_path,  # Either Azure URL or local path
-            processing_status="uploaded"
-        )
+        print(f"Stored {upload_result['size']} bytes, sha256 {upload_result['sha256']}")
         
-        db.add(new_video)
-        db.commit()
-        db.refresh(new_video)
+        new_video = create_uploaded_video(
+            db, current_user.id, title, description, brocade_type,
+            file_path, upload_result, storage_type, background_tasks
+        )
         
         print(f"Video record created with ID: {new_video.id}")
         
@@ -364,11 +778,15 @@ async def upload_video(
             "upload_timestamp": new_video.upload_timestamp,
             "storage_type": storage_type,
             "video_path": file_path,  # Include for debugging
+            "size": upload_result["size"],
+            "sha256": upload_result["sha256"],
             "message": f"Video uploaded successfully to {storage_type}"
         }
         
     except HTTPException:
         raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -376,12 +794,12 @@ async def upload_video(
 @router.post("/{video_id}/analyze")
 async def analyze_video(
     video_id: int,
-    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(database.get_db)
 ):
     """
-    Analyze a video using MMPose
+    Queue the video for analysis using MMPose. Submitting a video that is
+    already queued or running returns its job; poll /analysis-job for progress.
     """
     video = db.query(models.VideoUpload).filter(
         models.VideoUpload.id == video_id,
@@ -391,75 +809,243 @@ async def analyze_video(
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     
-    # Set the video to "processing" status
-    video.processing_status = "processing"
-    db.commit()
-    db.refresh(video)
+    job = queue_video_analysis(db, video, current_user)
+    
+    if job.get("reused_from") == video_id:
+        message = "Analysis results are current"
+    elif job.get("reused_from"):
+        message = "Analysis results reused"
+    elif job["created"]:
+        message = "Analysis started successfully"
+    else:
+        message = "Analysis already queued"
+    return {"message": message, **job}
+
+@router.get("/{video_id}/analysis-job")
+async def get_analysis_job(
+    video_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Latest analysis job of the video: status, queue position, attempts and error"""
+    from services.job_queue import latest_job, job_to_dict
     
-    # Store necessary values for background task
-    user_id = current_user.id
-    video_path = video.video_path
+    video = db.query(models.VideoUpload).filter(
+        models.VideoUpload.id == video_id,
+        models.VideoUpload.user_id == current_user.id
+    ).first()
     
-    # Define background task function
-    def process_video_analysis():
-        try:
-            # Create a new DB session for this background task
-            task_db = database.SessionLocal()
-            
-            try:
-                # Import here to avoid circular imports
-                from ml_pipeline.pose_analyzer import analyze_video as run_analysis
-                
-                # Run the analysis
-                result = run_analysis(video_path, user_id, video_id)
-                
-                # Update the database with results
-                db_video = task_db.query(models.VideoUpload).filter(
-                    models.VideoUpload.id == video_id
-                ).first()
-                
-                if not db_video:
-                    return
-                    
-                if result:
-                    db_video.analyzed_video_path = result.get("analyzed_video_path", result.get("original_video"))
-                    db_video.keypoints_path = result.get("keypoints_path", result.get("results_json"))
-                    db_video.processing_status = "completed"
-                else:
-                    db_video.processing_status = "failed"
-                    
-                task_db.commit()
-            except Exception as e:
-                try:
-                    db_video = task_db.query(models.VideoUpload).filter(
-                        models.VideoUpload.id == video_id
-                    ).first()
-                    if db_video:
-                        db_video.processing_status = "failed"
-                        task_db.commit()
-                except:
-                    pass
-            finally:
-                task_db.close()
-        except Exception as e:
-            print(f"Background task error: {str(e)}")
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
     
-    # Add the task
-    background_tasks.add_task(process_video_analysis)
+    job = latest_job(db, video_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Video has not been submitted for analysis")
     
-    return {"message": "Analysis started successfully"}
+    return job_to_dict(db, job)
 
 # stream_converted_video endpoint to allow learners to view master's videos
+def resolve_stream_path(video, variant: str) -> str:
+    """
+    Storage path (Azure URL or local file) of one variant of a video:
+    "original", "analyzed" or "english". Raises 404 when it has none.
+    """
+    import os
+    
+    # Get video UUID for path construction
+    video_uuid = getattr(video, 'video_uuid', None)
+    
+    # Determine video path based on type
+    video_path = None
+    
+    if variant == "original":
+        # Original videos are in uploads/videos/{user_id}/{uuid}.mp4
+        if video.video_path:
+            video_path = video.video_path
+        elif video_uuid:
+            video_path = f"https://baduanjintesting.blob.core.windows.net/videos/uploads/videos/{video.user_id}/{video_uuid}.mp4"
+        else:
+            raise HTTPException(status_code=404, detail="Original video path not found")
+        
+    elif variant == "analyzed":
+        # Analyzed videos are in outputs_json/{user_id}/{video.id}/{uuid}_web.mp4
+        if video.analyzed_video_path:
+            video_path = video.analyzed_video_path
+        elif video_uuid:
+            video_path = f"https://baduanjintesting.blob.core.windows.net/videos/outputs_json/{video.user_id}/{video.id}/{video_uuid}_web.mp4"
+        else:
+            # Fallback: look for any MP4 in outputs directory
+            outputs_dir = f"outputs_json/{video.user_id}/{video.id}"
+            if os.path.exists(outputs_dir):
+                mp4_files = [f for f in os.listdir(outputs_dir) if f.endswith('.mp4')]
+                if mp4_files:
+                    video_path = f"https://baduanjintesting.blob.core.windows.net/videos/{outputs_dir}/{mp4_files[0]}"
+            
+            if not video_path:
+                # Final fallback to original
+                video_path = video.video_path
+                print(f"Analyzed video not found, falling back to original")
+        
+    elif variant == "english":
+        # English videos are in outputs_json/{user_id}/{video.id}/{uuid}_english.mp4
+        if hasattr(video, 'english_audio_path') and video.english_audio_path:
+            video_path = video.english_audio_path
+        elif video_uuid:
+            video_path = f"https://baduanjintesting.blob.core.windows.net/videos/outputs_json/{video.user_id}/{video.id}/{video_uuid}_english.mp4"
+        else:
+            # Fallback: look for english files in outputs
+            from pathlib import Path
+            base_path = Path("outputs_json") / str(video.user_id) / str(video.id)
+            if base_path.exists():
+                english_files = list(base_path.glob("*english*.mp4"))
+                if english_files:
+                    video_path = f"https://baduanjintesting.blob.core.windows.net/videos/outputs_json/{video.user_id}/{video.id}/{english_files[0].name}"
+            
+            if not video_path:
+                raise HTTPException(status_code=404, detail="English audio version not found")
+        
+    else:
+        raise HTTPException(status_code=400, detail=f"Invalid video type: {variant}")
+    
+    if not video_path:
+        raise HTTPException(status_code=404, detail="Video path not found")
+    
+    return video_path
+
+def stream_video_file(video_path: str, request: Optional[Request] = None):
+    """Serve a resolved video path with HTTP Range support"""
+    import os
+    
+    # Stream from Azure (all paths should be Azure URLs now)
+    if video_path.startswith('https://') and '.blob.core.windows.net' in video_path:
+        try:
+            from services.blob_storage import get_blob_service_client, get_blob_properties_cached, iter_blob_range
+            from utils.http_range import parse_range_header
+            from azure.core.exceptions import ResourceNotFoundError
+            
+            blob_service_client = get_blob_service_client()
+            if not blob_service_client:
+                raise HTTPException(status_code=500, detail="Azure storage not configured")
+            
+            # Extract blob name from URL - everything after /videos/
+            container_name = "videos"
+            
+            if "/videos/" in video_path:
+                blob_name = video_path.split("/videos/", 1)[1]  # Get everything after first /videos/
+            else:
+                raise HTTPException(status_code=400, detail="Invalid Azure URL format")
+            
+            print(f"Azure streaming - Container: {container_name}, Blob: {blob_name}")
+            
+            # Get blob client
+            blob_client = blob_service_client.get_blob_client(
+                container=container_name,
+                blob=blob_name
+            )
+            
+            # One properties call gives existence, size and ETag; later Range
+            # requests of the same playback reuse it from the cache
+            try:
+                blob_properties = get_blob_properties_cached(blob_client, blob_name)
+            except ResourceNotFoundError:
+                print(f"Blob does not exist: {blob_name}")
+                raise HTTPException(status_code=404, detail="Video file not found in Azure storage")
+            
+            content_type = blob_properties["content_type"] or "video/mp4"
+            
+            # For video files, ensure proper content type
+            if blob_name.endswith('.mp4'):
+                content_type = "video/mp4"
+            
+            size = blob_properties["size"]
+            etag = blob_properties["etag"]
+            
+            headers = {
+                "Accept-Ranges": "bytes",
+                "Content-Disposition": "inline",
+                "Cache-Control": "private, max-age=3600",
+                "ETag": etag,
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Methods": "GET, OPTIONS",
+                "Access-Control-Allow-Headers": "Range, Content-Range, Content-Length",
+                "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges"
+            }
+            
+            range_header = request.headers.get("range") if request else None
+            if_range = request.headers.get("if-range") if request else None
+            if if_range and if_range != etag:
+                # The blob changed since the client cached its first part
+                range_header = None
+            
+            byte_range = parse_range_header(range_header, size)
+            if byte_range is None:
+                start, end, status_code = 0, size - 1, 200
+            else:
+                start, end = byte_range
+                status_code = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            
+            headers["Content-Length"] = str(end - start + 1 if size else 0)
+            print(f"Streaming bytes {start}-{end} of {size} from Azure")
+            
+            return StreamingResponse(
+                iter_blob_range(blob_client, start, end),
+                status_code=status_code,
+                media_type=content_type,
+                headers=headers
+            )
+            
+        except HTTPException:
+            raise
+        except Exception as azure_error:
+            print(f"Azure streaming error: {azure_error}")
+            print(f"URL: {video_path}")
+            print(f"Container: {container_name}")
+            print(f"Blob: {blob_name if 'blob_name' in locals() else 'unknown'}")
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Error streaming from Azure: {str(azure_error)}"
+            )
+    else:
+        # Handle local files (fallback); FileResponse answers Range requests
+        # itself with 206 and reads the file in chunks
+        if not os.path.exists(video_path):
+            print(f"Local file not found: {video_path}")
+            raise HTTPException(status_code=404, detail="Video file not found")
+        
+        return FileResponse(
+            video_path,
+            media_type="video/mp4",
+            headers={
+                "Accept-Ranges": "bytes",
+                "Content-Disposition": "inline",
+                "Cache-Control": "no-cache",
+                "Access-Control-Allow-Origin": "*"
+            }
+        )
+        
+
 @router.get("/{video_id}/stream-video")
 async def stream_specific_video(
     video_id: int,
+    request: Request = None,
     type: str = Query("original"),
     token: str = Query(None),
+    sig: Optional[str] = None,
     db: Session = Depends(database.get_db)
 ):
-    """Stream video with proper Azure path handling"""
+    """
+    Stream video with proper Azure path handling and HTTP Range support.
+    With a signed URL from get_video (sig) access was already checked when the
+    URL was issued, so no database query is made.
+    """
     import os
-    import io
+    
+    if sig:
+        from utils.signed_urls import verify_stream_token
+        
+        payload = verify_stream_token(sig, video_id, type)
+        return stream_video_file(payload["path"], request)
     
     if not token:
         raise HTTPException(status_code=401, detail="Authentication token required")
@@ -524,153 +1110,11 @@ async def stream_specific_video(
         if not has_access:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        # Get video UUID for path construction
-        video_uuid = getattr(video, 'video_uuid', None)
-        
-        # Determine video path based on type
-        video_path = None
-        
-        if type == "original":
-            # Original videos are in uploads/videos/{user_id}/{uuid}.mp4
-            if video.video_path:
-                video_path = video.video_path
-            elif video_uuid:
-                video_path = f"https://baduanjintesting.blob.core.windows.net/videos/uploads/videos/{video.user_id}/{video_uuid}.mp4"
-            else:
-                raise HTTPException(status_code=404, detail="Original video path not found")
-            
-            print(f"Streaming original video: {video_path}")
-            
-        elif type == "analyzed":
-            # Analyzed videos are in outputs_json/{user_id}/{video_id}/{uuid}_web.mp4
-            if video.analyzed_video_path:
-                video_path = video.analyzed_video_path
-            elif video_uuid:
-                video_path = f"https://baduanjintesting.blob.core.windows.net/videos/outputs_json/{video.user_id}/{video_id}/{video_uuid}_web.mp4"
-            else:
-                # Fallback: look for any MP4 in outputs directory
-                outputs_dir = f"outputs_json/{video.user_id}/{video_id}"
-                if os.path.exists(outputs_dir):
-                    mp4_files = [f for f in os.listdir(outputs_dir) if f.endswith('.mp4')]
-                    if mp4_files:
-                        video_path = f"https://baduanjintesting.blob.core.windows.net/videos/{outputs_dir}/{mp4_files[0]}"
-                
-                if not video_path:
-                    # Final fallback to original
-                    video_path = video.video_path
-                    print(f"Analyzed video not found, falling back to original")
-            
-            print(f"Streaming analyzed video: {video_path}")
-            
-        elif type == "english":
-            # English videos are in outputs_json/{user_id}/{video_id}/{uuid}_english.mp4
-            if hasattr(video, 'english_audio_path') and video.english_audio_path:
-                video_path = video.english_audio_path
-            elif video_uuid:
-                video_path = f"https://baduanjintesting.blob.core.windows.net/videos/outputs_json/{video.user_id}/{video_id}/{video_uuid}_english.mp4"
-            else:
-                # Fallback: look for english files in outputs
-                from pathlib import Path
-                base_path = Path("outputs_json") / str(video.user_id) / str(video_id)
-                if base_path.exists():
-                    english_files = list(base_path.glob("*english*.mp4"))
-                    if english_files:
-                        video_path = f"https://baduanjintesting.blob.core.windows.net/videos/outputs_json/{video.user_id}/{video_id}/{english_files[0].name}"
-                
-                if not video_path:
-                    raise HTTPException(status_code=404, detail="English audio version not found")
-            
-            print(f"Streaming English audio: {video_path}")
-            
-        else:
-            raise HTTPException(status_code=400, detail=f"Invalid video type: {type}")
+        video_path = resolve_stream_path(video, type)
+        print(f"Streaming {type} video: {video_path}")
         
-        if not video_path:
-            raise HTTPException(status_code=404, detail="Video path not found")
+        return stream_video_file(video_path, request)
         
-        # Stream from Azure (all paths should be Azure URLs now)
-        if video_path.startswith('https://') and '.blob.core.windows.net' in video_path:
-            try:
-                connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-                if not connection_string:
-                    raise HTTPException(status_code=500, detail="Azure storage not configured")
-                
-                from azure.storage.blob import BlobServiceClient
-                blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-                
-                # Extract blob name from URL - everything after /videos/
-                container_name = "videos"
-                
-                if "/videos/" in video_path:
-                    blob_name = video_path.split("/videos/", 1)[1]  # Get everything after first /videos/
-                else:
-                    raise HTTPException(status_code=400, detail="Invalid Azure URL format")
-                
-                print(f"Azure streaming - Container: {container_name}, Blob: {blob_name}")
-                
-                # Get blob client
-                blob_client = blob_service_client.get_blob_client(
-                    container=container_name,
-                    blob=blob_name
-                )
-                
-                # Check if blob exists
-                if not blob_client.exists():
-                    print(f"Blob does not exist: {blob_name}")
-                    raise HTTPException(status_code=404, detail="Video file not found in Azure storage")
-                
-                # Download and stream
-                blob_properties = blob_client.get_blob_properties()
-                content_type = blob_properties.content_settings.content_type or "video/mp4"
-                
-                # For video files, ensure proper content type
-                if blob_name.endswith('.mp4'):
-                    content_type = "video/mp4"
-                
-                content = blob_client.download_blob().readall()
-                print(f"Successfully downloaded {len(content)} bytes from Azure")
-                
-                headers = {
-                    "Accept-Ranges": "bytes",
-                    "Content-Disposition": "inline",
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET, OPTIONS",
-                    "Access-Control-Allow-Headers": "Range, Content-Range, Content-Length"
-                }
-                
-                return StreamingResponse(
-                    io.BytesIO(content),
-                    media_type=content_type,
-                    headers=headers
-                )
-                
-            except Exception as azure_error:
-                print(f"Azure streaming error: {azure_error}")
-                print(f"URL: {video_path}")
-                print(f"Container: {container_name}")
-                print(f"Blob: {blob_name if 'blob_name' in locals() else 'unknown'}")
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Error streaming from Azure: {str(azure_error)}"
-                )
-        else:
-            # Handle local files (fallback)
-            if not os.path.exists(video_path):
-                print(f"Local file not found: {video_path}")
-                raise HTTPException(status_code=404, detail="Video file not found")
-            
-            return FileResponse(
-                video_path,
-                media_type="video/mp4",
-                headers={
-                    "Accept-Ranges": "bytes",
-                    "Content-Disposition": "inline",
-                    "Cache-Control": "no-cache",
-                    "Access-Control-Allow-Origin": "*"
-                }
-            )
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -679,6 +1123,85 @@ async def stream_specific_video(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
+@router.get("/{video_id}/hls/{variant}/{file_path:path}")
+async def stream_hls_file(
+    video_id: int,
+    variant: str,
+    file_path: str,
+    sig: Optional[str] = None
+):
+    """
+    Serve an HLS playlist or segment. Access is carried by the signed URL from
+    get_video; playlists are rewritten so every child URI carries it too.
+    """
+    from services.hls_packager import HLS_FILE_PATTERN, read_published_file, sign_playlist
+    from utils.signed_urls import verify_stream_token, hls_token_variant
+    from urllib.parse import quote
+    
+    if not sig:
+        raise HTTPException(status_code=401, detail="Signed URL required")
+    
+    payload = verify_stream_token(sig, video_id, hls_token_variant(variant))
+    
+    if not HLS_FILE_PATTERN.match(file_path):
+        raise HTTPException(status_code=404, detail="HLS file not found")
+    
+    content = await read_published_file(payload["path"], file_path)
+    if content is None:
+        raise HTTPException(status_code=404, detail="HLS file not found")
+    
+    headers = {"Access-Control-Allow-Origin": "*"}
+    
+    if file_path.endswith(".m3u8"):
+        playlist = sign_playlist(content.decode("utf-8"), f"sig={quote(sig)}")
+        headers["Cache-Control"] = "private, max-age=60"
+        return Response(content=playlist, media_type="application/vnd.apple.mpegurl", headers=headers)
+    
+    # Segment names are never reused for different content
+    headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return Response(content=content, media_type="video/mp2t", headers=headers)
+
+@router.get("/{video_id}/media/{variant}/{version}/{filename}")
+async def get_preview_media(
+    video_id: int,
+    variant: str,
+    version: str,
+    filename: str,
+    sig: Optional[str] = None
+):
+    """
+    Serve a poster, sprite sheet or thumbnail index. Paths are versioned by
+    content, so responses are cacheable forever.
+    """
+    from services.hls_packager import read_published_file
+    from services.preview_media import PREVIEW_FILES, THUMBNAILS_FILE, sign_thumbnails_vtt
+    from utils.signed_urls import verify_stream_token, media_token_variant
+    from urllib.parse import quote
+    
+    if not sig:
+        raise HTTPException(status_code=401, detail="Signed URL required")
+    
+    payload = verify_stream_token(sig, video_id, media_token_variant(variant))
+    
+    if filename not in PREVIEW_FILES or not payload["path"].endswith(f"/{version}"):
+        raise HTTPException(status_code=404, detail="Preview file not found")
+    
+    content = await read_published_file(payload["path"], filename)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Preview file not found")
+    
+    if filename == THUMBNAILS_FILE:
+        content = sign_thumbnails_vtt(content.decode("utf-8"), f"sig={quote(sig)}")
+    
+    return Response(
+        content=content,
+        media_type=PREVIEW_FILES[filename],
+        headers={
+            "Cache-Control": "private, max-age=31536000, immutable",
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
 @router.delete("/{video_id}")
 async def delete_video(
     video_id: int,
@@ -709,6 +1232,9 @@ async def delete_video(
     # Get outputs directory
     outputs_dir = os.path.join("outputs_json", str(current_user.id), str(video_id))
     
+    invalidate_master_artifacts(video_id)
+    invalidate_blob_properties(f"outputs_json/{current_user.id}/{video_id}/")
+    
     # Delete from database
     try:
         db.delete(video)
@@ -779,6 +1305,10 @@ async def reset_video_processing_status(
     
     # Reset the status to 'uploaded' if it's 'processing'
     if video.processing_status == "processing":
+        # A job still waiting in the queue would set it back to processing
+        from services.job_queue import cancel_queued_job
+        cancel_queued_job(db, video_id)
+        
         video.processing_status = "uploaded"
         db.commit()
         db.refresh(video)
@@ -796,13 +1326,12 @@ async def reset_video_processing_status(
 @router.post("/{video_id}/analyze-enhanced") 
 async def analyze_video_enhanced(
     video_id: int,
-    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(database.get_db)
 ):
     """
-    Enhanced video analysis endpoint that properly updates status
-    This should REPLACE one of your existing analyze endpoints
+    Enhanced video analysis endpoint that properly updates status.
+    Checks the video file first, then queues the analysis like /analyze.
     """
     try:
         # Get video from database
@@ -820,95 +1349,21 @@ async def analyze_video_enhanced(
         # Print debug info
         print(f"Starting enhanced analysis for video ID: {video_id}, current status: {video.processing_status}")
         
-        # Set status to processing
-        video.processing_status = "processing"
-        db.commit()
-        
-        # Store necessary values for background task
-        user_id = current_user.id
-        video_path = video.video_path
-        
         # Check if video file exists
-        if not os.path.exists(video_path):
-            print(f"ERROR: Video file not found: {video_path}")
+        if not os.path.exists(video.video_path):
+            print(f"ERROR: Video file not found: {video.video_path}")
             video.processing_status = "failed"
             db.commit()
             raise HTTPException(status_code=400, detail="Video file not found on server")
         
-        # Enhanced background task function
-        def process_video_analysis_enhanced():
-            try:
-                # Create a new DB session for this background task
-                task_db = database.SessionLocal()
-                
-                try:
-                    print(f"Starting enhanced video analysis task for ID: {video_id}")
-                    # Import here to avoid circular imports
-                    from ml_pipeline.pose_analyzer import analyze_video as run_analysis
-                    
-                    # Print path confirmation
-                    print(f"Video path being analyzed: {video_path}")
-                    
-                    # Run the analysis
-                    result = run_analysis(video_path, user_id, video_id)
-                    
-                    print(f"Analysis result for video {video_id}: {result}")
-                    
-                    # Update the database with results
-                    db_video = task_db.query(models.VideoUpload).filter(
-                        models.VideoUpload.id == video_id
-                    ).first()
-                    
-                    if not db_video:
-                        print(f"WARNING: Could not find video with ID {video_id} in database after analysis")
-                        return
-                        
-                    if result:
-                        # Use the paths from the analysis result
-                        db_video.analyzed_video_path = result.get("analyzed_video_path", result.get("original_video"))
-                        db_video.keypoints_path = result.get("keypoints_path", result.get("results_json"))
-                        db_video.processing_status = "completed"  # FIXED: Ensure this is set
-                        
-                        print(f"Video {video_id} analysis completed successfully")
-                        print(f"  - Analyzed video path: {db_video.analyzed_video_path}")
-                        print(f"  - Keypoints path: {db_video.keypoints_path}")
-                    else:
-                        db_video.processing_status = "failed"
-                        print(f"Video {video_id} analysis failed - no results returned")
-                        
-                    task_db.commit()
-                    print(f"Database updated for video {video_id} with status: {db_video.processing_status}")
-                    
-                except Exception as e:
-                    print(f"Error in enhanced analysis process for video {video_id}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-                    
-                    try:
-                        db_video = task_db.query(models.VideoUpload).filter(
-                            models.VideoUpload.id == video_id
-                        ).first()
-                        if db_video:
-                            db_video.processing_status = "failed"
-                            task_db.commit()
-                            print(f"Set video {video_id} status to failed due to exception")
-                    except Exception as db_error:
-                        print(f"Error updating video status after analysis exception: {str(db_error)}")
-                finally:
-                    task_db.close()
-            except Exception as e:
-                print(f"Enhanced background task error: {str(e)}")
-                import traceback
-                traceback.print_exc()
-        
-        # Add the enhanced task
-        background_tasks.add_task(process_video_analysis_enhanced)
-        print(f"Added enhanced video analysis background task for video {video_id}")
+        job = queue_video_analysis(db, video, current_user)
+        print(f"Queued enhanced video analysis for video {video_id}: job {job['job_id']}, position {job['queue_position']}")
         
         return {
+            **job,
             "message": "Enhanced analysis started successfully",
             "video_id": video_id,
-            "status": "processing"
+            "status": "completed" if job.get("reused_from") else "processing"
         }
         
     except HTTPException:
@@ -935,6 +1390,8 @@ async def upload_video_azure(
     In testing mode: returns mock analysis
     In production mode: uses your existing MMPose processing
     """
+    from azure_services import azure_blob_service
+    
     try:
         # Validate file type
         if not file.content_type.startswith('video/'):
@@ -1111,6 +1568,8 @@ async def test_storage_complete():
 @router.get("/debug/azure-contents")
 async def debug_azure_contents():
     """Check what's actually stored in Azure"""
+    from azure.storage.blob import BlobServiceClient
+    
     try:
         connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
         if not connection_string:
@@ -1140,6 +1599,7 @@ async def debug_azure_contents():
 @router.post("/pi-transfer")
 async def transfer_video_from_pi_debug(
     transfer_data: dict,
+    background_tasks: BackgroundTasks = None,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(database.get_db)
 ):
@@ -1217,73 +1677,14 @@ async def transfer_video_from_pi_debug(
                 detail=f"Cannot reach Pi: {str(connectivity_error)}"
             )
         
-        # Step 6: Test file download from Pi
-        print("🔍 DEBUG: Step 6 - Testing file download")
+        # Step 6: Relay the file from Pi straight into storage
+        print("🔍 DEBUG: Step 6 - Relaying file from Pi to storage")
+        from services.pi_transfer import transfer_pi_video, TransferVerificationError
+        from services.video_upload import UploadTooLargeError
         try:
-            async with httpx.AsyncClient(
-                timeout=httpx.Timeout(connect=30.0, read=60.0, write=30.0, pool=30.0)
-            ) as client:
-                headers = {
-                    'ngrok-skip-browser-warning': 'true',
-                    'User-Agent': 'Main-Backend-Pi-Transfer-Debug/1.0'
-                }
-                
-                response = await client.get(PI_DOWNLOAD_URL, headers=headers)
-                print(f"🔍 DEBUG: Download response: HTTP {response.status_code}")
-                
-                if response.status_code != 200:
-                    error_text = response.text[:200] if hasattr(response, 'text') else 'Unknown error'
-                    raise HTTPException(
-                        status_code=503, 
-                        detail=f"Pi download failed: HTTP {response.status_code} - {error_text}"
-                    )
-                
-                file_content = response.content
-                total_size = len(file_content)
-                print(f"✅ DEBUG: Downloaded {total_size:,} bytes from Pi")
-                
-                if total_size == 0:
-                    raise HTTPException(status_code=500, detail="Downloaded file is empty")
-                
-        except httpx.TimeoutException:
-            print("❌ DEBUG: Download timeout")
-            raise HTTPException(
-                status_code=503,
-                detail="Download timeout - file may be too large or connection slow"
-            )
-        
-        # Step 7: Test UUID generation
-        print("🔍 DEBUG: Step 7 - Testing UUID generation")
-        try:
-            import uuid
-            file_extension = os.path.splitext(pi_filename)[1] or '.mp4'
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            print(f"✅ DEBUG: Generated UUID filename: {unique_filename}")
-        except Exception as uuid_error:
-            print(f"❌ DEBUG: UUID generation failed: {uuid_error}")
-            raise HTTPException(status_code=500, detail=f"UUID generation failed: {str(uuid_error)}")
-        
-        # Step 8: Test Azure upload
-        print("🔍 DEBUG: Step 8 - Testing Azure upload")
-        try:
-            from azure.storage.blob import BlobServiceClient
-            
-            if not connection_string:
-                raise Exception("Azure storage not configured")
-            
-            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            blob_path = f"uploads/videos/{current_user.id}/{unique_filename}"
-            
-            blob_client = blob_service_client.get_blob_client(
-                container="videos",
-                blob=blob_path
-            )
-            
-            # Test upload
-            blob_client.upload_blob(
-                file_content,
-                overwrite=True,
-                content_type="video/mp4",
+            transfer = await transfer_pi_video(
+                pi_filename,
+                current_user.id,
                 metadata={
                     "original_filename": pi_filename,
                     "user_id": str(current_user.id),
@@ -1291,55 +1692,32 @@ async def transfer_video_from_pi_debug(
                     "source": "raspberry_pi"
                 }
             )
-            
-            blob_url = blob_client.url
-            file_path = blob_url
-            storage_type = "azure_blob"
-            
-            print(f"✅ DEBUG: Azure upload successful: {blob_url}")
-            
-        except Exception as azure_error:
-            print(f"⚠️ DEBUG: Azure upload failed, trying local fallback: {azure_error}")
-            # Fallback to local storage
-            try:
-                UPLOAD_DIR = "uploads/videos"
-                os.makedirs(UPLOAD_DIR, exist_ok=True)
-                user_dir = os.path.join(UPLOAD_DIR, str(current_user.id))
-                os.makedirs(user_dir, exist_ok=True)
-                file_path = os.path.join(user_dir, unique_filename)
-                
-                with open(file_path, "wb") as buffer:
-                    buffer.write(file_content)
-                
-                storage_type = "local_fallback"
-                print(f"✅ DEBUG: Local storage fallback successful: {file_path}")
-                
-            except Exception as local_error:
-                print(f"❌ DEBUG: Local storage also failed: {local_error}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Both Azure and local storage failed. Azure: {str(azure_error)}, Local: {str(local_error)}"
-                )
-        
-        # Step 9: Test database record creation
-        print("🔍 DEBUG: Step 9 - Creating database record")
+        except httpx.TimeoutException:
+            print("❌ DEBUG: Download timeout")
+            raise HTTPException(
+                status_code=503,
+                detail="Download timeout - file may be too large or connection slow"
+            )
+        except UploadTooLargeError as size_error:
+            raise HTTPException(status_code=400, detail=str(size_error))
+        except (TransferVerificationError, httpx.HTTPError) as transfer_error:
+            print(f"❌ DEBUG: Pi transfer failed: {transfer_error}")
+            raise HTTPException(status_code=503, detail=f"Pi download failed: {str(transfer_error)}")
+        
+        file_path = transfer["file_path"]
+        storage_type = transfer["storage_type"]
+        total_size = transfer["size"]
+        unique_filename = transfer["unique_filename"]
+        print(f"✅ DEBUG: Relayed {total_size:,} bytes to {storage_type}: {file_path}")
+        
+        # Step 7: Test database record creation
+        print("🔍 DEBUG: Step 7 - Creating database record")
         try:
-            mapped_brocade_type = map_brocade_type(brocade_type)
-            print(f"🔍 DEBUG: Mapped brocade type: {brocade_type} -> {mapped_brocade_type}")
-            
-            new_video = models.VideoUpload(
-                user_id=current_user.id,
-                title=title,
-                description=description,
-                brocade_type=mapped_brocade_type,
-                video_path=file_path,
-                processing_status="uploaded"
+            new_video = create_uploaded_video(
+                db, current_user.id, title, description, brocade_type,
+                file_path, transfer, storage_type, background_tasks
             )
             
-            db.add(new_video)
-            db.commit()
-            db.refresh(new_video)
-            
             print(f"✅ DEBUG: Database record created with ID: {new_video.id}")
             
         except Exception as db_error:
@@ -1358,7 +1736,7 @@ async def transfer_video_from_pi_debug(
             "status": "success",
             "message": "DEBUG: Video transferred successfully from Pi",
             "debug_info": {
-                "steps_completed": 9,
+                "steps_completed": 7,
                 "video_id": new_video.id,
                 "storage_type": storage_type,
                 "file_size": total_size,
@@ -1429,10 +1807,11 @@ async def test_required_imports():
 @router.post("/pi-transfer-requests")
 async def transfer_video_from_pi_requests(
     transfer_data: dict,
+    background_tasks: BackgroundTasks = None,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    """Transfer video from Pi using requests instead of httpx"""
+    """Transfer video from Pi, relaying the bytes straight into storage"""
     
     try:
         # Extract and validate input
@@ -1444,101 +1823,40 @@ async def transfer_video_from_pi_requests(
         if not pi_filename or not title:
             raise HTTPException(status_code=400, detail="Pi filename and title are required")
         
-        print(f"Starting Pi transfer (requests): {pi_filename}")
-        
-        # Download from Pi using requests (synchronous)
-        PI_DOWNLOAD_URL = f"https://mongoose-hardy-caiman.ngrok-free.app/api/download/{pi_filename}"
-        
-        import requests  # You already have this
+        print(f"Starting Pi transfer (relay): {pi_filename}")
         
-        headers = {
-            'ngrok-skip-browser-warning': 'true',
-            'User-Agent': 'Main-Backend-Pi-Transfer-Requests/1.0'
-        }
-        
-        print(f"Downloading from Pi: {PI_DOWNLOAD_URL}")
-        
-        # Download file
-        response = requests.get(PI_DOWNLOAD_URL, headers=headers, timeout=120)
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Pi download failed: HTTP {response.status_code}"
-            )
-        
-        file_content = response.content
-        total_size = len(file_content)
-        
-        if total_size == 0:
-            raise HTTPException(status_code=500, detail="Downloaded file is empty")
-        
-        print(f"Downloaded {total_size:,} bytes from Pi")
-        
-        # Generate UUID filename (same as manual upload)
-        import uuid
-        file_extension = os.path.splitext(pi_filename)[1] or '.mp4'
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        
-        # Upload to Azure (same as manual upload)
+        # Stream from Pi into storage without holding the file in memory
+        import httpx
+        from services.pi_transfer import transfer_pi_video, TransferVerificationError
+        from services.video_upload import UploadTooLargeError
         try:
-            from azure.storage.blob import BlobServiceClient
-            
-            connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-            if not connection_string:
-                raise Exception("Azure storage not configured")
-            
-            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-            blob_path = f"uploads/videos/{current_user.id}/{unique_filename}"
-            
-            blob_client = blob_service_client.get_blob_client(
-                container="videos",
-                blob=blob_path
-            )
-            
-            blob_client.upload_blob(
-                file_content,
-                overwrite=True,
-                content_type="video/mp4",
+            transfer = await transfer_pi_video(
+                pi_filename,
+                current_user.id,
                 metadata={
                     "original_filename": pi_filename,
                     "user_id": str(current_user.id),
                     "upload_type": "pi_transfer"
                 }
             )
-            
-            file_path = blob_client.url
-            storage_type = "azure_blob"
-            
-        except Exception as azure_error:
-            # Fallback to local storage
-            UPLOAD_DIR = "uploads/videos"
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            user_dir = os.path.join(UPLOAD_DIR, str(current_user.id))
-            os.makedirs(user_dir, exist_ok=True)
-            file_path = os.path.join(user_dir, unique_filename)
-            
-            with open(file_path, "wb") as buffer:
-                buffer.write(file_content)
-            
-            storage_type = "local_fallback"
+        except UploadTooLargeError as size_error:
+            raise HTTPException(status_code=400, detail=str(size_error))
+        except (TransferVerificationError, httpx.HTTPError) as transfer_error:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Pi download failed: {str(transfer_error)}"
+            )
+        
+        file_path = transfer["file_path"]
+        storage_type = transfer["storage_type"]
+        total_size = transfer["size"]
         
         # Create database record (same as manual upload)
-        mapped_brocade_type = map_brocade_type(brocade_type)
-        
-        new_video = models.VideoUpload(
-            user_id=current_user.id,
-            title=title,
-            description=description,
-            brocade_type=mapped_brocade_type,
-            video_path=file_path,
-            processing_status="uploaded"
+        new_video = create_uploaded_video(
+            db, current_user.id, title, description, brocade_type,
+            file_path, transfer, storage_type, background_tasks
         )
         
-        db.add(new_video)
-        db.commit()
-        db.refresh(new_video)
-        
         print(f"Video record created with ID: {new_video.id}")
         
         return {
@@ -1549,7 +1867,7 @@ async def transfer_video_from_pi_requests(
             "processing_status": new_video.processing_status,
             "upload_timestamp": new_video.upload_timestamp,
             "storage_type": storage_type,
-            "message": f"Video uploaded successfully using requests",
+            "message": f"Video uploaded successfully using streaming relay",
             "original_pi_filename": pi_filename,
             "size": total_size
         }
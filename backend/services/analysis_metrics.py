@@ -0,0 +1,206 @@
+# services/analysis_metrics.py
+# Headline metrics of analyzed videos materialized into typed columns
+# (models.AnalysisMetrics, models.AnalysisJointRange) when the analysis JSON
+# files are extracted, so progress over time is a SQL aggregate instead of
+# one JSON download per video
+
+import os
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+OUTPUTS_ROOT = "outputs_json"
+PERFORMER_TYPES = ("learner", "master")
+METRICS = ("overall_smoothness", "overall_symmetry", "overall_stability", "mean_range_of_motion")
+
+def analysis_dir(user_id: int, video_id: int) -> str:
+    return os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id), "baduanjin_analysis")
+
+def detect_performer(directory: str) -> Optional[str]:
+    """Prefix of the extracted files in directory (learner_*.json or master_*.json)"""
+    for performer in PERFORMER_TYPES:
+        if os.path.exists(os.path.join(directory, f"{performer}_smoothness.json")):
+            return performer
+    return None
+
+def load_metric_files(directory: str, performer: str) -> Dict[str, Dict]:
+    """The four metric files of one performer; missing or unreadable ones are left out"""
+    files = {}
+    for kind in ("smoothness", "symmetry", "balance", "joint_angles"):
+        path = os.path.join(directory, f"{performer}_{kind}.json")
+        try:
+            with open(path, "r") as f:
+                files[kind] = json.load(f)
+        except (OSError, ValueError):
+            continue
+    return files
+
+def as_float(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def metrics_from_files(files: Dict[str, Dict]) -> Tuple[Dict, List[Dict]]:
+    """(headline metrics, per-joint ranges) from parsed metric files"""
+    joints = []
+    for joint, values in (files.get("joint_angles", {}).get("rangeOfMotion") or {}).items():
+        min_angle, max_angle = as_float(values.get("min")), as_float(values.get("max"))
+        joints.append({
+            "joint": joint,
+            "min_angle": min_angle,
+            "max_angle": max_angle,
+            "optimal_angle": as_float(values.get("optimal")),
+            "range_of_motion": max_angle - min_angle if None not in (min_angle, max_angle) else None
+        })
+
+    ranges = [j["range_of_motion"] for j in joints if j["range_of_motion"] is not None]
+    headline = {
+        "overall_smoothness": as_float(files.get("smoothness", {}).get("overallSmoothness")),
+        "overall_symmetry": as_float(files.get("symmetry", {}).get("overallSymmetry")),
+        "overall_stability": as_float(files.get("balance", {}).get("overallStability")),
+        "mean_range_of_motion": round(sum(ranges) / len(ranges), 2) if ranges else None
+    }
+    return headline, joints
+
+def materialize_metrics(db: Session, video: models.VideoUpload,
+                        directory: Optional[str] = None) -> Optional[models.AnalysisMetrics]:
+    """
+    Upsert the metrics row and joint ranges of an analyzed video from its local
+    JSON files. Returns None (and changes nothing) when the files are not there.
+    """
+    if directory is None:
+        directory = analysis_dir(video.user_id, video.id)
+
+    performer = detect_performer(directory)
+    if performer is None:
+        return None
+    headline, joints = metrics_from_files(load_metric_files(directory, performer))
+
+    record = db.query(models.AnalysisMetrics).filter(
+        models.AnalysisMetrics.video_id == video.id
+    ).first()
+    if not record:
+        record = models.AnalysisMetrics(video_id=video.id)
+        db.add(record)
+
+    record.user_id = video.user_id
+    record.brocade_type = video.brocade_type
+    record.performer_type = performer
+    record.analyzed_at = video.upload_timestamp or datetime.utcnow()
+    for name, value in headline.items():
+        setattr(record, name, value)
+
+    db.query(models.AnalysisJointRange).filter(
+        models.AnalysisJointRange.video_id == video.id
+    ).delete(synchronize_session=False)
+    if joints:
+        db.execute(models.AnalysisJointRange.__table__.insert(), [
+            dict(joint_range, video_id=video.id) for joint_range in joints
+        ])
+
+    db.commit()
+    return record
+
+def progress_sessions(db: Session, user_id: int, brocade_type: Optional[str] = None,
+                      joint: Optional[str] = None) -> List[Dict]:
+    """One user's analyzed sessions in time order, with one joint's range when asked for"""
+    columns = [
+        models.AnalysisMetrics.video_id,
+        models.VideoUpload.title,
+        models.AnalysisMetrics.brocade_type,
+        models.AnalysisMetrics.analyzed_at
+    ] + [getattr(models.AnalysisMetrics, name) for name in METRICS]
+    if joint:
+        columns += [
+            models.AnalysisJointRange.min_angle,
+            models.AnalysisJointRange.max_angle,
+            models.AnalysisJointRange.range_of_motion
+        ]
+
+    query = db.query(*columns).join(
+        models.VideoUpload, models.VideoUpload.id == models.AnalysisMetrics.video_id
+    )
+    if joint:
+        query = query.outerjoin(
+            models.AnalysisJointRange,
+            (models.AnalysisJointRange.video_id == models.AnalysisMetrics.video_id)
+            & (models.AnalysisJointRange.joint == joint)
+        )
+    query = query.filter(models.AnalysisMetrics.user_id == user_id)
+    if brocade_type:
+        query = query.filter(models.AnalysisMetrics.brocade_type == brocade_type)
+
+    rows = query.order_by(models.AnalysisMetrics.analyzed_at, models.AnalysisMetrics.video_id).all()
+    sessions = []
+    for row in rows:
+        session = {
+            "video_id": row.video_id,
+            "title": row.title,
+            "brocade_type": row.brocade_type,
+            "analyzed_at": row.analyzed_at.isoformat() if row.analyzed_at else None
+        }
+        session.update({name: getattr(row, name) for name in METRICS})
+        if joint:
+            session["joint"] = {
+                "name": joint,
+                "min_angle": row.min_angle,
+                "max_angle": row.max_angle,
+                "range_of_motion": row.range_of_motion
+            }
+        sessions.append(session)
+    return sessions
+
+def progress_by_brocade(db: Session, user_id: int, brocade_type: Optional[str] = None) -> List[Dict]:
+    """Session count, date span and avg/min/max of each metric per brocade, in one GROUP BY"""
+    columns = [
+        models.AnalysisMetrics.brocade_type,
+        func.count(models.AnalysisMetrics.id).label("sessions"),
+        func.min(models.AnalysisMetrics.analyzed_at).label("first_at"),
+        func.max(models.AnalysisMetrics.analyzed_at).label("last_at")
+    ]
+    for name in METRICS:
+        column = getattr(models.AnalysisMetrics, name)
+        columns += [
+            func.avg(column).label(f"{name}_avg"),
+            func.min(column).label(f"{name}_min"),
+            func.max(column).label(f"{name}_max")
+        ]
+
+    query = db.query(*columns).filter(models.AnalysisMetrics.user_id == user_id)
+    if brocade_type:
+        query = query.filter(models.AnalysisMetrics.brocade_type == brocade_type)
+    rows = query.group_by(models.AnalysisMetrics.brocade_type).order_by(models.AnalysisMetrics.brocade_type).all()
+
+    return [
+        {
+            "brocade_type": row.brocade_type,
+            "sessions": row.sessions,
+            "first_at": row.first_at.isoformat() if row.first_at else None,
+            "last_at": row.last_at.isoformat() if row.last_at else None,
+            "metrics": {
+                name: {
+                    "avg": round(getattr(row, f"{name}_avg"), 4) if getattr(row, f"{name}_avg") is not None else None,
+                    "min": getattr(row, f"{name}_min"),
+                    "max": getattr(row, f"{name}_max")
+                }
+                for name in METRICS
+            }
+        }
+        for row in rows
+    ]
+
+def add_trend(brocades: List[Dict], sessions: List[Dict]):
+    """First and latest value and their difference per metric, from the ordered sessions"""
+    for brocade in brocades:
+        ordered = [s for s in sessions if s["brocade_type"] == brocade["brocade_type"]]
+        for name, stats in brocade["metrics"].items():
+            values = [s[name] for s in ordered if s[name] is not None]
+            stats["first"] = values[0] if values else None
+            stats["latest"] = values[-1] if values else None
+            stats["change"] = round(values[-1] - values[0], 4) if values else None
@@ -0,0 +1,349 @@
+# services/artifact_manifest.py
+# Per-video manifest of analysis artifacts, so endpoints never have to list blobs
+
+import os
+import json
+import hashlib
+import mimetypes
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+import models
+from services.blob_storage import get_blob_service_client, download_blob_bytes
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+OUTPUTS_ROOT = "outputs_json"
+
+# Files produced by the pipeline that are not worth tracking
+IGNORED_FILES = {MANIFEST_FILENAME, "analysis_log.txt", "timings.json", "mmpose_timings.json"}
+IGNORED_PREFIXES = ("preprocessed_",)
+# Streaming packages and preview media are tracked in their own tables
+IGNORED_DIRS = {"hls", "media"}
+
+def manifest_blob_path(user_id: int, video_id: int) -> str:
+    """Blob path of the manifest inside the results container"""
+    return f"{OUTPUTS_ROOT}/{user_id}/{video_id}/{MANIFEST_FILENAME}"
+
+def artifact_container(name: str) -> str:
+    """Videos live in the videos container, everything else in results"""
+    return "videos" if name.lower().endswith(".mp4") else "results"
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_manifest(user_id: int, video_id: int, outputs_dir: Optional[str] = None) -> Dict:
+    """
+    Build the manifest for outputs_json/{user_id}/{video_id} from the local files
+    the pipeline just wrote. Artifact names are relative to that directory.
+    """
+    if outputs_dir is None:
+        outputs_dir = os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id))
+
+    artifacts = []
+    if os.path.isdir(outputs_dir):
+        for root, dirs, files in os.walk(outputs_dir):
+            dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+            for filename in sorted(files):
+                if filename in IGNORED_FILES or filename.startswith(IGNORED_PREFIXES):
+                    continue
+
+                local_path = os.path.join(root, filename)
+                name = os.path.relpath(local_path, outputs_dir).replace(os.path.sep, "/")
+                content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+                artifacts.append({
+                    "name": name,
+                    "size": os.path.getsize(local_path),
+                    "sha256": file_sha256(local_path),
+                    "content_type": content_type,
+                    "container": artifact_container(filename),
+                    "blob_path": f"{OUTPUTS_ROOT}/{user_id}/{video_id}/{name}"
+                })
+
+    artifacts.sort(key=lambda artifact: artifact["name"])
+
+    return {
+        "version": MANIFEST_VERSION,
+        "user_id": user_id,
+        "video_id": video_id,
+        "generated_at": datetime.utcnow().isoformat(),
+        "artifacts": artifacts
+    }
+
+def build_manifest_from_blobs(user_id: int, video_id: int) -> Optional[Dict]:
+    """
+    Manifest of a video analyzed before manifests existed whose outputs are
+    only in Azure: one prefix listing per container, for this video only.
+    Blobs carry no sha256, so the etag stands in for it. None when Azure is
+    not configured or holds nothing for the video.
+    """
+    blob_service_client = get_blob_service_client()
+    if blob_service_client is None:
+        return None
+
+    prefix = f"{OUTPUTS_ROOT}/{user_id}/{video_id}/"
+    artifacts = []
+    for container in ("results", "videos"):
+        for blob in blob_service_client.get_container_client(container).list_blobs(name_starts_with=prefix):
+            name = blob.name[len(prefix):]
+            filename = name.split("/")[-1]
+            if any(part in IGNORED_DIRS for part in name.split("/")[:-1]) or filename in IGNORED_FILES \
+                    or filename.startswith(IGNORED_PREFIXES) or artifact_container(filename) != container:
+                continue
+            content_settings = getattr(blob, "content_settings", None)
+            artifacts.append({
+                "name": name,
+                "size": blob.size,
+                "sha256": None,
+                "etag": str(blob.etag).strip('"') if blob.etag else None,
+                "content_type": getattr(content_settings, "content_type", None)
+                                or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                "container": container,
+                "blob_path": blob.name
+            })
+
+    if not artifacts:
+        return None
+    artifacts.sort(key=lambda artifact: artifact["name"])
+
+    return {
+        "version": MANIFEST_VERSION,
+        "user_id": user_id,
+        "video_id": video_id,
+        "generated_at": datetime.utcnow().isoformat(),
+        "artifacts": artifacts
+    }
+
+ANALYSIS_REPORT_NAME = "baduanjin_analysis/analysis_report.txt"
+
+def artifact_flags(manifest: Optional[Dict]) -> Dict:
+    """Availability flags stored in video_artifact_index"""
+    names = [a["name"] for a in artifacts_in(manifest)]
+    results = sorted(n for n in names if "/" not in n and n.startswith("results_") and n.endswith(".json"))
+    return {
+        "has_results_json": bool(results),
+        "has_analysis_report": ANALYSIS_REPORT_NAME in names,
+        "results_json_name": results[0] if results else None
+    }
+
+def save_artifact_index(db: Session, video_id: int, flags: Dict):
+    """Upsert the availability flags of a video (caller commits)"""
+    record = db.query(models.VideoArtifactIndex).filter(
+        models.VideoArtifactIndex.video_id == video_id
+    ).first()
+
+    if not record:
+        record = models.VideoArtifactIndex(video_id=video_id)
+        db.add(record)
+
+    record.has_results_json = flags["has_results_json"]
+    record.has_analysis_report = flags["has_analysis_report"]
+    record.results_json_name = flags["results_json_name"]
+
+def save_manifest_to_db(db: Session, video_id: int, manifest: Dict):
+    """Upsert the cached DB copy of a manifest and the artifact index derived from it"""
+    record = db.query(models.VideoArtifactManifest).filter(
+        models.VideoArtifactManifest.video_id == video_id
+    ).first()
+
+    if not record:
+        record = models.VideoArtifactManifest(video_id=video_id)
+        db.add(record)
+
+    record.set_manifest(manifest)
+    save_artifact_index(db, video_id, artifact_flags(manifest))
+    db.commit()
+
+def scan_artifact_flags(user_id: int, video_id: int) -> Dict:
+    """
+    Flags for a video analyzed before the index existed and without any
+    manifest: one look at its outputs directory.
+    """
+    base_path = os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id))
+    results = []
+    if os.path.isdir(base_path):
+        results = sorted(n for n in os.listdir(base_path) if n.startswith("results_") and n.endswith(".json"))
+    return {
+        "has_results_json": bool(results),
+        "has_analysis_report": os.path.exists(os.path.join(base_path, ANALYSIS_REPORT_NAME)),
+        "results_json_name": results[0] if results else None
+    }
+
+def index_from_cached_manifest(db: Session, video_id: int) -> Optional[Dict]:
+    """
+    Index a video from the DB copy of its manifest, if it has one (manifests
+    written before the index existed). DB only; None when there is no copy.
+    """
+    record = db.query(models.VideoArtifactManifest).filter(
+        models.VideoArtifactManifest.video_id == video_id
+    ).first()
+    if not record or not record.manifest:
+        return None
+
+    flags = artifact_flags(record.get_manifest())
+    save_artifact_index(db, video_id, flags)
+    db.commit()
+    return flags
+
+def resolve_artifact_flags(user_id: int, video_id: int) -> Tuple[Dict, Optional[Dict]]:
+    """
+    Flags of a video without index or cached manifest, and its manifest if
+    storage has one: the manifest blob or file, else a one-off directory scan.
+    Storage only (no DB), so async callers can run it on a worker thread.
+    """
+    manifest = read_stored_manifest(user_id, video_id)
+    if manifest is not None:
+        return artifact_flags(manifest), manifest
+    return scan_artifact_flags(user_id, video_id), None
+
+def save_backfilled_index(db: Session, video_id: int, flags: Dict, manifest: Optional[Dict] = None):
+    """Store what resolve_artifact_flags found: the manifest's DB copy (with its index) or the flags"""
+    if manifest is not None:
+        save_manifest_to_db(db, video_id, manifest)
+        return
+    save_artifact_index(db, video_id, flags)
+    db.commit()
+
+def backfill_artifact_index(db: Session, user_id: int, video_id: int) -> Dict:
+    """
+    Index a video on first sight: from its manifest when one exists, else
+    from a one-off directory scan. Blocks on storage; async code runs the
+    steps separately (see routers/relationships.py).
+    """
+    flags = index_from_cached_manifest(db, video_id)
+    if flags is not None:
+        return flags
+
+    flags, manifest = resolve_artifact_flags(user_id, video_id)
+    save_backfilled_index(db, video_id, flags, manifest)
+    return flags
+
+def upload_manifest_to_azure(user_id: int, video_id: int, manifest: Dict) -> Optional[str]:
+    """Upload the manifest next to the other results, if Azure is configured"""
+    blob_service_client = get_blob_service_client()
+    if blob_service_client is None:
+        return None
+
+    try:
+        from azure.storage.blob import ContentSettings
+
+        blob_client = blob_service_client.get_blob_client(
+            container="results",
+            blob=manifest_blob_path(user_id, video_id)
+        )
+        blob_client.upload_blob(
+            json.dumps(manifest, indent=2).encode("utf-8"),
+            overwrite=True,
+            content_settings=ContentSettings(content_type="application/json")
+        )
+        return blob_client.url
+    except Exception as e:
+        print(f"Error uploading manifest for video {video_id}: {e}")
+        return None
+
+def write_manifest(db: Session, user_id: int, video_id: int, outputs_dir: Optional[str] = None) -> Dict:
+    """
+    Write the manifest once analysis output is complete: local file, Azure copy and
+    cached DB copy. Called at the end of every pipeline step that adds artifacts.
+    """
+    if outputs_dir is None:
+        outputs_dir = os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id))
+
+    manifest = build_manifest(user_id, video_id, outputs_dir)
+
+    if os.path.isdir(outputs_dir):
+        with open(os.path.join(outputs_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    upload_manifest_to_azure(user_id, video_id, manifest)
+    save_manifest_to_db(db, video_id, manifest)
+
+    print(f"Wrote artifact manifest for video {video_id}: {len(manifest['artifacts'])} artifacts")
+    return manifest
+
+def rebuild_manifest(db: Session, user_id: int, video_id: int) -> Optional[Dict]:
+    """
+    Manifest for a completed video that has none: from its local outputs when
+    they are still on disk, else from one listing of its blobs (saved to the DB
+    and Azure like a written one). None when neither has anything.
+    """
+    if os.path.isdir(os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id))):
+        return write_manifest(db, user_id, video_id)
+
+    try:
+        manifest = build_manifest_from_blobs(user_id, video_id)
+    except Exception as e:
+        print(f"Error listing blobs of video {video_id}: {e}")
+        return None
+    if manifest is None:
+        return None
+
+    upload_manifest_to_azure(user_id, video_id, manifest)
+    save_manifest_to_db(db, video_id, manifest)
+    print(f"Rebuilt artifact manifest for video {video_id} from Azure: {len(manifest['artifacts'])} artifacts")
+    return manifest
+
+def read_stored_manifest(user_id: int, video_id: int) -> Optional[Dict]:
+    """The manifest blob, else the local manifest file; storage only, no DB"""
+    try:
+        data = download_blob_bytes("results", manifest_blob_path(user_id, video_id))
+        if data is not None:
+            return json.loads(data.decode("utf-8"))
+    except Exception as e:
+        print(f"No manifest blob for video {video_id}: {e}")
+
+    local_path = os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id), MANIFEST_FILENAME)
+    if os.path.exists(local_path):
+        with open(local_path, "r") as f:
+            return json.load(f)
+    return None
+
+def load_manifest(db: Session, user_id: int, video_id: int) -> Optional[Dict]:
+    """
+    Read a video's manifest: cached DB copy first, then the single manifest blob
+    (backfilling the DB copy). Never enumerates storage.
+    """
+    record = db.query(models.VideoArtifactManifest).filter(
+        models.VideoArtifactManifest.video_id == video_id
+    ).first()
+
+    if record and record.manifest:
+        return record.get_manifest()
+
+    manifest = read_stored_manifest(user_id, video_id)
+
+    if manifest is not None:
+        try:
+            save_manifest_to_db(db, video_id, manifest)
+        except Exception as e:
+            print(f"Could not cache manifest for video {video_id}: {e}")
+
+    return manifest
+
+def artifact_set_hash(manifest: Optional[Dict], names: List[str]) -> Optional[str]:
+    """
+    Single hash over the sha256 of each named artifact, or None if the manifest
+    does not list all of them. Changes whenever any of the files is rewritten.
+    """
+    # Manifests rebuilt from a blob listing only have etags
+    hashes = {a["name"]: a.get("sha256") or a.get("etag") for a in artifacts_in(manifest)}
+    if not all(name in hashes for name in names):
+        return None
+
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        digest.update(f"{name}:{hashes[name]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def artifacts_in(manifest: Optional[Dict], prefix: str = "") -> List[Dict]:
+    """Manifest entries whose name starts with prefix (e.g. 'baduanjin_analysis/')"""
+    if not manifest:
+        return []
+    return [a for a in manifest.get("artifacts", []) if a["name"].startswith(prefix)]
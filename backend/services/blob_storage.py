@@ -0,0 +1,106 @@
+# services/blob_storage.py
+# Shared Azure Blob client and non-blocking read helpers for request handlers
+
+import os
+import asyncio
+import threading
+from typing import Optional
+
+# Seconds a single blob read may take before the request gives up on it
+BLOB_READ_TIMEOUT = float(os.getenv("AZURE_BLOB_READ_TIMEOUT", "10"))
+
+_client_lock = threading.Lock()
+_client = None
+_client_connection_string = None
+
+def get_blob_service_client():
+    """
+    Return a process-wide BlobServiceClient, or None when Azure is not configured.
+    The client keeps its HTTP connection pool, so repeated reads skip the
+    TLS handshake that a client-per-call pays every time.
+    """
+    global _client, _client_connection_string
+
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if not connection_string:
+        return None
+
+    with _client_lock:
+        if _client is None or _client_connection_string != connection_string:
+            from azure.storage.blob import BlobServiceClient
+            from utils.metrics import count_storage_call
+
+            # The hook sees every HTTP response, so requests are charged for retries too
+            _client = BlobServiceClient.from_connection_string(
+                connection_string, raw_response_hook=count_storage_call
+            )
+            _client_connection_string = connection_string
+        return _client
+
+def reset_blob_service_client():
+    """Drop the cached client (used by tests and after credential rotation)"""
+    global _client, _client_connection_string
+    with _client_lock:
+        _client = None
+        _client_connection_string = None
+
+def download_blob_bytes(container: str, blob_path: str, timeout: Optional[float] = None) -> Optional[bytes]:
+    """Blocking download of a whole blob; None when Azure is not configured"""
+    client = get_blob_service_client()
+    if client is None:
+        return None
+
+    blob_client = client.get_blob_client(container=container, blob=blob_path)
+    return blob_client.download_blob(timeout=max(1, int(timeout or BLOB_READ_TIMEOUT))).readall()
+
+async def download_blob_bytes_async(container: str, blob_path: str, timeout: Optional[float] = None) -> Optional[bytes]:
+    """
+    Download a blob on a worker thread so the event loop keeps serving other
+    requests. Raises asyncio.TimeoutError if the read exceeds the timeout.
+    """
+    timeout = timeout or BLOB_READ_TIMEOUT
+    return await asyncio.wait_for(
+        asyncio.to_thread(download_blob_bytes, container, blob_path, timeout),
+        timeout=timeout
+    )
+
+# Bytes fetched from storage per request while streaming a video
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(1024 * 1024)))
+
+def iter_blob_range(blob_client, start: int, end: int, chunk_size: Optional[int] = None):
+    """
+    Yield bytes start..end (inclusive) of a blob, one ranged download per chunk,
+    so a viewer never holds more than chunk_size bytes in memory. Sync generator;
+    StreamingResponse runs it on the threadpool.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    offset = start
+    while offset <= end:
+        length = min(chunk_size, end - offset + 1)
+        chunk = blob_client.download_blob(offset=offset, length=length).readall()
+        if not chunk:
+            break
+        yield chunk
+        offset += len(chunk)
+
+def get_blob_properties_cached(blob_client, blob_name: str) -> dict:
+    """
+    {"size", "etag", "content_type"} of a blob, served from
+    blob_properties_cache when possible. ResourceNotFoundError propagates and
+    is never cached.
+    """
+    from utils.cache import blob_properties_cache
+
+    cached = blob_properties_cache.get(blob_name)
+    if cached is not None:
+        return cached
+
+    properties = blob_client.get_blob_properties()
+    content_settings = getattr(properties, "content_settings", None)
+    result = {
+        "size": properties.size,
+        "etag": properties.etag,
+        "content_type": getattr(content_settings, "content_type", None)
+    }
+    blob_properties_cache.set(blob_name, result, 1)
+    return result
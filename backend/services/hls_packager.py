@@ -0,0 +1,250 @@
+# services/hls_packager.py
+# HLS packaging of finished videos: one ffmpeg pass encodes every rendition
+# into short segments, so players start on a low bitrate and adapt to the link
+
+import os
+import re
+import asyncio
+import json
+import shutil
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from services.blob_storage import get_blob_service_client, download_blob_bytes_async
+
+HLS_ENABLED = os.getenv("HLS_PACKAGING_ENABLED", "true").lower() == "true"
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+HLS_FFMPEG_TIMEOUT = int(os.getenv("HLS_FFMPEG_TIMEOUT", "900"))
+HLS_DIRNAME = "hls"
+MASTER_PLAYLIST = "master.m3u8"
+
+# Lowest first; renditions taller than the source are skipped
+HLS_RENDITIONS = [
+    {"name": "360p", "height": 360, "video_bitrate": "800k", "audio_bitrate": "96k"},
+    {"name": "540p", "height": 540, "video_bitrate": "1600k", "audio_bitrate": "128k"},
+    {"name": "720p", "height": 720, "video_bitrate": "2800k", "audio_bitrate": "128k"},
+]
+
+# master.m3u8, {rendition}/index.m3u8 and {rendition}/seg_00001.ts only
+HLS_FILE_PATTERN = re.compile(r"^(master\.m3u8|[A-Za-z0-9_]+/(index\.m3u8|seg_\d{5}\.ts))$")
+
+def hls_base_path(user_id: int, video_id: int, variant: str) -> str:
+    """Local directory and blob prefix (videos container) of a variant's package"""
+    return f"outputs_json/{user_id}/{video_id}/{HLS_DIRNAME}/{variant}"
+
+def probe_video(path: str) -> Dict:
+    """{"width", "height", "duration", "has_audio"} of a video file, via ffprobe"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "stream=codec_type,width,height:format=duration",
+         "-of", "json", path],
+        capture_output=True, text=True, timeout=60, check=True
+    )
+    info = json.loads(result.stdout or "{}")
+    streams = info.get("streams", [])
+    video_streams = [s for s in streams if s.get("codec_type") == "video" and s.get("height")]
+    duration = info.get("format", {}).get("duration")
+    return {
+        "width": video_streams[0].get("width") if video_streams else None,
+        "height": video_streams[0].get("height") if video_streams else None,
+        "duration": float(duration) if duration not in (None, "N/A") else None,
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams)
+    }
+
+def select_renditions(source_height: Optional[int]) -> List[Dict]:
+    """Renditions not taller than the source; a small source gets one at its own height"""
+    if not source_height:
+        return HLS_RENDITIONS[:1]
+
+    selected = [r for r in HLS_RENDITIONS if r["height"] <= source_height]
+    if not selected:
+        selected = [dict(HLS_RENDITIONS[0], height=source_height - source_height % 2)]
+    return selected
+
+def build_hls_command(input_path: str, output_dir: str, renditions: List[Dict],
+                      has_audio: bool, segment_seconds: Optional[int] = None) -> List[str]:
+    """ffmpeg arguments producing master.m3u8 plus {name}/index.m3u8 and segments"""
+    segment_seconds = segment_seconds or HLS_SEGMENT_SECONDS
+    count = len(renditions)
+
+    split = f"[0:v]split={count}" + "".join(f"[v{i}]" for i in range(count))
+    scales = [f"[v{i}]scale=-2:{r['height']}[v{i}out]" for i, r in enumerate(renditions)]
+    cmd = ["ffmpeg", "-y", "-i", input_path, "-filter_complex", ";".join([split] + scales)]
+
+    for i, r in enumerate(renditions):
+        bitrate = int(r["video_bitrate"].rstrip("k"))
+        cmd += [
+            "-map", f"[v{i}out]",
+            f"-b:v:{i}", r["video_bitrate"],
+            f"-maxrate:v:{i}", f"{int(bitrate * 1.07)}k",
+            f"-bufsize:v:{i}", f"{int(bitrate * 1.5)}k",
+        ]
+    if has_audio:
+        for i, r in enumerate(renditions):
+            cmd += ["-map", "0:a:0", f"-b:a:{i}", r["audio_bitrate"]]
+        cmd += ["-c:a", "aac", "-ac", "2"]
+
+    cmd += [
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-profile:v", "main",
+        "-pix_fmt", "yuv420p",
+        # Keyframe on every segment boundary so renditions switch cleanly
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(output_dir, "%v", "seg_%05d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(
+            f"v:{i},a:{i},name:{r['name']}" if has_audio else f"v:{i},name:{r['name']}"
+            for i, r in enumerate(renditions)
+        ),
+        os.path.join(output_dir, "%v", "index.m3u8"),
+    ]
+    return cmd
+
+def package_hls(input_path: str, output_dir: str) -> Optional[List[str]]:
+    """
+    Encode input_path into an HLS package at output_dir. The package is built
+    next to it and swapped in whole, so players never see a half-written one.
+    Returns the rendition names, or None when ffmpeg is missing or fails.
+    """
+    if not shutil.which("ffmpeg"):
+        print("HLS packaging skipped: ffmpeg not found in PATH")
+        return None
+
+    try:
+        source = probe_video(input_path)
+    except (subprocess.SubprocessError, OSError, ValueError) as e:
+        print(f"HLS packaging skipped, could not probe {input_path}: {e}")
+        return None
+
+    renditions = select_renditions(source["height"])
+    build_dir = f"{output_dir}.tmp"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    for r in renditions:
+        os.makedirs(os.path.join(build_dir, r["name"]), exist_ok=True)
+
+    cmd = build_hls_command(input_path, build_dir, renditions, source["has_audio"])
+    print(f"Packaging HLS ({', '.join(r['name'] for r in renditions)}): {input_path}")
+
+    try:
+        process = subprocess.run(cmd, capture_output=True, text=True, timeout=HLS_FFMPEG_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        print(f"HLS packaging timed out after {HLS_FFMPEG_TIMEOUT}s: {input_path}")
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return None
+
+    if process.returncode != 0 or not os.path.exists(os.path.join(build_dir, MASTER_PLAYLIST)):
+        print(f"HLS packaging failed ({process.returncode}): {process.stderr[-2000:]}")
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return None
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(build_dir, output_dir)
+    return [r["name"] for r in renditions]
+
+@contextmanager
+def local_source(video_path: str):
+    """
+    Yield a local file for video_path. Azure URLs are downloaded to a
+    temporary file (streamed, not held in memory) and removed afterwards.
+    """
+    if os.path.exists(video_path):
+        yield video_path
+        return
+
+    if not (video_path.startswith("https://") and "/videos/" in video_path):
+        raise FileNotFoundError(video_path)
+
+    client = get_blob_service_client()
+    if client is None:
+        raise FileNotFoundError(f"Azure storage not configured for {video_path}")
+
+    blob_name = video_path.split("/videos/", 1)[1]
+    blob_client = client.get_blob_client(container="videos", blob=blob_name)
+
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(blob_name)[1] or ".mp4")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            blob_client.download_blob().readinto(f)
+        yield temp_path
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def upload_hls_package(local_dir: str, base_path: str) -> bool:
+    """Copy a package to the videos container under base_path; False without Azure"""
+    from azure.storage.blob import ContentSettings
+
+    client = get_blob_service_client()
+    if client is None:
+        return False
+
+    container = client.get_container_client("videos")
+    for root, _dirs, files in os.walk(local_dir):
+        for filename in files:
+            local_path = os.path.join(root, filename)
+            name = os.path.relpath(local_path, local_dir).replace(os.path.sep, "/")
+            content_type = "application/vnd.apple.mpegurl" if filename.endswith(".m3u8") else "video/mp2t"
+            with open(local_path, "rb") as data:
+                container.upload_blob(
+                    name=f"{base_path}/{name}",
+                    data=data,
+                    overwrite=True,
+                    content_settings=ContentSettings(content_type=content_type)
+                )
+    return True
+
+def package_variant(user_id: int, video_id: int, variant: str, video_path: str) -> Optional[Dict]:
+    """
+    Package one variant of a video and publish it. Returns
+    {"base_path", "renditions", "storage_type"}, or None if packaging failed.
+    """
+    base_path = hls_base_path(user_id, video_id, variant)
+
+    with local_source(video_path) as source_path:
+        renditions = package_hls(source_path, base_path)
+    if not renditions:
+        return None
+
+    storage_type = "local"
+    try:
+        if upload_hls_package(base_path, base_path):
+            storage_type = "azure_blob"
+    except Exception as e:
+        print(f"HLS upload to Azure failed, serving from local disk: {e}")
+
+    return {"base_path": base_path, "renditions": renditions, "storage_type": storage_type}
+
+def sign_playlist(playlist: str, query: str) -> str:
+    """Append query (e.g. "sig=...") to every URI line of an m3u8 playlist"""
+    lines = []
+    for line in playlist.splitlines():
+        if line and not line.startswith("#"):
+            line = f"{line}{'&' if '?' in line else '?'}{query}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def read_local_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+async def read_published_file(base_path: str, file_path: str) -> Optional[bytes]:
+    """
+    Bytes of one published file (HLS package or preview media), from local
+    disk when present, else from the videos container
+    """
+    local_path = os.path.join(base_path, file_path)
+    if os.path.exists(local_path):
+        return await asyncio.to_thread(read_local_file, local_path)
+
+    try:
+        return await download_blob_bytes_async("videos", f"{base_path}/{file_path}")
+    except Exception as e:
+        print(f"Published file not available: {base_path}/{file_path}: {e}")
+        return None
@@ -0,0 +1,351 @@
+# services/job_queue.py
+# Database-backed queue of video analysis jobs (analysis_jobs) with a bounded
+# pool of worker threads. Submission is idempotent per video, the queue is
+# bounded (admission control), workers claim jobs with FOR UPDATE SKIP LOCKED
+# and heartbeat while running, and jobs whose worker died are requeued.
+#
+# Workers run inside the API process (ANALYSIS_WORKERS, default 1) or, with
+# ANALYSIS_WORKERS=0 on the API, in a separate process:
+#     python -m services.job_queue
+
+import os
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "1"))
+# Admission control: queued jobs in total and active (queued or running) per user
+ANALYSIS_QUEUE_LIMIT = int(os.getenv("ANALYSIS_QUEUE_LIMIT", "50"))
+ANALYSIS_USER_QUEUE_LIMIT = int(os.getenv("ANALYSIS_USER_QUEUE_LIMIT", "3"))
+# A running job whose heartbeat is older than JOB_STALE_SECONDS lost its worker
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+class QueueFullError(Exception):
+    """The queue does not admit the job; retry later"""
+
+def active_job(db: Session, video_id: int) -> Optional[models.AnalysisJob]:
+    return db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.video_id == video_id,
+        models.AnalysisJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+
+def latest_job(db: Session, video_id: int) -> Optional[models.AnalysisJob]:
+    return db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.video_id == video_id
+    ).order_by(models.AnalysisJob.id.desc()).first()
+
+def submit_job(db: Session, video: models.VideoUpload, priority: int = 0) -> Tuple[models.AnalysisJob, bool]:
+    """
+    Queue an analysis of video. Returns (job, created); a video that already
+    has a queued or running job gets that job back. Raises QueueFullError when
+    the queue or the user's share of it is full.
+    """
+    job = active_job(db, video.id)
+    if job:
+        return job, False
+
+    queued = db.query(func.count(models.AnalysisJob.id)).filter(
+        models.AnalysisJob.status == "queued"
+    ).scalar()
+    if queued >= ANALYSIS_QUEUE_LIMIT:
+        raise QueueFullError(f"The analysis queue is full ({queued} jobs waiting)")
+
+    user_active = db.query(func.count(models.AnalysisJob.id)).filter(
+        models.AnalysisJob.user_id == video.user_id,
+        models.AnalysisJob.status.in_(ACTIVE_STATUSES)
+    ).scalar()
+    if user_active >= ANALYSIS_USER_QUEUE_LIMIT:
+        raise QueueFullError(f"You already have {user_active} analyses queued or running")
+
+    job = models.AnalysisJob(video_id=video.id, user_id=video.user_id, status="queued",
+                             priority=priority, attempts=0, max_attempts=JOB_MAX_ATTEMPTS,
+                             created_at=datetime.utcnow())
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request queued the same video first
+        db.rollback()
+        return active_job(db, video.id), False
+    db.refresh(job)
+    return job, True
+
+def queue_position(db: Session, job: models.AnalysisJob) -> int:
+    """1 for the next job to be claimed, 0 when the job is not waiting"""
+    if job.status != "queued":
+        return 0
+    ahead = db.query(func.count(models.AnalysisJob.id)).filter(
+        models.AnalysisJob.status == "queued",
+        or_(
+            models.AnalysisJob.priority > job.priority,
+            (models.AnalysisJob.priority == job.priority) & (models.AnalysisJob.id < job.id)
+        )
+    ).scalar()
+    return ahead + 1
+
+def job_to_dict(db: Session, job: models.AnalysisJob) -> dict:
+    return {
+        "job_id": job.id,
+        "video_id": job.video_id,
+        "status": job.status,
+        "queue_position": queue_position(db, job),
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def cancel_queued_job(db: Session, video_id: int) -> bool:
+    """
+    Cancel the video's job if it has not started (a running job finishes).
+    Part of the caller's transaction; the caller commits.
+    """
+    cancelled = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.video_id == video_id,
+        models.AnalysisJob.status == "queued"
+    ).update({"status": "cancelled", "finished_at": datetime.utcnow()}, synchronize_session=False)
+    return bool(cancelled)
+
+def claim_job(db: Session, worker_id: str) -> Optional[models.AnalysisJob]:
+    """
+    Take the next queued job (highest priority, then oldest). SKIP LOCKED lets
+    concurrent workers pass over a row another worker is claiming; the status
+    guard on the UPDATE covers databases without row locks (sqlite).
+    """
+    candidate = db.query(models.AnalysisJob.id).filter(
+        models.AnalysisJob.status == "queued"
+    ).order_by(
+        models.AnalysisJob.priority.desc(), models.AnalysisJob.id
+    ).with_for_update(skip_locked=True).limit(1).first()
+    if not candidate:
+        db.commit()
+        return None
+
+    now = datetime.utcnow()
+    claimed = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.id == candidate.id,
+        models.AnalysisJob.status == "queued"
+    ).update({
+        "status": "running",
+        "worker_id": worker_id,
+        "started_at": now,
+        "heartbeat_at": now,
+        "attempts": models.AnalysisJob.attempts + 1
+    }, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return None
+    return db.query(models.AnalysisJob).filter(models.AnalysisJob.id == candidate.id).first()
+
+def heartbeat(db: Session, job_id: int, worker_id: str) -> bool:
+    """Refresh the job's heartbeat; False when the job is no longer this worker's"""
+    updated = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.id == job_id,
+        models.AnalysisJob.worker_id == worker_id,
+        models.AnalysisJob.status == "running"
+    ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return bool(updated)
+
+def finish_job(db: Session, job_id: int, worker_id: str, succeeded: bool, error: Optional[str] = None):
+    db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.id == job_id,
+        models.AnalysisJob.worker_id == worker_id,
+        models.AnalysisJob.status == "running"
+    ).update({
+        "status": "completed" if succeeded else "failed",
+        "error": error[:2000] if error else None,
+        "finished_at": datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+
+def fail_video(db: Session, video_id: int):
+    """
+    Mark the video of a job whose handler raised as failed, so it does not stay
+    "processing" (and polled) forever. Errors are logged only.
+    """
+    try:
+        db.query(models.VideoUpload).filter(
+            models.VideoUpload.id == video_id,
+            models.VideoUpload.processing_status == "processing"
+        ).update({"processing_status": "failed"}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Could not mark video {video_id} failed: {e}")
+
+def requeue_stale_jobs(db: Session, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+    """
+    Running jobs whose heartbeat stopped (worker process died) go back to the
+    queue, or fail once they used up their attempts. Returns the number of jobs.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    stale = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.status == "running",
+        models.AnalysisJob.heartbeat_at < cutoff
+    ).with_for_update(skip_locked=True).all()
+
+    for job in stale:
+        job.worker_id = None
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            print(f"Requeued analysis job {job.id} for video {job.video_id} (attempt {job.attempts} lost its worker)")
+        else:
+            job.status = "failed"
+            job.error = "Worker stopped responding"
+            job.finished_at = datetime.utcnow()
+            db.query(models.VideoUpload).filter(
+                models.VideoUpload.id == job.video_id
+            ).update({"processing_status": "failed"}, synchronize_session=False)
+            print(f"Analysis job {job.id} for video {job.video_id} failed after {job.attempts} attempts")
+    db.commit()
+    return len(stale)
+
+def run_analysis_handler(db: Session, job: models.AnalysisJob) -> bool:
+    # The pipeline steps live with the endpoints that used to run them inline
+    from routers.video import run_analysis_job
+    return run_analysis_job(db, job)
+
+class AnalysisWorkerPool:
+    """
+    size worker threads, each running one job at a time. The analysis itself
+    is mostly an MMPose subprocess, so threads only wait on it; size bounds
+    how many analyses run at once.
+    """
+
+    def __init__(self, size: int = ANALYSIS_WORKERS, session_factory: Optional[Callable] = None,
+                 handler: Callable = run_analysis_handler, poll_seconds: float = JOB_POLL_SECONDS):
+        if session_factory is None:
+            import database
+            session_factory = database.SessionLocal
+        self.size = size
+        self.session_factory = session_factory
+        self.handler = handler
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.size):
+            thread = threading.Thread(target=self._work, args=(f"{self.name}-{index}",),
+                                      name=f"analysis-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.size} analysis worker(s) as {self.name}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming jobs; running jobs continue until the process exits"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """A job was submitted; idle workers look for it now instead of at the next poll"""
+        self._wake.set()
+
+    def _work(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once(worker_id)
+            except Exception as e:
+                print(f"Analysis worker {worker_id} error: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_once(self, worker_id: str) -> bool:
+        """Requeue orphaned jobs, then claim and run one job. False when the queue was empty."""
+        db = self.session_factory()
+        try:
+            requeue_stale_jobs(db)
+            job = claim_job(db, worker_id)
+            if not job:
+                return False
+
+            print(f"Worker {worker_id} running analysis job {job.id} for video {job.video_id} (attempt {job.attempts})")
+            beating = threading.Event()
+            beat = threading.Thread(target=self._heartbeat, args=(job.id, worker_id, beating), daemon=True)
+            beat.start()
+            try:
+                succeeded, error = bool(self.handler(db, job)), None
+                if not succeeded:
+                    error = "Analysis produced no results"
+            except Exception as e:
+                db.rollback()
+                succeeded, error = False, str(e)
+                fail_video(db, job.video_id)
+            finally:
+                beating.set()
+                beat.join()
+
+            finish_job(db, job.id, worker_id, succeeded, error)
+            print(f"Analysis job {job.id} {'completed' if succeeded else 'failed'}")
+            return True
+        finally:
+            db.close()
+
+    def _heartbeat(self, job_id: int, worker_id: str, done: threading.Event):
+        while not done.wait(JOB_HEARTBEAT_SECONDS):
+            db = self.session_factory()
+            try:
+                heartbeat(db, job_id, worker_id)
+            except Exception as e:
+                print(f"Heartbeat error for analysis job {job_id}: {e}")
+            finally:
+                db.close()
+
+_worker_pool: Optional[AnalysisWorkerPool] = None
+
+def get_worker_pool() -> Optional[AnalysisWorkerPool]:
+    return _worker_pool
+
+def start_workers(size: int = ANALYSIS_WORKERS) -> Optional[AnalysisWorkerPool]:
+    global _worker_pool
+    if size <= 0:
+        return None
+    if _worker_pool is None:
+        _worker_pool = AnalysisWorkerPool(size)
+        _worker_pool.start()
+    return _worker_pool
+
+def stop_workers():
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.stop(timeout=5)
+        _worker_pool = None
+
+def wake_workers():
+    if _worker_pool is not None:
+        _worker_pool.wake()
+
+if __name__ == "__main__":
+    # Standalone worker process: python -m services.job_queue
+    pool = AnalysisWorkerPool(max(ANALYSIS_WORKERS, 1))
+    pool.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pool.stop()
@@ -0,0 +1,135 @@
+# services/keypoint_store.py
+# Pose keypoints stored as compressed float32 chunks (models.KeypointChunk),
+# so timeline views and re-analysis read the frames they need instead of
+# parsing the whole MMPose results JSON
+
+import os
+import json
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+KEYPOINT_CHUNK_FRAMES = int(os.getenv("KEYPOINT_CHUNK_FRAMES", "256"))
+MAX_KEYPOINT_RANGE_FRAMES = int(os.getenv("MAX_KEYPOINT_RANGE_FRAMES", "5000"))
+CODEC = "zlib-f32"
+CHANNELS = 3  # x, y, score
+DEFAULT_KEYPOINT_COUNT = 17  # COCO
+
+def best_instance(instances: List[Dict]) -> Optional[Dict]:
+    """The person with the highest mean positive keypoint score, as results_analysis picks it"""
+    best, best_confidence = None, -1.0
+    for instance in instances or []:
+        scores = instance.get("keypoint_scores") or []
+        if not instance.get("keypoints") or not scores:
+            continue
+        valid_scores = [s for s in scores if s > 0]
+        if valid_scores and np.mean(valid_scores) > best_confidence:
+            best, best_confidence = instance, float(np.mean(valid_scores))
+    return best
+
+def keypoints_from_mmpose(pose_data: Dict) -> np.ndarray:
+    """
+    (frames, keypoints, 3) float32 array from MMPose output (instance_info).
+    Row i is the i-th frame of instance_info; frames without a person are NaN.
+    """
+    frames = pose_data.get("instance_info", [])
+    people = [best_instance(frame.get("instances", [])) for frame in frames]
+    keypoint_count = max(
+        (len(person["keypoints"]) for person in people if person),
+        default=DEFAULT_KEYPOINT_COUNT
+    )
+
+    array = np.full((len(frames), keypoint_count, CHANNELS), np.nan, dtype=np.float32)
+    for index, person in enumerate(people):
+        if not person:
+            continue
+        points = np.asarray(person["keypoints"], dtype=np.float32)[:, :2]
+        scores = np.asarray(person["keypoint_scores"], dtype=np.float32)
+        count = min(len(points), len(scores))
+        array[index, :count, :2] = points[:count]
+        array[index, :count, 2] = scores[:count]
+    return array
+
+def encode_chunk(array: np.ndarray) -> bytes:
+    return zlib.compress(np.ascontiguousarray(array, dtype="<f4").tobytes())
+
+def decode_chunk(chunk) -> np.ndarray:
+    values = np.frombuffer(zlib.decompress(chunk.data), dtype="<f4")
+    return values.reshape(chunk.frame_count, chunk.keypoint_count, CHANNELS)
+
+def ingest_keypoints(db: Session, video_id: int, array: np.ndarray, chunk_frames: Optional[int] = None) -> int:
+    """
+    Replace a video's keypoints with array, chunked by chunk_frames. All chunks
+    go in one executemany INSERT, which SQLAlchemy sends as batched multi-row
+    VALUES; returns the number of chunks.
+    """
+    chunk_frames = chunk_frames or KEYPOINT_CHUNK_FRAMES
+    rows = [
+        {
+            "video_id": video_id,
+            "start_frame": start,
+            "frame_count": len(array[start:start + chunk_frames]),
+            "keypoint_count": array.shape[1],
+            "codec": CODEC,
+            "data": encode_chunk(array[start:start + chunk_frames]),
+        }
+        for start in range(0, len(array), chunk_frames)
+    ]
+
+    db.query(models.KeypointChunk).filter(models.KeypointChunk.video_id == video_id).delete(
+        synchronize_session=False
+    )
+    if rows:
+        db.execute(models.KeypointChunk.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
+
+def ingest_results_json(db: Session, video_id: int, results_path: str) -> int:
+    """Bulk-load the MMPose results file of a finished analysis"""
+    with open(results_path, "r") as f:
+        pose_data = json.load(f)
+    return ingest_keypoints(db, video_id, keypoints_from_mmpose(pose_data))
+
+def total_frames(db: Session, video_id: int) -> int:
+    return db.query(
+        func.coalesce(func.max(models.KeypointChunk.start_frame + models.KeypointChunk.frame_count), 0)
+    ).filter(models.KeypointChunk.video_id == video_id).scalar()
+
+def read_keypoints(db: Session, video_id: int, start: int, end: int,
+                   keypoints: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Frames [start, end) of a video, optionally only the given keypoint
+    indices. Only the chunks overlapping the range are loaded.
+    """
+    chunks = db.query(models.KeypointChunk).filter(
+        models.KeypointChunk.video_id == video_id,
+        models.KeypointChunk.start_frame < end,
+        models.KeypointChunk.start_frame + models.KeypointChunk.frame_count > start
+    ).order_by(models.KeypointChunk.start_frame).all()
+
+    parts = []
+    for chunk in chunks:
+        if keypoints is not None and any(k < 0 or k >= chunk.keypoint_count for k in keypoints):
+            raise ValueError(f"Keypoint indices must be between 0 and {chunk.keypoint_count - 1}")
+        array = decode_chunk(chunk)
+        first = max(start - chunk.start_frame, 0)
+        last = min(end - chunk.start_frame, chunk.frame_count)
+        part = array[first:last]
+        if keypoints is not None:
+            part = part[:, list(keypoints)]
+        parts.append(part)
+
+    if not parts:
+        return np.empty((0, len(keypoints) if keypoints is not None else 0, CHANNELS), dtype=np.float32)
+    return np.concatenate(parts)
+
+def frames_to_json(array: np.ndarray) -> List:
+    """Nested [frame][keypoint] = [x, y, score] lists, null for missing values"""
+    values = array.astype(object)
+    values[np.isnan(array)] = None
+    return values.tolist()
@@ -0,0 +1,210 @@
+# services/pi_transfer.py
+# Non-blocking relay of Pi recordings into blob storage: bytes stream from the
+# Pi's download endpoint straight into the upload, never the whole file in RAM
+
+import os
+import uuid
+import asyncio
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+
+from services.blob_storage import get_blob_service_client
+from services.video_upload import BlockBlobWriter, LocalFileWriter, UploadTooLargeError, UPLOAD_BLOCK_SIZE
+
+PI_BASE_URL = os.getenv("PI_BASE_URL", "https://mongoose-hardy-caiman.ngrok-free.app")
+# Ranged GETs in flight at once; memory is bounded by this times RELAY_PART_SIZE
+PI_TRANSFER_PARALLELISM = int(os.getenv("PI_TRANSFER_PARALLELISM", "4"))
+RELAY_PART_SIZE = UPLOAD_BLOCK_SIZE
+PART_RETRIES = 3
+
+# The Pi serves the web-optimized version when it sees this user agent
+PI_HEADERS = {
+    'ngrok-skip-browser-warning': 'true',
+    'User-Agent': 'Main-Backend-Pi-Transfer/2.0'
+}
+
+class TransferVerificationError(Exception):
+    """Relayed bytes do not match what the Pi said it sent"""
+
+def pi_download_url(pi_filename: str) -> str:
+    return f"{PI_BASE_URL}/api/download/{pi_filename}"
+
+def parse_content_range_total(content_range: Optional[str]) -> Optional[int]:
+    """'bytes 0-99/1234' -> 1234"""
+    if not content_range or "/" not in content_range:
+        return None
+    total = content_range.rsplit("/", 1)[1].strip()
+    return int(total) if total.isdigit() else None
+
+def ranged_reply_consistent(headers) -> bool:
+    """
+    Whether a 206 reply's Content-Length matches its Content-Range. Older Pi
+    builds overwrite Content-Length with the full file size, so the part body
+    never "completes" and the client hangs until it times out.
+    """
+    content_range = headers.get("content-range", "")
+    content_length = headers.get("content-length")
+    if content_length is None:
+        return True
+    try:
+        start, end = content_range.split(" ", 1)[1].split("/", 1)[0].split("-")
+        return int(content_length) == int(end) - int(start) + 1
+    except (IndexError, ValueError):
+        return False
+
+async def fetch_part(client: httpx.AsyncClient, url: str, start: int, end: int, headers: Dict) -> bytes:
+    """One ranged GET, retried a few times; the part must come back whole"""
+    last_error = None
+    for attempt in range(PART_RETRIES):
+        try:
+            response = await client.get(url, headers={**headers, "Range": f"bytes={start}-{end}"})
+            if response.status_code != 206:
+                raise TransferVerificationError(f"Range {start}-{end}: HTTP {response.status_code}")
+            if len(response.content) != end - start + 1:
+                raise TransferVerificationError(
+                    f"Range {start}-{end}: got {len(response.content)} bytes"
+                )
+            return response.content
+        except (httpx.TransportError, TransferVerificationError) as e:
+            last_error = e
+            print(f"Pi transfer part {start}-{end} attempt {attempt + 1} failed: {e}")
+            await asyncio.sleep(0.5 * (attempt + 1))
+    raise last_error
+
+async def relay_stream(url: str, sink, client: httpx.AsyncClient, headers: Optional[Dict] = None,
+                       part_size: Optional[int] = None, parallelism: Optional[int] = None) -> Dict:
+    """
+    Copy the resource at url into sink (BlockBlobWriter / LocalFileWriter).
+
+    The first request asks for the first part only. A 206 reply means the
+    source supports ranges, so the rest is fetched as parallel ranged GETs
+    through an ordered window and written to the sink in order. A 200 reply,
+    or a 206 whose headers are inconsistent, is streamed through as it
+    arrives (the latter from a plain GET). Size (and X-Content-SHA256, when
+    the source sends it) is verified at the end.
+    """
+    headers = headers or PI_HEADERS
+    part_size = part_size or RELAY_PART_SIZE
+    parallelism = parallelism or PI_TRANSFER_PARALLELISM
+
+    request = client.build_request("GET", url, headers={**headers, "Range": f"bytes=0-{part_size - 1}"})
+    response = await client.send(request, stream=True)
+    if response.status_code == 206 and not ranged_reply_consistent(response.headers):
+        print(f"Ranged reply with Content-Length {response.headers.get('content-length')} for "
+              f"{response.headers.get('content-range')}, falling back to a plain download")
+        await response.aclose()
+        response = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+    try:
+        if response.status_code not in (200, 206):
+            await response.aread()
+            raise TransferVerificationError(f"Download failed: HTTP {response.status_code} - {response.text[:200]}")
+
+        expected_sha256 = response.headers.get("x-content-sha256")
+
+        if response.status_code == 200:
+            # No range support: stream the body through in order
+            content_length = response.headers.get("content-length")
+            expected_size = int(content_length) if content_length else None
+            async for chunk in response.aiter_bytes(part_size):
+                await sink.write(chunk)
+            ranged = False
+        else:
+            expected_size = parse_content_range_total(response.headers.get("content-range"))
+            if expected_size is None:
+                raise TransferVerificationError("Ranged reply without a total size")
+            async for chunk in response.aiter_bytes(part_size):
+                await sink.write(chunk)
+            ranged = True
+    finally:
+        await response.aclose()
+
+    if ranged and sink.size < expected_size:
+        pending = deque()
+        next_start = sink.size
+        try:
+            while next_start < expected_size or pending:
+                while len(pending) < parallelism and next_start < expected_size:
+                    end = min(next_start + part_size, expected_size) - 1
+                    pending.append(asyncio.create_task(fetch_part(client, url, next_start, end, headers)))
+                    next_start = end + 1
+
+                await sink.write(await pending.popleft())
+        finally:
+            for task in pending:
+                task.cancel()
+
+    if expected_size is not None and sink.size != expected_size:
+        raise TransferVerificationError(f"Size mismatch: expected {expected_size}, received {sink.size}")
+    if sink.size == 0:
+        raise TransferVerificationError("Downloaded file is empty")
+    if expected_sha256 and expected_sha256.lower() != sink.sha256:
+        raise TransferVerificationError("Checksum mismatch between Pi and received bytes")
+
+    return {"size": sink.size, "sha256": sink.sha256, "ranged": ranged}
+
+async def transfer_pi_video(pi_filename: str, user_id: int, metadata: Dict[str, str],
+                            client: Optional[httpx.AsyncClient] = None) -> Dict:
+    """
+    Relay a Pi recording into Azure (uploads/videos/{user_id}/{uuid}.mp4), or to
+    local disk when Azure is unavailable. Returns file_path, storage_type,
+    size, sha256 and the generated filename.
+    """
+    url = pi_download_url(pi_filename)
+    file_extension = os.path.splitext(pi_filename)[1] or '.mp4'
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=30.0, read=60.0, write=30.0, pool=30.0),
+            follow_redirects=True
+        )
+
+    try:
+        try:
+            blob_service_client = get_blob_service_client()
+            if not blob_service_client:
+                raise Exception("Azure storage not configured")
+
+            blob_client = blob_service_client.get_blob_client(
+                container="videos",
+                blob=f"uploads/videos/{user_id}/{unique_filename}"
+            )
+            writer = BlockBlobWriter(blob_client)
+            result = await relay_stream(url, writer, client)
+
+            metadata = dict(metadata)
+            metadata["sha256"] = result["sha256"]
+            file_path = await writer.commit(content_type="video/mp4", metadata=metadata)
+            storage_type = "azure_blob"
+
+        except (TransferVerificationError, UploadTooLargeError, httpx.HTTPError):
+            raise
+        except Exception as azure_error:
+            print(f"Azure relay failed, falling back to local storage: {azure_error}")
+            user_dir = os.path.join("uploads/videos", str(user_id))
+            os.makedirs(user_dir, exist_ok=True)
+
+            writer = LocalFileWriter(os.path.join(user_dir, unique_filename))
+            try:
+                result = await relay_stream(url, writer, client)
+                file_path = await writer.commit()
+            except Exception:
+                writer.discard()
+                raise
+            storage_type = "local_fallback"
+    finally:
+        if own_client:
+            await client.aclose()
+
+    print(f"Relayed {result['size']:,} bytes from Pi ({'ranged' if result['ranged'] else 'streamed'}) to {storage_type}")
+
+    return {
+        "file_path": file_path,
+        "storage_type": storage_type,
+        "size": result["size"],
+        "sha256": result["sha256"],
+        "unique_filename": unique_filename
+    }
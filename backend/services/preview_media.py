@@ -0,0 +1,188 @@
+# services/preview_media.py
+# Poster frame, seek-preview sprite sheet and WebVTT thumbnail index for a
+# video, made in one ffmpeg pass so list views and scrubbing never touch the MP4
+
+import os
+import math
+import shutil
+import hashlib
+import subprocess
+from typing import Dict, List, Optional
+
+from services.blob_storage import get_blob_service_client
+from services.hls_packager import local_source, probe_video
+
+PREVIEW_ENABLED = os.getenv("PREVIEW_MEDIA_ENABLED", "true").lower() == "true"
+PREVIEW_INTERVAL_SECONDS = float(os.getenv("PREVIEW_INTERVAL_SECONDS", "2"))
+PREVIEW_MAX_THUMBNAILS = int(os.getenv("PREVIEW_MAX_THUMBNAILS", "100"))
+PREVIEW_FFMPEG_TIMEOUT = int(os.getenv("PREVIEW_FFMPEG_TIMEOUT", "300"))
+POSTER_WIDTH = 640
+POSTER_SECONDS = 1.0
+THUMBNAIL_WIDTH = 160
+SPRITE_COLUMNS = 10
+
+POSTER_FILE = "poster.jpg"
+SPRITE_FILE = "sprite.jpg"
+THUMBNAILS_FILE = "thumbnails.vtt"
+PREVIEW_FILES = {
+    POSTER_FILE: "image/jpeg",
+    SPRITE_FILE: "image/jpeg",
+    THUMBNAILS_FILE: "text/vtt",
+}
+
+def preview_root(user_id: int, video_id: int, variant: str) -> str:
+    return f"outputs_json/{user_id}/{video_id}/media/{variant}"
+
+def plan_sprite(duration: float, width: int, height: int) -> Dict:
+    """Thumbnail interval, count, size and grid for a video of this duration and shape"""
+    duration = max(duration or 0, 0.1)
+    interval = max(PREVIEW_INTERVAL_SECONDS, math.ceil(duration / PREVIEW_MAX_THUMBNAILS))
+    count = max(1, math.ceil(duration / interval))
+    columns = min(count, SPRITE_COLUMNS)
+
+    thumb_height = THUMBNAIL_WIDTH * 9 // 16
+    if width and height:
+        thumb_height = max(2, round(THUMBNAIL_WIDTH * height / width / 2) * 2)
+
+    return {
+        "duration": duration,
+        "interval": interval,
+        "count": count,
+        "columns": columns,
+        "rows": math.ceil(count / columns),
+        "width": THUMBNAIL_WIDTH,
+        "height": thumb_height,
+    }
+
+def build_preview_command(input_path: str, output_dir: str, plan: Dict) -> List[str]:
+    """One decode feeding both the poster and the tiled sprite sheet"""
+    poster_time = min(POSTER_SECONDS, plan["duration"] / 2)
+    filters = (
+        "[0:v]split=2[p][s];"
+        f"[p]trim=start={poster_time:.3f},setpts=PTS-STARTPTS,scale={POSTER_WIDTH}:-2[poster];"
+        f"[s]fps=1/{plan['interval']},scale={plan['width']}:{plan['height']},"
+        f"tile={plan['columns']}x{plan['rows']}[sprite]"
+    )
+    return [
+        "ffmpeg", "-y", "-i", input_path,
+        "-filter_complex", filters,
+        "-map", "[poster]", "-frames:v", "1", "-q:v", "3", os.path.join(output_dir, POSTER_FILE),
+        "-map", "[sprite]", "-frames:v", "1", "-q:v", "5", os.path.join(output_dir, SPRITE_FILE),
+    ]
+
+def format_timestamp(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+def build_thumbnails_vtt(plan: Dict) -> str:
+    """WebVTT cues pointing each interval at its tile (#xywh) in the sprite sheet"""
+    lines = ["WEBVTT", ""]
+    for index in range(plan["count"]):
+        start = index * plan["interval"]
+        end = min((index + 1) * plan["interval"], plan["duration"])
+        x = (index % plan["columns"]) * plan["width"]
+        y = (index // plan["columns"]) * plan["height"]
+        lines.append(f"{format_timestamp(start)} --> {format_timestamp(end)}")
+        lines.append(f"{SPRITE_FILE}#xywh={x},{y},{plan['width']},{plan['height']}")
+        lines.append("")
+    return "\n".join(lines)
+
+def content_version(directory: str) -> str:
+    """Short hash of the generated files; it becomes part of their URLs"""
+    digest = hashlib.sha256()
+    for filename in sorted(PREVIEW_FILES):
+        with open(os.path.join(directory, filename), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def generate_preview_media(input_path: str, root_dir: str) -> Optional[Dict]:
+    """
+    Write poster, sprite sheet and WebVTT index to root_dir/{version}/ and
+    drop older versions. Returns the plan plus "version" and "base_path",
+    or None when ffmpeg is missing or fails.
+    """
+    if not shutil.which("ffmpeg"):
+        print("Preview media skipped: ffmpeg not found in PATH")
+        return None
+
+    try:
+        source = probe_video(input_path)
+    except (subprocess.SubprocessError, OSError, ValueError) as e:
+        print(f"Preview media skipped, could not probe {input_path}: {e}")
+        return None
+
+    plan = plan_sprite(source["duration"], source["width"], source["height"])
+    build_dir = os.path.join(root_dir, ".tmp")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+
+    try:
+        process = subprocess.run(
+            build_preview_command(input_path, build_dir, plan),
+            capture_output=True, text=True, timeout=PREVIEW_FFMPEG_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        print(f"Preview media timed out after {PREVIEW_FFMPEG_TIMEOUT}s: {input_path}")
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return None
+
+    if process.returncode != 0 or not all(
+        os.path.exists(os.path.join(build_dir, name)) for name in (POSTER_FILE, SPRITE_FILE)
+    ):
+        print(f"Preview media failed ({process.returncode}): {process.stderr[-2000:]}")
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return None
+
+    with open(os.path.join(build_dir, THUMBNAILS_FILE), "w") as f:
+        f.write(build_thumbnails_vtt(plan))
+
+    version = content_version(build_dir)
+    base_path = f"{root_dir}/{version}"
+    shutil.rmtree(base_path, ignore_errors=True)
+    os.replace(build_dir, base_path)
+
+    for name in os.listdir(root_dir):
+        if name != version:
+            shutil.rmtree(os.path.join(root_dir, name), ignore_errors=True)
+
+    return dict(plan, version=version, base_path=base_path)
+
+def upload_preview_media(base_path: str) -> bool:
+    """Copy the files to the videos container under base_path; False without Azure"""
+    from azure.storage.blob import ContentSettings
+
+    client = get_blob_service_client()
+    if client is None:
+        return False
+
+    container = client.get_container_client("videos")
+    for filename, content_type in PREVIEW_FILES.items():
+        with open(os.path.join(base_path, filename), "rb") as data:
+            container.upload_blob(
+                name=f"{base_path}/{filename}",
+                data=data,
+                overwrite=True,
+                content_settings=ContentSettings(content_type=content_type)
+            )
+    return True
+
+def create_variant_previews(user_id: int, video_id: int, variant: str, video_path: str) -> Optional[Dict]:
+    """Generate and publish preview media for one variant of a video"""
+    with local_source(video_path) as source_path:
+        media = generate_preview_media(source_path, preview_root(user_id, video_id, variant))
+    if not media:
+        return None
+
+    media["storage_type"] = "local"
+    try:
+        if upload_preview_media(media["base_path"]):
+            media["storage_type"] = "azure_blob"
+    except Exception as e:
+        print(f"Preview media upload to Azure failed, serving from local disk: {e}")
+
+    return media
+
+def sign_thumbnails_vtt(vtt: str, query: str) -> str:
+    """Make the sprite references in a served VTT carry the signature"""
+    return vtt.replace(f"{SPRITE_FILE}#", f"{SPRITE_FILE}?{query}#")
@@ -0,0 +1,168 @@
+# services/result_cache.py
+# Content-addressed reuse of analysis results. A finished analysis is keyed by
+# the sha256 of the video file plus the pipeline fingerprint
+# (ml_pipeline/pose_analyzer.py). A video with a matching key gets the cached
+# outputs hard-linked into its own outputs directory (copied where linking is
+# not possible) instead of running MMPose again.
+
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from services.artifact_manifest import OUTPUTS_ROOT, IGNORED_FILES, IGNORED_PREFIXES, file_sha256
+
+RESULT_CACHE_ENABLED = os.getenv("ANALYSIS_RESULT_CACHE", "1") != "0"
+
+# Reused per variant along with their tables; "english" is produced separately
+LINKED_VARIANTS = ("original", "analyzed")
+
+def outputs_dir(user_id: int, video_id: int) -> str:
+    return os.path.join(OUTPUTS_ROOT, str(user_id), str(video_id))
+
+def content_hash(db: Session, video: models.VideoUpload, compute: bool = False) -> Optional[str]:
+    """
+    sha256 of the video file recorded at upload. With compute, a local file
+    uploaded before hashes were recorded is hashed now (and recorded).
+    """
+    file_info = db.query(models.VideoFileInfo).filter(models.VideoFileInfo.video_id == video.id).first()
+    if file_info and file_info.sha256:
+        return file_info.sha256
+    if not compute or not video.video_path or not os.path.isfile(video.video_path):
+        return None
+
+    sha256 = file_sha256(video.video_path)
+    if file_info:
+        file_info.sha256 = sha256
+    else:
+        db.add(models.VideoFileInfo(video_id=video.id, size_bytes=os.path.getsize(video.video_path),
+                                    sha256=sha256, storage_type="local"))
+    db.commit()
+    return sha256
+
+def find_cached_result(db: Session, content_sha256: str,
+                       fingerprint: str) -> Optional[Tuple[models.AnalysisResultCache, models.VideoUpload]]:
+    """The cache entry and source video for a key, if its outputs are still there"""
+    entry = db.query(models.AnalysisResultCache).filter(
+        models.AnalysisResultCache.content_sha256 == content_sha256,
+        models.AnalysisResultCache.pipeline_fingerprint == fingerprint
+    ).first()
+    if not entry:
+        return None
+
+    source = db.query(models.VideoUpload).filter(models.VideoUpload.id == entry.video_id).first()
+    if source and source.processing_status == "completed" and os.path.isdir(outputs_dir(source.user_id, source.id)):
+        return entry, source
+
+    # Source re-analyzed, failed or its outputs were removed
+    db.delete(entry)
+    db.commit()
+    return None
+
+def remember_result(db: Session, video: models.VideoUpload, fingerprint: Optional[str]) -> bool:
+    """Make a video's finished analysis reusable; an existing valid entry for the key is kept"""
+    if not RESULT_CACHE_ENABLED or not fingerprint:
+        return False
+    sha256 = content_hash(db, video)
+    if not sha256 or find_cached_result(db, sha256, fingerprint):
+        return False
+
+    db.add(models.AnalysisResultCache(content_sha256=sha256, pipeline_fingerprint=fingerprint,
+                                      video_id=video.id, created_at=datetime.utcnow()))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def link_file(source: str, target: str) -> bool:
+    """Hard link source at target (True), or copy it where links are not possible"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        shutil.copy2(source, target)
+        return False
+
+def link_outputs(source_dir: str, target_dir: str) -> Dict[str, int]:
+    """Link every reusable output file of source_dir into target_dir"""
+    counts = {"linked": 0, "copied": 0}
+    for root, dirs, files in os.walk(source_dir):
+        for filename in files:
+            if filename in IGNORED_FILES or filename.startswith(IGNORED_PREFIXES) or filename.endswith(".threads"):
+                continue
+            source = os.path.join(root, filename)
+            target = os.path.join(target_dir, os.path.relpath(source, source_dir))
+            counts["linked" if link_file(source, target) else "copied"] += 1
+    return counts
+
+def rebase_path(path: Optional[str], source_prefix: str, target_prefix: str) -> Optional[str]:
+    """A path inside the source video's outputs, moved to the target's"""
+    if path and path.replace("\\", "/").startswith(source_prefix):
+        return target_prefix + path.replace("\\", "/")[len(source_prefix):]
+    return None
+
+def copy_variant_records(db: Session, source: models.VideoUpload, video: models.VideoUpload,
+                         source_prefix: str, target_prefix: str):
+    """HLS package and preview media rows of the linked local variants the video does not have yet"""
+    for model in (models.VideoStreamPackage, models.VideoPreviewMedia):
+        existing = {row.variant for row in db.query(model.variant).filter(model.video_id == video.id)}
+        for row in db.query(model).filter(model.video_id == source.id, model.variant.in_(LINKED_VARIANTS)):
+            base_path = rebase_path(row.base_path, source_prefix, target_prefix)
+            if row.variant in existing or row.storage_type == "azure_blob" or not base_path:
+                continue
+            columns = {c.name: getattr(row, c.name) for c in model.__table__.columns
+                       if c.name not in ("id", "video_id", "base_path", "created_at")}
+            db.add(model(video_id=video.id, base_path=base_path, **columns))
+
+def reuse_cached_result(db: Session, video: models.VideoUpload, fingerprint: str,
+                        compute_hash: bool = False) -> Optional[Dict]:
+    """
+    Give video the outputs of an earlier analysis of identical content with the
+    same pipeline: link the files, point its paths at them and mark it
+    completed. Returns {"source_video_id", "linked", "copied"} or None on a miss.
+    A re-analysis of the cached video itself finds its own outputs current and
+    changes nothing (source_video_id is the video's own id).
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    sha256 = content_hash(db, video, compute=compute_hash)
+    if not sha256:
+        return None
+    cached = find_cached_result(db, sha256, fingerprint)
+    if not cached:
+        return None
+    entry, source = cached
+    
+    if source.id == video.id:
+        entry.hits = (entry.hits or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        db.commit()
+        print(f"Analysis of video {video.id} is current, re-analysis skipped")
+        return {"source_video_id": video.id, "linked": 0, "copied": 0}
+
+    source_prefix = f"{OUTPUTS_ROOT}/{source.user_id}/{source.id}/"
+    target_prefix = f"{OUTPUTS_ROOT}/{video.user_id}/{video.id}/"
+    counts = link_outputs(outputs_dir(source.user_id, source.id), outputs_dir(video.user_id, video.id))
+
+    video.keypoints_path = rebase_path(source.keypoints_path, source_prefix, target_prefix) or source.keypoints_path
+    # An analyzed path outside the outputs (no output video) is the original
+    video.analyzed_video_path = rebase_path(source.analyzed_video_path, source_prefix, target_prefix) or video.video_path
+    video.processing_status = "completed"
+    copy_variant_records(db, source, video, source_prefix, target_prefix)
+
+    entry.hits = (entry.hits or 0) + 1
+    entry.last_hit_at = datetime.utcnow()
+    db.commit()
+
+    print(f"Reused analysis of video {source.id} for video {video.id}: "
+          f"{counts['linked']} files linked, {counts['copied']} copied")
+    return {"source_video_id": source.id, **counts}
@@ -0,0 +1,130 @@
+# services/stage_timings.py
+# Analysis job stage spans (ml_pipeline/stage_timing.py) stored in
+# analysis_stage_timings, per job and aggregated per stage across jobs
+
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+import models
+
+def parse_time(value: Optional[str]) -> datetime:
+    try:
+        return datetime.fromisoformat(value) if value else datetime.utcnow()
+    except ValueError:
+        return datetime.utcnow()
+
+def save_stage_timings(db: Session, video_id: int, timings: Dict) -> int:
+    """Replace the stored spans of timings["run_id"]; returns the number of spans"""
+    run_id = timings["run_id"]
+    rows = [
+        {
+            "video_id": video_id,
+            "run_id": run_id,
+            "stage": span["stage"],
+            "parent_stage": span.get("parent"),
+            "started_at": parse_time(span.get("started_at")),
+            "seconds": span["seconds"],
+            "frames": span.get("frames"),
+            "fps": span.get("fps"),
+            "status": span.get("status") or "ok",
+            "details": json.dumps(span["details"]) if span.get("details") else None
+        }
+        for span in timings.get("spans", [])
+    ]
+
+    db.query(models.AnalysisStageTiming).filter(
+        models.AnalysisStageTiming.run_id == run_id
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(models.AnalysisStageTiming.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
+
+def span_to_dict(row) -> Dict:
+    return {
+        "stage": row.stage,
+        "parent": row.parent_stage,
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "seconds": row.seconds,
+        "frames": row.frames,
+        "fps": row.fps,
+        "status": row.status,
+        "details": json.loads(row.details) if row.details else {}
+    }
+
+def list_runs(db: Session, video_id: int) -> List[Dict]:
+    """Jobs of a video, newest first, with start time and top-level total"""
+    rows = db.query(
+        models.AnalysisStageTiming.run_id,
+        func.min(models.AnalysisStageTiming.started_at).label("started_at"),
+        func.sum(case(
+            (models.AnalysisStageTiming.parent_stage.is_(None), models.AnalysisStageTiming.seconds),
+            else_=0
+        )).label("total_seconds"),
+        func.sum(case((models.AnalysisStageTiming.status == "error", 1), else_=0)).label("errors")
+    ).filter(
+        models.AnalysisStageTiming.video_id == video_id
+    ).group_by(models.AnalysisStageTiming.run_id).order_by(
+        func.min(models.AnalysisStageTiming.started_at).desc()
+    ).all()
+
+    return [
+        {
+            "run_id": row.run_id,
+            "started_at": row.started_at.isoformat() if row.started_at else None,
+            "total_seconds": round(row.total_seconds or 0, 4),
+            "failed": bool(row.errors)
+        }
+        for row in rows
+    ]
+
+def load_run(db: Session, video_id: int, run_id: str) -> List[Dict]:
+    rows = db.query(models.AnalysisStageTiming).filter(
+        models.AnalysisStageTiming.video_id == video_id,
+        models.AnalysisStageTiming.run_id == run_id
+    ).order_by(models.AnalysisStageTiming.started_at, models.AnalysisStageTiming.id).all()
+    return [span_to_dict(row) for row in rows]
+
+def stage_summary(db: Session, stage: Optional[str] = None, days: Optional[int] = None) -> List[Dict]:
+    """Per stage across jobs: runs, errors, avg/min/max seconds, avg fps and frames"""
+    timing = models.AnalysisStageTiming
+    query = db.query(
+        timing.stage,
+        timing.parent_stage,
+        func.count(timing.id).label("runs"),
+        func.sum(case((timing.status == "error", 1), else_=0)).label("errors"),
+        func.avg(timing.seconds).label("avg_seconds"),
+        func.min(timing.seconds).label("min_seconds"),
+        func.max(timing.seconds).label("max_seconds"),
+        func.avg(timing.fps).label("avg_fps"),
+        func.avg(timing.frames).label("avg_frames")
+    )
+    if stage:
+        query = query.filter(timing.stage == stage)
+    if days:
+        query = query.filter(timing.started_at >= datetime.utcnow() - timedelta(days=days))
+    rows = query.group_by(timing.stage, timing.parent_stage).order_by(
+        timing.parent_stage, func.avg(timing.seconds).desc()
+    ).all()
+
+    def rounded(value):
+        return round(float(value), 4) if value is not None else None
+
+    return [
+        {
+            "stage": row.stage,
+            "parent": row.parent_stage,
+            "runs": row.runs,
+            "errors": int(row.errors or 0),
+            "avg_seconds": rounded(row.avg_seconds),
+            "min_seconds": rounded(row.min_seconds),
+            "max_seconds": rounded(row.max_seconds),
+            "avg_fps": rounded(row.avg_fps),
+            "avg_frames": rounded(row.avg_frames)
+        }
+        for row in rows
+    ]
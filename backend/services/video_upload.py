@@ -0,0 +1,169 @@
+# services/video_upload.py
+# Constant-memory video uploads: request bodies are copied block by block into
+# Azure block blobs (or a local file), hashing and size-checking on the fly
+
+import os
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
+
+# Largest accepted video; memory use does not depend on it
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE_MB", "100")) * 1024 * 1024
+# Bytes held in memory per upload, and the size of each staged Azure block
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE_MB", "4")) * 1024 * 1024
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload passes the size limit"""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File too large. Maximum size is {max_size // (1024*1024)}MB")
+
+def make_block_id(index: int) -> str:
+    """
+    Block ids must all have the same length within a blob. The SDK base64
+    encodes them on the wire and decodes them again in get_block_list.
+    """
+    return f"{index:08d}"
+
+def parse_block_id(block_id: str) -> Optional[int]:
+    try:
+        return int(block_id)
+    except (TypeError, ValueError):
+        return None
+
+class BlockBlobWriter:
+    """
+    Buffers incoming bytes up to one block, stages each full block with
+    stage_block on a worker thread, and commits the block list at the end.
+    Tracks total size and a running sha256 of everything written.
+    """
+
+    def __init__(self, blob_client, block_size: Optional[int] = None, max_size: Optional[int] = None):
+        self.blob_client = blob_client
+        self.block_size = block_size or UPLOAD_BLOCK_SIZE
+        self.max_size = max_size or MAX_UPLOAD_SIZE
+        self.block_ids: List[str] = []
+        self.size = 0
+        self._buffer = bytearray()
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(self.max_size)
+
+        self._sha256.update(data)
+        self._buffer.extend(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            await self._stage(block)
+
+    async def commit(self, content_type: str = "video/mp4", metadata: Optional[Dict[str, str]] = None) -> str:
+        from azure.storage.blob import ContentSettings
+
+        if self._buffer:
+            await self._stage(bytes(self._buffer))
+            self._buffer.clear()
+
+        await asyncio.to_thread(
+            self.blob_client.commit_block_list,
+            self.block_ids,
+            content_settings=ContentSettings(content_type=content_type),
+            metadata=metadata
+        )
+        return self.blob_client.url
+
+    async def _stage(self, block: bytes):
+        block_id = make_block_id(len(self.block_ids))
+        await asyncio.to_thread(self.blob_client.stage_block, block_id, block)
+        self.block_ids.append(block_id)
+
+async def stream_upload_to_blob(file, blob_client, metadata: Optional[Dict[str, str]] = None,
+                                content_type: str = "video/mp4", max_size: Optional[int] = None) -> Dict:
+    """
+    Copy an UploadFile into a block blob one block at a time.
+    Returns {"url", "size", "sha256"}; the sha256 is also stored in the blob metadata.
+    """
+    writer = BlockBlobWriter(blob_client, max_size=max_size)
+
+    while True:
+        chunk = await file.read(writer.block_size)
+        if not chunk:
+            break
+        await writer.write(chunk)
+
+    metadata = dict(metadata or {})
+    metadata["sha256"] = writer.sha256
+    url = await writer.commit(content_type=content_type, metadata=metadata)
+
+    return {"url": url, "size": writer.size, "sha256": writer.sha256}
+
+async def stream_upload_to_file(file, file_path: str, max_size: Optional[int] = None,
+                                block_size: Optional[int] = None) -> Dict:
+    """
+    Copy an UploadFile to a local path one block at a time. A partial file is
+    removed if the upload fails or passes the size limit.
+    Returns {"path", "size", "sha256"}.
+    """
+    max_size = max_size or MAX_UPLOAD_SIZE
+    block_size = block_size or UPLOAD_BLOCK_SIZE
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(file_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(block_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(max_size)
+                digest.update(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    return {"path": file_path, "size": size, "sha256": digest.hexdigest()}
+
+class LocalFileWriter:
+    """
+    Same interface as BlockBlobWriter for the local-disk fallback: write()
+    appends on a worker thread with the size limit and running sha256 applied.
+    """
+
+    def __init__(self, file_path: str, max_size: Optional[int] = None):
+        self.file_path = file_path
+        self.max_size = max_size or MAX_UPLOAD_SIZE
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = open(file_path, "wb")
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(self.max_size)
+
+        self._sha256.update(data)
+        await asyncio.to_thread(self._file.write, data)
+
+    async def commit(self, content_type: str = "video/mp4", metadata: Optional[Dict[str, str]] = None) -> str:
+        self._file.close()
+        return self.file_path
+
+    def discard(self):
+        """Close and remove a partial file"""
+        self._file.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
@@ -0,0 +1,168 @@
+# type: ignore
+# /tests/auth/test_current_user.py
+# get_current_user: role claim, the short-TTL user cache and cache misses read
+# through the async session (sqlite file shared by a sync and an aiosqlite engine)
+
+import os
+import sys
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth.router import (
+    get_current_user,
+    accept_agreement,
+    UserAgreement,
+    create_access_token,
+    token_claims,
+    SECRET_KEY,
+    ALGORITHM
+)
+from utils.cache import user_cache, invalidate_user
+import models
+import database
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    path = tmp_path / "users.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.UserProfile.__table__
+    ])
+    statements = []
+    for bind in (engine, async_engine.sync_engine):
+        event.listen(bind, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    Session = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(async_engine)
+    db = Session()
+    user = models.User(id=7, username="learner", email="l@test.com", name="Learner",
+                       hashed_password="x", role=models.UserRole.LEARNER, agreement_accepted=False)
+    db.add(user)
+    db.add(models.UserProfile(user=user, bio="bio"))
+    db.commit()
+    db.close()
+
+    async def resolve(token, db=None):
+        """get_current_user as a request runs it: sync session plus async read session"""
+        async with AsyncSession() as read_db:
+            return await get_current_user(token=token, db=db or Session(), read_db=read_db)
+
+    yield Session, resolve, statements
+
+
+def token_for(**claims):
+    return create_access_token(dict({"sub": "l@test.com", "user_id": 7}, **claims))
+
+
+class TestTokenClaims:
+
+    def test_token_carries_role(self):
+        """Test that issued tokens carry id and role"""
+        user = models.User(id=7, email="l@test.com", role=models.UserRole.MASTER)
+
+        payload = jwt.decode(create_access_token(token_claims(user)), SECRET_KEY, algorithms=[ALGORITHM])
+
+        assert payload["user_id"] == 7
+        assert payload["role"] == "master"
+
+    @pytest.mark.asyncio
+    async def test_invalid_token_rejected(self, sqlite_db):
+        _Session, resolve, _statements = sqlite_db
+
+        with pytest.raises(HTTPException) as exc_info:
+            await resolve("not-a-jwt")
+
+        assert exc_info.value.status_code == 401
+
+
+class TestUserCache:
+
+    @pytest.mark.asyncio
+    async def test_cached_user_needs_no_query(self, sqlite_db):
+        """Test that the second request resolves its user without a SELECT"""
+        Session, resolve, statements = sqlite_db
+        token = token_for(role="learner")
+
+        await resolve(token)
+        statements.clear()
+        db = Session()
+        user = await resolve(token, db=db)
+
+        assert statements == []
+        assert user.id == 7 and user.role == models.UserRole.LEARNER
+        # Still a normal session object: relationships load lazily
+        assert user in db
+        assert user.profile.bio == "bio"
+
+    @pytest.mark.asyncio
+    async def test_legacy_token_without_role(self, sqlite_db):
+        _Session, resolve, _statements = sqlite_db
+
+        user = await resolve(token_for())
+
+        assert user.id == 7
+
+    @pytest.mark.asyncio
+    async def test_updates_through_cached_user_persist(self, sqlite_db):
+        """Test that endpoints can still modify the user they were given"""
+        Session, resolve, _statements = sqlite_db
+        token = token_for(role="learner")
+        await resolve(token)
+
+        db = Session()
+        user = await resolve(token, db=db)
+        await accept_agreement(UserAgreement(agreement_accepted=True), current_user=user, db=db)
+
+        assert Session().get(models.User, 7).agreement_accepted is True
+        # Invalidated, so the next request sees the change
+        fresh = await resolve(token)
+        assert fresh.agreement_accepted is True
+
+    @pytest.mark.asyncio
+    async def test_stale_role_token_rejected(self, sqlite_db):
+        """Test that a token issued for the old role stops working after a role change"""
+        Session, resolve, _statements = sqlite_db
+        await resolve(token_for(role="learner"))
+
+        db = Session()
+        db.get(models.User, 7).role = models.UserRole.MASTER
+        db.commit()
+
+        # The cached row is stale; the new role claim forces a reload
+        user = await resolve(token_for(role="master"))
+        assert user.role == models.UserRole.MASTER
+
+        with pytest.raises(HTTPException) as exc_info:
+            await resolve(token_for(role="learner"))
+        assert exc_info.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_invalidate_user_forces_reload(self, sqlite_db):
+        _Session, resolve, statements = sqlite_db
+        token = token_for(role="learner")
+        await resolve(token)
+
+        invalidate_user(7)
+        statements.clear()
+        await resolve(token)
+
+        assert len(statements) == 1
@@ -0,0 +1,71 @@
+# type: ignore
+# /tests/auth/test_login.py
+# Login with bcrypt on the password pool and rehash-on-login (sqlite)
+
+import os
+import sys
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth.router import login_for_access_token, register_user, UserLogin, UserCreate
+from utils.security import BCRYPT_ROUNDS, verify_password
+import models
+import database
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.UserProfile.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_user(db, hashed_password):
+    db.add(models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                       hashed_password=hashed_password, role=models.UserRole.LEARNER, agreement_accepted=True))
+    db.commit()
+
+
+class TestLogin:
+
+    @pytest.mark.asyncio
+    async def test_login_rehashes_outdated_cost(self, db):
+        """Test that a hash from an older BCRYPT_ROUNDS is upgraded on login"""
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret")
+        add_user(db, old_hash)
+
+        result = await login_for_access_token(UserLogin(email="l@test.com", password="secret"), db=db)
+
+        stored = db.get(models.User, 1).hashed_password
+        assert result["access_token"]
+        assert stored != old_hash
+        assert int(stored.split('$')[2]) == BCRYPT_ROUNDS
+        assert verify_password("secret", stored)
+
+    @pytest.mark.asyncio
+    async def test_login_by_username_wrong_password(self, db):
+        add_user(db, CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret"))
+
+        with pytest.raises(HTTPException) as exc_info:
+            await login_for_access_token(UserLogin(email="learner", password="nope"), db=db)
+
+        assert exc_info.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_register_hashes_with_configured_cost(self, db):
+        await register_user(UserCreate(email="n@test.com", username="new", password="secret", name="New"), db=db)
+
+        user = db.query(models.User).filter(models.User.email == "n@test.com").one()
+        assert int(user.hashed_password.split('$')[2]) == BCRYPT_ROUNDS
+        assert verify_password("secret", user.hashed_password)
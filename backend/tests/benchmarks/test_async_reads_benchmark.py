@@ -0,0 +1,157 @@
+# type: ignore
+# /tests/benchmarks/test_async_reads_benchmark.py
+# Concurrent GET /api/videos?limit=20 with the sync Session inside the async
+# handler (previous behaviour) vs the async session path.
+#
+# Point BENCHMARK_DATABASE_URL at a local PostgreSQL (postgresql://...) to
+# measure against the real thing. Without it a sqlite file stands in, with
+# every statement delayed by STATEMENT_LATENCY inside the driver's thread, the
+# way a network round trip to the server would be.
+# Run with -s to see the timings.
+
+import os
+import sys
+import time
+import asyncio
+import statistics
+import pytest
+import httpx
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth.router import create_access_token, token_claims
+from routers.video import router as video_router
+from utils.cache import user_cache
+import models
+import database
+
+CLIENTS = 20
+REQUESTS_PER_CLIENT = 10
+STATEMENT_LATENCY = 0.005
+TABLES = [models.User.__table__, models.VideoUpload.__table__, models.VideoPreviewMedia.__table__]
+
+
+def add_round_trip_latency(engine, is_async):
+    """Delay each statement in whichever thread runs the sqlite driver"""
+    def delay(_statement):
+        time.sleep(STATEMENT_LATENCY)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, _record):
+        if is_async:
+            dbapi_connection.run_async(lambda connection: connection.set_trace_callback(delay))
+        else:
+            dbapi_connection.set_trace_callback(delay)
+
+
+@pytest.fixture(scope="module")
+def engines(tmp_path_factory):
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    stand_in = url is None
+    if stand_in:
+        url = f"sqlite:///{tmp_path_factory.mktemp('reads') / 'bench.db'}"
+
+    # A connection per client on both paths, so neither waits on the pool
+    pool = dict(database.pool_options(url), pool_size=CLIENTS + 1, max_overflow=0)
+    connect_args = {"check_same_thread": False} if stand_in else {}
+    engine = create_engine(url, connect_args=connect_args, **pool)
+    async_engine = create_async_engine(database.async_database_url(url), **pool)
+    database.Base.metadata.create_all(engine, tables=TABLES)
+
+    session = sessionmaker(bind=engine)()
+    user = models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                       hashed_password="x", role=models.UserRole.LEARNER)
+    session.add(user)
+    session.commit()
+    start = datetime(2024, 1, 1)
+    session.execute(models.VideoUpload.__table__.insert(), [
+        {"user_id": 1, "title": f"Video {i}", "video_path": f"uploads/videos/1/{i}.mp4",
+         "processing_status": "completed", "upload_timestamp": start + timedelta(minutes=i)}
+        for i in range(200)
+    ])
+    session.commit()
+    token = create_access_token(token_claims(user))
+    session.close()
+
+    if stand_in:
+        add_round_trip_latency(engine, is_async=False)
+        add_round_trip_latency(async_engine.sync_engine, is_async=True)
+
+    yield engine, async_engine, token
+
+    database.Base.metadata.drop_all(engine, tables=TABLES)
+    user_cache.clear()
+
+
+def build_app(engine, async_engine, use_async):
+    Session = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def get_test_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(video_router)
+    app.dependency_overrides[database.get_db] = get_test_db
+    # The sync variant hands the endpoints a plain Session, as before
+    app.dependency_overrides[database.get_async_db] = get_test_async_db if use_async else get_test_db
+    return app
+
+
+async def run_load(app, token):
+    """Wall time and per-request latencies of CLIENTS concurrent clients"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test",
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        # Resolve the user once so only the listing's own queries are measured
+        assert (await client.get("/api/videos?limit=20")).status_code == 200
+
+        async def one_client():
+            for _ in range(REQUESTS_PER_CLIENT):
+                start = time.perf_counter()
+                response = await client.get("/api/videos?limit=20")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+                assert len(response.json()["items"]) == 20
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_client() for _ in range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+@pytest.mark.asyncio
+async def test_async_sessions_serve_reads_concurrently(engines):
+    engine, async_engine, token = engines
+    total = CLIENTS * REQUESTS_PER_CLIENT
+
+    user_cache.clear()
+    sync_elapsed, sync_median, sync_p99 = await run_load(build_app(engine, async_engine, False), token)
+    user_cache.clear()
+    async_elapsed, async_median, async_p99 = await run_load(build_app(engine, async_engine, True), token)
+    await async_engine.dispose()
+
+    print(f"\n{total} x GET /api/videos?limit=20 from {CLIENTS} clients ({engine.url.get_backend_name()}): "
+          f"sync session {total / sync_elapsed:.0f} req/s (median {sync_median * 1000:.1f} ms, "
+          f"p99 {sync_p99 * 1000:.1f} ms); "
+          f"async session {total / async_elapsed:.0f} req/s (median {async_median * 1000:.1f} ms, "
+          f"p99 {async_p99 * 1000:.1f} ms)")
+
+    assert async_elapsed < sync_elapsed
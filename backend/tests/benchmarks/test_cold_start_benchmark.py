@@ -0,0 +1,128 @@
+# type: ignore
+# /tests/benchmarks/test_cold_start_benchmark.py
+# Cold start of the API: `import main` in a fresh interpreter with
+# -X importtime, reported per module, plus the startup schema check.
+#
+# Fails when a heavy SDK (Azure, httpx, numpy, ...) is imported at startup
+# again, or when the import takes longer than COLD_START_BUDGET_SECONDS.
+# Set COLD_START_REPORT to a file path to keep the per-module timings as JSON.
+# Run with -s to see the timings.
+
+import os
+import sys
+import json
+import subprocess
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import database
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "1.2"))
+RUNS = 3
+
+# Loaded on first use by the endpoints that need them, never by `import main`
+LAZY_MODULES = (
+    "azure", "azure_services", "httpx", "requests", "numpy", "cv2", "scipy",
+    "pandas", "matplotlib", "torch", "mmpose", "services.pi_transfer", "services.keypoint_store"
+)
+# Packages of this repo whose import cost is reported separately
+APP_PACKAGES = ("main", "database", "models", "config", "auth.", "routers.", "services.", "utils.",
+                "baduanjin_analysis.")
+
+
+def import_main(cwd):
+    """{module: (self_us, cumulative_us)} for one `import main` in a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+@pytest.fixture(scope="module")
+def cold_start(tmp_path_factory):
+    # main mounts these directories relative to the working directory
+    cwd = tmp_path_factory.mktemp("cold_start")
+    for name in ("uploads", "outputs_json"):
+        (cwd / name).mkdir()
+
+    runs = [import_main(str(cwd)) for _ in range(RUNS)]
+    return min(runs, key=lambda modules: modules["main"][1])
+
+
+def test_heavy_modules_are_lazy(cold_start):
+    imported = [
+        name for name in cold_start
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    ]
+
+    assert imported == []
+
+
+def test_import_time_budget(cold_start):
+    total = cold_start["main"][1] / 1e6
+    app_modules = sorted(
+        ((name, cumulative) for name, (_, cumulative) in cold_start.items()
+         if name in APP_PACKAGES or name.startswith(APP_PACKAGES)),
+        key=lambda item: -item[1]
+    )
+    slowest = sorted(cold_start.items(), key=lambda item: -item[1][1])[:15]
+
+    print(f"\nimport main: {total * 1000:.0f} ms (budget {COLD_START_BUDGET_SECONDS * 1000:.0f} ms, best of {RUNS})")
+    print("app modules (cumulative ms): " + ", ".join(f"{name} {us / 1000:.1f}" for name, us in app_modules[:10]))
+    print("slowest imports (cumulative ms): " + ", ".join(f"{name} {us / 1000:.1f}" for name, (_, us) in slowest))
+
+    report = os.getenv("COLD_START_REPORT")
+    if report:
+        with open(report, "w") as f:
+            json.dump({
+                "total_us": cold_start["main"][1],
+                "modules": {name: {"self_us": s, "cumulative_us": c} for name, (s, c) in cold_start.items()}
+            }, f, indent=2)
+
+    assert total < COLD_START_BUDGET_SECONDS
+
+
+@compiles(JSONB, "sqlite")
+def jsonb_on_sqlite(type_, compiler, **kw):
+    """keypoint_data uses JSONB; sqlite stores it as JSON so the whole schema can be created"""
+    return "JSON"
+
+
+def test_startup_schema_check_is_one_query(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    assert database.ensure_schema(engine, mode="auto") == "synced"
+    first_start = len(statements)
+    statements.clear()
+    assert database.ensure_schema(engine, mode="auto") == "current"
+
+    print(f"\nstartup schema check: {first_start} statements on first start, {len(statements)} afterwards")
+    assert len(statements) == 1
+    assert database.ensure_schema(engine, mode="off") == "skipped"
+
+    # A table the database does not have yet triggers a sync again
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE analysis_joint_ranges")
+        conn.exec_driver_sql("UPDATE schema_state SET fingerprint = 'old'")
+    assert database.ensure_schema(engine, mode="auto") == "synced"
+    with engine.connect() as conn:
+        assert "analysis_joint_ranges" in engine.dialect.get_table_names(conn)
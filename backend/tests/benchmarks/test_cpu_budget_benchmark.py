@@ -0,0 +1,86 @@
+# type: ignore
+# /tests/benchmarks/test_cpu_budget_benchmark.py
+# Throughput of 1-4 concurrent analysis-like jobs (BLAS-heavy subprocesses,
+# like the MMPose inference) when every job uses all cores versus when each
+# gets its CPU budget share (ml_pipeline/cpu_budget.py).
+#
+# Fails when budgeted jobs are clearly slower than oversubscribed ones, or
+# when concurrent budgeted jobs fall below the throughput of a single job.
+# Set CPU_BUDGET_REPORT to a file path to keep the results as JSON.
+# Run with -s to see the throughput table.
+
+import os
+import sys
+import json
+import time
+import subprocess
+import pytest
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from ml_pipeline.cpu_budget import CpuBudget, available_cores, thread_env
+
+pytest.importorskip("numpy")
+
+CONCURRENCY = (1, 2, 3, 4)
+MATMULS = int(os.getenv("CPU_BUDGET_MATMULS", "24"))
+# Noise allowance; on one or two cores both modes run the same thread counts
+TOLERANCE = 0.75
+
+JOB = f"""
+import numpy as np
+a = np.random.rand(384, 384)
+for _ in range({MATMULS}):
+    a = a @ a
+    a /= np.abs(a).max()
+"""
+
+
+def run_concurrently(thread_counts):
+    """Wall seconds for one job per entry, started together, each with that many threads"""
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-c", JOB], env=dict(os.environ, **thread_env(threads)))
+        for threads in thread_counts
+    ]
+    for process in processes:
+        assert process.wait(timeout=300) == 0
+    return time.perf_counter() - start
+
+
+@pytest.fixture(scope="module")
+def throughput():
+    cores = available_cores()
+    budget = CpuBudget(cores=cores)
+    results = {}
+    for jobs in CONCURRENCY:
+        oversubscribed = run_concurrently([cores] * jobs)
+        budgeted = run_concurrently(budget.shares(jobs))
+        results[jobs] = {
+            "all_cores_jobs_per_second": jobs / oversubscribed,
+            "budgeted_jobs_per_second": jobs / budgeted,
+            "budgeted_threads": budget.shares(jobs)
+        }
+
+    print(f"\n{cores} cores, {MATMULS} matmuls per job (jobs/s)")
+    for jobs, result in results.items():
+        print(f"  {jobs} concurrent: all cores {result['all_cores_jobs_per_second']:.2f}, "
+              f"budgeted {result['budgeted_jobs_per_second']:.2f} (threads {result['budgeted_threads']})")
+
+    report = os.getenv("CPU_BUDGET_REPORT")
+    if report:
+        with open(report, "w") as f:
+            json.dump({"cores": cores, "matmuls": MATMULS, "results": results}, f, indent=2)
+    return results
+
+
+def test_budget_not_slower_than_oversubscription(throughput):
+    for jobs, result in throughput.items():
+        assert result["budgeted_jobs_per_second"] >= TOLERANCE * result["all_cores_jobs_per_second"], jobs
+
+
+def test_concurrent_jobs_keep_single_job_throughput(throughput):
+    single = throughput[1]["budgeted_jobs_per_second"]
+    for jobs in CONCURRENCY[1:]:
+        assert throughput[jobs]["budgeted_jobs_per_second"] >= TOLERANCE * single, jobs
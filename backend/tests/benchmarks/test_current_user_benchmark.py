@@ -0,0 +1,109 @@
+# type: ignore
+# /tests/benchmarks/test_current_user_benchmark.py
+# Request overhead of authentication on a hot endpoint (video details, which
+# the UI polls during analysis): user query on every request vs user cache.
+# Run with -s to see the timings.
+
+import os
+import sys
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth.router import create_access_token, token_claims
+from routers.video import router as video_router
+from utils.cache import user_cache
+import models
+import database
+
+REQUESTS = 300
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    path = tmp_path_factory.mktemp("auth") / "bench.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.MasterLearnerRelationship.__table__,
+        models.VideoUpload.__table__,
+        models.VideoStreamPackage.__table__,
+        models.VideoPreviewMedia.__table__
+    ])
+    statements = []
+    for bind in (engine, async_engine.sync_engine):
+        event.listen(bind, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    user = models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                       hashed_password="x", role=models.UserRole.LEARNER)
+    db.add(user)
+    db.add(models.VideoUpload(id=1, user_id=1, title="Video", video_path="uploads/videos/1/v.mp4",
+                              processing_status="processing"))
+    db.commit()
+    token = create_access_token(token_claims(user))
+    db.close()
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_test_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(video_router)
+    app.dependency_overrides[database.get_db] = get_test_db
+    app.dependency_overrides[database.get_async_db] = get_test_async_db
+
+    with TestClient(app) as test_client:
+        test_client.headers["Authorization"] = f"Bearer {token}"
+        yield test_client, statements
+    user_cache.clear()
+
+
+def poll(test_client, statements, cached):
+    """Average seconds and SQL statements per request over REQUESTS polls"""
+    user_cache.clear()
+    test_client.get("/api/videos/1")  # warm up (and fill the cache)
+    statements.clear()
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        if not cached:
+            user_cache.clear()
+        response = test_client.get("/api/videos/1")
+        assert response.status_code == 200
+    elapsed = time.perf_counter() - start
+
+    return elapsed / REQUESTS, len(statements) / REQUESTS
+
+
+def test_user_cache_removes_auth_query(client):
+    test_client, statements = client
+
+    uncached_seconds, uncached_statements = poll(test_client, statements, cached=False)
+    cached_seconds, cached_statements = poll(test_client, statements, cached=True)
+
+    print(f"\nGET /api/videos/1 x{REQUESTS}: "
+          f"user query {uncached_seconds * 1000:.2f} ms/request ({uncached_statements:.0f} statements), "
+          f"user cache {cached_seconds * 1000:.2f} ms/request ({cached_statements:.0f} statements)")
+
+    assert cached_statements == uncached_statements - 1
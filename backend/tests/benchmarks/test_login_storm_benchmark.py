@@ -0,0 +1,106 @@
+# type: ignore
+# /tests/benchmarks/test_login_storm_benchmark.py
+# Latency of an unrelated endpoint while a burst of logins is being verified:
+# bcrypt inline on the event loop (previous behaviour) vs the password pool.
+# Run with -s to see the timings.
+
+import os
+import sys
+import time
+import asyncio
+import statistics
+import pytest
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from auth import router as auth_router
+from utils.security import get_password_hash, verify_and_update_password
+import models
+import database
+
+LOGINS = 8
+PROBE_INTERVAL = 0.005
+
+
+@pytest.fixture(scope="module")
+def app():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.Base.metadata.create_all(engine, tables=[models.User.__table__])
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                       hashed_password=get_password_hash("secret"), role=models.UserRole.LEARNER,
+                       agreement_accepted=True))
+    db.commit()
+    db.close()
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    test_app = FastAPI()
+    test_app.include_router(auth_router.router)
+    test_app.dependency_overrides[database.get_db] = get_test_db
+
+    @test_app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return test_app
+
+
+async def login_storm(app):
+    """p99 and max latency (seconds) of /ping while LOGINS logins are in flight"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def login():
+            response = await client.post("/api/auth/login", json={"email": "l@test.com", "password": "secret"})
+            assert response.status_code == 200
+
+        async def probe():
+            # Fixed schedule, latency measured from when each request was due,
+            # so time spent stuck behind a blocked loop is counted
+            due = time.perf_counter()
+            while not logins.done():
+                await asyncio.sleep(max(0, due - time.perf_counter()))
+                response = await client.get("/ping")
+                latencies.append(time.perf_counter() - due)
+                assert response.status_code == 200
+                due += PROBE_INTERVAL
+
+        logins = asyncio.ensure_future(asyncio.gather(*(login() for _ in range(LOGINS))))
+        await asyncio.gather(logins, probe())
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return p99, latencies[-1], statistics.median(latencies), len(latencies)
+
+
+@pytest.mark.asyncio
+async def test_logins_do_not_stall_other_requests(app, monkeypatch):
+    async def verify_inline(plain_password, hashed_password):
+        return verify_and_update_password(plain_password, hashed_password)
+
+    with monkeypatch.context() as patched:
+        patched.setattr(auth_router, "verify_and_update_password_async", verify_inline)
+        inline_p99, inline_max, inline_median, inline_count = await login_storm(app)
+
+    pooled_p99, pooled_max, pooled_median, pooled_count = await login_storm(app)
+
+    print(f"\n/ping during {LOGINS} logins: "
+          f"inline bcrypt p99 {inline_p99 * 1000:.1f} ms (median {inline_median * 1000:.1f}, "
+          f"max {inline_max * 1000:.1f}, n={inline_count}); "
+          f"password pool p99 {pooled_p99 * 1000:.1f} ms (median {pooled_median * 1000:.1f}, "
+          f"max {pooled_max * 1000:.1f}, n={pooled_count})")
+
+    assert pooled_p99 < inline_p99
@@ -0,0 +1,62 @@
+# type: ignore
+# /tests/benchmarks/test_metrics_overhead_benchmark.py
+# Per-request cost of MetricsMiddleware: a minimal ASGI app called directly,
+# with and without the middleware, so the difference is the instrumentation
+# alone (timing, histogram, in-flight gauge, call counters).
+# Run with -s to see the timings.
+
+import os
+import sys
+import time
+import asyncio
+import pytest
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.metrics import MetricsMiddleware, count_db_statement, reset
+
+REQUESTS = 20000
+MAX_OVERHEAD_SECONDS = 50e-6
+
+
+class Route:
+    path = "/api/videos/{video_id}"
+
+
+async def app(scope, receive, send):
+    scope["route"] = Route
+    count_db_statement()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def serve(asgi_app):
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        scope = {"type": "http", "method": "GET", "path": f"/api/videos/{i}"}
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - start) / REQUESTS
+
+
+@pytest.mark.asyncio
+async def test_middleware_overhead_is_small():
+    reset()
+    await serve(MetricsMiddleware(app))  # warm up
+    bare = min([await serve(app) for _ in range(3)])
+    instrumented = min([await serve(MetricsMiddleware(app)) for _ in range(3)])
+    reset()
+
+    overhead = instrumented - bare
+    print(f"\n{REQUESTS} requests: bare app {bare * 1e6:.1f} us/request, "
+          f"with metrics {instrumented * 1e6:.1f} us/request (+{overhead * 1e6:.1f} us)")
+
+    assert overhead < MAX_OVERHEAD_SECONDS
@@ -0,0 +1,113 @@
+# type: ignore
+# /tests/benchmarks/test_video_listing_benchmark.py
+# Video listing with 10k videos per user: full list vs keyset pages.
+# Run with -s to see the timings.
+
+import os
+import sys
+import time
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from routers.video import get_videos
+import models
+import database
+
+VIDEOS_PER_USER = 10_000
+
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.VideoPreviewMedia.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+
+    for user_id in (1, 2):
+        session.add(models.User(id=user_id, username=f"user{user_id}", email=f"u{user_id}@test.com",
+                                name=f"User {user_id}", hashed_password="x", role=models.UserRole.LEARNER))
+    session.commit()
+
+    start = datetime(2024, 1, 1)
+    rows = []
+    for user_id in (1, 2):
+        for i in range(VIDEOS_PER_USER):
+            rows.append({
+                "user_id": user_id,
+                "title": f"Video {i}",
+                "description": "x" * 200,
+                "brocade_type": "BROCADE_1",
+                "video_path": f"https://example.blob.core.windows.net/videos/uploads/videos/{user_id}/{i}.mp4",
+                # Every 10 videos share a timestamp, so the id tie-breaker is exercised
+                "upload_timestamp": start + timedelta(minutes=i // 10),
+                "processing_status": "deleted" if i % 50 == 0 else "completed",
+                "analyzed_video_path": f"outputs_json/{user_id}/{i}/out.mp4",
+                "keypoints_path": f"outputs_json/{user_id}/{i}/results.json"
+            })
+    session.execute(models.VideoUpload.__table__.insert(), rows)
+    session.commit()
+
+    yield session
+    session.close()
+
+
+class TestVideoListingBenchmark:
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages_cover_full_list(self, db):
+        user = db.get(models.User, 1)
+
+        started = time.perf_counter()
+        full_list = await get_videos(current_user=user, db=db)
+        full_seconds = time.perf_counter() - started
+
+        page_ids, cursor, page_count = [], None, 0
+        first_page_seconds = None
+        while True:
+            started = time.perf_counter()
+            page = await get_videos(cursor=cursor, limit=100, current_user=user, db=db)
+            if first_page_seconds is None:
+                first_page_seconds = time.perf_counter() - started
+            page_ids.extend(item["id"] for item in page["items"])
+            page_count += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        print(f"\nfull list: {len(full_list)} rows in {full_seconds * 1000:.1f} ms; "
+              f"first page: {first_page_seconds * 1000:.1f} ms; {page_count} pages")
+
+        assert len(full_list) == VIDEOS_PER_USER - VIDEOS_PER_USER // 50
+        assert "preview_media" not in full_list[0] and "poster_url" in full_list[0]
+        # Same rows, each exactly once (the full list leaves ties unordered)
+        assert len(page_ids) == len(set(page_ids))
+        assert sorted(page_ids) == sorted(video["id"] for video in full_list)
+        assert first_page_seconds < full_seconds
+
+    @pytest.mark.asyncio
+    async def test_page_is_projected(self, db):
+        user = db.get(models.User, 1)
+
+        page = await get_videos(limit=5, current_user=user, db=db)
+
+        assert set(page["items"][0]) == {
+            "id", "title", "description", "brocade_type", "processing_status", "upload_timestamp", "poster_url"
+        }
+        assert "total" not in page
+
+    def test_listing_uses_composite_index(self, db):
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM video_uploads "
+            "WHERE user_id = 1 AND processing_status != 'deleted' "
+            "ORDER BY upload_timestamp DESC, id DESC LIMIT 101"
+        )).fetchall()
+
+        assert any("ix_video_uploads_user_status_uploaded" in str(row) for row in plan)
@@ -0,0 +1,92 @@
+# type: ignore
+# /tests/ml_pipeline/test_cpu_budget.py
+# Unit tests for ml_pipeline/cpu_budget.py (thread shares of concurrent analyses)
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from ml_pipeline.cpu_budget import CpuBudget, available_cores, thread_env, read_thread_count
+
+
+class TestShares:
+    """Splitting the cores between running jobs"""
+
+    def test_single_job_gets_every_core(self):
+        assert CpuBudget(cores=8).shares(1) == [8]
+
+    def test_even_and_uneven_split(self):
+        budget = CpuBudget(cores=8)
+
+        assert budget.shares(2) == [4, 4]
+        assert budget.shares(3) == [3, 3, 2]
+        assert sum(budget.shares(3)) == 8
+
+    def test_never_below_one_thread(self):
+        assert CpuBudget(cores=2).shares(4) == [1, 1, 1, 1]
+
+    def test_reserved_cores(self):
+        assert CpuBudget(cores=8, reserved=2).cores == 6
+        assert CpuBudget(cores=2, reserved=4).cores == 1
+
+    def test_configured_core_count(self):
+        with patch.dict(os.environ, {"ANALYSIS_CPU_CORES": "12"}):
+            assert available_cores() == 12
+
+
+class TestLeases:
+    """Shares follow jobs starting and finishing"""
+
+    def test_shares_adapt(self, tmp_path):
+        budget = CpuBudget(cores=8, control_dir=str(tmp_path))
+
+        first = budget.acquire("video-1")
+        assert first.threads == 8
+
+        second = budget.acquire("video-2")
+        assert (first.threads, second.threads) == (4, 4)
+        assert read_thread_count(first.control_path) == 4
+
+        first.release()
+        assert second.threads == 8
+        assert read_thread_count(second.control_path) == 8
+        assert not os.path.exists(first.control_path)
+        assert budget.active() == {"video-2": 8}
+
+    def test_lease_context_releases_on_error(self):
+        budget = CpuBudget(cores=4)
+
+        with pytest.raises(RuntimeError):
+            with budget.lease("video-1") as lease:
+                assert lease.threads == 4
+                raise RuntimeError("analysis failed")
+
+        assert budget.active() == {}
+
+    def test_double_release_is_harmless(self):
+        budget = CpuBudget(cores=4)
+        lease = budget.acquire("video-1")
+
+        lease.release()
+        lease.release()
+
+        assert budget.active() == {}
+
+    def test_thread_env(self):
+        env = thread_env(3)
+
+        assert env["OMP_NUM_THREADS"] == "3"
+        assert env["MKL_NUM_THREADS"] == "3"
+        assert env["TORCH_NUM_THREADS"] == "3"
+        assert env["CUDA_VISIBLE_DEVICES"] == ""
+
+    def test_read_thread_count_invalid(self, tmp_path):
+        path = tmp_path / "bad.threads"
+        path.write_text("many")
+
+        assert read_thread_count(str(path)) is None
+        assert read_thread_count(str(tmp_path / "missing.threads")) is None
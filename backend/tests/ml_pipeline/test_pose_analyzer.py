@@ -19,7 +19,8 @@ from ml_pipeline.pose_analyzer import (
     estimate_processing_time,
     convert_to_web_format,
     preprocess_video_for_cpu,
-    preprocess_video_for_cpu_preserve_duration
+    preprocess_video_for_cpu_preserve_duration,
+    pipeline_fingerprint
 )
 
 class TestCPUOptimizations:
@@ -330,6 +331,22 @@ class TestWebFormatConversion:
                 log_content = f.read()
                 assert "FFmpeg conversion" in log_content
     
+    def test_convert_to_web_format_thread_budget(self, temp_files_and_logs):
+        """Test that a CPU budget share limits the encoder threads"""
+        input_path, output_path, debug_log, log_file = temp_files_and_logs
+        
+        with patch('subprocess.run') as mock_subprocess:
+            mock_subprocess.return_value = Mock(returncode=0, stdout="", stderr="")
+            with open(output_path, 'wb') as f:
+                f.write(b'converted_video_data' * 500)
+            
+            result = convert_to_web_format(input_path, output_path, debug_log, log_file, threads=3)
+            
+            assert result is True
+            ffmpeg_cmd = mock_subprocess.call_args_list[-1][0][0]
+            assert ffmpeg_cmd[-3:] == ["3", "-y", output_path]
+            assert ffmpeg_cmd[ffmpeg_cmd.index("-threads") + 1] == "3"
+    
     def test_convert_to_web_format_ffmpeg_not_found(self, temp_files_and_logs):
         """Test conversion when FFmpeg is not available"""
         input_path, output_path, debug_log, log_file = temp_files_and_logs
@@ -450,6 +467,30 @@ class TestPathHandling:
             assert len(name_without_ext) > 0
 
 
+class TestPipelineFingerprint:
+    """Test the pipeline fingerprint keying reused analysis results"""
+    
+    def test_fingerprint_is_stable(self):
+        """Test that the same pipeline always gives the same fingerprint"""
+        pipeline_fingerprint.cache_clear()
+        first = pipeline_fingerprint()
+        pipeline_fingerprint.cache_clear()
+        
+        assert pipeline_fingerprint() == first
+        assert len(first) == 64
+    
+    def test_fingerprint_changes_with_pipeline_version(self):
+        """Test that bumping PIPELINE_VERSION invalidates reused results"""
+        pipeline_fingerprint.cache_clear()
+        first = pipeline_fingerprint()
+        pipeline_fingerprint.cache_clear()
+        
+        try:
+            with patch('ml_pipeline.pose_analyzer.PIPELINE_VERSION', 2):
+                assert pipeline_fingerprint() != first
+        finally:
+            pipeline_fingerprint.cache_clear()
+
 class TestErrorHandling:
     """Test error handling and edge cases"""
     
@@ -23,7 +23,12 @@ from routers.analysis import (
     run_analysis_script,
     run_analysis_sync,
     run_analysis,
-    get_analysis_image
+    get_analysis_image,
+    get_keypoint_frames,
+    get_progress,
+    get_stage_timings,
+    get_stage_timing_summary,
+    get_analysis_summary
 )
 import models
 import database
@@ -265,6 +270,86 @@ class TestAnalysisEndpoints:
     def mock_background_tasks(self):
         return Mock(spec=BackgroundTasks)
     
+    @pytest.mark.asyncio
+    async def test_analysis_summary_writes_missing_manifest(self, mock_db, mock_user, mock_video, tmp_path, monkeypatch):
+        """Test that a video analyzed before manifests existed gets one from its local outputs"""
+        monkeypatch.chdir(tmp_path)
+        os.makedirs("outputs_json/1/1/baduanjin_analysis")
+        mock_query = Mock()
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_video
+        mock_db.query.return_value = mock_query
+        manifest = {"artifacts": [{"name": "baduanjin_analysis/joint_angles.png"}]}
+        
+        with patch('routers.analysis.load_manifest', return_value=None), \
+             patch('services.artifact_manifest.write_manifest', return_value=manifest) as mock_write:
+            result = await get_analysis_summary(video_id=1, current_user=mock_user, db=mock_db)
+        
+        mock_write.assert_called_once_with(mock_db, 1, 1)
+        assert result["status"] == "completed"
+        assert result["available_files"]["images"] == ["joint_angles"]
+    
+    @pytest.mark.asyncio
+    async def test_analysis_summary_azure_only_legacy_video(self, mock_db, mock_user, mock_video, tmp_path, monkeypatch):
+        """Test that a legacy video whose outputs are only in Azure is indexed from one blob listing"""
+        monkeypatch.chdir(tmp_path)
+        mock_query = Mock()
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_video
+        mock_db.query.return_value = mock_query
+        
+        def blob(name, size=10):
+            item = Mock(size=size, etag='"0x8D"', content_settings=Mock(content_type=None))
+            item.name = f"outputs_json/1/1/{name}"
+            return item
+        results_container = Mock()
+        results_container.list_blobs.return_value = [
+            blob("results_video.json"),
+            blob("baduanjin_analysis/joint_angles.png"),
+            blob("baduanjin_analysis/analysis_report.txt"),
+            blob("hls/analyzed/master.m3u8")
+        ]
+        videos_container = Mock()
+        videos_container.list_blobs.return_value = [blob("analyzed_video_web.mp4")]
+        client = Mock()
+        client.get_container_client.side_effect = lambda name: {"results": results_container, "videos": videos_container}[name]
+        
+        with patch('routers.analysis.load_manifest', return_value=None), \
+             patch('services.artifact_manifest.get_blob_service_client', return_value=client), \
+             patch('services.artifact_manifest.upload_manifest_to_azure') as mock_upload, \
+             patch('services.artifact_manifest.save_manifest_to_db') as mock_save:
+            result = await get_analysis_summary(video_id=1, current_user=mock_user, db=mock_db)
+        
+        results_container.list_blobs.assert_called_once_with(name_starts_with="outputs_json/1/1/")
+        saved = mock_save.call_args[0][2]
+        assert [a["name"] for a in saved["artifacts"]] == [
+            "analyzed_video_web.mp4",
+            "baduanjin_analysis/analysis_report.txt",
+            "baduanjin_analysis/joint_angles.png",
+            "results_video.json"
+        ]
+        mock_upload.assert_called_once()
+        assert result["status"] == "completed"
+        assert result["available_files"]["images"] == ["joint_angles"]
+        assert result["available_files"]["reports"] == ["analysis_report"]
+    
+    @pytest.mark.asyncio
+    async def test_analysis_summary_without_outputs(self, mock_db, mock_user, mock_video, tmp_path, monkeypatch):
+        """Test that no manifest is written when neither disk nor Azure has outputs"""
+        monkeypatch.chdir(tmp_path)
+        mock_query = Mock()
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_video
+        mock_db.query.return_value = mock_query
+        
+        with patch('routers.analysis.load_manifest', return_value=None), \
+             patch('services.artifact_manifest.get_blob_service_client', return_value=None), \
+             patch('services.artifact_manifest.save_manifest_to_db') as mock_save:
+            result = await get_analysis_summary(video_id=1, current_user=mock_user, db=mock_db)
+        
+        mock_save.assert_not_called()
+        assert result["status"] == "no_manifest"
+    
     @pytest.mark.asyncio
     async def test_run_analysis_video_not_found(self, mock_db, mock_user, mock_background_tasks):
         """Test run analysis when video not found"""
@@ -610,4 +695,212 @@ class TestPerformanceAndEdgeCases:
                         
                         result = run_analysis_sync(video_id=1, user_id=1, video=mock_video)
                         
-                        assert result is False
\ No newline at end of file
+                        assert result is False
+
+
+class TestKeypointFrames:
+    """Frame-range reads from the chunked keypoint store"""
+    
+    @pytest.fixture
+    def mock_db(self):
+        db = Mock(spec=Session)
+        query = Mock()
+        query.filter.return_value = query
+        query.first.return_value = Mock(id=1, user_id=1)
+        db.query.return_value = query
+        return db
+    
+    @pytest.fixture
+    def mock_user(self):
+        return Mock(id=1, role=models.UserRole.LEARNER)
+    
+    @pytest.mark.asyncio
+    async def test_range_and_subset(self, mock_db, mock_user):
+        import numpy as np
+        frames = np.zeros((10, 2, 3), dtype=np.float32)
+        
+        with patch('services.keypoint_store.total_frames', return_value=500), \
+             patch('services.keypoint_store.read_keypoints', return_value=frames) as mock_read:
+            result = await get_keypoint_frames(
+                video_id=1, start=100, end=110, keypoints="5,6", current_user=mock_user, db=mock_db
+            )
+        
+        mock_read.assert_called_once_with(mock_db, 1, 100, 110, [5, 6])
+        assert result["keypoints"] == [5, 6]
+        assert result["total_frames"] == 500
+        assert len(result["frames"]) == 10
+    
+    @pytest.mark.asyncio
+    async def test_end_defaults_to_last_frame_and_is_capped(self, mock_db, mock_user):
+        import numpy as np
+        
+        with patch('services.keypoint_store.total_frames', return_value=20000), \
+             patch('services.keypoint_store.MAX_KEYPOINT_RANGE_FRAMES', 5000), \
+             patch('services.keypoint_store.read_keypoints',
+                   return_value=np.zeros((0, 17, 3), dtype=np.float32)) as mock_read:
+            result = await get_keypoint_frames(
+                video_id=1, start=0, end=None, keypoints=None, current_user=mock_user, db=mock_db
+            )
+        
+        assert mock_read.call_args[0][2:4] == (0, 5000)
+        assert result["end"] == 5000
+    
+    @pytest.mark.asyncio
+    async def test_bad_keypoints_parameter(self, mock_db, mock_user):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_keypoint_frames(
+                video_id=1, start=0, end=None, keypoints="a,b", current_user=mock_user, db=mock_db
+            )
+        
+        assert exc_info.value.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_video_without_keypoints(self, mock_db, mock_user):
+        with patch('services.keypoint_store.total_frames', return_value=0):
+            with pytest.raises(HTTPException) as exc_info:
+                await get_keypoint_frames(
+                    video_id=1, start=0, end=None, keypoints=None, current_user=mock_user, db=mock_db
+                )
+        
+        assert exc_info.value.status_code == 404
+
+
+class TestProgress:
+    """Progress over time from the materialized metrics"""
+    
+    @pytest.fixture
+    def mock_db(self):
+        db = Mock(spec=Session)
+        query = Mock()
+        query.filter.return_value = query
+        query.first.return_value = None
+        db.query.return_value = query
+        return db
+    
+    @pytest.mark.asyncio
+    async def test_own_progress(self, mock_db):
+        sessions = [{"video_id": 1, "brocade_type": "FIRST", "overall_smoothness": 0.8}]
+        brocades = [{"brocade_type": "FIRST", "metrics": {}}]
+        
+        with patch('services.analysis_metrics.progress_sessions', return_value=sessions) as mock_sessions, \
+             patch('services.analysis_metrics.progress_by_brocade', return_value=brocades), \
+             patch('services.analysis_metrics.add_trend') as mock_trend:
+            result = await get_progress(
+                user_id=None, brocade_type="FIRST", joint="left_knee",
+                current_user=Mock(id=3, role=models.UserRole.LEARNER), db=mock_db
+            )
+        
+        mock_sessions.assert_called_once_with(mock_db, 3, "FIRST", "left_knee")
+        mock_trend.assert_called_once_with(brocades, sessions)
+        assert result["user_id"] == 3
+        assert result["sessions"] == sessions
+        mock_db.query.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_learner_cannot_view_others(self, mock_db):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_progress(
+                user_id=4, brocade_type=None, joint=None,
+                current_user=Mock(id=3, role=models.UserRole.LEARNER), db=mock_db
+            )
+        
+        assert exc_info.value.status_code == 403
+    
+    @pytest.mark.asyncio
+    async def test_master_views_accepted_learner(self, mock_db):
+        mock_db.query.return_value.first.return_value = (1,)
+        
+        with patch('services.analysis_metrics.progress_sessions', return_value=[]) as mock_sessions, \
+             patch('services.analysis_metrics.progress_by_brocade', return_value=[]):
+            result = await get_progress(
+                user_id=4, brocade_type=None, joint=None,
+                current_user=Mock(id=3, role=models.UserRole.MASTER), db=mock_db
+            )
+        
+        mock_sessions.assert_called_once_with(mock_db, 4, None, None)
+        assert result["user_id"] == 4
+    
+    @pytest.mark.asyncio
+    async def test_master_without_relationship(self, mock_db):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_progress(
+                user_id=4, brocade_type=None, joint=None,
+                current_user=Mock(id=3, role=models.UserRole.MASTER), db=mock_db
+            )
+        
+        assert exc_info.value.status_code == 403
+    
+    def test_route_declared_before_video_id(self):
+        paths = [route.path for route in router.routes]
+        
+        assert paths.index("/api/analysis/progress") < paths.index("/api/analysis/{video_id}")
+
+
+class TestStageTimings:
+    """Per-stage timing spans of analysis jobs"""
+    
+    @pytest.fixture
+    def mock_db(self):
+        db = Mock(spec=Session)
+        query = Mock()
+        query.filter.return_value = query
+        query.first.return_value = Mock(id=1)
+        db.query.return_value = query
+        return db
+    
+    @pytest.fixture
+    def runs(self):
+        return [
+            {"run_id": "new", "started_at": "2024-01-02T00:00:00", "total_seconds": 30.0, "failed": False},
+            {"run_id": "old", "started_at": "2024-01-01T00:00:00", "total_seconds": 40.0, "failed": True}
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_latest_run(self, mock_db, runs):
+        spans = [{"stage": "mmpose", "seconds": 25.0}]
+        
+        with patch('services.stage_timings.list_runs', return_value=runs), \
+             patch('services.stage_timings.load_run', return_value=spans) as mock_load:
+            result = await get_stage_timings(video_id=1, run_id=None, current_user=Mock(id=1), db=mock_db)
+        
+        mock_load.assert_called_once_with(mock_db, 1, "new")
+        assert result["run_id"] == "new"
+        assert result["total_seconds"] == 30.0
+        assert result["spans"] == spans
+        assert len(result["runs"]) == 2
+    
+    @pytest.mark.asyncio
+    async def test_specific_run(self, mock_db, runs):
+        with patch('services.stage_timings.list_runs', return_value=runs), \
+             patch('services.stage_timings.load_run', return_value=[]) as mock_load:
+            result = await get_stage_timings(video_id=1, run_id="old", current_user=Mock(id=1), db=mock_db)
+        
+        mock_load.assert_called_once_with(mock_db, 1, "old")
+        assert result["failed"] is True
+    
+    @pytest.mark.asyncio
+    async def test_unknown_run(self, mock_db, runs):
+        with patch('services.stage_timings.list_runs', return_value=runs):
+            with pytest.raises(HTTPException) as exc_info:
+                await get_stage_timings(video_id=1, run_id="missing", current_user=Mock(id=1), db=mock_db)
+        
+        assert exc_info.value.status_code == 404
+    
+    @pytest.mark.asyncio
+    async def test_video_not_owned(self, mock_db):
+        mock_db.query.return_value.first.return_value = None
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await get_stage_timings(video_id=1, run_id=None, current_user=Mock(id=2), db=mock_db)
+        
+        assert exc_info.value.status_code == 404
+    
+    @pytest.mark.asyncio
+    async def test_summary(self, mock_db):
+        stages = [{"stage": "mmpose", "parent": None, "runs": 4, "avg_seconds": 21.5}]
+        
+        with patch('services.stage_timings.stage_summary', return_value=stages) as mock_summary:
+            result = await get_stage_timing_summary(stage=None, days=7, current_user=Mock(id=1), db=mock_db)
+        
+        mock_summary.assert_called_once_with(mock_db, None, 7)
+        assert result["stages"] == stages
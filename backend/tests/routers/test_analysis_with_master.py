@@ -18,6 +18,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from routers.analysis_with_master import (
     router,
     read_json_file_azure_local,
+    read_json_files_concurrently,
     json_file_exists,
     run_extract_json_files,
     run_results_analysis,
@@ -29,11 +30,20 @@ from routers.analysis_with_master import (
     get_master_data,
     get_analysis_data_file,
     compare_analysis,
-    generate_comparison_recommendations
+    generate_comparison_recommendations,
+    read_master_json_cached
 )
 import models
+from utils.cache import master_artifact_cache
 import database
 
+@pytest.fixture(autouse=True)
+def clear_master_cache():
+    """Master files are cached per process; start every test cold"""
+    master_artifact_cache.clear()
+    yield
+    master_artifact_cache.clear()
+
 class TestLocalJSONOperations:
     """Test local JSON file operations without Azure"""
     
@@ -101,6 +111,50 @@ class TestLocalJSONOperations:
         result = await json_file_exists(1, 1, "test.json")
         
         assert result is False
+    
+    @pytest.mark.asyncio
+    @patch('routers.analysis_with_master.read_json_file_azure_local')
+    async def test_read_json_files_concurrently_partial_failure(self, mock_read_json):
+        """Test that reads overlap and a failed file is left out"""
+        import asyncio
+        
+        async def slow_read(user_id, video_id, file_name):
+            await asyncio.sleep(0.2)
+            if file_name == "missing.json":
+                raise FileNotFoundError(file_name)
+            return {"file": file_name}
+        
+        mock_read_json.side_effect = slow_read
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await read_json_files_concurrently(1, 1, ["a.json", "missing.json", "b.json"])
+        elapsed = loop.time() - started
+        
+        assert result == {"a.json": {"file": "a.json"}, "b.json": {"file": "b.json"}}
+        assert elapsed < 0.5
+    
+    @pytest.mark.asyncio
+    @patch('routers.analysis_with_master.read_json_file_azure_local')
+    async def test_read_master_json_cached_reads_once(self, mock_read_json):
+        """Test that concurrent and repeat reads of a master file hit storage once"""
+        import asyncio
+        
+        async def slow_read(user_id, video_id, file_name):
+            await asyncio.sleep(0.05)
+            return {"overallStability": 0.9}
+        
+        mock_read_json.side_effect = slow_read
+        
+        results = await asyncio.gather(*(
+            read_master_json_cached(2, 7, "master_balance.json") for _ in range(5)
+        ))
+        again = await read_master_json_cached(2, 7, "master_balance.json")
+        
+        assert all(r == {"overallStability": 0.9} for r in results)
+        assert again == {"overallStability": 0.9}
+        assert mock_read_json.call_count == 1
+        assert master_artifact_cache.stats()["hits"] >= 1
 
 class TestScriptExecution:
     """Test script execution functions"""
@@ -886,4 +940,66 @@ class TestPerformanceAndEdgeCases:
         
         # Should handle empty data gracefully
         assert isinstance(recommendations, list)
-        assert len(recommendations) >= 4  # Should have general recommendations
\ No newline at end of file
+        assert len(recommendations) >= 4  # Should have general recommendations
+class TestStoredComparisons:
+    """Test that comparisons are reused until either side's files change"""
+    
+    @pytest.fixture
+    def sqlite_db(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        
+        engine = create_engine("sqlite://")
+        database.Base.metadata.create_all(engine, tables=[
+            models.User.__table__,
+            models.VideoUpload.__table__,
+            models.VideoArtifactManifest.__table__,
+            models.ComparisonResult.__table__
+        ])
+        db = sessionmaker(bind=engine)()
+        
+        db.add_all([
+            models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                        hashed_password="x", role=models.UserRole.LEARNER),
+            models.User(id=2, username="master", email="m@test.com", name="Master",
+                        hashed_password="x", role=models.UserRole.MASTER),
+            models.VideoUpload(id=10, user_id=1, title="Mine", video_path="a.mp4", processing_status="completed"),
+            models.VideoUpload(id=20, user_id=2, title="Ref", video_path="b.mp4", processing_status="completed")
+        ])
+        db.commit()
+        yield db
+        db.close()
+    
+    def set_manifest(self, db, video_id, prefix, sha):
+        record = db.query(models.VideoArtifactManifest).filter(
+            models.VideoArtifactManifest.video_id == video_id
+        ).first() or models.VideoArtifactManifest(video_id=video_id)
+        record.set_manifest({"artifacts": [
+            {"name": f"baduanjin_analysis/{prefix}_{kind}.json", "sha256": sha}
+            for kind in ("joint_angles", "smoothness", "symmetry", "balance")
+        ]})
+        db.add(record)
+        db.commit()
+    
+    @pytest.mark.asyncio
+    @patch('routers.analysis_with_master.read_json_file_azure_local')
+    async def test_repeat_comparison_served_from_store(self, mock_read_json, sqlite_db):
+        """Test that files are read once per pair of artifact versions"""
+        mock_read_json.return_value = {"overallStability": 0.8}
+        self.set_manifest(sqlite_db, 10, "learner", "aaa")
+        self.set_manifest(sqlite_db, 20, "master", "bbb")
+        learner = sqlite_db.get(models.User, 1)
+        
+        first = await compare_analysis(user_video_id=10, master_video_id=20, current_user=learner, db=sqlite_db)
+        second = await compare_analysis(user_video_id=10, master_video_id=20, current_user=learner, db=sqlite_db)
+        
+        assert second == first
+        assert mock_read_json.call_count == 8
+        assert sqlite_db.query(models.ComparisonResult).count() == 1
+        
+        # Re-analysis of the learner video changes its hash and forces a recompute
+        self.set_manifest(sqlite_db, 10, "learner", "ccc")
+        await compare_analysis(user_video_id=10, master_video_id=20, current_user=learner, db=sqlite_db)
+        
+        assert mock_read_json.call_count == 12  # learner files only, master files are cached
+        assert sqlite_db.query(models.ComparisonResult).count() == 2
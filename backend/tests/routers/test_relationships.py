@@ -84,30 +84,12 @@ class TestMasterDiscovery:
     @pytest.mark.asyncio
     async def test_get_available_masters_success(self, mock_db, mock_learner, mock_masters):
         """Test successful retrieval of available masters"""
-        # Mock user query
-        user_query = Mock()
-        user_query.filter.return_value = user_query
-        user_query.all.return_value = mock_masters
-        
-        # Mock relationship and video count queries
-        relationship_query = Mock()
-        relationship_query.filter.return_value = relationship_query
-        relationship_query.count.return_value = 5  # 5 followers
-        
-        video_query = Mock()
-        video_query.filter.return_value = video_query
-        video_query.count.return_value = 10  # 10 videos
-        
-        def mock_query_side_effect(model):
-            if model == models.User:
-                return user_query
-            elif model == models.MasterLearnerRelationship:
-                return relationship_query
-            elif model == models.VideoUpload:
-                return video_query
-            return Mock()
-        
-        mock_db.query.side_effect = mock_query_side_effect
+        # One aggregate query returns each master with both counts
+        master_query = Mock()
+        for method in ("outerjoin", "options", "filter", "order_by"):
+            getattr(master_query, method).return_value = master_query
+        master_query.all.return_value = [(master, 5, 10) for master in mock_masters]
+        mock_db.query.return_value = master_query
         
         result = await get_available_masters(current_user=mock_learner, db=mock_db)
         
@@ -636,14 +618,13 @@ class TestVideoAnalysis:
         video_query.order_by.return_value = video_query
         video_query.all.return_value = []  # No videos to avoid path mocking complexity
         
-        def mock_query_side_effect(model):
-            if model == models.User:
+        def mock_query_side_effect(*entities):
+            if entities[0] is models.User:
                 return user_query
-            elif model == models.VideoUpload:
-                return video_query
-            return Mock()
+            return video_query
         
         mock_db.query.side_effect = mock_query_side_effect
+        video_query.outerjoin.return_value = video_query
         
         result = await get_master_analyzed_videos(master_id=2, current_user=mock_user, db=mock_db)
         
@@ -1073,29 +1054,12 @@ class TestPerformanceAndEdgeCases:
             master.profile = None
             large_masters_list.append(master)
         
-        # Mock queries
-        user_query = Mock()
-        user_query.filter.return_value = user_query
-        user_query.all.return_value = large_masters_list
-        
-        relationship_query = Mock()
-        relationship_query.filter.return_value = relationship_query
-        relationship_query.count.return_value = 5
-        
-        video_query = Mock()
-        video_query.filter.return_value = video_query
-        video_query.count.return_value = 10
-        
-        def mock_query_side_effect(model):
-            if model == models.User:
-                return user_query
-            elif model == models.MasterLearnerRelationship:
-                return relationship_query
-            elif model == models.VideoUpload:
-                return video_query
-            return Mock()
-        
-        mock_db.query.side_effect = mock_query_side_effect
+        # Mock the single aggregate query
+        master_query = Mock()
+        for method in ("outerjoin", "options", "filter", "order_by"):
+            getattr(master_query, method).return_value = master_query
+        master_query.all.return_value = [(master, 5, 10) for master in large_masters_list]
+        mock_db.query.return_value = master_query
         
         result = await get_available_masters(current_user=mock_user, db=mock_db)
         
@@ -1124,4 +1088,207 @@ class TestPerformanceAndEdgeCases:
         for status in valid_statuses:
             # Just verify the status values are valid strings
             assert isinstance(status, str)
-            assert len(status) > 0
\ No newline at end of file
+            assert len(status) > 0
+
+class TestMasterDirectoryQueries:
+    """Query count of the masters directory against a real (sqlite) database"""
+    
+    @pytest.fixture
+    def sqlite_db(self):
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.orm import sessionmaker
+        
+        engine = create_engine("sqlite://")
+        database.Base.metadata.create_all(engine, tables=[
+            models.User.__table__,
+            models.UserProfile.__table__,
+            models.MasterLearnerRelationship.__table__,
+            models.VideoUpload.__table__
+        ])
+        statements = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        
+        db = sessionmaker(bind=engine)()
+        db.add(models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                           hashed_password="x", role=models.UserRole.LEARNER))
+        db.commit()
+        yield db, statements
+        db.close()
+    
+    def add_masters(self, db, count, first_id):
+        for master_id in range(first_id, first_id + count):
+            db.add(models.User(id=master_id, username=f"m{master_id}", email=f"m{master_id}@test.com",
+                               name=f"Master {master_id}", hashed_password="x", role=models.UserRole.MASTER))
+            db.add(models.UserProfile(user_id=master_id, bio="bio", experience_level="expert"))
+            db.add(models.MasterLearnerRelationship(master_id=master_id, learner_id=1, status="accepted"))
+            for _ in range(master_id % 3):
+                db.add(models.VideoUpload(user_id=master_id, title="v", video_path="v.mp4"))
+        db.commit()
+        db.expunge_all()
+    
+    @pytest.mark.asyncio
+    async def test_query_count_independent_of_master_count(self, sqlite_db):
+        db, statements = sqlite_db
+        learner = Mock(id=1, role=models.UserRole.LEARNER)
+        
+        self.add_masters(db, 2, first_id=10)
+        statements.clear()
+        small = await get_available_masters(current_user=learner, db=db)
+        small_queries = len(statements)
+        
+        self.add_masters(db, 25, first_id=100)
+        statements.clear()
+        large = await get_available_masters(current_user=learner, db=db)
+        
+        assert len(small) == 2 and len(large) == 27
+        assert len(statements) == small_queries == 1
+        master = next(m for m in large if m["id"] == 101)
+        assert master["followers_count"] == 1
+        assert master["videos_count"] == 2
+        assert master["profile"] == {"bio": "bio", "experience_level": "expert"}
+    
+    @pytest.mark.asyncio
+    async def test_paginated_directory(self, sqlite_db):
+        db, _statements = sqlite_db
+        learner = Mock(id=1, role=models.UserRole.LEARNER)
+        self.add_masters(db, 5, first_id=10)
+        
+        first = await get_available_masters(limit=3, current_user=learner, db=db)
+        second = await get_available_masters(cursor=first["next_cursor"], limit=3, current_user=learner, db=db)
+        
+        assert [m["id"] for m in first["items"]] == [10, 11, 12]
+        assert [m["id"] for m in second["items"]] == [13, 14]
+        assert second["next_cursor"] is None
+
+class TestAnalyzedVideoIndex:
+    """Analyzed-video listings served from video_artifact_index (sqlite)"""
+    
+    @pytest.fixture
+    def sqlite_db(self):
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.orm import sessionmaker
+        
+        engine = create_engine("sqlite://")
+        database.Base.metadata.create_all(engine, tables=[
+            models.User.__table__,
+            models.MasterLearnerRelationship.__table__,
+            models.VideoUpload.__table__,
+            models.VideoArtifactManifest.__table__,
+            models.VideoArtifactIndex.__table__
+        ])
+        statements = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        
+        db = sessionmaker(bind=engine)()
+        db.add(models.User(id=2, username="master", email="m@test.com", name="Master",
+                           hashed_password="x", role=models.UserRole.MASTER))
+        for video_id in range(1, 31):
+            db.add(models.VideoUpload(id=video_id, user_id=2, title=f"v{video_id}", video_path="v.mp4",
+                                      processing_status="completed",
+                                      upload_timestamp=datetime(2025, 1, 1, 0, video_id)))
+            # Every third video finished without any artifacts
+            has_artifacts = video_id % 3 != 0
+            db.add(models.VideoArtifactIndex(video_id=video_id, has_results_json=has_artifacts,
+                                             has_analysis_report=has_artifacts))
+        db.commit()
+        yield db, statements
+        db.close()
+    
+    @pytest.mark.asyncio
+    async def test_listing_is_one_query_without_filesystem(self, sqlite_db):
+        db, statements = sqlite_db
+        learner = Mock(id=1, role=models.UserRole.LEARNER)
+        
+        statements.clear()
+        with patch('os.path.exists') as mock_exists, patch('os.listdir') as mock_listdir:
+            result = await get_master_analyzed_videos(master_id=2, current_user=learner, db=db)
+        
+        assert len(result) == 20
+        assert result[0]["id"] == 29
+        assert result[0]["has_json"] and result[0]["has_analysis"]
+        # master lookup + the listing itself
+        assert len(statements) == 2
+        mock_exists.assert_not_called()
+        mock_listdir.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_unindexed_video_is_backfilled_once(self, sqlite_db, tmp_path, monkeypatch):
+        db, statements = sqlite_db
+        master = Mock(id=2, role=models.UserRole.MASTER)
+        db.add(models.VideoUpload(id=99, user_id=3, title="legacy", video_path="v.mp4",
+                                  processing_status="completed"))
+        db.add(models.MasterLearnerRelationship(master_id=2, learner_id=3, status="accepted"))
+        db.commit()
+        video_dir = tmp_path / "outputs_json" / "3" / "99"
+        video_dir.mkdir(parents=True)
+        (video_dir / "results_legacy.json").write_text("{}")
+        monkeypatch.chdir(tmp_path)
+        
+        with patch('services.artifact_manifest.os.getenv', return_value=None):
+            first = await get_learner_analyzed_videos(learner_id=3, current_user=master, db=db)
+        index = db.query(models.VideoArtifactIndex).filter_by(video_id=99).one()
+        
+        assert [v["id"] for v in first] == [99]
+        assert first[0]["has_json"] and not first[0]["has_analysis"]
+        assert index.results_json_name == "results_legacy.json"
+        
+        with patch('os.listdir') as mock_listdir:
+            second = await get_learner_analyzed_videos(learner_id=3, current_user=master, db=db)
+        assert second == first
+        mock_listdir.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_storage_lookups_run_off_the_event_loop(self, sqlite_db):
+        import threading
+        db, _statements = sqlite_db
+        master = Mock(id=2, role=models.UserRole.MASTER)
+        db.add(models.VideoUpload(id=99, user_id=3, title="legacy", video_path="v.mp4",
+                                  processing_status="completed"))
+        db.add(models.MasterLearnerRelationship(master_id=2, learner_id=3, status="accepted"))
+        db.commit()
+        threads = []
+        
+        def resolve(user_id, video_id):
+            threads.append(threading.current_thread())
+            return {"has_results_json": True, "has_analysis_report": False,
+                    "results_json_name": "results_legacy.json"}, None
+        
+        with patch('services.artifact_manifest.resolve_artifact_flags', side_effect=resolve):
+            result = await get_learner_analyzed_videos(learner_id=3, current_user=master, db=db)
+        
+        assert [v["id"] for v in result] == [99]
+        assert threads and threads[0] is not threading.main_thread()
+        assert db.query(models.VideoArtifactIndex).filter_by(video_id=99).one().has_results_json
+    
+    @pytest.mark.asyncio
+    async def test_cached_manifest_indexes_without_storage(self, sqlite_db):
+        db, _statements = sqlite_db
+        master = Mock(id=2, role=models.UserRole.MASTER)
+        db.add(models.VideoUpload(id=99, user_id=3, title="legacy", video_path="v.mp4",
+                                  processing_status="completed"))
+        db.add(models.MasterLearnerRelationship(master_id=2, learner_id=3, status="accepted"))
+        record = models.VideoArtifactManifest(video_id=99)
+        record.set_manifest({"artifacts": [{"name": "results_legacy.json"}]})
+        db.add(record)
+        db.commit()
+        
+        with patch('services.artifact_manifest.resolve_artifact_flags') as mock_resolve:
+            result = await get_learner_analyzed_videos(learner_id=3, current_user=master, db=db)
+        
+        assert [v["id"] for v in result] == [99]
+        mock_resolve.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_paginated_listing(self, sqlite_db):
+        db, _statements = sqlite_db
+        learner = Mock(id=1, role=models.UserRole.LEARNER)
+        
+        first = await get_master_analyzed_videos(master_id=2, limit=15, current_user=learner, db=db)
+        second = await get_master_analyzed_videos(master_id=2, cursor=first["next_cursor"], limit=15,
+                                                  current_user=learner, db=db)
+        
+        ids = [v["id"] for v in first["items"] + second["items"]]
+        assert ids == [i for i in range(30, 0, -1) if i % 3 != 0]
+        assert second["next_cursor"] is None
@@ -0,0 +1,171 @@
+# type: ignore
+# /tests/routers/test_upload_sessions.py
+# Tests for routers/upload_sessions.py: resumable chunked uploads on local storage
+
+import os
+import sys
+import hashlib
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from routers.upload_sessions import router, MIN_CHUNK_SIZE
+from auth.router import get_current_user
+import models
+import database
+
+CHUNK_SIZE = MIN_CHUNK_SIZE
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """App with only the upload session router, a sqlite DB and local storage"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("AZURE_STORAGE_CONNECTION_STRING", raising=False)
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.VideoFileInfo.__table__,
+        models.UploadSession.__table__
+    ])
+    TestingSession = sessionmaker(bind=engine)
+
+    db = TestingSession()
+    db.add(models.User(id=1, username="learner", email="l@test.com", name="Learner",
+                       hashed_password="x", role=models.UserRole.LEARNER))
+    db.commit()
+    user = db.get(models.User, 1)
+
+    def override_get_db():
+        session = TestingSession()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[database.get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    yield TestClient(app), TestingSession
+    db.close()
+
+
+def create_session(client, data):
+    response = client.post("/api/upload-sessions", json={
+        "title": "Practice",
+        "brocade_type": "FIRST",
+        "filename": "practice.mp4",
+        "content_type": "video/mp4",
+        "total_size": len(data),
+        "chunk_size": CHUNK_SIZE
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def chunk(data, index):
+    return data[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+class TestResumableUpload:
+
+    def test_interrupted_upload_resumes_byte_identical(self, client):
+        """Test that a transfer cut off part way finishes from where it stopped"""
+        test_client, TestingSession = client
+        data = os.urandom(CHUNK_SIZE * 4 + 1234)  # 5 chunks, short last chunk
+
+        created = create_session(test_client, data)
+        session_id = created["session_id"]
+        assert created["total_chunks"] == 5
+
+        # First attempt: two chunks out of order, then the connection drops mid-chunk
+        for index in (3, 0):
+            response = test_client.put(f"/api/upload-sessions/{session_id}/chunks/{index}", content=chunk(data, index))
+            assert response.status_code == 200
+        response = test_client.put(
+            f"/api/upload-sessions/{session_id}/chunks/1",
+            content=chunk(data, 1)[:1000]
+        )
+        assert response.status_code == 400
+
+        # Committing now is refused
+        response = test_client.post(f"/api/upload-sessions/{session_id}/commit")
+        assert response.status_code == 409
+
+        # The client asks what arrived and only sends the rest, in parallel
+        status = test_client.get(f"/api/upload-sessions/{session_id}").json()
+        assert status["received_chunks"] == [0, 3]
+        assert status["missing_chunks"] == [1, 2, 4]
+        assert status["received_ranges"] == [
+            [0, CHUNK_SIZE - 1],
+            [3 * CHUNK_SIZE, 4 * CHUNK_SIZE - 1]
+        ]
+
+        def send(index):
+            return test_client.put(
+                f"/api/upload-sessions/{session_id}/chunks/{index}",
+                content=chunk(data, index),
+                headers={"X-Chunk-Sha256": hashlib.sha256(chunk(data, index)).hexdigest()}
+            ).status_code
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            assert list(pool.map(send, status["missing_chunks"])) == [200, 200, 200]
+
+        response = test_client.post(f"/api/upload-sessions/{session_id}/commit")
+        assert response.status_code == 200
+        committed = response.json()
+
+        with open(committed["video_path"], "rb") as f:
+            assert f.read() == data
+        assert committed["sha256"] == hashlib.sha256(data).hexdigest()
+        assert not os.path.exists(os.path.join("uploads", "sessions", session_id))
+
+        db = TestingSession()
+        file_info = db.query(models.VideoFileInfo).filter(
+            models.VideoFileInfo.video_id == committed["id"]
+        ).first()
+        assert file_info.size_bytes == len(data)
+        db.close()
+
+    def test_chunk_checksum_mismatch_rejected(self, client):
+        test_client, _ = client
+        data = os.urandom(CHUNK_SIZE)
+        session_id = create_session(test_client, data)["session_id"]
+
+        response = test_client.put(
+            f"/api/upload-sessions/{session_id}/chunks/0",
+            content=data,
+            headers={"X-Chunk-Sha256": "0" * 64}
+        )
+
+        assert response.status_code == 400
+        status = test_client.get(f"/api/upload-sessions/{session_id}").json()
+        assert status["received_chunks"] == []
+
+    def test_oversized_session_rejected(self, client):
+        test_client, _ = client
+
+        response = test_client.post("/api/upload-sessions", json={
+            "title": "Huge",
+            "brocade_type": "FIRST",
+            "filename": "huge.mp4",
+            "total_size": 10 * 1024 * 1024 * 1024
+        })
+
+        assert response.status_code == 400
+        assert "File too large" in response.json()["detail"]
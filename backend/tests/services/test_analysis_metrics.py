@@ -0,0 +1,173 @@
+# type: ignore
+# /tests/services/test_analysis_metrics.py
+# Unit tests for services/analysis_metrics.py (materialized metrics, sqlite)
+
+import os
+import sys
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import models
+import database
+from services.analysis_metrics import (
+    metrics_from_files,
+    materialize_metrics,
+    progress_sessions,
+    progress_by_brocade,
+    add_trend
+)
+
+
+def write_metric_files(directory, performer="learner", smoothness=0.9, symmetry=0.8, stability=0.85, knee=(90, 170)):
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        "smoothness": {"overallSmoothness": smoothness, "jerkMetrics": {}},
+        "symmetry": {"overallSymmetry": symmetry, "symmetryScores": {}},
+        "balance": {"overallStability": stability, "balanceMetrics": {}},
+        "joint_angles": {"rangeOfMotion": {
+            "left_knee": {"min": knee[0], "max": knee[1], "optimal": 160},
+            "right_elbow": {"min": 100, "max": 150, "optimal": 135}
+        }}
+    }
+    for kind, data in files.items():
+        with open(os.path.join(directory, f"{performer}_{kind}.json"), "w") as f:
+            json.dump(data, f)
+
+
+@pytest.fixture
+def sqlite_db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.AnalysisMetrics.__table__,
+        models.AnalysisJointRange.__table__
+    ])
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    db = sessionmaker(bind=engine)()
+    yield db, statements
+    db.close()
+
+
+def add_video(db, video_id, brocade_type="FIRST", day=1, user_id=1):
+    video = models.VideoUpload(id=video_id, user_id=user_id, title=f"Session {video_id}",
+                               video_path="v.mp4", brocade_type=brocade_type,
+                               upload_timestamp=datetime(2024, 1, day))
+    db.add(video)
+    db.commit()
+    return video
+
+
+class TestMaterialize:
+    """Copying the extracted JSON metrics into typed columns"""
+
+    def test_metrics_from_files(self):
+        headline, joints = metrics_from_files({
+            "smoothness": {"overallSmoothness": 0.91},
+            "joint_angles": {"rangeOfMotion": {"left_knee": {"min": 90, "max": 170, "optimal": 160}}}
+        })
+
+        assert headline["overall_smoothness"] == 0.91
+        assert headline["overall_symmetry"] is None
+        assert headline["mean_range_of_motion"] == 80
+        assert joints == [{"joint": "left_knee", "min_angle": 90.0, "max_angle": 170.0,
+                           "optimal_angle": 160.0, "range_of_motion": 80.0}]
+
+    def test_materialize_upserts(self, sqlite_db, tmp_path):
+        db, _ = sqlite_db
+        video = add_video(db, 1)
+        write_metric_files(str(tmp_path), smoothness=0.8)
+        materialize_metrics(db, video, str(tmp_path))
+        write_metric_files(str(tmp_path), smoothness=0.9, knee=(80, 175))
+        record = materialize_metrics(db, video, str(tmp_path))
+
+        assert db.query(models.AnalysisMetrics).count() == 1
+        assert record.overall_smoothness == 0.9
+        assert record.performer_type == "learner"
+        assert record.brocade_type == "FIRST"
+        assert record.analyzed_at == datetime(2024, 1, 1)
+        assert record.mean_range_of_motion == 72.5
+        ranges = {r.joint: r.range_of_motion for r in db.query(models.AnalysisJointRange).all()}
+        assert ranges == {"left_knee": 95.0, "right_elbow": 50.0}
+
+    def test_master_files(self, sqlite_db, tmp_path):
+        db, _ = sqlite_db
+        video = add_video(db, 1)
+        write_metric_files(str(tmp_path), performer="master")
+
+        assert materialize_metrics(db, video, str(tmp_path)).performer_type == "master"
+
+    def test_no_files(self, sqlite_db, tmp_path):
+        db, _ = sqlite_db
+        video = add_video(db, 1)
+
+        assert materialize_metrics(db, video, str(tmp_path)) is None
+        assert db.query(models.AnalysisMetrics).count() == 0
+
+
+class TestProgress:
+    """Trend queries over the materialized metrics"""
+
+    @pytest.fixture
+    def history(self, sqlite_db, tmp_path):
+        db, statements = sqlite_db
+        sessions = [
+            (1, "FIRST", 3, 0.70, (100, 160)),
+            (2, "FIRST", 1, 0.60, (100, 150)),
+            (3, "SECOND", 2, 0.80, (90, 170)),
+            (4, "FIRST", 5, 0.90, (95, 175))
+        ]
+        for video_id, brocade, day, smoothness, knee in sessions:
+            video = add_video(db, video_id, brocade, day)
+            directory = str(tmp_path / str(video_id))
+            write_metric_files(directory, smoothness=smoothness, knee=knee)
+            materialize_metrics(db, video, directory)
+        # Another user's session must not show up
+        other = add_video(db, 5, "FIRST", 2, user_id=2)
+        write_metric_files(str(tmp_path / "5"), smoothness=0.1)
+        materialize_metrics(db, other, str(tmp_path / "5"))
+        statements.clear()
+        return db, statements
+
+    def test_sessions_in_time_order(self, history):
+        db, statements = history
+        sessions = progress_sessions(db, 1, "FIRST", joint="left_knee")
+
+        assert [s["video_id"] for s in sessions] == [2, 1, 4]
+        assert [s["overall_smoothness"] for s in sessions] == [0.6, 0.7, 0.9]
+        assert sessions[0]["joint"]["range_of_motion"] == 50.0
+        assert sessions[0]["title"] == "Session 2"
+        assert len(statements) == 1
+
+    def test_aggregates_per_brocade(self, history):
+        db, statements = history
+        brocades = progress_by_brocade(db, 1)
+
+        assert [b["brocade_type"] for b in brocades] == ["FIRST", "SECOND"]
+        first = brocades[0]
+        assert first["sessions"] == 3
+        assert first["first_at"] == datetime(2024, 1, 1).isoformat()
+        assert first["metrics"]["overall_smoothness"]["avg"] == pytest.approx(0.7333, abs=1e-4)
+        assert first["metrics"]["overall_smoothness"]["min"] == 0.6
+        assert first["metrics"]["overall_smoothness"]["max"] == 0.9
+        assert len(statements) == 1
+
+    def test_trend(self, history):
+        db, _ = history
+        sessions = progress_sessions(db, 1)
+        brocades = progress_by_brocade(db, 1)
+        add_trend(brocades, sessions)
+
+        smoothness = brocades[0]["metrics"]["overall_smoothness"]
+        assert smoothness["first"] == 0.6
+        assert smoothness["latest"] == 0.9
+        assert smoothness["change"] == pytest.approx(0.3)
+        assert brocades[1]["metrics"]["overall_smoothness"]["change"] == 0
@@ -0,0 +1,174 @@
+# type: ignore
+# /tests/services/test_artifact_manifest.py
+# Unit tests for services/artifact_manifest.py core functions
+
+import os
+import sys
+import json
+import hashlib
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy.orm import Session
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import models
+from services.artifact_manifest import (
+    build_manifest,
+    write_manifest,
+    load_manifest,
+    artifacts_in,
+    artifact_flags,
+    manifest_blob_path,
+    MANIFEST_FILENAME
+)
+
+
+@pytest.fixture
+def outputs_dir(tmp_path):
+    """A fake outputs_json/{user_id}/{video_id} directory"""
+    video_dir = tmp_path / "outputs_json" / "2" / "18"
+    analysis_dir = video_dir / "baduanjin_analysis"
+    analysis_dir.mkdir(parents=True)
+
+    (video_dir / "results_abc.json").write_text(json.dumps({"frames": []}))
+    (video_dir / "abc.mp4").write_bytes(b"\x00" * 2048)
+    (video_dir / "analysis_log.txt").write_text("ignored")
+    (video_dir / "preprocessed_abc.mp4").write_bytes(b"ignored")
+    (analysis_dir / "analysis_report.txt").write_text("Key Poses\n")
+    (analysis_dir / "joint_angles.png").write_bytes(b"png")
+    return video_dir
+
+
+def mock_db_with_record(record):
+    db = Mock(spec=Session)
+    query = Mock()
+    query.filter.return_value = query
+    query.first.return_value = record
+    db.query.return_value = query
+    return db
+
+
+class TestBuildManifest:
+
+    def test_build_manifest_lists_artifacts(self, outputs_dir):
+        """Test that every pipeline artifact is listed with size, hash and type"""
+        manifest = build_manifest(2, 18, str(outputs_dir))
+        names = [a["name"] for a in manifest["artifacts"]]
+
+        assert names == [
+            "abc.mp4",
+            "baduanjin_analysis/analysis_report.txt",
+            "baduanjin_analysis/joint_angles.png",
+            "results_abc.json"
+        ]
+
+        video = manifest["artifacts"][0]
+        assert video["size"] == 2048
+        assert video["sha256"] == hashlib.sha256(b"\x00" * 2048).hexdigest()
+        assert video["content_type"] == "video/mp4"
+        assert video["container"] == "videos"
+        assert video["blob_path"] == "outputs_json/2/18/abc.mp4"
+
+    def test_build_manifest_missing_directory(self, tmp_path):
+        """Test that a missing directory gives an empty manifest"""
+        manifest = build_manifest(1, 1, str(tmp_path / "missing"))
+
+        assert manifest["artifacts"] == []
+        assert manifest["video_id"] == 1
+
+    def test_artifacts_in_prefix(self, outputs_dir):
+        """Test filtering manifest entries by prefix"""
+        manifest = build_manifest(2, 18, str(outputs_dir))
+
+        analysis = artifacts_in(manifest, "baduanjin_analysis/")
+
+        assert len(analysis) == 2
+        assert artifacts_in(None, "baduanjin_analysis/") == []
+
+    def test_artifact_flags(self, outputs_dir):
+        """Test the index flags derived from a manifest"""
+        manifest = build_manifest(2, 18, str(outputs_dir))
+
+        assert artifact_flags(manifest) == {
+            "has_results_json": True,
+            "has_analysis_report": True,
+            "results_json_name": "results_abc.json"
+        }
+        assert artifact_flags(None) == {
+            "has_results_json": False,
+            "has_analysis_report": False,
+            "results_json_name": None
+        }
+
+
+class TestWriteAndLoadManifest:
+
+    @patch('services.artifact_manifest.os.getenv', return_value=None)
+    def test_write_manifest_saves_file_and_db_copy(self, mock_getenv, outputs_dir):
+        """Test that the manifest is written locally and cached in the DB"""
+        db = mock_db_with_record(None)
+
+        manifest = write_manifest(db, 2, 18, str(outputs_dir))
+
+        local_manifest = json.loads((outputs_dir / MANIFEST_FILENAME).read_text())
+        assert local_manifest["artifacts"] == manifest["artifacts"]
+
+        saved, index = [call[0][0] for call in db.add.call_args_list]
+        assert isinstance(saved, models.VideoArtifactManifest)
+        assert json.loads(saved.manifest)["video_id"] == 18
+        assert isinstance(index, models.VideoArtifactIndex)
+        assert index.has_results_json and index.has_analysis_report
+        assert index.results_json_name == "results_abc.json"
+        db.commit.assert_called_once()
+
+    @patch('services.artifact_manifest.os.getenv')
+    def test_load_manifest_prefers_db_copy(self, mock_getenv):
+        """Test that a cached DB copy is used without touching storage"""
+        record = models.VideoArtifactManifest(video_id=18)
+        record.set_manifest({"video_id": 18, "artifacts": []})
+        db = mock_db_with_record(record)
+
+        manifest = load_manifest(db, 2, 18)
+
+        assert manifest == {"video_id": 18, "artifacts": []}
+        mock_getenv.assert_not_called()
+
+    @patch('services.artifact_manifest.os.getenv', return_value=None)
+    @patch('services.artifact_manifest.os.path.exists', return_value=False)
+    def test_load_manifest_not_found(self, mock_exists, mock_getenv):
+        """Test that a video without a manifest returns None"""
+        db = mock_db_with_record(None)
+
+        assert load_manifest(db, 2, 18) is None
+
+    def test_load_manifest_reads_blob_through_shared_client(self):
+        """Test that the manifest blob is read with the process-wide client and cached in the DB"""
+        db = mock_db_with_record(None)
+        data = json.dumps({"video_id": 18, "artifacts": []}).encode("utf-8")
+
+        with patch('services.artifact_manifest.download_blob_bytes', return_value=data) as mock_download:
+            manifest = load_manifest(db, 2, 18)
+
+        assert manifest == {"video_id": 18, "artifacts": []}
+        mock_download.assert_called_once_with("results", "outputs_json/2/18/manifest.json")
+        db.commit.assert_called_once()
+
+    def test_upload_uses_shared_client(self):
+        """Test that the manifest upload goes through get_blob_service_client"""
+        pytest.importorskip("azure.storage.blob")
+        from services.artifact_manifest import upload_manifest_to_azure
+        client = Mock()
+        client.get_blob_client.return_value.url = "https://account/results/outputs_json/2/18/manifest.json"
+
+        with patch('services.artifact_manifest.get_blob_service_client', return_value=client):
+            url = upload_manifest_to_azure(2, 18, {"artifacts": []})
+
+        assert url.endswith("manifest.json")
+        client.get_blob_client.assert_called_once_with(container="results", blob="outputs_json/2/18/manifest.json")
+        client.get_blob_client.return_value.upload_blob.assert_called_once()
+
+    def test_manifest_blob_path(self):
+        """Test the manifest lives beside the video's other results"""
+        assert manifest_blob_path(2, 18) == "outputs_json/2/18/manifest.json"
@@ -0,0 +1,76 @@
+# type: ignore
+# /tests/services/test_blob_storage.py
+# Unit tests for services/blob_storage.py core functions
+
+import os
+import sys
+import time
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from services import blob_storage
+from services.blob_storage import (
+    get_blob_service_client,
+    reset_blob_service_client,
+    download_blob_bytes_async
+)
+from utils.metrics import count_storage_call
+
+
+@pytest.fixture(autouse=True)
+def fresh_client():
+    reset_blob_service_client()
+    yield
+    reset_blob_service_client()
+
+
+class TestBlobServiceClient:
+
+    @patch('services.blob_storage.os.getenv', return_value=None)
+    def test_no_connection_string(self, mock_getenv):
+        """Test that no client is built when Azure is not configured"""
+        assert get_blob_service_client() is None
+
+    @patch('azure.storage.blob.BlobServiceClient.from_connection_string')
+    @patch('services.blob_storage.os.getenv', return_value="conn")
+    def test_client_is_shared(self, mock_getenv, mock_from_conn):
+        """Test that the client is built once and reused"""
+        first = get_blob_service_client()
+        second = get_blob_service_client()
+
+        assert first is second
+        mock_from_conn.assert_called_once_with("conn", raw_response_hook=count_storage_call)
+
+
+class TestAsyncDownload:
+
+    @pytest.mark.asyncio
+    @patch('services.blob_storage.download_blob_bytes')
+    async def test_download_runs_off_event_loop(self, mock_download):
+        """Test that blocking reads overlap instead of running back to back"""
+        def blocking_read(container, blob_path, timeout):
+            time.sleep(0.2)
+            return blob_path.encode()
+
+        mock_download.side_effect = blocking_read
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(
+            download_blob_bytes_async("results", f"blob_{i}") for i in range(4)
+        ))
+
+        assert results == [b"blob_0", b"blob_1", b"blob_2", b"blob_3"]
+        assert time.monotonic() - started < 0.6
+
+    @pytest.mark.asyncio
+    @patch('services.blob_storage.download_blob_bytes')
+    async def test_download_timeout(self, mock_download):
+        """Test that a slow read raises TimeoutError"""
+        mock_download.side_effect = lambda container, blob_path, timeout: time.sleep(0.5)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await download_blob_bytes_async("results", "slow.json", timeout=0.1)
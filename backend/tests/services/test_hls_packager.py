@@ -0,0 +1,128 @@
+# type: ignore
+# /tests/services/test_hls_packager.py
+# Unit tests for services/hls_packager.py core functions
+
+import os
+import sys
+import pytest
+from unittest.mock import Mock, patch
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from services.hls_packager import (
+    HLS_FILE_PATTERN,
+    select_renditions,
+    build_hls_command,
+    package_hls,
+    sign_playlist,
+    read_published_file
+)
+
+
+class TestRenditionSelection:
+
+    def test_hd_source_gets_all_renditions(self):
+        assert [r["name"] for r in select_renditions(1080)] == ["360p", "540p", "720p"]
+
+    def test_renditions_never_upscale(self):
+        assert [r["name"] for r in select_renditions(540)] == ["360p", "540p"]
+
+    def test_small_source_gets_one_rendition_at_own_height(self):
+        renditions = select_renditions(241)
+        assert len(renditions) == 1
+        assert renditions[0]["height"] == 240
+
+
+class TestBuildCommand:
+
+    def test_command_with_audio(self):
+        cmd = build_hls_command("in.mp4", "out", select_renditions(720), has_audio=True, segment_seconds=4)
+
+        assert cmd[cmd.index("-filter_complex") + 1].startswith("[0:v]split=3[v0][v1][v2]")
+        assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,a:0,name:360p v:1,a:1,name:540p v:2,a:2,name:720p"
+        assert cmd.count("0:a:0") == 3
+        assert cmd[cmd.index("-hls_time") + 1] == "4"
+        assert cmd[-1] == os.path.join("out", "%v", "index.m3u8")
+
+    def test_command_without_audio(self):
+        """Test that silent sources (most analyzed outputs) map no audio"""
+        cmd = build_hls_command("in.mp4", "out", select_renditions(540), has_audio=False)
+
+        assert "0:a:0" not in cmd
+        assert "-c:a" not in cmd
+        assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,name:360p v:1,name:540p"
+
+
+class TestPackageHls:
+
+    @patch('services.hls_packager.shutil.which', return_value=None)
+    def test_skipped_without_ffmpeg(self, mock_which, tmp_path):
+        assert package_hls("in.mp4", str(tmp_path / "hls")) is None
+
+    @patch('services.hls_packager.probe_video', return_value={"height": 540, "has_audio": False})
+    @patch('services.hls_packager.shutil.which', return_value="/usr/bin/ffmpeg")
+    def test_package_swapped_in_on_success(self, mock_which, mock_probe, tmp_path):
+        output_dir = tmp_path / "hls" / "original"
+        output_dir.mkdir(parents=True)
+        (output_dir / "stale.ts").write_bytes(b"old")
+
+        def fake_ffmpeg(cmd, **kwargs):
+            build_dir = os.path.dirname(os.path.dirname(cmd[-1]))
+            with open(os.path.join(build_dir, "master.m3u8"), "w") as f:
+                f.write("#EXTM3U\n360p/index.m3u8\n")
+            return Mock(returncode=0, stderr="")
+
+        with patch('services.hls_packager.subprocess.run', side_effect=fake_ffmpeg):
+            renditions = package_hls("in.mp4", str(output_dir))
+
+        assert renditions == ["360p", "540p"]
+        assert (output_dir / "master.m3u8").exists()
+        assert not (output_dir / "stale.ts").exists()
+        assert not os.path.exists(f"{output_dir}.tmp")
+
+    @patch('services.hls_packager.probe_video', return_value={"height": 720, "has_audio": True})
+    @patch('services.hls_packager.shutil.which', return_value="/usr/bin/ffmpeg")
+    def test_failed_encode_keeps_previous_package(self, mock_which, mock_probe, tmp_path):
+        output_dir = tmp_path / "hls"
+        output_dir.mkdir()
+        (output_dir / "master.m3u8").write_text("previous")
+
+        with patch('services.hls_packager.subprocess.run', return_value=Mock(returncode=1, stderr="boom")):
+            assert package_hls("in.mp4", str(output_dir)) is None
+
+        assert (output_dir / "master.m3u8").read_text() == "previous"
+        assert not os.path.exists(f"{output_dir}.tmp")
+
+
+class TestPlaylists:
+
+    def test_sign_playlist_rewrites_uri_lines_only(self):
+        playlist = "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=880000\n360p/index.m3u8\n#EXT-X-ENDLIST\n"
+
+        signed = sign_playlist(playlist, "sig=abc")
+
+        assert signed.splitlines() == [
+            "#EXTM3U",
+            "#EXT-X-STREAM-INF:BANDWIDTH=880000",
+            "360p/index.m3u8?sig=abc",
+            "#EXT-X-ENDLIST"
+        ]
+
+    def test_file_pattern_rejects_other_paths(self):
+        assert HLS_FILE_PATTERN.match("master.m3u8")
+        assert HLS_FILE_PATTERN.match("540p/index.m3u8")
+        assert HLS_FILE_PATTERN.match("540p/seg_00012.ts")
+        assert not HLS_FILE_PATTERN.match("../manifest.json")
+        assert not HLS_FILE_PATTERN.match("540p/../../x.ts")
+
+    @pytest.mark.asyncio
+    async def test_read_published_file_prefers_local_disk(self, tmp_path):
+        (tmp_path / "360p").mkdir()
+        (tmp_path / "360p" / "seg_00000.ts").write_bytes(b"segment")
+
+        with patch('services.hls_packager.download_blob_bytes_async') as mock_download:
+            content = await read_published_file(str(tmp_path), "360p/seg_00000.ts")
+
+        assert content == b"segment"
+        mock_download.assert_not_called()
@@ -0,0 +1,262 @@
+# type: ignore
+# /tests/services/test_job_queue.py
+# Unit tests for services/job_queue.py (analysis job queue and workers, sqlite)
+
+import os
+import sys
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import models
+import database
+from services.job_queue import (
+    QueueFullError,
+    AnalysisWorkerPool,
+    submit_job,
+    queue_position,
+    claim_job,
+    heartbeat,
+    requeue_stale_jobs,
+    cancel_queued_job,
+    latest_job
+)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file database, so worker threads get their own connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.AnalysisJob.__table__
+    ])
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    for video_id in range(1, 7):
+        db.add(models.VideoUpload(id=video_id, user_id=1 + video_id % 2, title=f"Video {video_id}",
+                                  video_path="v.mp4", brocade_type="FIRST", processing_status="processing"))
+    db.commit()
+    db.close()
+    yield Session
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def video(db, video_id):
+    return db.query(models.VideoUpload).filter(models.VideoUpload.id == video_id).first()
+
+
+class TestSubmit:
+    """Idempotent submission and admission control"""
+
+    def test_submit_is_idempotent(self, db):
+        job, created = submit_job(db, video(db, 1))
+        again, created_again = submit_job(db, video(db, 1))
+
+        assert created is True
+        assert created_again is False
+        assert again.id == job.id
+        assert job.status == "queued"
+        assert db.query(models.AnalysisJob).count() == 1
+
+    def test_finished_video_can_be_resubmitted(self, db):
+        job, _ = submit_job(db, video(db, 1))
+        job.status = "completed"
+        db.commit()
+
+        second, created = submit_job(db, video(db, 1))
+
+        assert created is True
+        assert second.id != job.id
+        assert latest_job(db, 1).id == second.id
+
+    def test_one_active_job_per_video_in_database(self, db):
+        submit_job(db, video(db, 1))
+        db.add(models.AnalysisJob(video_id=1, user_id=2, status="queued"))
+
+        with pytest.raises(IntegrityError):
+            db.commit()
+
+    def test_queue_limit(self, db):
+        with patch('services.job_queue.ANALYSIS_QUEUE_LIMIT', 2):
+            submit_job(db, video(db, 1))
+            submit_job(db, video(db, 2))
+
+            with pytest.raises(QueueFullError):
+                submit_job(db, video(db, 3))
+
+    def test_user_limit(self, db):
+        with patch('services.job_queue.ANALYSIS_USER_QUEUE_LIMIT', 2):
+            submit_job(db, video(db, 1))
+            submit_job(db, video(db, 3))
+
+            with pytest.raises(QueueFullError):
+                submit_job(db, video(db, 5))
+            # Another user is not affected
+            assert submit_job(db, video(db, 2))[1] is True
+
+    def test_cancel_queued_job(self, db):
+        job, _ = submit_job(db, video(db, 1))
+
+        assert cancel_queued_job(db, 1) is True
+        db.commit()
+        db.refresh(job)
+        assert job.status == "cancelled"
+        assert cancel_queued_job(db, 1) is False
+
+
+class TestClaim:
+    """Claim order, queue positions and heartbeats"""
+
+    def test_priority_then_age(self, db):
+        first, _ = submit_job(db, video(db, 1))
+        second, _ = submit_job(db, video(db, 2))
+        urgent, _ = submit_job(db, video(db, 3), priority=1)
+
+        assert [queue_position(db, job) for job in (first, second, urgent)] == [2, 3, 1]
+        assert claim_job(db, "w1").id == urgent.id
+        assert claim_job(db, "w1").id == first.id
+
+    def test_claim_marks_running(self, db):
+        job, _ = submit_job(db, video(db, 1))
+
+        claimed = claim_job(db, "w1")
+
+        assert claimed.status == "running"
+        assert claimed.worker_id == "w1"
+        assert claimed.attempts == 1
+        assert claimed.heartbeat_at is not None
+        assert queue_position(db, claimed) == 0
+        assert claim_job(db, "w2") is None
+
+    def test_heartbeat_only_for_owner(self, db):
+        submit_job(db, video(db, 1))
+        job = claim_job(db, "w1")
+
+        assert heartbeat(db, job.id, "w1") is True
+        assert heartbeat(db, job.id, "w2") is False
+
+
+class TestRecovery:
+    """Jobs orphaned by a dead worker"""
+
+    def make_stale(self, db, job_id, attempts):
+        db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).update({
+            "heartbeat_at": datetime.utcnow() - timedelta(minutes=10), "attempts": attempts
+        })
+        db.commit()
+
+    def test_stale_job_is_requeued(self, db):
+        submit_job(db, video(db, 1))
+        job = claim_job(db, "dead")
+        self.make_stale(db, job.id, attempts=1)
+
+        assert requeue_stale_jobs(db, stale_seconds=60) == 1
+
+        db.refresh(job)
+        assert job.status == "queued"
+        assert job.worker_id is None
+        assert claim_job(db, "w2").attempts == 2
+
+    def test_stale_job_fails_after_max_attempts(self, db):
+        submit_job(db, video(db, 1))
+        job = claim_job(db, "dead")
+        self.make_stale(db, job.id, attempts=job.max_attempts)
+
+        requeue_stale_jobs(db, stale_seconds=60)
+
+        db.refresh(job)
+        assert job.status == "failed"
+        assert video(db, 1).processing_status == "failed"
+
+    def test_fresh_job_is_left_alone(self, db):
+        submit_job(db, video(db, 1))
+        claim_job(db, "w1")
+
+        assert requeue_stale_jobs(db, stale_seconds=60) == 0
+
+
+class TestWorkerPool:
+    """Running jobs through the worker pool"""
+
+    def test_run_once_success(self, session_factory, db):
+        job, _ = submit_job(db, video(db, 1))
+        ran = []
+        pool = AnalysisWorkerPool(1, session_factory, handler=lambda s, j: ran.append(j.video_id) or True)
+
+        assert pool.run_once("w1") is True
+        assert pool.run_once("w1") is False
+
+        db.refresh(job)
+        assert ran == [1]
+        assert job.status == "completed"
+        assert job.finished_at is not None
+
+    def test_handler_error_fails_job(self, session_factory, db):
+        job, _ = submit_job(db, video(db, 1))
+
+        def handler(session, claimed):
+            raise RuntimeError("MMPose crashed")
+
+        AnalysisWorkerPool(1, session_factory, handler=handler).run_once("w1")
+
+        db.refresh(job)
+        assert job.status == "failed"
+        assert "MMPose crashed" in job.error
+        db.expire_all()
+        assert video(db, 1).processing_status == "failed"
+
+    def test_result_reuse_error_fails_video(self, session_factory, db):
+        """A failing cache lookup / hash in the real handler must not leave the video processing"""
+        job, _ = submit_job(db, video(db, 1))
+
+        with patch('ml_pipeline.pose_analyzer.pipeline_fingerprint', return_value="f" * 64), \
+             patch('services.result_cache.reuse_cached_result', side_effect=OSError("hash read failed")), \
+             patch('ml_pipeline.pose_analyzer.analyze_video') as mock_analyze:
+            AnalysisWorkerPool(1, session_factory).run_once("w1")
+
+        db.refresh(job)
+        db.expire_all()
+        assert job.status == "failed"
+        assert "hash read failed" in job.error
+        assert video(db, 1).processing_status == "failed"
+        mock_analyze.assert_not_called()
+
+    def test_no_results_fails_job(self, session_factory, db):
+        job, _ = submit_job(db, video(db, 1))
+
+        AnalysisWorkerPool(1, session_factory, handler=lambda s, j: False).run_once("w1")
+
+        db.refresh(job)
+        assert job.status == "failed"
+
+    def test_threads_run_every_job_once(self, session_factory, db):
+        jobs = [submit_job(db, video(db, video_id))[0].id for video_id in range(1, 5)]
+        ran = []
+        pool = AnalysisWorkerPool(2, session_factory, handler=lambda s, j: ran.append(j.id) or True,
+                                  poll_seconds=0.05)
+
+        pool.start()
+        deadline = time.time() + 10
+        while len(ran) < len(jobs) and time.time() < deadline:
+            time.sleep(0.05)
+        pool.stop(timeout=5)
+
+        assert sorted(ran) == jobs
+        db.expire_all()
+        assert {job.status for job in db.query(models.AnalysisJob)} == {"completed"}
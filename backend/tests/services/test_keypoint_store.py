@@ -0,0 +1,143 @@
+# type: ignore
+# /tests/services/test_keypoint_store.py
+# Unit tests for services/keypoint_store.py (chunked keypoints, sqlite)
+
+import os
+import sys
+import json
+import pytest
+import numpy as np
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import models
+import database
+from services.keypoint_store import (
+    keypoints_from_mmpose,
+    decode_chunk,
+    ingest_keypoints,
+    ingest_results_json,
+    read_keypoints,
+    total_frames,
+    frames_to_json
+)
+
+
+def mmpose_frame(frame_id, offset, people=1):
+    """One instance_info entry; the second person (if any) scores lower"""
+    instances = []
+    for person in range(people):
+        instances.append({
+            "keypoints": [[offset + k, offset + k + 0.5] for k in range(17)],
+            "keypoint_scores": [0.9 - 0.5 * person] * 17,
+            "bbox": [[0, 0, 10, 10]]
+        })
+    return {"frame_id": frame_id, "instances": instances}
+
+
+@pytest.fixture
+def sqlite_db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.KeypointChunk.__table__
+    ])
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    db = sessionmaker(bind=engine)()
+    db.add(models.VideoUpload(id=1, user_id=1, title="v", video_path="v.mp4"))
+    db.commit()
+    yield db, statements
+    db.close()
+
+
+class TestMMPoseConversion:
+
+    def test_best_instance_per_frame(self):
+        """Test that the most confident person is kept and empty frames are NaN"""
+        pose_data = {"instance_info": [
+            mmpose_frame(1, 0, people=2),
+            {"frame_id": 2, "instances": []},
+            mmpose_frame(3, 100)
+        ]}
+
+        array = keypoints_from_mmpose(pose_data)
+
+        assert array.shape == (3, 17, 3)
+        assert array.dtype == np.float32
+        assert array[0, 5].tolist() == pytest.approx([5, 5.5, 0.9])
+        assert np.isnan(array[1]).all()
+        assert array[2, 0, 0] == 100
+
+
+class TestChunkedStore:
+
+    def test_round_trip_across_chunks(self, sqlite_db):
+        """Test ranges that start and end inside different chunks"""
+        db, _statements = sqlite_db
+        array = np.random.default_rng(0).random((1000, 17, 3), dtype=np.float32)
+
+        chunks = ingest_keypoints(db, 1, array, chunk_frames=128)
+
+        assert chunks == 8
+        assert total_frames(db, 1) == 1000
+        np.testing.assert_array_equal(read_keypoints(db, 1, 100, 700), array[100:700])
+        np.testing.assert_array_equal(read_keypoints(db, 1, 990, 2000), array[990:])
+
+    def test_keypoint_subset_reads_only_overlapping_chunks(self, sqlite_db):
+        db, statements = sqlite_db
+        array = np.random.default_rng(1).random((1000, 17, 3), dtype=np.float32)
+        ingest_keypoints(db, 1, array, chunk_frames=100)
+
+        statements.clear()
+        with patch('services.keypoint_store.decode_chunk', wraps=decode_chunk) as mock_decode:
+            frames = read_keypoints(db, 1, 250, 320, keypoints=[5, 6])
+
+        np.testing.assert_array_equal(frames, array[250:320][:, [5, 6]])
+        assert len(statements) == 1
+        assert [call.args[0].start_frame for call in mock_decode.call_args_list] == [200, 300]
+
+    def test_invalid_keypoint_index(self, sqlite_db):
+        db, _statements = sqlite_db
+        ingest_keypoints(db, 1, np.zeros((10, 17, 3), dtype=np.float32))
+
+        with pytest.raises(ValueError):
+            read_keypoints(db, 1, 0, 10, keypoints=[17])
+
+    def test_reingest_replaces_chunks(self, sqlite_db):
+        db, _statements = sqlite_db
+        ingest_keypoints(db, 1, np.zeros((600, 17, 3), dtype=np.float32), chunk_frames=256)
+
+        ingest_keypoints(db, 1, np.ones((100, 17, 3), dtype=np.float32), chunk_frames=256)
+
+        assert db.query(models.KeypointChunk).count() == 1
+        assert total_frames(db, 1) == 100
+
+    def test_ingest_results_json(self, sqlite_db, tmp_path):
+        """Test the bulk path from an MMPose results file"""
+        db, statements = sqlite_db
+        results_path = tmp_path / "results_v.json"
+        results_path.write_text(json.dumps({
+            "meta_info": {},
+            "instance_info": [mmpose_frame(i + 1, i) for i in range(600)]
+        }))
+
+        statements.clear()
+        chunks = ingest_results_json(db, 1, str(results_path))
+
+        inserts = [s for s in statements if s.startswith("INSERT")]
+        assert chunks == 3
+        assert len(inserts) == 1
+        assert read_keypoints(db, 1, 599, 600)[0, 0, 0] == 599
+
+    def test_frames_to_json_nulls(self):
+        array = np.array([[[1, 2, np.nan]]], dtype=np.float32)
+
+        assert frames_to_json(array) == [[[1.0, 2.0, None]]]
+
@@ -0,0 +1,127 @@
+# type: ignore
+# /tests/services/test_pi_transfer.py
+# Unit tests for services/pi_transfer.py core functions
+
+import os
+import sys
+import hashlib
+import pytest
+import httpx
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from services.pi_transfer import relay_stream, TransferVerificationError
+from services.video_upload import LocalFileWriter
+
+VIDEO = os.urandom(10 * 1024 + 17)
+URL = "https://pi.example/api/download/rec.mp4"
+
+
+class HangingPartStream(httpx.AsyncByteStream):
+    """A part body followed by the connection dropping short of Content-Length"""
+
+    def __init__(self, body):
+        self.body = body
+
+    async def __aiter__(self):
+        yield self.body
+        raise httpx.RemoteProtocolError("peer closed connection without sending complete message body")
+
+
+def pi_transport(supports_ranges=True, sha256=None, truncate=False, log=None, full_length_header=False):
+    """
+    Mock Pi download endpoint, optionally honouring Range like Flask's send_file.
+    full_length_header reproduces the Pi route overwriting a 206's
+    Content-Length with the full file size.
+    """
+    def handler(request):
+        range_header = request.headers.get("range")
+        if log is not None:
+            log.append(range_header)
+        headers = {"Accept-Ranges": "bytes"}
+        if sha256:
+            headers["X-Content-SHA256"] = sha256
+
+        if supports_ranges and range_header:
+            start, end = (int(x) for x in range_header.split("=")[1].split("-"))
+            end = min(end, len(VIDEO) - 1)
+            body = VIDEO[start:end + 1]
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(VIDEO)}"
+            if full_length_header:
+                headers["Content-Length"] = str(len(VIDEO))
+                return httpx.Response(206, stream=HangingPartStream(body), headers=headers)
+            return httpx.Response(206, content=body, headers=headers)
+
+        body = VIDEO[:-5] if truncate else VIDEO
+        headers["Content-Length"] = str(len(VIDEO))
+        return httpx.Response(200, content=body, headers=headers)
+    return httpx.MockTransport(handler)
+
+
+class TestRelayStream:
+
+    @pytest.mark.asyncio
+    async def test_ranged_relay_is_byte_identical(self, tmp_path):
+        """Test that parallel ranged parts are written back in order"""
+        log = []
+        path = str(tmp_path / "out.mp4")
+        writer = LocalFileWriter(path)
+
+        async with httpx.AsyncClient(transport=pi_transport(log=log)) as client:
+            result = await relay_stream(URL, writer, client, part_size=1024, parallelism=3)
+        await writer.commit()
+
+        with open(path, "rb") as f:
+            assert f.read() == VIDEO
+        assert result["ranged"] is True
+        assert result["sha256"] == hashlib.sha256(VIDEO).hexdigest()
+        assert len(log) == 11  # 10 full parts + 17 bytes
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_streaming_without_ranges(self, tmp_path):
+        path = str(tmp_path / "out.mp4")
+        writer = LocalFileWriter(path)
+
+        async with httpx.AsyncClient(transport=pi_transport(supports_ranges=False)) as client:
+            result = await relay_stream(URL, writer, client, part_size=1024)
+        await writer.commit()
+
+        with open(path, "rb") as f:
+            assert f.read() == VIDEO
+        assert result["ranged"] is False
+
+    @pytest.mark.asyncio
+    async def test_full_length_on_ranged_reply_falls_back(self, tmp_path):
+        """Test the Pi's 206 with the whole file's Content-Length is downloaded unranged"""
+        log = []
+        path = str(tmp_path / "out.mp4")
+        writer = LocalFileWriter(path)
+
+        async with httpx.AsyncClient(transport=pi_transport(log=log, full_length_header=True)) as client:
+            result = await relay_stream(URL, writer, client, part_size=1024)
+        await writer.commit()
+
+        with open(path, "rb") as f:
+            assert f.read() == VIDEO
+        assert result["ranged"] is False
+        assert log == ["bytes=0-1023", None]
+
+    @pytest.mark.asyncio
+    async def test_checksum_verified(self, tmp_path):
+        writer = LocalFileWriter(str(tmp_path / "out.mp4"))
+
+        async with httpx.AsyncClient(transport=pi_transport(sha256="0" * 64)) as client:
+            with pytest.raises(TransferVerificationError):
+                await relay_stream(URL, writer, client, part_size=1024)
+        writer.discard()
+
+    @pytest.mark.asyncio
+    async def test_short_body_detected(self, tmp_path):
+        """Test that a connection cut short fails instead of storing a truncated video"""
+        writer = LocalFileWriter(str(tmp_path / "out.mp4"))
+
+        async with httpx.AsyncClient(transport=pi_transport(supports_ranges=False, truncate=True)) as client:
+            with pytest.raises(TransferVerificationError):
+                await relay_stream(URL, writer, client, part_size=1024)
+        writer.discard()
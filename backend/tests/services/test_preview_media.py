@@ -0,0 +1,95 @@
+# type: ignore
+# /tests/services/test_preview_media.py
+# Unit tests for services/preview_media.py core functions
+
+import os
+import sys
+import pytest
+from unittest.mock import Mock, patch
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from services.preview_media import (
+    plan_sprite,
+    build_preview_command,
+    build_thumbnails_vtt,
+    generate_preview_media,
+    sign_thumbnails_vtt
+)
+
+
+class TestSpritePlan:
+
+    def test_short_video_uses_default_interval(self):
+        plan = plan_sprite(25.0, 1920, 1080)
+
+        assert plan["interval"] == 2
+        assert plan["count"] == 13
+        assert (plan["columns"], plan["rows"]) == (10, 2)
+        assert (plan["width"], plan["height"]) == (160, 90)
+
+    def test_long_video_caps_thumbnail_count(self):
+        plan = plan_sprite(1200.0, 1280, 720)
+
+        assert plan["interval"] == 12
+        assert plan["count"] == 100
+
+    def test_portrait_video_keeps_aspect(self):
+        assert plan_sprite(10.0, 720, 1280)["height"] == 284
+
+
+class TestPreviewOutputs:
+
+    def test_single_ffmpeg_pass_writes_poster_and_sprite(self):
+        plan = plan_sprite(25.0, 1920, 1080)
+        cmd = build_preview_command("in.mp4", "out", plan)
+
+        assert cmd.count("-i") == 1
+        assert "tile=10x2" in cmd[cmd.index("-filter_complex") + 1]
+        assert os.path.join("out", "poster.jpg") in cmd
+        assert os.path.join("out", "sprite.jpg") in cmd
+
+    def test_vtt_cues_point_at_tiles(self):
+        plan = plan_sprite(25.0, 1920, 1080)
+        lines = build_thumbnails_vtt(plan).splitlines()
+
+        assert lines[0] == "WEBVTT"
+        assert lines[2] == "00:00:00.000 --> 00:00:02.000"
+        assert lines[3] == "sprite.jpg#xywh=0,0,160,90"
+        # 11th thumbnail wraps to the second row; the last cue ends at the duration
+        assert "sprite.jpg#xywh=0,90,160,90" in lines
+        assert lines[-2] == "00:00:24.000 --> 00:00:25.000"
+
+    def test_sign_thumbnails_vtt(self):
+        vtt = "WEBVTT\n\n00:00:00.000 --> 00:00:02.000\nsprite.jpg#xywh=0,0,160,90\n"
+
+        assert "sprite.jpg?sig=abc#xywh=0,0,160,90" in sign_thumbnails_vtt(vtt, "sig=abc")
+
+
+class TestGeneratePreviewMedia:
+
+    @patch('services.preview_media.shutil.which', return_value=None)
+    def test_skipped_without_ffmpeg(self, mock_which, tmp_path):
+        assert generate_preview_media("in.mp4", str(tmp_path)) is None
+
+    @patch('services.preview_media.probe_video', return_value={"width": 1280, "height": 720, "duration": 9.0, "has_audio": False})
+    @patch('services.preview_media.shutil.which', return_value="/usr/bin/ffmpeg")
+    def test_versioned_output_replaces_previous(self, mock_which, mock_probe, tmp_path):
+        root = tmp_path / "media" / "original"
+        (root / "0123456789abcdef").mkdir(parents=True)
+
+        def fake_ffmpeg(cmd, **kwargs):
+            for path in (cmd[-8], cmd[-1]):
+                with open(path, "wb") as f:
+                    f.write(b"jpeg")
+            return Mock(returncode=0, stderr="")
+
+        with patch('services.preview_media.subprocess.run', side_effect=fake_ffmpeg) as mock_run:
+            media = generate_preview_media("in.mp4", str(root))
+
+        mock_run.assert_called_once()
+        assert media["count"] == 5
+        assert media["base_path"] == f"{root}/{media['version']}"
+        assert sorted(os.listdir(media["base_path"])) == ["poster.jpg", "sprite.jpg", "thumbnails.vtt"]
+        assert os.listdir(root) == [media["version"]]
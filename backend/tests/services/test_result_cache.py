@@ -0,0 +1,189 @@
+# type: ignore
+# /tests/services/test_result_cache.py
+# Unit tests for services/result_cache.py (content-addressed reuse of analysis results, sqlite)
+
+import os
+import sys
+import shutil
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import models
+import database
+from services.result_cache import (
+    content_hash, find_cached_result, remember_result, reuse_cached_result, rebase_path, outputs_dir
+)
+
+SHA = "a" * 64
+FINGERPRINT = "f" * 64
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.VideoFileInfo.__table__,
+        models.AnalysisResultCache.__table__,
+        models.VideoStreamPackage.__table__,
+        models.VideoPreviewMedia.__table__
+    ])
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+
+
+def add_video(db, video_id, user_id, sha=SHA, status="uploaded"):
+    video = models.VideoUpload(id=video_id, user_id=user_id, title="Session", brocade_type="FIRST",
+                               video_path=f"uploads/{video_id}.mp4", processing_status=status)
+    db.add(video)
+    if sha:
+        db.add(models.VideoFileInfo(video_id=video_id, size_bytes=10, sha256=sha, storage_type="local"))
+    db.commit()
+    return video
+
+
+def add_analyzed_source(db, video_id=1, user_id=1):
+    """A completed analysis with outputs on disk and a cache entry"""
+    source = add_video(db, video_id, user_id, status="completed")
+    base = f"outputs_json/{user_id}/{video_id}"
+    os.makedirs(f"{base}/hls/analyzed", exist_ok=True)
+    for name, content in (("results_video.json", "{}"), ("analyzed_video.mp4", "mp4"),
+                          ("timings.json", "{}"), ("preprocessed_video.mp4", "tmp"),
+                          ("hls/analyzed/master.m3u8", "#EXTM3U")):
+        with open(f"{base}/{name}", "w") as f:
+            f.write(content)
+    source.keypoints_path = f"{base}/results_video.json"
+    source.analyzed_video_path = f"{base}/analyzed_video.mp4"
+    db.add(models.VideoStreamPackage(video_id=video_id, variant="analyzed", base_path=f"{base}/hls/analyzed",
+                                     renditions='["360p"]', storage_type="local"))
+    db.add(models.AnalysisResultCache(content_sha256=SHA, pipeline_fingerprint=FINGERPRINT, video_id=video_id))
+    db.commit()
+    return source
+
+
+class TestLookup:
+    """Cache keys and stale entries"""
+
+    def test_content_hash_from_upload(self, sqlite_db):
+        video = add_video(sqlite_db, 1, 1)
+
+        assert content_hash(sqlite_db, video) == SHA
+
+    def test_content_hash_computed_for_legacy_video(self, sqlite_db):
+        video = add_video(sqlite_db, 1, 1, sha=None)
+        os.makedirs("uploads")
+        with open(video.video_path, "wb") as f:
+            f.write(b"video bytes")
+
+        assert content_hash(sqlite_db, video) is None
+        computed = content_hash(sqlite_db, video, compute=True)
+
+        assert len(computed) == 64
+        assert sqlite_db.query(models.VideoFileInfo).filter_by(video_id=1).one().sha256 == computed
+
+    def test_miss_for_other_pipeline(self, sqlite_db):
+        add_analyzed_source(sqlite_db)
+
+        assert find_cached_result(sqlite_db, SHA, "0" * 64) is None
+        assert find_cached_result(sqlite_db, SHA, FINGERPRINT) is not None
+
+    def test_entry_with_missing_outputs_is_dropped(self, sqlite_db):
+        add_video(sqlite_db, 1, 1, status="completed")
+        sqlite_db.add(models.AnalysisResultCache(content_sha256=SHA, pipeline_fingerprint=FINGERPRINT, video_id=1))
+        sqlite_db.commit()
+
+        assert find_cached_result(sqlite_db, SHA, FINGERPRINT) is None
+        assert sqlite_db.query(models.AnalysisResultCache).count() == 0
+
+    def test_remember_keeps_existing_entry(self, sqlite_db):
+        add_analyzed_source(sqlite_db)
+        other = add_video(sqlite_db, 2, 1, status="completed")
+
+        assert remember_result(sqlite_db, other, FINGERPRINT) is False
+        assert sqlite_db.query(models.AnalysisResultCache).one().video_id == 1
+
+    def test_remember_new_result(self, sqlite_db):
+        video = add_video(sqlite_db, 1, 1, status="completed")
+
+        assert remember_result(sqlite_db, video, FINGERPRINT) is True
+        assert remember_result(sqlite_db, video, None) is False
+        assert sqlite_db.query(models.AnalysisResultCache).one().content_sha256 == SHA
+
+
+class TestReuse:
+    """Linking a cached analysis into another video"""
+
+    def test_reuse_links_outputs(self, sqlite_db):
+        add_analyzed_source(sqlite_db)
+        video = add_video(sqlite_db, 5, 2)
+
+        reused = reuse_cached_result(sqlite_db, video, FINGERPRINT)
+
+        assert reused["source_video_id"] == 1
+        assert video.processing_status == "completed"
+        assert video.keypoints_path == "outputs_json/2/5/results_video.json"
+        assert video.analyzed_video_path == "outputs_json/2/5/analyzed_video.mp4"
+        # Same file on disk, not a second copy
+        source_stat = os.stat("outputs_json/1/1/analyzed_video.mp4")
+        target_stat = os.stat("outputs_json/2/5/analyzed_video.mp4")
+        assert reused["linked"] + reused["copied"] == 3
+        if reused["copied"] == 0:
+            assert source_stat.st_ino == target_stat.st_ino
+
+    def test_reuse_skips_run_files(self, sqlite_db):
+        add_analyzed_source(sqlite_db)
+        video = add_video(sqlite_db, 5, 2)
+
+        reuse_cached_result(sqlite_db, video, FINGERPRINT)
+
+        target = outputs_dir(2, 5)
+        assert not os.path.exists(os.path.join(target, "timings.json"))
+        assert not os.path.exists(os.path.join(target, "preprocessed_video.mp4"))
+        assert os.path.exists(os.path.join(target, "hls", "analyzed", "master.m3u8"))
+
+    def test_reuse_copies_stream_packages(self, sqlite_db):
+        add_analyzed_source(sqlite_db)
+        video = add_video(sqlite_db, 5, 2)
+
+        reuse_cached_result(sqlite_db, video, FINGERPRINT)
+
+        package = sqlite_db.query(models.VideoStreamPackage).filter_by(video_id=5).one()
+        assert package.base_path == "outputs_json/2/5/hls/analyzed"
+        assert package.get_renditions() == ["360p"]
+        assert sqlite_db.query(models.AnalysisResultCache).one().hits == 1
+
+    def test_reanalysis_of_cached_video_is_skipped(self, sqlite_db):
+        source = add_analyzed_source(sqlite_db)
+
+        reused = reuse_cached_result(sqlite_db, source, FINGERPRINT)
+
+        assert reused == {"source_video_id": 1, "linked": 0, "copied": 0}
+        assert source.processing_status == "completed"
+        assert source.keypoints_path == "outputs_json/1/1/results_video.json"
+        assert sqlite_db.query(models.AnalysisResultCache).one().hits == 1
+
+    def test_reanalysis_runs_when_own_outputs_are_gone(self, sqlite_db):
+        source = add_analyzed_source(sqlite_db)
+        shutil.rmtree(outputs_dir(1, 1))
+
+        assert reuse_cached_result(sqlite_db, source, FINGERPRINT) is None
+        assert sqlite_db.query(models.AnalysisResultCache).count() == 0
+
+    def test_no_reuse_of_different_content(self, sqlite_db):
+        add_analyzed_source(sqlite_db)
+        different = add_video(sqlite_db, 6, 2, sha="b" * 64)
+
+        assert reuse_cached_result(sqlite_db, different, FINGERPRINT) is None
+        assert different.processing_status == "uploaded"
+
+    def test_rebase_path(self):
+        assert rebase_path("outputs_json\\1\\1\\a.json", "outputs_json/1/1/", "outputs_json/2/5/") == "outputs_json/2/5/a.json"
+        assert rebase_path("uploads/1.mp4", "outputs_json/1/1/", "outputs_json/2/5/") is None
+        assert rebase_path(None, "outputs_json/1/1/", "outputs_json/2/5/") is None
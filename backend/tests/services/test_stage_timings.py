@@ -0,0 +1,199 @@
+# type: ignore
+# /tests/services/test_stage_timings.py
+# Unit tests for ml_pipeline/stage_timing.py and services/stage_timings.py (sqlite)
+
+import os
+import sys
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import models
+import database
+from ml_pipeline.stage_timing import StageTimer, StageTotals, add_reported_stages, timings_path
+from services.stage_timings import save_stage_timings, list_runs, load_run, stage_summary
+
+
+@pytest.fixture
+def sqlite_db():
+    engine = create_engine("sqlite://")
+    database.Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.VideoUpload.__table__,
+        models.AnalysisStageTiming.__table__
+    ])
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    db = sessionmaker(bind=engine)()
+    db.add(models.VideoUpload(id=1, user_id=1, title="Session", video_path="v.mp4", brocade_type="FIRST"))
+    db.commit()
+    statements.clear()
+    yield db, statements
+    db.close()
+
+
+def make_run(run_id, day, mmpose_seconds=10.0, status="ok"):
+    started = datetime(2024, 1, day, 12).isoformat()
+    return {
+        "run_id": run_id,
+        "spans": [
+            {"stage": "preprocess", "parent": None, "started_at": started, "seconds": 2.0,
+             "frames": 300, "fps": 150.0, "status": "ok", "details": {}},
+            {"stage": "mmpose", "parent": None, "started_at": started, "seconds": mmpose_seconds,
+             "frames": 300, "fps": 300 / mmpose_seconds, "status": status, "details": {"returncode": 0}},
+            {"stage": "pose_estimation", "parent": "mmpose", "started_at": started, "seconds": 6.0,
+             "frames": 300, "fps": 50.0, "status": "ok", "details": {}}
+        ]
+    }
+
+
+class TestStageTimer:
+    """Collecting spans in the pipeline"""
+
+    def test_stage_records_frames_and_fps(self):
+        timer = StageTimer(run_id="r1")
+
+        with timer.stage("preprocess") as span:
+            span["frames"] = 120
+
+        recorded = timer.spans[0]
+        assert recorded["stage"] == "preprocess"
+        assert recorded["frames"] == 120
+        assert recorded["status"] == "ok"
+        assert recorded["fps"] is None or recorded["fps"] > 0
+
+    def test_stage_exception_marks_error(self):
+        timer = StageTimer()
+
+        with pytest.raises(RuntimeError):
+            with timer.stage("web_conversion"):
+                raise RuntimeError("ffmpeg failed")
+
+        assert timer.spans[0]["status"] == "error"
+
+    def test_finish_open_closes_abandoned_spans(self):
+        timer = StageTimer()
+        timer.start("mmpose")
+
+        timer.finish_open()
+
+        assert timer.spans[0]["stage"] == "mmpose"
+        assert timer.spans[0]["status"] == "error"
+
+    def test_total_counts_top_level_spans_only(self):
+        timer = StageTimer()
+        timer.add_span("mmpose", 10.0, frames=200)
+        timer.add_span("pose_estimation", 6.0, frames=200, parent="mmpose")
+        timer.add_span("web_conversion", 1.5)
+
+        assert timer.total_seconds() == 11.5
+        assert timer.spans[0]["fps"] == 20.0
+
+    def test_save_and_load(self, tmp_path):
+        timer = StageTimer(run_id="abc")
+        timer.add_span("preprocess", 1.0, frames=10)
+        path = timings_path(str(tmp_path / "outputs"))
+
+        timer.save(path)
+        loaded = StageTimer.load(path)
+
+        assert loaded.run_id == "abc"
+        assert loaded.spans == timer.spans
+        assert StageTimer.load(str(tmp_path / "missing.json")) is None
+
+    def test_add_reported_stages(self, tmp_path):
+        path = tmp_path / "mmpose_timings.json"
+        path.write_text(json.dumps({"stages": {
+            "model_load": {"seconds": 3.0, "frames": None},
+            "pose_estimation": {"seconds": 5.0, "frames": 250}
+        }}))
+        timer = StageTimer()
+
+        frames = add_reported_stages(timer, str(path), parent="mmpose")
+
+        assert frames == 250
+        assert [span["parent"] for span in timer.spans] == ["mmpose", "mmpose"]
+        assert timer.spans[1]["fps"] == 50.0
+        assert add_reported_stages(timer, str(tmp_path / "missing.json"), parent="mmpose") is None
+
+    def test_stage_totals_round_trip(self, tmp_path):
+        """Per-frame steps summed in the subprocess come back as one span per stage"""
+        path = str(tmp_path / "mmpose_timings.json")
+        totals = StageTotals()
+        for _ in range(3):
+            totals.add("pose_estimation", 0.5, 1)
+        totals.add("model_load", 2.0)
+        totals.save(path)
+        timer = StageTimer()
+
+        frames = add_reported_stages(timer, path, parent="mmpose")
+
+        assert frames == 3
+        pose = next(span for span in timer.spans if span["stage"] == "pose_estimation")
+        assert pose["seconds"] == 1.5
+        assert pose["fps"] == 2.0
+
+
+class TestStoreTimings:
+    """Persisting and reading back the spans of analysis jobs"""
+
+    def test_save_is_one_insert(self, sqlite_db):
+        db, statements = sqlite_db
+
+        count = save_stage_timings(db, 1, make_run("run-a", day=1))
+
+        inserts = [s for s in statements if s.startswith("INSERT")]
+        assert count == 3
+        assert len(inserts) == 1
+        assert db.query(models.AnalysisStageTiming).count() == 3
+
+    def test_resave_replaces_run(self, sqlite_db):
+        db, _ = sqlite_db
+        save_stage_timings(db, 1, make_run("run-a", day=1))
+
+        save_stage_timings(db, 1, make_run("run-a", day=1))
+
+        assert db.query(models.AnalysisStageTiming).count() == 3
+
+    def test_runs_newest_first(self, sqlite_db):
+        db, _ = sqlite_db
+        save_stage_timings(db, 1, make_run("run-a", day=1))
+        save_stage_timings(db, 1, make_run("run-b", day=2, status="error"))
+
+        runs = list_runs(db, 1)
+
+        assert [run["run_id"] for run in runs] == ["run-b", "run-a"]
+        assert runs[0]["failed"] is True
+        assert runs[1]["total_seconds"] == 12.0
+
+    def test_load_run(self, sqlite_db):
+        db, _ = sqlite_db
+        save_stage_timings(db, 1, make_run("run-a", day=1))
+
+        spans = load_run(db, 1, "run-a")
+
+        assert [span["stage"] for span in spans] == ["preprocess", "mmpose", "pose_estimation"]
+        assert spans[1]["details"] == {"returncode": 0}
+        assert spans[2]["parent"] == "mmpose"
+
+    def test_stage_summary(self, sqlite_db):
+        db, statements = sqlite_db
+        save_stage_timings(db, 1, make_run("run-a", day=1, mmpose_seconds=10.0))
+        save_stage_timings(db, 1, make_run("run-b", day=2, mmpose_seconds=20.0, status="error"))
+        statements.clear()
+
+        summary = {row["stage"]: row for row in stage_summary(db)}
+
+        assert len(statements) == 1
+        assert summary["mmpose"]["runs"] == 2
+        assert summary["mmpose"]["errors"] == 1
+        assert summary["mmpose"]["avg_seconds"] == 15.0
+        assert summary["mmpose"]["max_seconds"] == 20.0
+        assert summary["pose_estimation"]["parent"] == "mmpose"
+        assert [row["stage"] for row in stage_summary(db, stage="preprocess")] == ["preprocess"]
@@ -0,0 +1,107 @@
+# type: ignore
+# /tests/services/test_video_upload.py
+# Unit tests for services/video_upload.py core functions
+
+import os
+import sys
+import hashlib
+import pytest
+from unittest.mock import Mock, AsyncMock
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from services.video_upload import (
+    BlockBlobWriter,
+    UploadTooLargeError,
+    stream_upload_to_blob,
+    stream_upload_to_file,
+    make_block_id
+)
+
+
+def chunked_file(data, read_size_log=None):
+    """Mock UploadFile that serves data in the requested block sizes"""
+    position = {"offset": 0}
+
+    async def read(size=-1):
+        if read_size_log is not None:
+            read_size_log.append(size)
+        start = position["offset"]
+        chunk = data[start:start + size] if size > 0 else data[start:]
+        position["offset"] += len(chunk)
+        return chunk
+
+    file = Mock()
+    file.read = AsyncMock(side_effect=read)
+    return file
+
+
+class TestBlockBlobWriter:
+
+    @pytest.mark.asyncio
+    async def test_stages_fixed_size_blocks_and_commits(self):
+        """Test that small writes are grouped into full blocks"""
+        blob_client = Mock(url="https://example/videos/a.mp4")
+        writer = BlockBlobWriter(blob_client, block_size=10, max_size=100)
+
+        for _ in range(5):
+            await writer.write(b"abcdef")  # 30 bytes in 6-byte pieces
+        await writer.commit(metadata={"user_id": "1"})
+
+        staged = [call.args[1] for call in blob_client.stage_block.call_args_list]
+        assert [len(block) for block in staged] == [10, 10, 10]
+        assert b"".join(staged) == b"abcdef" * 5
+
+        block_ids = blob_client.commit_block_list.call_args.args[0]
+        assert block_ids == [make_block_id(0), make_block_id(1), make_block_id(2)]
+        assert writer.sha256 == hashlib.sha256(b"abcdef" * 5).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_size_limit_enforced_while_streaming(self):
+        """Test that an oversized upload stops before the rest is read"""
+        blob_client = Mock()
+        reads = []
+        file = chunked_file(b"x" * 1000, reads)
+
+        with pytest.raises(UploadTooLargeError):
+            await stream_upload_to_blob(file, blob_client, max_size=250)
+
+        # Reads are block-sized and stop once the limit is passed
+        assert all(size > 0 for size in reads)
+        blob_client.commit_block_list.assert_not_called()
+
+
+class TestStreamUploads:
+
+    @pytest.mark.asyncio
+    async def test_stream_upload_to_blob_records_hash(self):
+        blob_client = Mock(url="https://example/videos/a.mp4")
+        data = os.urandom(3000)
+
+        result = await stream_upload_to_blob(chunked_file(data), blob_client, metadata={"user_id": "1"})
+
+        assert result["size"] == 3000
+        assert result["sha256"] == hashlib.sha256(data).hexdigest()
+        metadata = blob_client.commit_block_list.call_args.kwargs["metadata"]
+        assert metadata == {"user_id": "1", "sha256": result["sha256"]}
+
+    @pytest.mark.asyncio
+    async def test_stream_upload_to_file(self, tmp_path):
+        data = os.urandom(5000)
+        path = str(tmp_path / "video.mp4")
+
+        result = await stream_upload_to_file(chunked_file(data), path, block_size=1024)
+
+        with open(path, "rb") as f:
+            assert f.read() == data
+        assert result["sha256"] == hashlib.sha256(data).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_stream_upload_to_file_too_large_removes_partial(self, tmp_path):
+        path = str(tmp_path / "video.mp4")
+
+        with pytest.raises(UploadTooLargeError):
+            await stream_upload_to_file(chunked_file(b"x" * 5000), path, max_size=2048, block_size=1024)
+
+        assert not os.path.exists(path)
@@ -0,0 +1,81 @@
+# type: ignore
+# /tests/utils/test_cache.py
+# Unit tests for utils/cache.py core functions
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.cache import (
+    LRUCache,
+    master_artifact_cache,
+    master_cache_key,
+    invalidate_master_artifacts
+)
+
+
+class TestLRUCache:
+
+    def test_get_counts_hits_and_misses(self):
+        """Test that lookups are counted"""
+        cache = LRUCache(max_bytes=100)
+        cache.set("a", {"x": 1}, 10)
+
+        assert cache.get("a") == {"x": 1}
+        assert cache.get("b") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_evicts_least_recently_used_when_over_size(self):
+        """Test that the cache stays within its byte budget"""
+        cache = LRUCache(max_bytes=30)
+        cache.set("a", 1, 10)
+        cache.set("b", 2, 10)
+        cache.set("c", 3, 10)
+        cache.get("a")  # a is now most recently used
+
+        cache.set("d", 4, 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["bytes"] == 30
+        assert cache.stats()["evictions"] == 1
+
+    def test_oversized_value_not_stored(self):
+        """Test that a value bigger than the cache is skipped"""
+        cache = LRUCache(max_bytes=10)
+        cache.set("big", "x", 11)
+
+        assert cache.stats()["entries"] == 0
+
+    @patch('utils.cache.time.monotonic')
+    def test_entries_expire_after_ttl(self, mock_monotonic):
+        """Test that expired entries count as misses"""
+        cache = LRUCache(max_bytes=100, ttl_seconds=60)
+        mock_monotonic.return_value = 1000
+        cache.set("a", 1, 1)
+
+        mock_monotonic.return_value = 1030
+        assert cache.get("a") == 1
+
+        mock_monotonic.return_value = 1061
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_invalidate_master_artifacts(self):
+        """Test that only the given video's files are dropped"""
+        master_artifact_cache.clear()
+        master_artifact_cache.set(master_cache_key(1, "master_balance.json"), {}, 1)
+        master_artifact_cache.set(master_cache_key(1, "master_symmetry.json"), {}, 1)
+        master_artifact_cache.set(master_cache_key(12, "master_balance.json"), {}, 1)
+
+        assert invalidate_master_artifacts(1) == 2
+        assert master_artifact_cache.get(master_cache_key(12, "master_balance.json")) == {}
+        master_artifact_cache.clear()
@@ -0,0 +1,49 @@
+# type: ignore
+# /tests/utils/test_http_range.py
+# Unit tests for utils/http_range.py core functions
+
+import os
+import sys
+import pytest
+from fastapi import HTTPException
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.http_range import parse_range_header
+
+
+class TestParseRangeHeader:
+
+    def test_no_header_means_whole_file(self):
+        assert parse_range_header(None, 1000) is None
+
+    def test_closed_range(self):
+        assert parse_range_header("bytes=0-499", 1000) == (0, 499)
+
+    def test_open_ended_range(self):
+        """Test the 'bytes=N-' form browsers send when seeking"""
+        assert parse_range_header("bytes=600-", 1000) == (600, 999)
+
+    def test_suffix_range(self):
+        assert parse_range_header("bytes=-100", 1000) == (900, 999)
+
+    def test_end_clamped_to_size(self):
+        assert parse_range_header("bytes=900-5000", 1000) == (900, 999)
+
+    def test_multiple_ranges_served_whole(self):
+        assert parse_range_header("bytes=0-10,20-30", 1000) is None
+
+    def test_unsatisfiable_range(self):
+        """Test that a start past the end gives 416 with the full size"""
+        with pytest.raises(HTTPException) as exc_info:
+            parse_range_header("bytes=1000-", 1000)
+
+        assert exc_info.value.status_code == 416
+        assert exc_info.value.headers["Content-Range"] == "bytes */1000"
+
+    def test_malformed_range(self):
+        with pytest.raises(HTTPException) as exc_info:
+            parse_range_header("bytes=abc-def", 1000)
+
+        assert exc_info.value.status_code == 416
@@ -0,0 +1,147 @@
+# type: ignore
+# /tests/utils/test_metrics.py
+# Unit tests for utils/metrics.py core functions
+
+import os
+import sys
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils import metrics
+from utils.metrics import (
+    Histogram,
+    Counter,
+    MetricsMiddleware,
+    count_storage_call,
+    instrument_engine,
+    render,
+    reset,
+    scrape_authorized
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    reset()
+    yield
+    reset()
+
+
+class TestMetricTypes:
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that each observation lands in the first bucket with bound >= value"""
+        histogram = Histogram("latency", "Latency", ("route",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(("/a",), value)
+
+        snapshot = histogram.snapshot(("/a",))
+        assert snapshot["buckets"] == {0.1: 2, 1: 3, float("inf"): 4}
+        assert snapshot["count"] == 4
+        assert snapshot["sum"] == pytest.approx(3.65)
+
+    def test_render_prometheus_text(self):
+        """Test the exposition format of histograms and counters"""
+        histogram = Histogram("latency", "Latency", ("route",), buckets=(0.1,))
+        histogram.observe(('/x"y',), 0.2)
+        counter = Counter("calls_total", "Calls", ("kind",))
+        counter.inc(("db",), 3)
+
+        lines = histogram.collect() + counter.collect()
+
+        assert "# TYPE latency histogram" in lines
+        assert 'latency_bucket{route="/x\\"y",le="0.1"} 0' in lines
+        assert 'latency_bucket{route="/x\\"y",le="+Inf"} 1' in lines
+        assert 'latency_count{route="/x\\"y"} 1' in lines
+        assert 'calls_total{kind="db"} 3' in lines
+
+
+class TestMiddleware:
+
+    @pytest.fixture
+    def client(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(engine)
+        instrument_engine(engine)  # idempotent
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/api/items/{item_id}")
+        async def get_item(item_id: int):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+            # Storage calls made on a worker thread still belong to this request
+            await asyncio.to_thread(count_storage_call)
+            return {"id": item_id, "in_flight": metrics.requests_in_flight.value()}
+
+        @app.get("/api/missing")
+        async def missing():
+            from fastapi import HTTPException
+            raise HTTPException(status_code=404, detail="nope")
+
+        return TestClient(app)
+
+    def test_latency_per_route_template_and_status(self, client):
+        """Test that different ids share one series and statuses are separate"""
+        assert client.get("/api/items/1").json()["in_flight"] == 1
+        client.get("/api/items/2")
+        client.get("/api/missing")
+        client.get("/not/a/route")
+
+        assert metrics.request_duration.snapshot(("GET", "/api/items/{item_id}", "200"))["count"] == 2
+        assert metrics.request_duration.snapshot(("GET", "/api/missing", "404"))["count"] == 1
+        assert metrics.request_duration.snapshot(("GET", "unmatched", "404"))["count"] == 1
+        assert metrics.requests_in_flight.value() == 0
+
+    def test_db_and_storage_calls_per_route(self, client):
+        """Test that statements and storage calls are charged to the route"""
+        client.get("/api/items/1")
+        client.get("/api/items/2")
+
+        route = ("GET", "/api/items/{item_id}")
+        assert metrics.db_statements.value(route) == 4
+        assert metrics.storage_calls.value(route) == 2
+
+    def test_render_includes_request_metrics(self, client):
+        client.get("/api/items/1")
+
+        output = render()
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/items/{item_id}",status="200"} 1' in output
+        assert 'http_request_db_statements_total{method="GET",route="/api/items/{item_id}"} 2' in output
+        assert "http_requests_in_flight 0" in output
+
+    def test_calls_outside_requests_are_ignored(self):
+        count_storage_call()
+
+        assert "http_request_storage_calls_total{" not in render()
+
+
+class TestScrapeAccess:
+
+    def test_closed_without_token(self, monkeypatch):
+        monkeypatch.delenv("METRICS_TOKEN", raising=False)
+        monkeypatch.delenv("METRICS_PUBLIC", raising=False)
+
+        assert scrape_authorized(None) is False
+        assert scrape_authorized("Bearer anything") is False
+
+    def test_explicit_opt_out(self, monkeypatch):
+        monkeypatch.delenv("METRICS_TOKEN", raising=False)
+        monkeypatch.setenv("METRICS_PUBLIC", "1")
+
+        assert scrape_authorized(None) is True
+
+    def test_token_required(self, monkeypatch):
+        monkeypatch.setenv("METRICS_TOKEN", "secret")
+        monkeypatch.setenv("METRICS_PUBLIC", "1")
+
+        assert scrape_authorized("Bearer secret") is True
+        assert scrape_authorized("Bearer wrong") is False
+        assert scrape_authorized(None) is False
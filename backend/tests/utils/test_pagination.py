@@ -0,0 +1,34 @@
+# type: ignore
+# /tests/utils/test_pagination.py
+# Unit tests for utils/pagination.py core functions
+
+import os
+import sys
+import pytest
+from datetime import datetime
+from fastapi import HTTPException
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.pagination import clamp_page_size, encode_cursor, decode_cursor, MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+
+
+class TestCursors:
+
+    def test_round_trip(self):
+        timestamp = datetime(2025, 6, 1, 12, 30, 15, 123456)
+
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    def test_garbage_cursor_rejected(self):
+        for cursor in ("not-a-cursor", encode_cursor(datetime(2025, 1, 1), 1)[:-3]):
+            with pytest.raises(HTTPException) as exc_info:
+                decode_cursor(cursor)
+            assert exc_info.value.status_code == 400
+
+    def test_page_size_clamped(self):
+        assert clamp_page_size(None) == DEFAULT_PAGE_SIZE
+        assert clamp_page_size(0) == DEFAULT_PAGE_SIZE
+        assert clamp_page_size(-5) == 1
+        assert clamp_page_size(10_000) == MAX_PAGE_SIZE
@@ -10,7 +10,16 @@ from unittest.mock import Mock, patch
 # Add the backend root directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from utils.security import verify_password, get_password_hash, pwd_context
+from passlib.context import CryptContext
+from utils.security import (
+    verify_password,
+    get_password_hash,
+    pwd_context,
+    verify_and_update_password,
+    verify_password_async,
+    get_password_hash_async,
+    BCRYPT_ROUNDS
+)
 
 
 class TestPasswordHashing:
@@ -303,4 +312,45 @@ class TestErrorHandling:
         
         for password in test_passwords:
             hashed = get_password_hash(password)
-            assert verify_password(password, hashed) is True
\ No newline at end of file
+            assert verify_password(password, hashed) is True
+
+
+class TestPasswordPool:
+
+    def test_hash_uses_configured_rounds(self):
+        """Test that new hashes use BCRYPT_ROUNDS"""
+        assert int(get_password_hash("pw").split('$')[2]) == BCRYPT_ROUNDS
+
+    def test_outdated_cost_is_rehashed(self):
+        """Test that a hash with another cost verifies and comes back upgraded"""
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("pw")
+
+        valid, new_hash = verify_and_update_password("pw", old_hash)
+
+        assert valid is True
+        assert int(new_hash.split('$')[2]) == BCRYPT_ROUNDS
+        assert verify_password("pw", new_hash)
+
+    def test_current_cost_is_not_rehashed(self):
+        valid, new_hash = verify_and_update_password("pw", get_password_hash("pw"))
+
+        assert valid is True
+        assert new_hash is None
+
+    def test_wrong_password_is_not_rehashed(self):
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("pw")
+
+        assert verify_and_update_password("wrong", old_hash) == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_async_helpers_run_off_the_event_loop(self):
+        """Test that hashing runs on the password pool threads"""
+        import threading
+
+        with patch('utils.security.pwd_context') as mock_context:
+            mock_context.hash.side_effect = lambda password: threading.current_thread().name
+
+            thread_name = await get_password_hash_async("pw")
+
+        assert thread_name.startswith("password-hash")
+        assert await verify_password_async("pw", get_password_hash("pw")) is True
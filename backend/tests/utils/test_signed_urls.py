@@ -0,0 +1,78 @@
+# type: ignore
+# /tests/utils/test_signed_urls.py
+# Unit tests for utils/signed_urls.py core functions
+
+import os
+import sys
+import pytest
+from urllib.parse import unquote
+from fastapi import HTTPException
+
+# Add the backend root directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from utils.signed_urls import sign_stream_token, verify_stream_token, build_stream_url, build_media_url
+
+PATH = "https://baduanjintesting.blob.core.windows.net/videos/uploads/videos/1/a.mp4"
+
+
+class TestStreamTokens:
+
+    def test_round_trip(self):
+        token = sign_stream_token(5, "original", PATH, ttl_seconds=60, now=1000)
+        payload = verify_stream_token(token, 5, "original", now=1030)
+
+        assert payload["path"] == PATH
+        assert payload["exp"] == 1060
+
+    def test_expired_token_rejected(self):
+        token = sign_stream_token(5, "original", PATH, ttl_seconds=60, now=1000)
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_stream_token(token, 5, "original", now=1061)
+
+        assert exc_info.value.status_code == 401
+        assert "expired" in exc_info.value.detail
+
+    def test_tampered_payload_rejected(self):
+        """A token for another video's path must not be forged by editing the payload"""
+        token = sign_stream_token(5, "original", PATH, now=1000)
+        other = sign_stream_token(6, "original", PATH.replace("/1/", "/2/"), now=1000)
+        forged = f"{other.split('.')[0]}.{token.split('.')[1]}"
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_stream_token(forged, 6, "original", now=1000)
+
+        assert exc_info.value.status_code == 401
+
+    def test_wrong_video_or_variant_rejected(self):
+        token = sign_stream_token(5, "original", PATH, now=1000)
+
+        for video_id, variant in ((6, "original"), (5, "analyzed")):
+            with pytest.raises(HTTPException) as exc_info:
+                verify_stream_token(token, video_id, variant, now=1000)
+            assert exc_info.value.status_code == 403
+
+    def test_malformed_token_rejected(self):
+        with pytest.raises(HTTPException) as exc_info:
+            verify_stream_token("not-a-token", 5, "original")
+
+        assert exc_info.value.status_code == 401
+
+    def test_build_stream_url(self):
+        url = build_stream_url(5, "analyzed", PATH)
+
+        assert url.startswith("/api/videos/5/stream-video?type=analyzed&sig=")
+        token = unquote(url.split("sig=", 1)[1])
+        assert verify_stream_token(token, 5, "analyzed")["path"] == PATH
+
+    def test_media_url_stable_within_a_day(self):
+        """Test that poster URLs stay the same across page loads so browsers reuse them"""
+        day = 86400 * 20000
+        first = build_media_url(5, "original", "base/v1", "v1", "poster.jpg", now=day + 60)
+        later = build_media_url(5, "original", "base/v1", "v1", "poster.jpg", now=day + 80000)
+        next_day = build_media_url(5, "original", "base/v1", "v1", "poster.jpg", now=day + 86400 + 60)
+
+        assert first == later
+        assert first != next_day
+        assert first.startswith("/api/videos/5/media/original/v1/poster.jpg?sig=")
@@ -0,0 +1,138 @@
+# utils/cache.py
+# Small in-process caches shared by the routers
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by total size in bytes, with an optional TTL.
+    Callers pass the size of each value when storing it. Hits, misses and
+    evictions are counted for the stats endpoint.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, stored_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, size: int):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            # A value larger than the whole cache is not worth keeping
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _remove(self, key: str):
+        _value, size, _stored_at = self._entries.pop(key)
+        self._bytes -= size
+
+# Master reference JSON (joint angles, balance, ...) shared by every follower's
+# comparison. The TTL bounds staleness when another worker re-analyzes a video.
+master_artifact_cache = LRUCache(
+    max_bytes=int(os.getenv("MASTER_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    ttl_seconds=float(os.getenv("MASTER_CACHE_TTL_SECONDS", "3600"))
+)
+
+def master_cache_key(video_id: int, file_name: str) -> str:
+    return f"{video_id}/{file_name}"
+
+def invalidate_master_artifacts(video_id: int) -> int:
+    """Drop every cached master file of a video (re-analysis, reset, delete)"""
+    return master_artifact_cache.invalidate_prefix(f"{video_id}/")
+
+# Size/ETag/content type of streamed blobs, so the many Range requests of one
+# playback session do not each pay a get_blob_properties round trip. Entries
+# are tiny; the bound is on count (one "byte" each).
+blob_properties_cache = LRUCache(
+    max_bytes=int(os.getenv("BLOB_PROPERTIES_CACHE_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("BLOB_PROPERTIES_CACHE_TTL_SECONDS", "300"))
+)
+
+def invalidate_blob_properties(prefix: str) -> int:
+    """Drop cached properties of blobs under a path (re-analysis, delete)"""
+    return blob_properties_cache.invalidate_prefix(prefix)
+
+# User rows behind authenticated requests, keyed by id. Every polling tick and
+# video chunk resolves its user; the short TTL bounds staleness across workers,
+# and role/profile changes invalidate explicitly in this one.
+user_cache = LRUCache(
+    max_bytes=int(os.getenv("USER_CACHE_ENTRIES", "4096")),
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+)
+
+def user_cache_key(user_id: int) -> str:
+    return str(user_id)
+
+def invalidate_user(user_id: int):
+    """Drop a cached user after a role, profile or agreement change"""
+    user_cache.invalidate(user_cache_key(user_id))
@@ -0,0 +1,48 @@
+# utils/http_range.py
+# Parsing of HTTP Range headers for video streaming
+
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=start-end" range against a resource of `size` bytes.
+    Returns (start, end) inclusive, or None to send the whole resource
+    (no header, multiple ranges, or a unit other than bytes).
+    Raises 416 when the range cannot be satisfied.
+    """
+    if not range_header:
+        return None
+
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, _, end_text = ranges.strip().partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: the last N bytes
+            suffix_length = int(end_text)
+            if suffix_length <= 0:
+                raise ValueError
+            start = max(size - suffix_length, 0)
+            end = size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+            end = min(end, size - 1)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Invalid Range header",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    return start, end
@@ -0,0 +1,230 @@
+# utils/metrics.py
+# In-process request metrics in Prometheus text format: latency histograms per
+# route template and status, DB statements and storage calls per route, and
+# in-flight requests. Counts are per worker process; scrape every worker.
+
+import os
+import hmac
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; the upper bounds of the latency histogram buckets (+Inf is implicit)
+LATENCY_BUCKETS = tuple(
+    float(b) for b in os.getenv(
+        "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30"
+    ).split(",")
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{format_labels(self.labelnames, labels)} {format_value(v)}" for labels, v in values]
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Gauge(Counter):
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram; observe is one bisect and a few adds under a lock"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self, labels: Tuple) -> Optional[Dict]:
+        """{"buckets": cumulative counts per bound, "count", "sum"} of one series"""
+        with self._lock:
+            series = list(self._series.get(labels) or [])
+        if not series:
+            return None
+        cumulative, running = [], 0
+        for count in series[:-1]:
+            running += count
+            cumulative.append(running)
+        return {"buckets": dict(zip(self.buckets + (float("inf"),), cumulative)),
+                "count": running, "sum": series[-1]}
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, values in series:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                running += count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames + ('le',), labels + (le,))} {running}")
+            label_text = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {format_value(values[-1])}")
+            lines.append(f"{self.name}_count{label_text} {running}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+REQUEST_LABELS = ("method", "route", "status")
+ROUTE_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency until the last body byte is sent", REQUEST_LABELS
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Requests being served")
+db_statements = Counter(
+    "http_request_db_statements_total", "SQL statements executed while serving requests", ROUTE_LABELS
+)
+storage_calls = Counter(
+    "http_request_storage_calls_total", "Blob storage HTTP calls made while serving requests", ROUTE_LABELS
+)
+REGISTRY = [request_duration, requests_in_flight, db_statements, storage_calls]
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+def scrape_authorized(authorization: Optional[str]) -> bool:
+    """
+    Whether a scrape may read the metrics: it must send "Bearer $METRICS_TOKEN".
+    Without a token configured nobody may, unless METRICS_PUBLIC=1 opts out.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        return os.getenv("METRICS_PUBLIC") == "1"
+    return hmac.compare_digest(authorization or "", f"Bearer {token}")
+
+def reset():
+    """Drop all series (tests)"""
+    for metric in REGISTRY:
+        metric.clear()
+
+# Per-request call counts. The value is a mutable dict so that worker threads
+# started with asyncio.to_thread / the starlette threadpool (which copy the
+# context) add to the same request's counts.
+_request_calls: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_calls", default=None)
+
+def count_call(kind: str):
+    calls = _request_calls.get()
+    if calls is not None:
+        calls[kind] += 1
+
+def count_db_statement(*_args, **_kwargs):
+    count_call("db")
+
+def count_storage_call(*_args, **_kwargs):
+    """raw_response_hook for Azure clients: one call per HTTP response"""
+    count_call("storage")
+
+def instrument_engine(engine):
+    """Count statements of a sync Engine (pass async_engine.sync_engine for async ones)"""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", count_db_statement):
+        event.listen(engine, "before_cursor_execute", count_db_statement)
+
+def route_template(scope) -> str:
+    """Path template of the matched route, so /api/videos/12 and /13 share a series"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if scope.get("endpoint") is not None:
+        # Mounted app (static files): the mount path
+        return scope.get("root_path", "").rstrip("/") + "/{path}"
+    return "unmatched"
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/queue per request).
+    Latency runs until the response is complete, so streamed bodies count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        calls = {"db": 0, "storage": 0}
+        token = _request_calls.set(calls)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec()
+            _request_calls.reset(token)
+
+            route = (scope["method"], route_template(scope))
+            request_duration.observe(route + (str(status["code"]),), elapsed)
+            if calls["db"]:
+                db_statements.inc(route, calls["db"])
+            if calls["storage"]:
+                storage_calls.inc(route, calls["storage"])
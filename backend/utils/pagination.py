@@ -0,0 +1,83 @@
+# utils/pagination.py
+# Keyset (cursor) pagination for newest-first listings. A page is found by
+# seeking the index past the last row seen, so page 500 costs the same as
+# page 1 and no total count is ever computed.
+
+import json
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of encode_cursor; 400 for anything that did not come from it"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_paginate(query, timestamp_column, id_column, cursor: Optional[str] = None,
+                    limit: Optional[int] = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of query ordered by (timestamp_column, id_column) descending,
+    starting after cursor. Rows must expose both columns as attributes (ORM
+    objects or projected rows). Returns (rows, next_cursor); next_cursor is
+    None on the last page.
+    """
+    limit = clamp_page_size(limit)
+
+    if cursor:
+        after_timestamp, after_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            timestamp_column < after_timestamp,
+            and_(timestamp_column == after_timestamp, id_column < after_id)
+        ))
+
+    # One extra row tells whether another page exists without counting
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
+
+def id_paginate(query, id_column, cursor: Optional[str] = None, limit: Optional[int] = None,
+                row_id=None) -> Tuple[List[Any], Optional[str]]:
+    """
+    Ascending pages over a unique integer column. row_id extracts the id from
+    a row when rows are tuples (e.g. an entity plus aggregate columns).
+    """
+    limit = clamp_page_size(limit)
+
+    if cursor:
+        _timestamp, after_id = decode_cursor(cursor)
+        query = query.filter(id_column > after_id)
+
+    rows = query.order_by(id_column).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id = row_id(rows[-1]) if row_id else getattr(rows[-1], id_column.key)
+        next_cursor = encode_cursor(None, last_id)
+
+    return rows, next_cursor
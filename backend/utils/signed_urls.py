@@ -0,0 +1,99 @@
+# utils/signed_urls.py
+# Short-lived HMAC-signed stream URLs. get_video checks access once and hands
+# out one URL per variant; the stream endpoint then verifies the signature
+# without touching the database.
+
+import os
+import hmac
+import time
+import json
+import base64
+import hashlib
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException
+
+from config import settings
+
+STREAM_URL_TTL_SECONDS = int(os.getenv("STREAM_URL_TTL_SECONDS", "3600"))
+# Preview media URLs are signed per day, so the same URL (and the browser's
+# cached copy) is reused across page loads
+MEDIA_URL_BUCKET_SECONDS = 86400
+
+def _signing_key() -> bytes:
+    # Separate from the JWT key when configured, so leaking one does not forge the other
+    secret = os.getenv("STREAM_URL_SECRET") or f"stream-url:{settings.secret_key}"
+    return secret.encode()
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload_part: str) -> str:
+    return _b64encode(hmac.new(_signing_key(), payload_part.encode(), hashlib.sha256).digest())
+
+def sign_stream_token(video_id: int, variant: str, path: str, ttl_seconds: Optional[int] = None,
+                      now: Optional[float] = None) -> str:
+    """
+    Token carrying the video id, variant, resolved storage path and expiry.
+    The path is inside the signature, so the stream endpoint can trust it as is.
+    """
+    expires = int((now or time.time()) + (ttl_seconds or STREAM_URL_TTL_SECONDS))
+    payload = {"vid": video_id, "var": variant, "path": path, "exp": expires}
+    payload_part = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{payload_part}.{_sign(payload_part)}"
+
+def verify_stream_token(token: str, video_id: int, variant: str, now: Optional[float] = None) -> Dict:
+    """
+    Check signature, expiry and that the token was issued for this video and
+    variant. Returns the payload; raises 401/403 otherwise.
+    """
+    payload_part, _, signature = token.partition(".")
+    if not payload_part or not signature:
+        raise HTTPException(status_code=401, detail="Invalid stream signature")
+
+    if not hmac.compare_digest(signature, _sign(payload_part)):
+        raise HTTPException(status_code=401, detail="Invalid stream signature")
+
+    try:
+        payload = json.loads(_b64decode(payload_part))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid stream signature")
+
+    if payload.get("exp", 0) < (now or time.time()):
+        raise HTTPException(status_code=401, detail="Stream URL expired")
+
+    if payload.get("vid") != video_id or payload.get("var") != variant:
+        raise HTTPException(status_code=403, detail="Stream URL not valid for this video")
+
+    return payload
+
+def build_stream_url(video_id: int, variant: str, path: str, ttl_seconds: Optional[int] = None) -> str:
+    token = sign_stream_token(video_id, variant, path, ttl_seconds)
+    return f"/api/videos/{video_id}/stream-video?type={variant}&sig={quote(token)}"
+
+def hls_token_variant(variant: str) -> str:
+    """HLS tokens are scoped apart from progressive ones for the same variant"""
+    return f"hls-{variant}"
+
+def build_hls_url(video_id: int, variant: str, base_path: str, ttl_seconds: Optional[int] = None) -> str:
+    token = sign_stream_token(video_id, hls_token_variant(variant), base_path, ttl_seconds)
+    return f"/api/videos/{video_id}/hls/{variant}/master.m3u8?sig={quote(token)}"
+
+def media_token_variant(variant: str) -> str:
+    return f"media-{variant}"
+
+def build_media_url(video_id: int, variant: str, base_path: str, version: str, filename: str,
+                    now: Optional[float] = None) -> str:
+    """
+    Signed URL of a preview file. The expiry is rounded to the current day
+    bucket (valid one to two days), so repeated calls give the same URL.
+    """
+    now = now or time.time()
+    bucket_start = now - now % MEDIA_URL_BUCKET_SECONDS
+    token = sign_stream_token(video_id, media_token_variant(variant), base_path,
+                              ttl_seconds=2 * MEDIA_URL_BUCKET_SECONDS, now=bucket_start)
+    return f"/api/videos/{video_id}/media/{variant}/{version}/{filename}?sig={quote(token)}"
@@ -834,8 +834,8 @@ def register_api_routes(app, web_analyzer):
             )
             
             # Add headers for Azure transfer compatibility
+            # send_file sets Content-Length itself (the part size for Range requests)
             response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Content-Length'] = str(file_size)
             response.headers['Accept-Ranges'] = 'bytes'
             response.headers['X-Web-Optimized'] = 'true' if '_web' in filename else 'false'
             response.headers['X-Enhanced-Tracking'] = 'true' if ENHANCED_TRACKING_AVAILABLE else 'false'  # 🚀 NEW